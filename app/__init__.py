@@ -8,11 +8,30 @@ from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 import logging
 import os
+import threading
 from datetime import timedelta
 
 from app.config.settings import Config
 from app.database.connection import init_databases
+from app.database.health_monitor import init_health_monitor
+from app.database.replica_router import init_replica_routers
+from app.services.archive import init_archives
+from app.services.balance_snapshots import init_balance_snapshots
+from app.services.business_calendar import init_business_calendars
+from app.services.change_stream import init_change_streams
+from app.services.hot_accounts import init_hot_accounts
+from app.services.ledger import init_journal_appliers
+from app.services.limit_profiles import init_limit_profile_caches
+from app.services.restraint_index import init_restraint_indexes
+from app.utils.admission import init_admission
 from app.utils.logger import setup_logging
+from app.utils.profiler import init_profiler, install_signal_handler
+from app.utils.encoding import BankingJSONProvider
+
+
+# Process that ran start_worker; a forked child has another pid and starts its own
+_worker_pid = None
+_worker_lock = threading.Lock()
 
 
 def create_app(config_class=Config):
@@ -20,6 +39,9 @@ def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
     
+    # Decimal-exact JSON / MessagePack responses for all blueprints
+    app.json = BankingJSONProvider(app)
+    
     # Setup logging
     setup_logging(app)
     
@@ -31,17 +53,34 @@ def create_app(config_class=Config):
     app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)
     app.config['JWT_REFRESH_TOKEN_EXPIRES'] = timedelta(days=30)
     
-    # Initialize databases
-    init_databases(app)
+    # Initialize databases; with LAZY_STARTUP each process creates its engines on first use
+    init_databases(app, lazy=app.config.get('LAZY_STARTUP', True))
+    
+    # Caches, indexes and background threads belong to the worker process: a
+    # preloading master must not start them, since threads do not survive fork
+    if not app.config.get('LAZY_STARTUP', True):
+        start_worker(app)
+    app.before_request(lambda: start_worker(app))
+    
+    # Open the segment archives so history reads reach archived rows
+    init_archives(app)
+    
+    # Turn away requests past per-client rate limits or the in-flight cap
+    init_admission(app)
+    
+    # Attribute profiler samples to the request each thread serves
+    init_profiler(app)
     
     # Register blueprints
     from app.api.health_api import health_bp
     from app.api.account_api import account_bp
     from app.api.transfer_api import transfer_bp
+    from app.api.admin_api import admin_bp
     
     app.register_blueprint(health_bp)
     app.register_blueprint(account_bp, url_prefix='/api/v1')
     app.register_blueprint(transfer_bp, url_prefix='/api/v1')
+    app.register_blueprint(admin_bp, url_prefix='/admin')
     
     # Error handlers
     @app.errorhandler(404)
@@ -60,6 +99,57 @@ def create_app(config_class=Config):
     return app
 
 
+def start_worker(app):
+    """
+    Start the per-process state of a worker, once per process.
+    
+    Called by the gunicorn post_worker_init hook after fork, and before each
+    request as a fallback (a pid comparison once started). With lazy startup
+    the databases are first connected here, and an unreachable database shows
+    up in the health monitor rather than failing the worker.
+    """
+    global _worker_pid
+    
+    if _worker_pid == os.getpid():
+        return
+    with _worker_lock:
+        if _worker_pid == os.getpid():
+            return
+        
+        # Start replica lag sampling for read-only routing
+        init_replica_routers(app)
+        
+        # Start background database health probes
+        init_health_monitor(app)
+        
+        # Load in-memory restraint indexes for transfer validation
+        init_restraint_indexes(app)
+        
+        # Load hot accounts and start slot compaction
+        init_hot_accounts(app)
+        
+        # Start the limit profile caches for transfer limit checks
+        init_limit_profile_caches(app)
+        
+        # Push binlog changes to the restraint indexes and limit profile caches
+        init_change_streams(app)
+        
+        # Post journal entries to the balances when this instance runs the applier
+        init_journal_appliers(app)
+        
+        # Load branch business calendars for value dating
+        init_business_calendars(app)
+        
+        # Start the end-of-day balance snapshot job
+        init_balance_snapshots(app)
+        
+        # Profile this worker on SIGUSR2 (gunicorn resets the handler in each worker)
+        install_signal_handler()
+        
+        _worker_pid = os.getpid()
+        app.logger.info(f'Worker {_worker_pid} started')
+
+
 if __name__ == '__main__':
     app = create_app()
     app.run(host='0.0.0.0', port=5000, debug=False)
\ No newline at end of file
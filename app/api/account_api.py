@@ -2,19 +2,40 @@
 Account management API endpoints
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 import logging
+import threading
 
-from app.database.connection import get_source_session, get_dest_session
+from app.database.connection import (
+    get_source_session, get_dest_session, get_source_read_session, get_dest_read_session
+)
 from app.services.account_service import AccountService
+from app.services.archive import get_segment_archive
+from app.services.hot_accounts import get_hot_account_registry
+from app.services.limit_profiles import get_limit_profile_cache
+from app.services.restraint_index import get_restraint_index
+from app.config.settings import Config
 from app.utils.exceptions import BankingException
 from app.utils.logger import log_audit
+from app.utils.read_consistency import client_written_at
+from app.utils.validators import validate_timestamp
 
 logger = logging.getLogger(__name__)
 
 account_bp = Blueprint('account', __name__)
 
+# Runs the per-database queries of a multi-account balance lookup side by side
+_balance_executor = None
+_balance_executor_lock = threading.Lock()
+
+# (response name, registry name, read session factory), in order of precedence
+_BALANCE_DATABASES = (
+    ('source', 'source', get_source_read_session),
+    ('destination', 'dest', get_dest_read_session)
+)
+
 
 @account_bp.route('/accounts/<account_no>', methods=['GET'])
 @jwt_required(optional=True)
@@ -23,8 +44,11 @@ def get_account_info(account_no):
     try:
         # Try source database first
         try:
-            with get_source_session() as session:
-                account_service = AccountService(session)
+            with get_source_read_session((account_no,), client_written_at()) as session:
+                account_service = AccountService(
+                    session, hot_accounts=get_hot_account_registry('source'),
+                    limit_profiles=get_limit_profile_cache('source')
+                )
                 account_info = account_service.get_account_info(account_no)
                 account_info['database'] = 'source'
                 
@@ -39,8 +63,11 @@ def get_account_info(account_no):
                 
         except Exception:
             # Try destination database
-            with get_dest_session() as session:
-                account_service = AccountService(session)
+            with get_dest_read_session((account_no,), client_written_at()) as session:
+                account_service = AccountService(
+                    session, hot_accounts=get_hot_account_registry('dest'),
+                    limit_profiles=get_limit_profile_cache('dest')
+                )
                 account_info = account_service.get_account_info(account_no)
                 account_info['database'] = 'destination'
                 
@@ -74,9 +101,9 @@ def get_account_balance(account_no):
     try:
         # Try source database first
         try:
-            with get_source_session() as session:
-                account_service = AccountService(session)
-                account, balance = account_service.get_account_balance(account_no)
+            with get_source_read_session((account_no,), client_written_at()) as session:
+                account_service = AccountService(session, hot_accounts=get_hot_account_registry('source'))
+                account, balance = account_service.get_account_balance_record(account_no)
                 
                 # Log audit event
                 user_id = get_jwt_identity() or 'anonymous'
@@ -86,7 +113,8 @@ def get_account_balance(account_no):
                     'success': True,
                     'data': {
                         'account_no': account_no,
-                        'balance': float(balance.TOTAL_AMOUNT),
+                        'balance': balance.TOTAL_AMOUNT,
+                        'available_balance': balance.available_amount,
                         'currency': account.ACCT_CCY,
                         'last_updated': balance.TRAN_TIMESTAMP.isoformat(),
                         'database': 'source'
@@ -95,9 +123,9 @@ def get_account_balance(account_no):
                 
         except Exception:
             # Try destination database
-            with get_dest_session() as session:
-                account_service = AccountService(session)
-                account, balance = account_service.get_account_balance(account_no)
+            with get_dest_read_session((account_no,), client_written_at()) as session:
+                account_service = AccountService(session, hot_accounts=get_hot_account_registry('dest'))
+                account, balance = account_service.get_account_balance_record(account_no)
                 
                 # Log audit event
                 user_id = get_jwt_identity() or 'anonymous'
@@ -107,7 +135,8 @@ def get_account_balance(account_no):
                     'success': True,
                     'data': {
                         'account_no': account_no,
-                        'balance': float(balance.TOTAL_AMOUNT),
+                        'balance': balance.TOTAL_AMOUNT,
+                        'available_balance': balance.available_amount,
                         'currency': account.ACCT_CCY,
                         'last_updated': balance.TRAN_TIMESTAMP.isoformat(),
                         'database': 'destination'
@@ -128,6 +157,185 @@ def get_account_balance(account_no):
         }), 500
 
 
+def _get_balance_executor():
+    global _balance_executor
+    with _balance_executor_lock:
+        if _balance_executor is None:
+            _balance_executor = ThreadPoolExecutor(
+                max_workers=2 * len(_BALANCE_DATABASES), thread_name_prefix='balance-lookup'
+            )
+        return _balance_executor
+
+
+def _balance_response(account, balance, database):
+    """Build the balance payload of one account"""
+    return {
+        'account_no': account.BASE_ACCT_NO,
+        'balance': balance.TOTAL_AMOUNT,
+        'available_balance': balance.available_amount,
+        'currency': account.ACCT_CCY,
+        'last_updated': balance.TRAN_TIMESTAMP.isoformat(),
+        'database': database
+    }
+
+
+def _lookup_balances(name, get_read_session, account_nos, client_no, written_at):
+    """Balance records of one database: one IN-list query, or one query by client"""
+    with get_read_session(tuple(account_nos), written_at) as session:
+        account_service = AccountService(session, hot_accounts=get_hot_account_registry(name))
+        if client_no is not None:
+            return account_service.get_client_balance_records(client_no)
+        return account_service.get_account_balance_records(account_nos)
+
+
+@account_bp.route('/accounts/balances', methods=['POST'])
+@jwt_required(optional=True)
+def get_account_balances():
+    """Get the balances of several accounts ({"account_nos": [...]}) or of all accounts of a client ({"client_no": ...})"""
+    try:
+        data = request.get_json(silent=True)
+        data = data if isinstance(data, dict) else {}
+        account_nos, client_no = data.get('account_nos'), data.get('client_no')
+        
+        if client_no is not None:
+            if account_nos is not None or not isinstance(client_no, str) or not client_no:
+                return jsonify({
+                    'error': {
+                        'code': 'INVALID_REQUEST',
+                        'message': 'Request body must contain either account_nos or client_no'
+                    }
+                }), 400
+            account_nos = []
+        elif not isinstance(account_nos, list) or not account_nos or \
+                not all(isinstance(account_no, str) and account_no for account_no in account_nos):
+            return jsonify({
+                'error': {
+                    'code': 'INVALID_REQUEST',
+                    'message': 'Request body must contain an account_nos list of account numbers or a client_no'
+                }
+            }), 400
+        
+        account_nos = list(dict.fromkeys(account_nos))
+        max_accounts = Config().ACCOUNT_BALANCES_MAX_ACCOUNTS
+        if len(account_nos) > max_accounts:
+            return jsonify({
+                'error': {
+                    'code': 'TOO_MANY_ACCOUNTS',
+                    'message': f'At most {max_accounts} accounts per request'
+                }
+            }), 400
+        
+        # An account lives in one database, so both are asked at once instead of one after the other
+        written_at = client_written_at()
+        futures = [
+            (database, _get_balance_executor().submit(
+                _lookup_balances, name, get_read_session, account_nos, client_no, written_at
+            ))
+            for database, name, get_read_session in _BALANCE_DATABASES
+        ]
+        
+        found, unavailable = {}, []
+        for database, future in futures:
+            try:
+                records = future.result()
+            except Exception as e:
+                logger.warning(f"Balance lookup in {database} database failed: {str(e)}")
+                unavailable.append(database)
+                continue
+            # The source database wins, as with the single-account lookup
+            for account_no, (account, balance) in records.items():
+                found.setdefault(account_no, _balance_response(account, balance, database))
+        
+        if len(unavailable) == len(futures):
+            raise RuntimeError('No database answered the balance lookup')
+        
+        if client_no is not None:
+            account_nos = sorted(found)
+        balances = [found[account_no] for account_no in account_nos if account_no in found]
+        
+        # Log audit event
+        user_id = get_jwt_identity() or 'anonymous'
+        log_audit(user_id, 'VIEW_BALANCES', client_no or 'accounts', {'account_nos': account_nos})
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'client_no': client_no,
+                'balances': balances,
+                'not_found': [account_no for account_no in account_nos if account_no not in found],
+                'unavailable': unavailable,
+                'count': len(balances)
+            }
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Unexpected error in multi-account balance lookup: {str(e)}")
+        return jsonify({
+            'error': {
+                'code': 'INTERNAL_ERROR',
+                'message': 'Internal server error'
+            }
+        }), 500
+
+
+def _balance_at_response(account, point, at, database):
+    """Build the point-in-time balance payload"""
+    return {
+        'account_no': account.BASE_ACCT_NO,
+        'timestamp': at.isoformat(),
+        'balance': point.balance,
+        'currency': account.ACCT_CCY,
+        'snapshot_date': point.snapshot_date.isoformat() if point.snapshot_date else None,
+        'replay_direction': point.direction,
+        'replayed_transactions': point.replayed,
+        'database': database
+    }
+
+
+@account_bp.route('/accounts/<account_no>/balance/at', methods=['GET'])
+@jwt_required(optional=True)
+def get_account_balance_at(account_no):
+    """Get account balance at a point in time (?timestamp=ISO 8601, UTC unless an offset is given)"""
+    try:
+        at = validate_timestamp(request.args.get('timestamp'))
+        
+        # Try source database first
+        try:
+            with get_source_read_session((account_no,), client_written_at()) as session:
+                account_service = AccountService(session, hot_accounts=get_hot_account_registry('source'))
+                account, point = account_service.get_balance_at(account_no, at)
+                database = 'source'
+                
+        except Exception:
+            # Try destination database
+            with get_dest_read_session((account_no,), client_written_at()) as session:
+                account_service = AccountService(session, hot_accounts=get_hot_account_registry('dest'))
+                account, point = account_service.get_balance_at(account_no, at)
+                database = 'destination'
+        
+        # Log audit event
+        user_id = get_jwt_identity() or 'anonymous'
+        log_audit(user_id, 'VIEW_BALANCE_HISTORY', account_no, {'timestamp': at.isoformat()})
+        
+        return jsonify({
+            'success': True,
+            'data': _balance_at_response(account, point, at, database)
+        }), 200
+        
+    except BankingException as e:
+        logger.warning(f"Point-in-time balance lookup failed: {str(e)}")
+        return jsonify(e.to_dict()), 400
+        
+    except Exception as e:
+        logger.error(f"Unexpected error in point-in-time balance lookup: {str(e)}")
+        return jsonify({
+            'error': {
+                'code': 'INTERNAL_ERROR',
+                'message': 'Internal server error'
+            }
+        }), 500
+
+
 @account_bp.route('/accounts/<account_no>/transactions', methods=['GET'])
 @jwt_required(optional=True)
 def get_account_transactions(account_no):
@@ -141,8 +349,8 @@ def get_account_transactions(account_no):
         
         # Try source database first
         try:
-            with get_source_session() as session:
-                account_service = AccountService(session)
+            with get_source_read_session((account_no,), client_written_at()) as session:
+                account_service = AccountService(session, archive=get_segment_archive('source'))
                 source_transactions = account_service.get_account_transaction_history(
                     account_no, limit, offset
                 )
@@ -155,8 +363,8 @@ def get_account_transactions(account_no):
         
         # Try destination database
         try:
-            with get_dest_session() as session:
-                account_service = AccountService(session)
+            with get_dest_read_session((account_no,), client_written_at()) as session:
+                account_service = AccountService(session, archive=get_segment_archive('dest'))
                 dest_transactions = account_service.get_account_transaction_history(
                     account_no, limit, offset
                 )
@@ -209,7 +417,7 @@ def validate_account(account_no):
         # Try source database first
         try:
             with get_source_session() as session:
-                account_service = AccountService(session)
+                account_service = AccountService(session, get_restraint_index('source'))
                 account, balance = account_service.validate_account_for_transfer(
                     account_no, is_source
                 )
@@ -222,7 +430,7 @@ def validate_account(account_no):
                         'account_name': account.ACCT_NAME,
                         'currency': account.ACCT_CCY,
                         'status': account.ACCT_STATUS,
-                        'balance': float(balance.TOTAL_AMOUNT),
+                        'balance': balance.TOTAL_AMOUNT,
                         'database': 'source'
                     }
                 }), 200
@@ -230,7 +438,7 @@ def validate_account(account_no):
         except Exception:
             # Try destination database
             with get_dest_session() as session:
-                account_service = AccountService(session)
+                account_service = AccountService(session, get_restraint_index('dest'))
                 account, balance = account_service.validate_account_for_transfer(
                     account_no, is_source
                 )
@@ -243,7 +451,7 @@ def validate_account(account_no):
                         'account_name': account.ACCT_NAME,
                         'currency': account.ACCT_CCY,
                         'status': account.ACCT_STATUS,
-                        'balance': float(balance.TOTAL_AMOUNT),
+                        'balance': balance.TOTAL_AMOUNT,
                         'database': 'destination'
                     }
                 }), 200
@@ -0,0 +1,103 @@
+"""
+Admin API endpoints: on-demand profiling of the serving worker
+"""
+
+import os
+import logging
+
+from flask import Blueprint, Response, current_app, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
+
+from app.utils.logger import log_audit
+from app.utils.profiler import PROFILE_NAME, ProfilerBusy, list_profiles, profile_name, start_profile
+
+logger = logging.getLogger(__name__)
+
+admin_bp = Blueprint('admin', __name__)
+
+ADMIN_ROLE = 'admin'
+
+
+def _error(code, message, status):
+    return jsonify({'error': {'code': code, 'message': message}}), status
+
+
+def _admin_only():
+    """Error response unless the caller holds an admin token and profiling is enabled"""
+    if get_jwt().get('role') != ADMIN_ROLE:
+        return _error('FORBIDDEN', 'Admin role required', 403)
+    if not current_app.config.get('PROFILER_ENABLED', True):
+        return _error('PROFILER_DISABLED', 'Profiling is disabled', 404)
+    return None
+
+
+@admin_bp.route('/profiles', methods=['POST'])
+@jwt_required()
+def create_profile():
+    """Start sampling the worker serving this request; the result is saved when it ends"""
+    denied = _admin_only()
+    if denied:
+        return denied
+    
+    data = request.get_json(silent=True) or {}
+    max_seconds = float(current_app.config.get('PROFILER_MAX_SECONDS', 120))
+    try:
+        seconds = float(data.get('seconds', 30))
+        interval_ms = float(data.get('interval_ms', current_app.config.get('PROFILER_INTERVAL_MS', 10)))
+    except (TypeError, ValueError):
+        return _error('INVALID_REQUEST', 'seconds and interval_ms must be numbers', 400)
+    if not 0 < seconds <= max_seconds or not 1 <= interval_ms <= 1000:
+        return _error('INVALID_REQUEST',
+                      f'seconds must be in (0, {max_seconds:g}] and interval_ms in [1, 1000]', 400)
+    
+    try:
+        profiler = start_profile(seconds, interval_ms / 1000, all_threads=bool(data.get('all_threads')))
+    except ProfilerBusy as e:
+        return _error('PROFILER_BUSY', str(e), 409)
+    
+    log_audit(get_jwt_identity(), 'START_PROFILE', str(os.getpid()))
+    return jsonify({
+        'success': True,
+        'data': {
+            'profile': profile_name(profiler),
+            'pid': os.getpid(),
+            'seconds': seconds,
+            'interval_ms': interval_ms
+        }
+    }), 202
+
+
+@admin_bp.route('/profiles', methods=['GET'])
+@jwt_required()
+def get_profiles():
+    """List the saved profiles of all workers, newest first"""
+    denied = _admin_only()
+    if denied:
+        return denied
+    
+    return jsonify({
+        'success': True,
+        'data': {'profiles': list_profiles(current_app.config.get('PROFILER_DIR', '/app/data/profiles'))}
+    }), 200
+
+
+@admin_bp.route('/profiles/<name>', methods=['GET'])
+@jwt_required()
+def get_profile(name):
+    """A saved profile: collapsed stacks, or its summary with ?format=json"""
+    denied = _admin_only()
+    if denied:
+        return denied
+    if not PROFILE_NAME.match(name):
+        return _error('INVALID_REQUEST', 'Invalid profile name', 400)
+    
+    suffix = '.json' if request.args.get('format') == 'json' else '.collapsed'
+    path = os.path.join(current_app.config.get('PROFILER_DIR', '/app/data/profiles'), name + suffix)
+    try:
+        with open(path) as f:
+            content = f.read()
+    except FileNotFoundError:
+        # Still running, or removed by PROFILER_KEEP
+        return _error('PROFILE_NOT_FOUND', f'Profile {name} not found', 404)
+    
+    return Response(content, mimetype='application/json' if suffix == '.json' else 'text/plain')
@@ -7,16 +7,42 @@ from datetime import datetime
 import logging
 
 from app.database.connection import get_database_info, test_connections
+from app.database.health_monitor import (
+    get_health_monitor, STATUS_HEALTHY, STATUS_DEGRADED
+)
 
 logger = logging.getLogger(__name__)
 
 health_bp = Blueprint('health', __name__)
 
+# Statuses under which the service keeps receiving traffic
+SERVING_STATUSES = (STATUS_HEALTHY, STATUS_DEGRADED)
+
+
+def _cached_health():
+    """Get the cached health snapshot, or None when the monitor is not running"""
+    monitor = get_health_monitor()
+    if monitor is None:
+        return None
+    return monitor.snapshot()
+
 
 @health_bp.route('/health', methods=['GET'])
 def health_check():
     """Basic health check endpoint"""
     try:
+        snapshot = _cached_health()
+        if snapshot is not None:
+            status = snapshot['status']
+            return jsonify({
+                'status': status,
+                'timestamp': datetime.utcnow().isoformat(),
+                'service': 'core-banking-transfer-system',
+                'version': '1.0.0',
+                'database_status': 'connected' if status in SERVING_STATUSES else 'disconnected',
+                'checked_at': snapshot['checked_at']
+            }), 200 if status in SERVING_STATUSES else 503
+        
         # Test database connections
         db_status = test_connections()
         
@@ -44,6 +70,10 @@ def health_check():
 def detailed_health_check():
     """Detailed health check with database information"""
     try:
+        snapshot = _cached_health()
+        if snapshot is not None:
+            return _detailed_from_snapshot(snapshot)
+        
         # Get database connection info
         db_info = get_database_info()
         
@@ -81,10 +111,56 @@ def detailed_health_check():
         }), 503
 
 
+def _detailed_from_snapshot(snapshot):
+    """Build the detailed health response from cached monitor state"""
+    # Pool statistics are read from the engines in memory, no query is issued
+    db_info = get_database_info(ping=False)
+    components = snapshot['components']
+    status = snapshot['status']
+    
+    health_status = {
+        'status': status,
+        'timestamp': datetime.utcnow().isoformat(),
+        'service': 'core-banking-transfer-system',
+        'version': '1.0.0',
+        'checked_at': snapshot['checked_at'],
+        'age_seconds': snapshot['age_seconds'],
+        'components': {
+            'source_database': {
+                'status': components.get('source', {}).get('status', 'unknown'),
+                'details': {**db_info.get('source', {}), **components.get('source', {})}
+            },
+            'destination_database': {
+                'status': components.get('dest', {}).get('status', 'unknown'),
+                'details': {**db_info.get('dest', {}), **components.get('dest', {})}
+            }
+        }
+    }
+    
+    status_code = 200 if status in SERVING_STATUSES else 503
+    return jsonify(health_status), status_code
+
+
 @health_bp.route('/health/ready', methods=['GET'])
 def readiness_check():
     """Readiness check for Kubernetes"""
     try:
+        snapshot = _cached_health()
+        if snapshot is not None:
+            if snapshot['status'] in SERVING_STATUSES:
+                return jsonify({
+                    'status': 'ready',
+                    'timestamp': datetime.utcnow().isoformat(),
+                    'health': snapshot['status']
+                }), 200
+            
+            return jsonify({
+                'status': 'not_ready',
+                'timestamp': datetime.utcnow().isoformat(),
+                'reason': 'monitor_starting' if snapshot['checked_at'] is None else 'database_not_connected',
+                'health': snapshot['status']
+            }), 503
+        
         # Test if the application is ready to serve requests
         db_status = test_connections()
         
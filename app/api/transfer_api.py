@@ -5,23 +5,59 @@ Transfer API endpoints
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 import logging
-from decimal import Decimal
 
 from app.services.transfer_service import TransferService
 from app.config.settings import Config
-from app.utils.exceptions import BankingException
+from app.utils.deadline import Deadline
+from app.utils.exceptions import BankingException, TimeoutException
 from app.utils.logger import log_audit
+from app.utils.read_consistency import client_written_at, mark_client_write
+from app.utils.transfer_rules import violation_exception
 
 logger = logging.getLogger(__name__)
 
 transfer_bp = Blueprint('transfer', __name__)
 
 
+def _violation_dict(violation):
+    """Convert a rule violation to a response entry"""
+    return {'code': violation.code, 'field': violation.field, 'message': violation.message}
+
+
+def _missing_fields(violations):
+    """Required request fields a client left out (currency has a default)"""
+    return [v.field for v in violations if v.code == 'MISSING_FIELD' and v.field != 'currency']
+
+
+def _missing_fields_response(fields):
+    """Response for a request without its required fields"""
+    return jsonify({
+        'error': {
+            'code': 'MISSING_FIELDS',
+            'message': f'Missing required fields: {", ".join(fields)}'
+        }
+    }), 400
+
+
+def _violations_response(violations):
+    """Error response for the first violation of a rejected request"""
+    missing = _missing_fields(violations)
+    if missing:
+        return _missing_fields_response(missing)
+    
+    error = violation_exception(violations[0])
+    logger.warning(f"Transfer failed: {str(error)}")
+    return jsonify(error.to_dict()), 400
+
+
 @transfer_bp.route('/transfers', methods=['POST'])
 @jwt_required(optional=True)
 def create_transfer():
     """Create a new transfer"""
     try:
+        # The transfer's time budget starts with the request
+        deadline = Deadline(Config.TRANSACTION_TIMEOUT, 'transfer')
+        
         # Get request data
         data = request.get_json()
         if not data:
@@ -32,23 +68,11 @@ def create_transfer():
                 }
             }), 400
         
-        # Validate required fields
-        required_fields = ['from_account', 'to_account', 'amount']
-        missing_fields = [field for field in required_fields if not data.get(field)]
-        
-        if missing_fields:
-            return jsonify({
-                'error': {
-                    'code': 'MISSING_FIELDS',
-                    'message': f'Missing required fields: {", ".join(missing_fields)}'
-                }
-            }), 400
-        
         # Prepare transfer request
         transfer_request = {
-            'from_account': data['from_account'],
-            'to_account': data['to_account'],
-            'amount': data['amount'],
+            'from_account': data.get('from_account'),
+            'to_account': data.get('to_account'),
+            'amount': data.get('amount'),
             'currency': data.get('currency', 'CNY'),
             'description': data.get('description', 'Transfer'),
             'reference': data.get('reference', '')
@@ -58,8 +82,13 @@ def create_transfer():
         config = Config()
         transfer_service = TransferService(config)
         
+        # Validate the request in one pass; the service does not repeat it
+        transfer_request, violations = transfer_service.rules.validate(transfer_request)
+        if violations:
+            return _violations_response(violations)
+        
         # Process transfer
-        result = transfer_service.process_transfer(transfer_request)
+        result = transfer_service.process_transfer(transfer_request, validated=True, deadline=deadline)
         
         # Log audit event
         user_id = get_jwt_identity() or 'anonymous'
@@ -69,10 +98,15 @@ def create_transfer():
             'amount': transfer_request['amount']
         })
         
-        return jsonify({
+        response = jsonify({
             'success': True,
             'data': result
-        }), 201
+        })
+        return mark_client_write(response), 201
+        
+    except TimeoutException as e:
+        logger.warning(f"Transfer timed out: {str(e)}")
+        return jsonify(e.to_dict()), 504
         
     except BankingException as e:
         logger.warning(f"Transfer failed: {str(e)}")
@@ -98,7 +132,7 @@ def get_transfer_status(transfer_id):
         transfer_service = TransferService(config)
         
         # Get transfer status
-        transfer_info = transfer_service.get_transfer_status(transfer_id)
+        transfer_info = transfer_service.get_transfer_status(transfer_id, client_written_at())
         
         if not transfer_info:
             return jsonify({
@@ -141,7 +175,9 @@ def get_transfer_history(account_no):
         transfer_service = TransferService(config)
         
         # Get transfer history
-        transfers = transfer_service.get_transfer_history(account_no, limit, offset)
+        transfers = transfer_service.get_transfer_history(
+            account_no, limit, offset, client_written_at()
+        )
         
         # Log audit event
         user_id = get_jwt_identity() or 'anonymous'
@@ -183,23 +219,11 @@ def validate_transfer():
                 }
             }), 400
         
-        # Validate required fields
-        required_fields = ['from_account', 'to_account', 'amount']
-        missing_fields = [field for field in required_fields if not data.get(field)]
-        
-        if missing_fields:
-            return jsonify({
-                'error': {
-                    'code': 'MISSING_FIELDS',
-                    'message': f'Missing required fields: {", ".join(missing_fields)}'
-                }
-            }), 400
-        
         # Prepare transfer request
         transfer_request = {
-            'from_account': data['from_account'],
-            'to_account': data['to_account'],
-            'amount': data['amount'],
+            'from_account': data.get('from_account'),
+            'to_account': data.get('to_account'),
+            'amount': data.get('amount'),
             'currency': data.get('currency', 'CNY')
         }
         
@@ -207,8 +231,21 @@ def validate_transfer():
         config = Config()
         transfer_service = TransferService(config)
         
-        # Validate transfer request (this will raise exceptions if invalid)
-        transfer_service._validate_transfer_request(transfer_request)
+        # Collect every rule violation in one pass
+        transfer_request, violations = transfer_service.rules.validate(transfer_request)
+        missing = _missing_fields(violations)
+        if missing:
+            return _missing_fields_response(missing)
+        
+        if violations:
+            return jsonify({
+                'success': False,
+                'data': {
+                    'valid': False,
+                    'error': violation_exception(violations[0]).to_dict(),
+                    'violations': [_violation_dict(v) for v in violations]
+                }
+            }), 200  # Return 200 but with valid=false
         
         # If we get here, the transfer is valid
         return jsonify({
@@ -218,7 +255,7 @@ def validate_transfer():
                 'message': 'Transfer request is valid',
                 'from_account': transfer_request['from_account'],
                 'to_account': transfer_request['to_account'],
-                'amount': float(transfer_request['amount']),
+                'amount': transfer_request['amount'],
                 'currency': transfer_request['currency']
             }
         }), 200
@@ -243,6 +280,63 @@ def validate_transfer():
         }), 500
 
 
+@transfer_bp.route('/transfers/validate/batch', methods=['POST'])
+@jwt_required(optional=True)
+def validate_transfer_batch():
+    """Validate a batch of transfer requests without executing them"""
+    try:
+        data = request.get_json()
+        transfers = data.get('transfers') if isinstance(data, dict) else None
+        if not isinstance(transfers, list) or not all(isinstance(t, dict) for t in transfers):
+            return jsonify({
+                'error': {
+                    'code': 'INVALID_REQUEST',
+                    'message': 'Request body must contain a transfers list of objects'
+                }
+            }), 400
+        
+        config = Config()
+        if len(transfers) > config.TRANSFER_BATCH_MAX_SIZE:
+            return jsonify({
+                'error': {
+                    'code': 'BATCH_TOO_LARGE',
+                    'message': f'At most {config.TRANSFER_BATCH_MAX_SIZE} transfers per batch'
+                }
+            }), 400
+        
+        transfer_requests = [dict(t, currency=t.get('currency', 'CNY')) for t in transfers]
+        _, violations = TransferService(config).rules.validate_batch(transfer_requests)
+        
+        items = [
+            {
+                'index': index,
+                'valid': not request_violations,
+                'violations': [_violation_dict(v) for v in request_violations]
+            }
+            for index, request_violations in enumerate(violations)
+        ]
+        invalid = sum(1 for item in items if not item['valid'])
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'count': len(items),
+                'valid': len(items) - invalid,
+                'invalid': invalid,
+                'results': items
+            }
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Unexpected error in batch transfer validation: {str(e)}")
+        return jsonify({
+            'error': {
+                'code': 'INTERNAL_ERROR',
+                'message': 'Internal server error'
+            }
+        }), 500
+
+
 @transfer_bp.route('/transfers/limits', methods=['GET'])
 @jwt_required(optional=True)
 def get_transfer_limits():
@@ -36,20 +36,150 @@ class Config:
     REDIS_PORT = int(os.environ.get('REDIS_PORT') or 6379)
     REDIS_PASSWORD = os.environ.get('REDIS_PASSWORD') or None
     
+    # Admission Control Settings (per-client token buckets and an in-flight cap, shared through Redis)
+    ADMISSION_ENABLED = (os.environ.get('ADMISSION_ENABLED') or 'true').lower() == 'true'
+    ADMISSION_REDIS_ENABLED = (os.environ.get('ADMISSION_REDIS_ENABLED') or 'true').lower() == 'true'
+    ADMISSION_REDIS_TIMEOUT = float(os.environ.get('ADMISSION_REDIS_TIMEOUT') or 0.05)
+    ADMISSION_REDIS_RETRY = float(os.environ.get('ADMISSION_REDIS_RETRY') or 5)
+    ADMISSION_READ_RATE = float(os.environ.get('ADMISSION_READ_RATE') or 20)
+    ADMISSION_READ_BURST = int(os.environ.get('ADMISSION_READ_BURST') or 40)
+    ADMISSION_WRITE_RATE = float(os.environ.get('ADMISSION_WRITE_RATE') or 5)
+    ADMISSION_WRITE_BURST = int(os.environ.get('ADMISSION_WRITE_BURST') or 10)
+    ADMISSION_MAX_CONCURRENCY = int(os.environ.get('ADMISSION_MAX_CONCURRENCY') or 0)  # 0: WEB_CONCURRENCY x DB_POOL_SIZE
+    ADMISSION_LEASE_SECONDS = float(os.environ.get('ADMISSION_LEASE_SECONDS') or 30)
+    ADMISSION_QUEUE_TIMEOUT = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT') or 0)
+    WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY') or 4)
+    
     # Business Rules Configuration
     MAX_TRANSFER_AMOUNT = float(os.environ.get('MAX_TRANSFER_AMOUNT') or 50000.00)
     DAILY_TRANSFER_LIMIT = float(os.environ.get('DAILY_TRANSFER_LIMIT') or 100000.00)
     MIN_TRANSFER_AMOUNT = float(os.environ.get('MIN_TRANSFER_AMOUNT') or 0.01)
-    TRANSACTION_TIMEOUT = int(os.environ.get('TRANSACTION_TIMEOUT') or 30)
+    TRANSACTION_TIMEOUT = int(os.environ.get('TRANSACTION_TIMEOUT') or 20)  # seconds per transfer; below the gunicorn timeout
+    TRANSFER_BATCH_MAX_SIZE = int(os.environ.get('TRANSFER_BATCH_MAX_SIZE') or 1000)
+    ACCOUNT_BALANCES_MAX_ACCOUNTS = int(os.environ.get('ACCOUNT_BALANCES_MAX_ACCOUNTS') or 100)
+    
+    # Transfer Retry Settings (deadlocks and lock wait timeouts are retried with the same transfer_id)
+    TRANSFER_RETRY_MAX_ATTEMPTS = int(os.environ.get('TRANSFER_RETRY_MAX_ATTEMPTS') or 3)
+    TRANSFER_RETRY_BASE_DELAY = float(os.environ.get('TRANSFER_RETRY_BASE_DELAY') or 0.02)
+    TRANSFER_RETRY_MAX_DELAY = float(os.environ.get('TRANSFER_RETRY_MAX_DELAY') or 0.5)
+    TRANSFER_RETRY_BUDGET_RATIO = float(os.environ.get('TRANSFER_RETRY_BUDGET_RATIO') or 0.1)
+    TRANSFER_RETRY_BUDGET_RESERVE = int(os.environ.get('TRANSFER_RETRY_BUDGET_RESERVE') or 10)
     
     # Logging Configuration
     LOG_LEVEL = os.environ.get('LOG_LEVEL') or 'INFO'
     LOG_FILE = os.environ.get('LOG_FILE') or '/app/logs/banking.log'
     
+    # Startup Settings (lazy: engines, caches and background threads start per worker process)
+    LAZY_STARTUP = (os.environ.get('LAZY_STARTUP') or 'true').lower() == 'true'
+    
     # Database Connection Pool Settings
     DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE') or 10)
     DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT') or 30)
     DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE') or 3600)
+    
+    # Response Encoding Settings
+    JSON_DECIMAL_MODE = os.environ.get('JSON_DECIMAL_MODE') or 'number'  # number, string or cents
+    JSON_USE_ORJSON = (os.environ.get('JSON_USE_ORJSON') or 'true').lower() == 'true'
+    MSGPACK_ENABLED = (os.environ.get('MSGPACK_ENABLED') or 'true').lower() == 'true'
+    
+    # Restraint Index Settings
+    RESTRAINT_INDEX_ENABLED = (os.environ.get('RESTRAINT_INDEX_ENABLED') or 'true').lower() == 'true'
+    RESTRAINT_INDEX_REFRESH_INTERVAL = float(os.environ.get('RESTRAINT_INDEX_REFRESH_INTERVAL') or 1)
+    RESTRAINT_INDEX_MAX_STALENESS = float(os.environ.get('RESTRAINT_INDEX_MAX_STALENESS') or 5)
+    RESTRAINT_INDEX_OVERLAP = float(os.environ.get('RESTRAINT_INDEX_OVERLAP') or 5)
+    RESTRAINT_INDEX_FULL_RELOAD_INTERVAL = float(os.environ.get('RESTRAINT_INDEX_FULL_RELOAD_INTERVAL') or 300)
+    
+    # Limit Profile Cache Settings
+    LIMIT_PROFILE_CACHE_ENABLED = (os.environ.get('LIMIT_PROFILE_CACHE_ENABLED') or 'true').lower() == 'true'
+    LIMIT_PROFILE_MAX_ENTRIES = int(os.environ.get('LIMIT_PROFILE_MAX_ENTRIES') or 100000)
+    LIMIT_PROFILE_REFRESH_INTERVAL = float(os.environ.get('LIMIT_PROFILE_REFRESH_INTERVAL') or 1)
+    LIMIT_PROFILE_MAX_STALENESS = float(os.environ.get('LIMIT_PROFILE_MAX_STALENESS') or 5)
+    LIMIT_PROFILE_OVERLAP = float(os.environ.get('LIMIT_PROFILE_OVERLAP') or 5)
+    LIMIT_PROFILE_FULL_RELOAD_INTERVAL = float(os.environ.get('LIMIT_PROFILE_FULL_RELOAD_INTERVAL') or 300)
+    
+    # Binlog Change Stream Settings (pushes committed changes to the restraint index and limit profile cache)
+    CHANGE_STREAM_ENABLED = (os.environ.get('CHANGE_STREAM_ENABLED') or 'false').lower() == 'true'
+    CHANGE_STREAM_SERVER_ID = int(os.environ.get('CHANGE_STREAM_SERVER_ID') or 100000)  # API workers add their pid
+    CHANGE_STREAM_POLL_INTERVAL = float(os.environ.get('CHANGE_STREAM_POLL_INTERVAL') or 0.5)
+    CHANGE_STREAM_BATCH_SIZE = int(os.environ.get('CHANGE_STREAM_BATCH_SIZE') or 500)
+    CHANGE_STREAM_DIR = os.environ.get('CHANGE_STREAM_DIR') or '/app/data/change_stream'
+    CHANGE_STREAM_REDIS_PREFIX = os.environ.get('CHANGE_STREAM_REDIS_PREFIX') or 'banking:changes'
+    CHANGE_STREAM_REDIS_MAXLEN = int(os.environ.get('CHANGE_STREAM_REDIS_MAXLEN') or 100000)
+    
+    # Ledger Settings (journal mode appends transfers; an applier posts them to rb_acct_balance)
+    LEDGER_MODE = os.environ.get('LEDGER_MODE') or 'balance'  # balance or journal
+    LEDGER_APPLIER_ENABLED = (os.environ.get('LEDGER_APPLIER_ENABLED') or 'false').lower() == 'true'
+    LEDGER_APPLIER_BATCH_SIZE = int(os.environ.get('LEDGER_APPLIER_BATCH_SIZE') or 1000)
+    LEDGER_APPLIER_INTERVAL = float(os.environ.get('LEDGER_APPLIER_INTERVAL') or 0.2)
+    LEDGER_GAP_TIMEOUT = float(os.environ.get('LEDGER_GAP_TIMEOUT') or 60)  # above TRANSACTION_TIMEOUT
+    
+    # Business Calendar Settings
+    BUSINESS_CALENDAR_ENABLED = (os.environ.get('BUSINESS_CALENDAR_ENABLED') or 'true').lower() == 'true'
+    BUSINESS_CALENDAR_COUNTRY = os.environ.get('BUSINESS_CALENDAR_COUNTRY') or 'CHN'
+    BUSINESS_CALENDAR_REFRESH_INTERVAL = float(os.environ.get('BUSINESS_CALENDAR_REFRESH_INTERVAL') or 60)
+    
+    # Balance Snapshot Settings (end-of-day snapshots for point-in-time balances)
+    BALANCE_SNAPSHOT_ENABLED = (os.environ.get('BALANCE_SNAPSHOT_ENABLED') or 'false').lower() == 'true'
+    BALANCE_SNAPSHOT_BATCH_SIZE = int(os.environ.get('BALANCE_SNAPSHOT_BATCH_SIZE') or 500)
+    BALANCE_SNAPSHOT_CHECK_INTERVAL = float(os.environ.get('BALANCE_SNAPSHOT_CHECK_INTERVAL') or 300)
+    BALANCE_SNAPSHOT_SETTLE_SECONDS = float(os.environ.get('BALANCE_SNAPSHOT_SETTLE_SECONDS') or 300)
+    BALANCE_SNAPSHOT_RETENTION_DAYS = int(os.environ.get('BALANCE_SNAPSHOT_RETENTION_DAYS') or 400)
+    BALANCE_SNAPSHOT_MAX_BACKFILL_DAYS = int(os.environ.get('BALANCE_SNAPSHOT_MAX_BACKFILL_DAYS') or 7)
+    
+    # Archive Settings (rb_tran_hist / transfer_log rows past retention move to segment files)
+    ARCHIVE_ENABLED = (os.environ.get('ARCHIVE_ENABLED') or 'false').lower() == 'true'
+    ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR') or '/var/lib/bank/archive'
+    ARCHIVE_RETENTION_DAYS = int(os.environ.get('ARCHIVE_RETENTION_DAYS') or 400)
+    ARCHIVE_BLOCK_ROWS = int(os.environ.get('ARCHIVE_BLOCK_ROWS') or 256)
+    ARCHIVE_DELETE_BATCH_SIZE = int(os.environ.get('ARCHIVE_DELETE_BATCH_SIZE') or 1000)
+    ARCHIVE_DELETE_PAUSE = float(os.environ.get('ARCHIVE_DELETE_PAUSE') or 0.1)
+    ARCHIVE_MAX_DAYS_PER_RUN = int(os.environ.get('ARCHIVE_MAX_DAYS_PER_RUN') or 7)
+    
+    # Analytics Settings (columnar history export for turnover reports)
+    ANALYTICS_DIR = os.environ.get('ANALYTICS_DIR') or '/var/lib/bank/analytics'
+    ANALYTICS_CHUNK_ROWS = int(os.environ.get('ANALYTICS_CHUNK_ROWS') or 50000)
+    ANALYTICS_MAX_BACKFILL_DAYS = int(os.environ.get('ANALYTICS_MAX_BACKFILL_DAYS') or 7)
+    
+    # Statement Settings (bulk statements from python -m app.tools.account_statements)
+    STATEMENT_DIR = os.environ.get('STATEMENT_DIR') or '/var/lib/bank/statements'
+    STATEMENT_WORKERS = int(os.environ.get('STATEMENT_WORKERS') or 4)
+    STATEMENT_FETCH_ROWS = int(os.environ.get('STATEMENT_FETCH_ROWS') or 5000)
+    
+    # Read Replica Settings (replica hosts come from DB1_REPLICA_HOST / DB2_REPLICA_HOST)
+    REPLICA_ROUTING_ENABLED = (os.environ.get('REPLICA_ROUTING_ENABLED') or 'true').lower() == 'true'
+    REPLICA_MAX_LAG = float(os.environ.get('REPLICA_MAX_LAG') or 2)
+    REPLICA_LAG_CHECK_INTERVAL = float(os.environ.get('REPLICA_LAG_CHECK_INTERVAL') or 1)
+    REPLICA_STICKY_SECONDS = float(os.environ.get('REPLICA_STICKY_SECONDS') or 5)
+    
+    # Hot Account Settings
+    HOT_ACCOUNT_ENABLED = (os.environ.get('HOT_ACCOUNT_ENABLED') or 'true').lower() == 'true'
+    HOT_ACCOUNT_DEFAULT_SLOTS = int(os.environ.get('HOT_ACCOUNT_DEFAULT_SLOTS') or 8)
+    HOT_ACCOUNT_AUTO_DETECT = (os.environ.get('HOT_ACCOUNT_AUTO_DETECT') or 'true').lower() == 'true'
+    HOT_ACCOUNT_LOCK_WAIT_MS = float(os.environ.get('HOT_ACCOUNT_LOCK_WAIT_MS') or 50)
+    HOT_ACCOUNT_LOCK_WAIT_COUNT = int(os.environ.get('HOT_ACCOUNT_LOCK_WAIT_COUNT') or 20)
+    HOT_ACCOUNT_DETECT_WINDOW = float(os.environ.get('HOT_ACCOUNT_DETECT_WINDOW') or 60)
+    HOT_ACCOUNT_REFRESH_INTERVAL = float(os.environ.get('HOT_ACCOUNT_REFRESH_INTERVAL') or 30)
+    HOT_ACCOUNT_COMPACT_INTERVAL = float(os.environ.get('HOT_ACCOUNT_COMPACT_INTERVAL') or 60)
+    
+    # Profiler Settings (on-demand stack sampling of a worker: POST /admin/profiles or SIGUSR2)
+    PROFILER_ENABLED = (os.environ.get('PROFILER_ENABLED') or 'true').lower() == 'true'
+    PROFILER_DIR = os.environ.get('PROFILER_DIR') or '/app/data/profiles'
+    PROFILER_INTERVAL_MS = float(os.environ.get('PROFILER_INTERVAL_MS') or 10)
+    PROFILER_MAX_SECONDS = float(os.environ.get('PROFILER_MAX_SECONDS') or 120)
+    PROFILER_SIGNAL_SECONDS = float(os.environ.get('PROFILER_SIGNAL_SECONDS') or 30)
+    PROFILER_KEEP = int(os.environ.get('PROFILER_KEEP') or 20)
+    
+    # Health Monitor Settings
+    HEALTH_MONITOR_ENABLED = (os.environ.get('HEALTH_MONITOR_ENABLED') or 'true').lower() == 'true'
+    HEALTH_CHECK_INTERVAL = float(os.environ.get('HEALTH_CHECK_INTERVAL') or 5)
+    HEALTH_CHECK_TIMEOUT = float(os.environ.get('HEALTH_CHECK_TIMEOUT') or 2)
+    HEALTH_WINDOW_SIZE = int(os.environ.get('HEALTH_WINDOW_SIZE') or 60)
+    HEALTH_DEGRADED_LATENCY_MS = float(os.environ.get('HEALTH_DEGRADED_LATENCY_MS') or 200)
+    HEALTH_UNHEALTHY_LATENCY_MS = float(os.environ.get('HEALTH_UNHEALTHY_LATENCY_MS') or 1000)
+    HEALTH_DEGRADED_ERROR_RATE = float(os.environ.get('HEALTH_DEGRADED_ERROR_RATE') or 0.1)
+    HEALTH_UNHEALTHY_ERROR_RATE = float(os.environ.get('HEALTH_UNHEALTHY_ERROR_RATE') or 0.5)
+    HEALTH_UNHEALTHY_CONSECUTIVE_FAILURES = int(os.environ.get('HEALTH_UNHEALTHY_CONSECUTIVE_FAILURES') or 2)
+    HEALTH_MAX_STALENESS = float(os.environ.get('HEALTH_MAX_STALENESS') or 30)
 
 
 class DevelopmentConfig(Config):
@@ -69,6 +199,17 @@ class TestingConfig(Config):
     TESTING = True
     DEBUG = True
     LOG_LEVEL = 'DEBUG'
+    HEALTH_MONITOR_ENABLED = False
+    RESTRAINT_INDEX_ENABLED = False
+    HOT_ACCOUNT_ENABLED = False
+    BUSINESS_CALENDAR_ENABLED = False
+    LIMIT_PROFILE_CACHE_ENABLED = False
+    BALANCE_SNAPSHOT_ENABLED = False
+    ARCHIVE_ENABLED = False
+    REPLICA_ROUTING_ENABLED = False
+    ADMISSION_ENABLED = False
+    CHANGE_STREAM_ENABLED = False
+    LEDGER_APPLIER_ENABLED = False
 
 
 # Configuration mapping
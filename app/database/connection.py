@@ -3,67 +3,81 @@ Database connection management for the banking system
 """
 
 import os
-from sqlalchemy import create_engine
+import threading
+from sqlalchemy import create_engine, make_url, text
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import QueuePool
 import logging
 
+from app.utils.deadline import install_limit_reset
+
 # Global variables for database engines and sessions
 source_engine = None
 dest_engine = None
 SourceSession = None
 DestSession = None
 
+# Optional read replicas, keyed by database name ('source', 'dest')
+replica_engines = {}
+replica_sessions = {}
+
+# Lazy startup: the engines are created by the first session or engine lookup
+# of each process, so a preloading master never opens a pool its workers inherit
+_lazy_engines = False
+_engine_lock = threading.Lock()
+
 logger = logging.getLogger(__name__)
 
 
-def init_databases(app):
-    """Initialize database connections using environment variables directly"""
-    global source_engine, dest_engine, SourceSession, DestSession
+def _database_uri(prefix, default_host, default_name):
+    return (f"mysql+pymysql://{os.getenv(f'{prefix}_USER', 'bank_user')}:{os.getenv(f'{prefix}_PASSWORD', 'secure_password123')}"
+            f"@{os.getenv(f'{prefix}_HOST', default_host)}:{os.getenv(f'{prefix}_PORT', '3306')}/{os.getenv(f'{prefix}_NAME', default_name)}?charset=utf8mb4")
+
+
+def _create_engine(uri):
+    return create_engine(
+        uri,
+        poolclass=QueuePool,
+        pool_size=int(os.getenv('DB_POOL_SIZE', '10')),
+        pool_timeout=int(os.getenv('DB_POOL_TIMEOUT', '30')),
+        pool_recycle=int(os.getenv('DB_POOL_RECYCLE', '3600')),
+        pool_pre_ping=True,
+        echo=False
+    )
+
+
+def init_databases(app, lazy=False):
+    """
+    Initialize database connections using environment variables directly.
     
-    try:
-        # Build source database URI from environment variables
-        source_uri = f"mysql+pymysql://{os.getenv('DB1_USER', 'bank_user')}:{os.getenv('DB1_PASSWORD', 'secure_password123')}@{os.getenv('DB1_HOST', 'bank-db1')}:{os.getenv('DB1_PORT', '3306')}/{os.getenv('DB1_NAME', 'bank_source')}?charset=utf8mb4"
-        
-        # Build destination database URI from environment variables
-        dest_uri = f"mysql+pymysql://{os.getenv('DB2_USER', 'bank_user')}:{os.getenv('DB2_PASSWORD', 'secure_password123')}@{os.getenv('DB2_HOST', 'bank-db2')}:{os.getenv('DB2_PORT', '3306')}/{os.getenv('DB2_NAME', 'bank_dest')}?charset=utf8mb4"
-        
-        logger.info(f"Connecting to source database: {os.getenv('DB1_HOST', 'bank-db1')}:{os.getenv('DB1_PORT', '3306')}/{os.getenv('DB1_NAME', 'bank_source')}")
-        logger.info(f"Connecting to destination database: {os.getenv('DB2_HOST', 'bank-db2')}:{os.getenv('DB2_PORT', '3306')}/{os.getenv('DB2_NAME', 'bank_dest')}")
-        
-        # Source database engine
-        source_engine = create_engine(
-            source_uri,
-            poolclass=QueuePool,
-            pool_size=int(os.getenv('DB_POOL_SIZE', '10')),
-            pool_timeout=int(os.getenv('DB_POOL_TIMEOUT', '30')),
-            pool_recycle=int(os.getenv('DB_POOL_RECYCLE', '3600')),
-            pool_pre_ping=True,
-            echo=False
-        )
-        
-        # Destination database engine
-        dest_engine = create_engine(
-            dest_uri,
-            poolclass=QueuePool,
-            pool_size=int(os.getenv('DB_POOL_SIZE', '10')),
-            pool_timeout=int(os.getenv('DB_POOL_TIMEOUT', '30')),
-            pool_recycle=int(os.getenv('DB_POOL_RECYCLE', '3600')),
-            pool_pre_ping=True,
-            echo=False
-        )
+    By default the engines are created at once and both databases must answer
+    a trivial query. With lazy=True nothing is connected here: each process
+    creates its engines on first use, and connectivity is left to the health
+    monitor.
+    """
+    global _lazy_engines
+    
+    if lazy:
+        with _engine_lock:
+            _lazy_engines = True
+            _discard_engines()
         
-        # Create session factories
-        SourceSession = sessionmaker(bind=source_engine)
-        DestSession = sessionmaker(bind=dest_engine)
+        # Import the dialect and driver now, so a preloading master does it once for all workers
+        try:
+            make_url(_database_uri('DB1', 'bank-db1', 'bank_source')).get_dialect().import_dbapi()
+        except ImportError as e:
+            logger.warning(f"Database driver not importable: {str(e)}")
+        logger.info("Database engines will be created on first use in each process")
+        return
+    
+    try:
+        _create_engines()
         
         # Test connections
-        with source_engine.connect() as conn:
-            conn.execute("SELECT 1")
+        ping_engine(source_engine)
         logger.info("Source database connection successful")
         
-        with dest_engine.connect() as conn:
-            conn.execute("SELECT 1")
+        ping_engine(dest_engine)
         logger.info("Destination database connection successful")
         
         logger.info("Database connections initialized successfully")
@@ -71,10 +85,110 @@ def init_databases(app):
     except Exception as e:
         logger.error(f"Failed to initialize databases: {str(e)}")
         raise
+    
+    init_replicas()
+
+
+def _create_engines():
+    """Create both primary engines and their session factories"""
+    global source_engine, dest_engine, SourceSession, DestSession
+    
+    logger.info(f"Connecting to source database: {os.getenv('DB1_HOST', 'bank-db1')}:{os.getenv('DB1_PORT', '3306')}/{os.getenv('DB1_NAME', 'bank_source')}")
+    logger.info(f"Connecting to destination database: {os.getenv('DB2_HOST', 'bank-db2')}:{os.getenv('DB2_PORT', '3306')}/{os.getenv('DB2_NAME', 'bank_dest')}")
+    
+    source = _create_engine(_database_uri('DB1', 'bank-db1', 'bank_source'))
+    dest = _create_engine(_database_uri('DB2', 'bank-db2', 'bank_dest'))
+    
+    # Connections whose statement limits a deadline shortened go back to the pool with the defaults
+    install_limit_reset(source)
+    install_limit_reset(dest)
+    
+    # Session factories last: a lookup that sees them sees both engines
+    source_engine, dest_engine = source, dest
+    SourceSession = sessionmaker(bind=source_engine)
+    DestSession = sessionmaker(bind=dest_engine)
+
+
+def _discard_engines():
+    global source_engine, dest_engine, SourceSession, DestSession
+    
+    source_engine = dest_engine = SourceSession = DestSession = None
+    replica_engines.clear()
+    replica_sessions.clear()
+
+
+def _ensure_engines():
+    """Create this process's engines on first use when startup is lazy"""
+    if SourceSession is not None or not _lazy_engines:
+        return
+    with _engine_lock:
+        if SourceSession is None:
+            _create_engines()
+            # The replica routers' lag probes decide whether a replica is usable
+            init_replicas(ping=False)
+
+
+def _after_fork_in_child():
+    """Drop the pooled connections inherited from the parent without closing its sockets"""
+    global _engine_lock
+    
+    _engine_lock = threading.Lock()
+    for engine in (source_engine, dest_engine, *replica_engines.values()):
+        if engine is not None:
+            engine.dispose(close=False)
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def use_engines(source, dest):
+    """Bind the session factories to engines created elsewhere (benchmarks, tools)"""
+    global source_engine, dest_engine, SourceSession, DestSession
+    
+    source_engine, dest_engine = source, dest
+    for engine in (source_engine, dest_engine):
+        install_limit_reset(engine)
+    SourceSession = sessionmaker(bind=source_engine)
+    DestSession = sessionmaker(bind=dest_engine)
+
+
+def _replica_uri(prefix, default_name):
+    """Build a replica URI from <prefix>_REPLICA_* variables, defaulting to the primary's settings"""
+    host = os.getenv(f'{prefix}_REPLICA_HOST')
+    if not host:
+        return None
+    
+    def setting(name, default):
+        return os.getenv(f'{prefix}_REPLICA_{name}') or os.getenv(f'{prefix}_{name}', default)
+    
+    return (f"mysql+pymysql://{setting('USER', 'bank_user')}:{setting('PASSWORD', 'secure_password123')}"
+            f"@{host}:{setting('PORT', '3306')}/{setting('NAME', default_name)}?charset=utf8mb4")
+
+
+def init_replicas(ping=True):
+    """Create engines for configured read replicas; a replica that fails stays unused"""
+    replica_engines.clear()
+    replica_sessions.clear()
+    
+    for name, prefix, default_name in (('source', 'DB1', 'bank_source'), ('dest', 'DB2', 'bank_dest')):
+        uri = _replica_uri(prefix, default_name)
+        if uri is None:
+            continue
+        
+        try:
+            engine = _create_engine(uri)
+            if ping:
+                ping_engine(engine)
+            replica_engines[name] = engine
+            replica_sessions[name] = sessionmaker(bind=engine, info={'replica': True})
+            logger.info(f"Connected to {name} replica: {engine.url.host}:{engine.url.port}/{engine.url.database}")
+        except Exception as e:
+            logger.error(f"Failed to connect to {name} replica, reads stay on the primary: {str(e)}")
 
 
 def get_source_session():
     """Get a new source database session"""
+    _ensure_engines()
     if SourceSession is None:
         raise RuntimeError("Database not initialized")
     return SourceSession()
@@ -82,6 +196,7 @@ def get_source_session():
 
 def get_dest_session():
     """Get a new destination database session"""
+    _ensure_engines()
     if DestSession is None:
         raise RuntimeError("Database not initialized")
     return DestSession()
@@ -89,6 +204,7 @@ def get_dest_session():
 
 def get_source_engine():
     """Get the source database engine"""
+    _ensure_engines()
     if source_engine is None:
         raise RuntimeError("Database not initialized")
     return source_engine
@@ -96,6 +212,151 @@ def get_source_engine():
 
 def get_dest_engine():
     """Get the destination database engine"""
+    _ensure_engines()
     if dest_engine is None:
         raise RuntimeError("Database not initialized")
-    return dest_engine
\ No newline at end of file
+    return dest_engine
+
+
+def get_replica_engine(name):
+    """Get the replica engine of a database, or None when it has no replica"""
+    _ensure_engines()
+    return replica_engines.get(name)
+
+
+def _get_read_session(name, primary_session_factory, sticky_keys, written_at):
+    from app.database.replica_router import get_replica_router
+    
+    _ensure_engines()
+    replica_session_factory = replica_sessions.get(name)
+    router = get_replica_router(name)
+    if replica_session_factory is not None and router is not None and router.use_replica(sticky_keys, written_at):
+        return replica_session_factory()
+    return primary_session_factory()
+
+
+def get_source_read_session(sticky_keys=(), written_at=None):
+    """Get a session for read-only work on the source database, served by its replica when fresh enough"""
+    return _get_read_session('source', get_source_session, sticky_keys, written_at)
+
+
+def get_dest_read_session(sticky_keys=(), written_at=None):
+    """Get a session for read-only work on the destination database, served by its replica when fresh enough"""
+    return _get_read_session('dest', get_dest_session, sticky_keys, written_at)
+
+
+def is_replica_session(session):
+    """Check if a session reads from a replica"""
+    return session.info.get('replica', False)
+
+
+def ping_engine(engine):
+    """Run a trivial query against an engine, raising on failure"""
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
+def test_connections():
+    """Check that both databases answer a trivial query"""
+    try:
+        ping_engine(get_source_engine())
+        ping_engine(get_dest_engine())
+        return True
+    except Exception as e:
+        logger.error(f"Database connection test failed: {str(e)}")
+        return False
+
+
+def _describe_engine(engine, ping=True):
+    """Collect connection and pool details for a single engine"""
+    info = {
+        'host': engine.url.host,
+        'port': engine.url.port,
+        'database': engine.url.database,
+        'pool_status': engine.pool.status()
+    }
+    if isinstance(engine.pool, QueuePool):
+        info['pool_size'] = engine.pool.size()
+        info['checked_out'] = engine.pool.checkedout()
+    if not ping:
+        return info
+    
+    try:
+        ping_engine(engine)
+        info['status'] = 'connected'
+    except Exception as e:
+        info['status'] = 'disconnected'
+        info['error'] = str(e)
+    return info
+
+
+def get_database_info(ping=True):
+    """Get pool details for both databases, with live connection status when ping is set"""
+    info = {
+        'source': _describe_engine(get_source_engine(), ping),
+        'dest': _describe_engine(get_dest_engine(), ping)
+    }
+    for name, engine in replica_engines.items():
+        info[f'{name}_replica'] = _describe_engine(engine, ping)
+    return info
+
+
+class DatabaseManager:
+    """Holds one session per database for the duration of a cross-database transaction"""
+    
+    def __init__(self):
+        self.source_session = None
+        self.dest_session = None
+        self.transactions_started = False
+    
+    def begin_distributed_transaction(self):
+        """Open a session on each database; transactions begin on first use"""
+        if self.transactions_started:
+            raise RuntimeError("Distributed transaction already started")
+        
+        self.source_session = get_source_session()
+        self.dest_session = get_dest_session()
+        self.transactions_started = True
+    
+    def get_source_session(self):
+        """Get the source session of the active transaction"""
+        if self.source_session is None:
+            raise RuntimeError("No active source session")
+        return self.source_session
+    
+    def get_dest_session(self):
+        """Get the destination session of the active transaction"""
+        if self.dest_session is None:
+            raise RuntimeError("No active destination session")
+        return self.dest_session
+    
+    def rollback_distributed_transaction(self):
+        """Roll back both sessions, then release them"""
+        errors = []
+        try:
+            for session in (self.source_session, self.dest_session):
+                if session is None:
+                    continue
+                try:
+                    session.rollback()
+                except Exception as e:
+                    errors.append(str(e))
+        finally:
+            self.cleanup_sessions()
+        
+        if errors:
+            raise RuntimeError(f"Rollback failed: {'; '.join(errors)}")
+    
+    def cleanup_sessions(self):
+        """Close both sessions and reset the transaction state"""
+        for session in (self.source_session, self.dest_session):
+            if session is None:
+                continue
+            try:
+                session.close()
+            except Exception as e:
+                logger.warning(f"Error closing session: {str(e)}")
+        
+        self.source_session = None
+        self.dest_session = None
+        self.transactions_started = False
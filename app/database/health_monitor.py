@@ -0,0 +1,324 @@
+"""
+Background database health monitor
+
+Probes each database engine on a fixed interval from a daemon thread and keeps
+rolling latency and error-rate windows, so health endpoints can answer from
+cached state instead of querying MySQL on every probe.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+STATUS_HEALTHY = 'healthy'
+STATUS_DEGRADED = 'degraded'
+STATUS_UNHEALTHY = 'unhealthy'
+STATUS_UNKNOWN = 'unknown'
+
+_STATUS_RANK = {
+    STATUS_HEALTHY: 0,
+    STATUS_DEGRADED: 1,
+    STATUS_UNKNOWN: 2,
+    STATUS_UNHEALTHY: 3
+}
+
+# Global monitor instance, created by init_health_monitor
+health_monitor = None
+
+
+class HealthThresholds:
+    """Latency and error-rate thresholds used to grade a component"""
+
+    def __init__(self, degraded_latency_ms=200, unhealthy_latency_ms=1000,
+                 degraded_error_rate=0.1, unhealthy_error_rate=0.5,
+                 unhealthy_consecutive_failures=2, max_staleness=30):
+        self.degraded_latency_ms = degraded_latency_ms
+        self.unhealthy_latency_ms = unhealthy_latency_ms
+        self.degraded_error_rate = degraded_error_rate
+        self.unhealthy_error_rate = unhealthy_error_rate
+        self.unhealthy_consecutive_failures = unhealthy_consecutive_failures
+        self.max_staleness = max_staleness
+
+    @classmethod
+    def from_config(cls, config):
+        """Build thresholds from a Flask config mapping"""
+        return cls(
+            degraded_latency_ms=float(config.get('HEALTH_DEGRADED_LATENCY_MS', 200)),
+            unhealthy_latency_ms=float(config.get('HEALTH_UNHEALTHY_LATENCY_MS', 1000)),
+            degraded_error_rate=float(config.get('HEALTH_DEGRADED_ERROR_RATE', 0.1)),
+            unhealthy_error_rate=float(config.get('HEALTH_UNHEALTHY_ERROR_RATE', 0.5)),
+            unhealthy_consecutive_failures=int(config.get('HEALTH_UNHEALTHY_CONSECUTIVE_FAILURES', 2)),
+            max_staleness=float(config.get('HEALTH_MAX_STALENESS', 30))
+        )
+
+
+class ComponentHealth:
+    """Rolling probe results for a single component"""
+
+    def __init__(self, name, window_size):
+        self.name = name
+        self.latencies = deque(maxlen=window_size)
+        self.outcomes = deque(maxlen=window_size)
+        self.last_check = None
+        self.last_success = None
+        self.last_error = None
+        self.consecutive_failures = 0
+
+    def record_success(self, latency_ms, checked_at):
+        """Record a successful probe"""
+        self.latencies.append(latency_ms)
+        self.outcomes.append(True)
+        self.last_check = checked_at
+        self.last_success = checked_at
+        self.consecutive_failures = 0
+
+    def record_failure(self, error, checked_at):
+        """Record a failed or timed-out probe"""
+        self.outcomes.append(False)
+        self.last_check = checked_at
+        self.last_error = error
+        self.consecutive_failures += 1
+
+    def error_rate(self):
+        """Fraction of failed probes in the window"""
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def latency_percentile(self, percentile):
+        """Latency percentile (0-100) over successful probes in the window"""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(round(percentile / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def evaluate(self, thresholds, now):
+        """Grade the component against the thresholds"""
+        if self.last_check is None:
+            return STATUS_UNKNOWN
+
+        if now - self.last_check > thresholds.max_staleness:
+            return STATUS_UNHEALTHY
+
+        if self.consecutive_failures >= thresholds.unhealthy_consecutive_failures:
+            return STATUS_UNHEALTHY
+
+        error_rate = self.error_rate()
+        p95 = self.latency_percentile(95)
+
+        if error_rate >= thresholds.unhealthy_error_rate:
+            return STATUS_UNHEALTHY
+        if p95 is not None and p95 >= thresholds.unhealthy_latency_ms:
+            return STATUS_UNHEALTHY
+        if error_rate >= thresholds.degraded_error_rate or self.consecutive_failures > 0:
+            return STATUS_DEGRADED
+        if p95 is not None and p95 >= thresholds.degraded_latency_ms:
+            return STATUS_DEGRADED
+        return STATUS_HEALTHY
+
+    def to_dict(self, thresholds, now):
+        """Convert component state to dictionary"""
+        last_latency = self.latencies[-1] if self.latencies else None
+        return {
+            'status': self.evaluate(thresholds, now),
+            'last_check': _isoformat(self.last_check),
+            'last_success': _isoformat(self.last_success),
+            'last_error': self.last_error,
+            'consecutive_failures': self.consecutive_failures,
+            'samples': len(self.outcomes),
+            'error_rate': round(self.error_rate(), 4),
+            'latency_ms': {
+                'last': round(last_latency, 3) if last_latency is not None else None,
+                'p50': _round(self.latency_percentile(50)),
+                'p95': _round(self.latency_percentile(95)),
+                'max': _round(max(self.latencies) if self.latencies else None)
+            }
+        }
+
+
+class HealthMonitor:
+    """
+    Periodically probes a set of components and caches the results.
+
+    ``probes`` maps a component name to a zero-argument callable that raises
+    on failure. Each probe runs on its own single-thread executor so a hung
+    database cannot block probes of the other one; a probe that exceeds
+    ``timeout`` is recorded as a failure and the next round is skipped for that
+    component until the hung call returns.
+    """
+
+    def __init__(self, probes, interval=5, timeout=2, window_size=60, thresholds=None):
+        self.probes = dict(probes)
+        self.interval = interval
+        self.timeout = timeout
+        self.thresholds = thresholds or HealthThresholds()
+        self.components = {name: ComponentHealth(name, window_size) for name in self.probes}
+        self._executors = {
+            name: ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"health-{name}")
+            for name in self.probes
+        }
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._snapshot = None
+        self.started_at = None
+
+    def start(self):
+        """Start the background probe thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self.started_at = time.time()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='health-monitor', daemon=True)
+        self._thread.start()
+        logger.info(f"Health monitor started (interval={self.interval}s, timeout={self.timeout}s)")
+
+    def stop(self):
+        """Stop the background probe thread"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + self.timeout)
+            self._thread = None
+        for executor in self._executors.values():
+            executor.shutdown(wait=False)
+        logger.info("Health monitor stopped")
+
+    def is_running(self):
+        """Check if the probe thread is alive"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.check_now()
+            except Exception as e:
+                logger.error(f"Health monitor round failed: {str(e)}")
+            self._stop_event.wait(self.interval)
+
+    def check_now(self):
+        """Probe every component once and refresh the cached snapshot"""
+        futures = {}
+        for name, probe in self.probes.items():
+            pending = self._pending.get(name)
+            if pending is not None and not pending.done():
+                # Previous probe is still hung; count it again instead of piling up threads
+                self._record(name, None, 'probe still running from previous round')
+                continue
+            futures[name] = (time.perf_counter(), self._executors[name].submit(probe))
+            self._pending[name] = futures[name][1]
+
+        deadline = time.perf_counter() + self.timeout
+        for name, (started, future) in futures.items():
+            try:
+                future.result(timeout=max(0.0, deadline - time.perf_counter()))
+                self._record(name, (time.perf_counter() - started) * 1000.0, None)
+            except FutureTimeoutError:
+                self._record(name, None, f"probe timed out after {self.timeout}s")
+            except Exception as e:
+                self._record(name, None, str(e))
+
+        self._refresh_snapshot()
+
+    def _record(self, name, latency_ms, error):
+        now = time.time()
+        with self._lock:
+            component = self.components[name]
+            if error is None:
+                component.record_success(latency_ms, now)
+            else:
+                component.record_failure(error, now)
+                logger.warning(f"Health probe for {name} failed: {error}")
+
+    def _refresh_snapshot(self):
+        now = time.time()
+        with self._lock:
+            components = {
+                name: component.to_dict(self.thresholds, now)
+                for name, component in self.components.items()
+            }
+        self._snapshot = {
+            'status': _worst_status(c['status'] for c in components.values()),
+            'checked_at': now,
+            'components': components
+        }
+
+    def snapshot(self):
+        """
+        Get the cached health state.
+
+        Overall status is re-graded against staleness on read, so a stalled
+        monitor thread surfaces as unhealthy rather than serving old results.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return {
+                'status': STATUS_UNKNOWN,
+                'checked_at': None,
+                'age_seconds': None,
+                'components': {}
+            }
+
+        age = time.time() - snapshot['checked_at']
+        status = snapshot['status']
+        if age > self.thresholds.max_staleness:
+            status = STATUS_UNHEALTHY
+
+        return {
+            'status': status,
+            'checked_at': _isoformat(snapshot['checked_at']),
+            'age_seconds': round(age, 3),
+            'components': snapshot['components']
+        }
+
+
+def _worst_status(statuses):
+    return max(statuses, key=_STATUS_RANK.get, default=STATUS_UNKNOWN)
+
+
+def _isoformat(timestamp):
+    if timestamp is None:
+        return None
+    return datetime.utcfromtimestamp(timestamp).isoformat()
+
+
+def _round(value):
+    return round(value, 3) if value is not None else None
+
+
+def init_health_monitor(app):
+    """Create and start the global health monitor for the database engines"""
+    global health_monitor
+
+    from app.database.connection import get_source_engine, get_dest_engine, ping_engine
+
+    if not app.config.get('HEALTH_MONITOR_ENABLED', True):
+        logger.info("Health monitor disabled by configuration")
+        return None
+
+    if health_monitor is not None:
+        health_monitor.stop()
+
+    health_monitor = HealthMonitor(
+        probes={
+            'source': lambda: ping_engine(get_source_engine()),
+            'dest': lambda: ping_engine(get_dest_engine())
+        },
+        interval=float(app.config.get('HEALTH_CHECK_INTERVAL', 5)),
+        timeout=float(app.config.get('HEALTH_CHECK_TIMEOUT', 2)),
+        window_size=int(app.config.get('HEALTH_WINDOW_SIZE', 60)),
+        thresholds=HealthThresholds.from_config(app.config)
+    )
+    health_monitor.start()
+    return health_monitor
+
+
+def get_health_monitor():
+    """Get the global health monitor, or None if it is not running"""
+    return health_monitor
@@ -0,0 +1,191 @@
+"""
+Lag-aware routing of read-only work to database replicas
+
+Each database with a configured replica gets a router that samples the
+replica's replication delay in the background. Read sessions go to the replica
+only while the last sample is recent and within REPLICA_MAX_LAG; otherwise
+they fall back to the primary.
+
+Read-your-writes: after a transfer, reads that concern one of its accounts,
+or that come from a client presenting a recent write time (see
+app.utils.read_consistency), stay on the primary until the replica has had
+time to apply the write.
+"""
+
+import logging
+import threading
+import time
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Global router registry keyed by database name ('source', 'dest')
+replica_routers = {}
+
+
+def measure_replica_lag(engine):
+    """Read replication delay in seconds from the replica, None when replication is not running"""
+    with engine.connect() as conn:
+        try:
+            row = conn.execute(text("SHOW REPLICA STATUS")).mappings().first()
+        except Exception:
+            # MySQL before 8.0.22
+            row = conn.execute(text("SHOW SLAVE STATUS")).mappings().first()
+
+    if row is None:
+        return None
+    lag = row.get('Seconds_Behind_Source', row.get('Seconds_Behind_Master'))
+    return float(lag) if lag is not None else None
+
+
+class ReplicaRouter:
+    """Decides per read whether one database's replica is fresh enough to serve it"""
+
+    def __init__(self, name, lag_probe, max_lag=2, check_interval=1, sticky_seconds=5):
+        self.name = name
+        self.lag_probe = lag_probe
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.sticky_seconds = sticky_seconds
+
+        self._lag = None
+        self._lag_checked_at = None
+        # Sticky key (account number) -> wall-clock time of its last write
+        self._writes = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self.replica_reads = 0
+        self.primary_reads = 0
+
+    def check_lag(self):
+        """Sample replication delay; a failed probe counts as unknown lag"""
+        try:
+            lag = self.lag_probe()
+        except Exception as e:
+            logger.warning(f"Replica lag check for {self.name} failed: {str(e)}")
+            lag = None
+
+        self._lag = lag
+        self._lag_checked_at = time.monotonic()
+        return lag
+
+    def replica_lag(self):
+        """Last sampled lag, or None when unknown or the sample is too old to trust"""
+        checked_at = self._lag_checked_at
+        if checked_at is None or time.monotonic() - checked_at > self.check_interval * 3:
+            return None
+        return self._lag
+
+    def _sticky_window(self, lag):
+        # The write is visible once the replica has caught up with it; sampling
+        # granularity adds up to one check interval of uncertainty
+        return max(self.sticky_seconds, lag + self.check_interval)
+
+    def record_write(self, *keys):
+        """Remember that keys were just written on the primary"""
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                if key:
+                    self._writes[key] = now
+
+            if len(self._writes) > 10000:
+                horizon = now - self._sticky_window(self.max_lag)
+                self._writes = {k: t for k, t in self._writes.items() if t >= horizon}
+
+    def use_replica(self, sticky_keys=(), written_at=None):
+        """Check if a read may go to the replica"""
+        lag = self.replica_lag()
+        if lag is None or lag > self.max_lag:
+            self.primary_reads += 1
+            return False
+
+        horizon = time.time() - self._sticky_window(lag)
+        last_writes = [self._writes.get(key) for key in sticky_keys]
+        if written_at is not None:
+            last_writes.append(written_at)
+
+        if any(t is not None and t >= horizon for t in last_writes):
+            self.primary_reads += 1
+            return False
+
+        self.replica_reads += 1
+        return True
+
+    def stats(self):
+        """Get lag and routing counters"""
+        return {
+            'name': self.name,
+            'lag_seconds': self.replica_lag(),
+            'max_lag_seconds': self.max_lag,
+            'replica_reads': self.replica_reads,
+            'primary_reads': self.primary_reads,
+            'sticky_keys': len(self._writes)
+        }
+
+    def start(self):
+        """Start the background lag sampling thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=f"replica-lag-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.check_interval * 2)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self.check_lag()
+            self._stop_event.wait(self.check_interval)
+
+
+def init_replica_routers(app):
+    """Create and start a router for each database that has a replica engine"""
+    from app.database.connection import get_replica_engine
+
+    for router in replica_routers.values():
+        router.stop()
+    replica_routers.clear()
+
+    if not app.config.get('REPLICA_ROUTING_ENABLED', True):
+        logger.info("Replica routing disabled by configuration")
+        return replica_routers
+
+    for name in ('source', 'dest'):
+        engine = get_replica_engine(name)
+        if engine is None:
+            continue
+
+        router = ReplicaRouter(
+            name,
+            lambda engine=engine: measure_replica_lag(engine),
+            max_lag=float(app.config.get('REPLICA_MAX_LAG', 2)),
+            check_interval=float(app.config.get('REPLICA_LAG_CHECK_INTERVAL', 1)),
+            sticky_seconds=float(app.config.get('REPLICA_STICKY_SECONDS', 5))
+        )
+        router.check_lag()
+        router.start()
+        replica_routers[name] = router
+        logger.info(f"Replica routing enabled for {name} database")
+
+    return replica_routers
+
+
+def get_replica_router(name):
+    """Get the replica router for a database, or None when it has no replica"""
+    return replica_routers.get(name)
+
+
+def record_write(name, *keys):
+    """Pin reads of keys on a database to its primary for the sticky window"""
+    router = replica_routers.get(name)
+    if router is not None:
+        router.record_write(*keys)
@@ -0,0 +1,582 @@
+"""
+Pre-built SQL statements for the hot account and transfer queries
+
+Each statement is constructed once at import time with named bind parameters,
+so a request only supplies parameter values. Building a ``session.query(...)``
+chain on every call costs far more CPU than running it; a module-level
+``select()`` keeps a stable cache key, so SQLAlchemy's compiled cache serves
+the SQL string after the first execution on each engine.
+
+Statements ending in ``_ROW``/``_ROWS`` select plain table columns in the
+field order of the matching record in app.models.read_models; they serve the
+read-only endpoints and never load ORM instances.
+"""
+
+from sqlalchemy import select, insert, update, delete, bindparam, func, case, cast, literal_column, String, BigInteger
+
+from app.models.account import (
+    Account, AccountBalance, AccountBalanceSlot, AccountBalanceSnapshot, AccountJournal, HotAccount,
+    JournalApplierState
+)
+from app.models.calendar import Branch, BranchHoliday, LocationHoliday
+from app.models.constraints import AccountRestraint, ClientTransactionLimit, FREEZE_RESTRAINT_TYPES
+from app.models.transaction import TransactionHistory, TransferLog
+from app.models.read_models import (
+    AccountRecord, AccountBalanceRecord, TransactionHistoryRecord,
+    TransferLogRecord, AccountRestraintRecord, ClientTransactionLimitRecord,
+    record_columns
+)
+
+_account = Account.__table__
+_balance = AccountBalance.__table__
+_slot = AccountBalanceSlot.__table__
+_snapshot = AccountBalanceSnapshot.__table__
+_restraint = AccountRestraint.__table__
+_limit = ClientTransactionLimit.__table__
+_history = TransactionHistory.__table__
+_journal = AccountJournal.__table__
+_transfer_log = TransferLog.__table__
+_branch = Branch.__table__
+_branch_holiday = BranchHoliday.__table__
+_loc_holiday = LocationHoliday.__table__
+
+
+# Account lookups
+ACCOUNT_BY_NUMBER = (
+    select(Account)
+    .where(Account.BASE_ACCT_NO == bindparam('account_no'))
+)
+
+ACCOUNT_WITH_BALANCE = (
+    select(Account, AccountBalance)
+    .join(AccountBalance, Account.INTERNAL_KEY == AccountBalance.INTERNAL_KEY)
+    .where(Account.BASE_ACCT_NO == bindparam('account_no'))
+)
+
+ACCOUNT_WITH_BALANCE_FOR_UPDATE = ACCOUNT_WITH_BALANCE.with_for_update()
+
+# Slot sum of the account in the enclosing statement, 0 without slots. Balance
+# reads always add it: whether an account is hot is a per-process guess.
+_slot_total = (
+    select(func.coalesce(func.sum(_slot.c.SLOT_AMOUNT), 0))
+    .where(_slot.c.INTERNAL_KEY == _account.c.INTERNAL_KEY)
+    .scalar_subquery()
+)
+
+ACCOUNT_WITH_BALANCE_AND_SLOTS = (
+    select(Account, AccountBalance, _slot_total.label('SLOT_TOTAL'))
+    .join(AccountBalance, Account.INTERNAL_KEY == AccountBalance.INTERNAL_KEY)
+    .where(Account.BASE_ACCT_NO == bindparam('account_no'))
+)
+
+# Locks the account and main balance rows only; MySQL does not lock subquery rows
+ACCOUNT_WITH_BALANCE_AND_SLOTS_FOR_UPDATE = ACCOUNT_WITH_BALANCE_AND_SLOTS.with_for_update()
+
+# Hot account balance slots
+HOT_ACCOUNTS = select(HotAccount.BASE_ACCT_NO, HotAccount.INTERNAL_KEY, HotAccount.SLOT_COUNT)
+
+BALANCE_SLOT_FOR_UPDATE = (
+    select(AccountBalanceSlot)
+    .where(
+        AccountBalanceSlot.INTERNAL_KEY == bindparam('internal_key'),
+        AccountBalanceSlot.SLOT_NO == bindparam('slot_no')
+    )
+    .with_for_update()
+)
+
+BALANCE_SLOTS_FOR_UPDATE = (
+    select(AccountBalanceSlot)
+    .where(AccountBalanceSlot.INTERNAL_KEY == bindparam('internal_key'))
+    .order_by(AccountBalanceSlot.SLOT_NO)
+    .with_for_update()
+)
+
+BALANCE_SLOT_TOTAL = (
+    select(func.coalesce(func.sum(AccountBalanceSlot.SLOT_AMOUNT), 0))
+    .where(AccountBalanceSlot.INTERNAL_KEY == bindparam('internal_key'))
+)
+
+# Restraints and limits
+ACTIVE_RESTRAINTS = (
+    select(AccountRestraint)
+    .where(
+        AccountRestraint.INTERNAL_KEY == bindparam('internal_key'),
+        AccountRestraint.RESTRAINTS_STATUS == 'A'
+    )
+)
+
+LIMIT_BY_REF = (
+    select(ClientTransactionLimit)
+    .where(
+        ClientTransactionLimit.BASE_ACCT_NO == bindparam('account_no'),
+        ClientTransactionLimit.LIMIT_REF == bindparam('limit_ref')
+    )
+)
+
+# Restraint index loading: only the columns needed to track freezes
+_FREEZE_RESTRAINT_COLUMNS = (
+    _restraint.c.INTERNAL_KEY,
+    _restraint.c.RES_SEQ_NO,
+    _restraint.c.RESTRAINT_TYPE,
+    _restraint.c.RESTRAINTS_STATUS,
+    _restraint.c.TRAN_TIMESTAMP
+)
+
+ACTIVE_FREEZE_RESTRAINTS = (
+    select(*_FREEZE_RESTRAINT_COLUMNS)
+    .where(
+        _restraint.c.RESTRAINT_TYPE.in_(FREEZE_RESTRAINT_TYPES),
+        _restraint.c.RESTRAINTS_STATUS == 'A'
+    )
+)
+
+FREEZE_RESTRAINT_WATERMARK = (
+    select(func.max(_restraint.c.TRAN_TIMESTAMP))
+    .where(_restraint.c.RESTRAINT_TYPE.in_(FREEZE_RESTRAINT_TYPES))
+)
+
+FREEZE_RESTRAINTS_CHANGED_SINCE = (
+    select(*_FREEZE_RESTRAINT_COLUMNS)
+    .where(
+        _restraint.c.RESTRAINT_TYPE.in_(FREEZE_RESTRAINT_TYPES),
+        _restraint.c.TRAN_TIMESTAMP >= bindparam('since')
+    )
+    .order_by(_restraint.c.TRAN_TIMESTAMP)
+)
+
+# Limit profile cache refresh: accounts whose limits changed since the watermark
+LIMIT_WATERMARK = select(func.max(_limit.c.TRAN_TIMESTAMP))
+
+LIMITS_CHANGED_SINCE = (
+    select(_limit.c.BASE_ACCT_NO, _limit.c.TRAN_TIMESTAMP)
+    .where(_limit.c.TRAN_TIMESTAMP >= bindparam('since'))
+)
+
+# Business calendar loading: entries with APPLY_IND = 'N' are disabled
+CALENDAR_BRANCHES = select(_branch.c.BRANCH, _branch.c.COUNTRY, _branch.c.STATE)
+
+CALENDAR_BRANCH_HOLIDAYS = (
+    select(_branch_holiday.c.BRANCH, _branch_holiday.c.HOLIDAY_DATE, _branch_holiday.c.WORKING_HOLIDAY)
+    .where(func.coalesce(_branch_holiday.c.APPLY_IND, 'Y') != 'N')
+)
+
+CALENDAR_LOC_HOLIDAYS = (
+    select(
+        _loc_holiday.c.COUNTRY, _loc_holiday.c.STATE,
+        _loc_holiday.c.HOLIDAY_DATE, _loc_holiday.c.WORKING_HOLIDAY
+    )
+    .where(func.coalesce(_loc_holiday.c.APPLY_IND, 'Y') != 'N')
+)
+
+# Row counts and latest change of the calendar tables; any difference triggers a reload
+CALENDAR_SIGNATURE = select(
+    *(
+        column
+        for table in (_branch, _branch_holiday, _loc_holiday)
+        for column in (
+            select(func.count()).select_from(table).scalar_subquery(),
+            select(func.max(table.c.TRAN_TIMESTAMP)).scalar_subquery()
+        )
+    )
+)
+
+# Balance snapshots: history rows replayed as signed amounts, failed rows skipped
+_signed_amount = case(
+    (_history.c.CR_DR_IND == 'C', _history.c.TRAN_AMT),
+    else_=-_history.c.TRAN_AMT
+)
+
+_HISTORY_DELTA_COLUMNS = (
+    _history.c.INTERNAL_KEY,
+    func.coalesce(func.sum(_signed_amount), 0),
+    func.count()
+)
+
+# Per account: (INTERNAL_KEY, net amount, row count) of rows in [since, until)
+HISTORY_DELTAS_BETWEEN = (
+    select(*_HISTORY_DELTA_COLUMNS)
+    .where(
+        _history.c.INTERNAL_KEY.in_(bindparam('internal_keys', expanding=True)),
+        _history.c.TRAN_DATE >= bindparam('since'),
+        _history.c.TRAN_DATE < bindparam('until'),
+        func.coalesce(_history.c.TRAN_STATUS, 'N') != 'F'
+    )
+    .group_by(_history.c.INTERNAL_KEY)
+)
+
+HISTORY_DELTAS_SINCE = (
+    select(*_HISTORY_DELTA_COLUMNS)
+    .where(
+        _history.c.INTERNAL_KEY.in_(bindparam('internal_keys', expanding=True)),
+        _history.c.TRAN_DATE >= bindparam('since'),
+        func.coalesce(_history.c.TRAN_STATUS, 'N') != 'F'
+    )
+    .group_by(_history.c.INTERNAL_KEY)
+)
+
+# Next batch of accounts by INTERNAL_KEY, with hot account slots folded into the balance
+SNAPSHOT_ACCOUNTS_AFTER = (
+    select(
+        _account.c.INTERNAL_KEY, _account.c.CLIENT_NO, _account.c.BASE_ACCT_NO,
+        _balance.c.TOTAL_AMOUNT + _slot_total
+    )
+    .select_from(_account.join(_balance, _account.c.INTERNAL_KEY == _balance.c.INTERNAL_KEY))
+    .where(_account.c.INTERNAL_KEY > bindparam('after_key'))
+    .order_by(_account.c.INTERNAL_KEY)
+    .limit(bindparam('limit'))
+)
+
+SNAPSHOT_BALANCES_ON_DATE = (
+    select(_snapshot.c.INTERNAL_KEY, _snapshot.c.BALANCE)
+    .where(
+        _snapshot.c.SNAPSHOT_DATE == bindparam('snapshot_date'),
+        _snapshot.c.INTERNAL_KEY.in_(bindparam('internal_keys', expanding=True))
+    )
+)
+
+SNAPSHOT_ON_OR_BEFORE = (
+    select(_snapshot.c.SNAPSHOT_DATE, _snapshot.c.BALANCE)
+    .where(
+        _snapshot.c.INTERNAL_KEY == bindparam('internal_key'),
+        _snapshot.c.SNAPSHOT_DATE <= bindparam('snapshot_date')
+    )
+    .order_by(_snapshot.c.SNAPSHOT_DATE.desc())
+    .limit(1)
+)
+
+SNAPSHOT_ON_OR_AFTER = (
+    select(_snapshot.c.SNAPSHOT_DATE, _snapshot.c.BALANCE)
+    .where(
+        _snapshot.c.INTERNAL_KEY == bindparam('internal_key'),
+        _snapshot.c.SNAPSHOT_DATE >= bindparam('snapshot_date')
+    )
+    .order_by(_snapshot.c.SNAPSHOT_DATE)
+    .limit(1)
+)
+
+LATEST_SNAPSHOT_DATE = select(func.max(_snapshot.c.SNAPSHOT_DATE))
+
+INSERT_BALANCE_SNAPSHOTS = insert(_snapshot)
+
+DELETE_BALANCE_SNAPSHOTS = (
+    delete(_snapshot)
+    .where(
+        _snapshot.c.SNAPSHOT_DATE == bindparam('snapshot_date'),
+        _snapshot.c.INTERNAL_KEY.in_(bindparam('internal_keys', expanding=True))
+    )
+)
+
+DELETE_SNAPSHOTS_BEFORE = delete(_snapshot).where(_snapshot.c.SNAPSHOT_DATE < bindparam('before'))
+
+# Reconciliation: transfer ids start with TRF + YYYYMMDDHHMMSS, so an id
+# prefix is a time partition shared by transfer_log and rb_tran_hist.REFERENCE
+RECONCILE_PARTITION_LENGTHS = (13, 15, 17)  # hour, minute, second
+
+
+def _cents(amount):
+    return cast(func.round(amount * 100), BigInteger)
+
+
+def _in_partition(key):
+    return (key >= bindparam('low')) & (key < bindparam('high'))
+
+
+_log_item = (
+    _transfer_log.c.transfer_id + '|' + cast(_cents(_transfer_log.c.amount), String)
+    + '|' + cast(_transfer_log.c.status, String)
+)
+_log_success = _transfer_log.c.status == 'SUCCESS'
+_history_posted = func.coalesce(_history.c.TRAN_STATUS, 'N') != 'F'
+
+
+def _log_digests(length):
+    partition = func.substr(_transfer_log.c.transfer_id, literal_column('1'), literal_column(str(length)))
+    return (
+        select(
+            partition, func.count(), func.sum(func.crc32(_log_item)),
+            func.sum(case((_log_success, 1), else_=0)),
+            func.sum(case((_log_success, _cents(_transfer_log.c.amount)), else_=0))
+        )
+        .where(_in_partition(_transfer_log.c.transfer_id))
+        .group_by(partition)
+    )
+
+
+def _history_digests(length, direction):
+    partition = func.substr(_history.c.REFERENCE, literal_column('1'), literal_column(str(length)))
+    item = _history.c.REFERENCE + '|' + cast(_cents(_history.c.TRAN_AMT), String) + '|' + direction
+    return (
+        select(partition, func.count(), func.sum(func.crc32(item)), func.sum(_cents(_history.c.TRAN_AMT)))
+        .where(_in_partition(_history.c.REFERENCE), _history_posted)
+        .group_by(partition)
+    )
+
+
+# Destination credits hash as the mirror of source debits, so matching legs agree
+_MIRRORED_DIRECTION = case(
+    (_history.c.CR_DR_IND == 'C', 'D'),
+    (_history.c.CR_DR_IND == 'D', 'C'),
+    else_=func.coalesce(_history.c.CR_DR_IND, '')
+)
+
+# Per child partition: (prefix, rows, hash sum, SUCCESS rows, SUCCESS cents)
+RECONCILE_LOG_DIGESTS = {length: _log_digests(length) for length in RECONCILE_PARTITION_LENGTHS}
+
+# Per child partition: (prefix, rows, hash sum, cents)
+RECONCILE_HISTORY_DIGESTS = {
+    'source': {
+        length: _history_digests(length, func.coalesce(_history.c.CR_DR_IND, ''))
+        for length in RECONCILE_PARTITION_LENGTHS
+    },
+    'dest': {length: _history_digests(length, _MIRRORED_DIRECTION) for length in RECONCILE_PARTITION_LENGTHS}
+}
+
+RECONCILE_LOG_ROWS = (
+    select(_transfer_log.c.transfer_id, _cents(_transfer_log.c.amount), _transfer_log.c.status)
+    .where(_in_partition(_transfer_log.c.transfer_id))
+)
+
+RECONCILE_HISTORY_ROWS = (
+    select(_history.c.REFERENCE, _cents(_history.c.TRAN_AMT), _history.c.CR_DR_IND, _history.c.SEQ_NO)
+    .where(_in_partition(_history.c.REFERENCE), _history_posted)
+)
+
+# Transfer log
+TRANSFER_LOG_BY_ID = (
+    select(TransferLog)
+    .where(TransferLog.transfer_id == bindparam('transfer_id'))
+)
+
+# Read-only row statements
+_account_with_balance_rows = (
+    select(
+        *record_columns(Account, AccountRecord),
+        *record_columns(AccountBalance, AccountBalanceRecord),
+        _slot_total.label('SLOT_TOTAL')
+    )
+    .select_from(_account.join(_balance, _account.c.INTERNAL_KEY == _balance.c.INTERNAL_KEY))
+)
+
+ACCOUNT_WITH_BALANCE_ROW = _account_with_balance_rows.where(_account.c.BASE_ACCT_NO == bindparam('account_no'))
+
+# Several accounts in one round trip; the IN list expands to the number of account numbers given
+ACCOUNTS_WITH_BALANCE_ROWS = _account_with_balance_rows.where(
+    _account.c.BASE_ACCT_NO.in_(bindparam('account_nos', expanding=True))
+)
+
+# All accounts of a client, through idx_balance_client
+CLIENT_BALANCE_ROWS = (
+    _account_with_balance_rows
+    .where(_balance.c.CLIENT_NO == bindparam('client_no'))
+    .order_by(_account.c.BASE_ACCT_NO)
+)
+
+ACTIVE_RESTRAINTS_ROWS = (
+    select(*record_columns(AccountRestraint, AccountRestraintRecord))
+    .where(
+        _restraint.c.INTERNAL_KEY == bindparam('internal_key'),
+        _restraint.c.RESTRAINTS_STATUS == 'A'
+    )
+)
+
+LIMITS_BY_ACCOUNT_ROWS = (
+    select(*record_columns(ClientTransactionLimit, ClientTransactionLimitRecord))
+    .where(_limit.c.BASE_ACCT_NO == bindparam('account_no'))
+)
+
+LIMITS_BY_ACCOUNTS_ROWS = (
+    select(*record_columns(ClientTransactionLimit, ClientTransactionLimitRecord))
+    .where(_limit.c.BASE_ACCT_NO.in_(bindparam('account_nos', expanding=True)))
+)
+
+TRANSACTION_HISTORY_PAGE_ROWS = (
+    select(*record_columns(TransactionHistory, TransactionHistoryRecord))
+    .where(_history.c.BASE_ACCT_NO == bindparam('account_no'))
+    .order_by(_history.c.TRAN_DATE.desc())
+    .limit(bindparam('limit'))
+    .offset(bindparam('offset'))
+)
+
+TRANSFER_LOG_BY_ID_ROW = (
+    select(*record_columns(TransferLog, TransferLogRecord))
+    .where(_transfer_log.c.transfer_id == bindparam('transfer_id'))
+)
+
+OUTGOING_TRANSFERS_ROWS = (
+    select(*record_columns(TransferLog, TransferLogRecord))
+    .where(_transfer_log.c.from_account == bindparam('account_no'))
+    .order_by(_transfer_log.c.created_at.desc())
+    .limit(bindparam('limit'))
+)
+
+INCOMING_TRANSFERS_ROWS = (
+    select(*record_columns(TransferLog, TransferLogRecord))
+    .where(_transfer_log.c.to_account == bindparam('account_no'))
+    .order_by(_transfer_log.c.created_at.desc())
+    .limit(bindparam('limit'))
+)
+
+TRANSACTION_HISTORY_COUNT = (
+    select(func.count())
+    .select_from(_history)
+    .where(_history.c.BASE_ACCT_NO == bindparam('account_no'))
+)
+
+
+# Archival: one day of rows in segment order (account, then time), the oldest
+# day still in the table, and deletes of archived rows by primary key
+def _archive_day_rows(model, record, date_column, key_column, pk_column):
+    return (
+        select(*record_columns(model, record))
+        .where(date_column >= bindparam('since'), date_column < bindparam('until'))
+        .order_by(key_column, date_column, pk_column)
+    )
+
+
+def _archive_delete(table, date_column, pk_column):
+    return (
+        delete(table)
+        .where(
+            pk_column.in_(bindparam('keys', expanding=True)),
+            date_column >= bindparam('since'),
+            date_column < bindparam('until')
+        )
+    )
+
+
+ARCHIVE_DAY_ROWS = {
+    'rb_tran_hist': {
+        'BASE_ACCT_NO': _archive_day_rows(
+            TransactionHistory, TransactionHistoryRecord,
+            _history.c.TRAN_DATE, _history.c.BASE_ACCT_NO, _history.c.SEQ_NO
+        )
+    },
+    'transfer_log': {
+        key: _archive_day_rows(
+            TransferLog, TransferLogRecord,
+            _transfer_log.c.created_at, _transfer_log.c[key], _transfer_log.c.id
+        )
+        for key in ('from_account', 'to_account')
+    }
+}
+
+ARCHIVE_OLDEST_DATE = {
+    'rb_tran_hist': select(func.min(_history.c.TRAN_DATE)),
+    'transfer_log': select(func.min(_transfer_log.c.created_at))
+}
+
+ARCHIVE_DELETE = {
+    'rb_tran_hist': _archive_delete(_history, _history.c.TRAN_DATE, _history.c.SEQ_NO),
+    'transfer_log': _archive_delete(_transfer_log, _transfer_log.c.created_at, _transfer_log.c.id)
+}
+
+# Analytics export: one day of history with the account's branch, in table order
+ANALYTICS_HISTORY_DAY = (
+    select(
+        _history.c.BASE_ACCT_NO, _history.c.CLIENT_NO, _account.c.ACCT_BRANCH, _history.c.TRAN_TYPE,
+        _history.c.CR_DR_IND, _history.c.TRAN_AMT, _history.c.TRAN_DATE, _history.c.TRAN_STATUS
+    )
+    .select_from(_history.outerjoin(_account, _account.c.INTERNAL_KEY == _history.c.INTERNAL_KEY))
+    .where(_history.c.TRAN_DATE >= bindparam('since'), _history.c.TRAN_DATE < bindparam('until'))
+)
+
+# Bulk statements: accounts are partitioned by INTERNAL_KEY range and each
+# partition reads its history with one scan of idx_tran_hist_key_date
+STATEMENT_KEY_RANGE = select(func.min(_account.c.INTERNAL_KEY), func.max(_account.c.INTERNAL_KEY))
+
+_in_key_range = (bindparam('low_key'), bindparam('high_key'))
+
+STATEMENT_ACCOUNTS = (
+    select(
+        _account.c.INTERNAL_KEY, _account.c.BASE_ACCT_NO, _account.c.CLIENT_NO, _account.c.ACCT_NAME,
+        _account.c.ACCT_CCY, _balance.c.TOTAL_AMOUNT + _slot_total
+    )
+    .select_from(_account.join(_balance, _account.c.INTERNAL_KEY == _balance.c.INTERNAL_KEY))
+    .where(_account.c.INTERNAL_KEY >= _in_key_range[0], _account.c.INTERNAL_KEY < _in_key_range[1])
+    .order_by(_account.c.INTERNAL_KEY)
+)
+
+STATEMENT_HISTORY = (
+    select(
+        _history.c.INTERNAL_KEY, _history.c.SEQ_NO, _history.c.TRAN_DATE, _history.c.TRAN_TYPE,
+        _history.c.CR_DR_IND, _history.c.TRAN_AMT, _history.c.PREVIOUS_BAL_AMT, _history.c.ACTUAL_BAL,
+        _history.c.REFERENCE, _history.c.NARRATIVE
+    )
+    .where(
+        _history.c.INTERNAL_KEY >= _in_key_range[0],
+        _history.c.INTERNAL_KEY < _in_key_range[1],
+        _history.c.TRAN_DATE >= bindparam('since'),
+        _history.c.TRAN_DATE < bindparam('until'),
+        _history_posted
+    )
+    .order_by(_history.c.INTERNAL_KEY, _history.c.TRAN_DATE, _history.c.SEQ_NO)
+)
+
+# Per account of a partition: (INTERNAL_KEY, net amount, row count) of rows since the period end
+STATEMENT_DELTAS_AFTER = (
+    select(*_HISTORY_DELTA_COLUMNS)
+    .where(
+        _history.c.INTERNAL_KEY >= _in_key_range[0],
+        _history.c.INTERNAL_KEY < _in_key_range[1],
+        _history.c.TRAN_DATE >= bindparam('until'),
+        _history_posted
+    )
+    .group_by(_history.c.INTERNAL_KEY)
+)
+
+# Journal ledger mode: a debit reserves funds with one conditional update, so
+# the row lock is taken and the balance checked in a single statement
+RESERVE_FUNDS = (
+    update(_balance)
+    .where(
+        _balance.c.INTERNAL_KEY == bindparam('internal_key'),
+        _balance.c.TOTAL_AMOUNT - _balance.c.RESERVED_AMOUNT >= bindparam('amount')
+    )
+    .values(RESERVED_AMOUNT=_balance.c.RESERVED_AMOUNT + bindparam('amount'))
+)
+
+BALANCE_RESERVATION_ROW = (
+    select(_balance.c.TOTAL_AMOUNT, _balance.c.RESERVED_AMOUNT, _slot_total.label('SLOT_TOTAL'))
+    .select_from(_account.join(_balance, _account.c.INTERNAL_KEY == _balance.c.INTERNAL_KEY))
+    .where(_balance.c.INTERNAL_KEY == bindparam('internal_key'))
+)
+
+JOURNAL_APPLIER_FOR_UPDATE = (
+    select(JournalApplierState)
+    .where(JournalApplierState.APPLIER == bindparam('applier'))
+    .with_for_update()
+)
+
+JOURNAL_ENTRIES_AFTER = (
+    select(
+        _journal.c.JOURNAL_ID, _journal.c.INTERNAL_KEY, _journal.c.CLIENT_NO, _journal.c.BASE_ACCT_NO,
+        _journal.c.AMOUNT, _journal.c.CR_DR_IND, _journal.c.REFERENCE, _journal.c.NARRATIVE, _journal.c.CREATED_AT
+    )
+    .where(_journal.c.JOURNAL_ID > bindparam('after'))
+    .order_by(_journal.c.JOURNAL_ID)
+    .limit(bindparam('limit'))
+)
+
+JOURNAL_LAST_ID = select(func.coalesce(func.max(_journal.c.JOURNAL_ID), 0))
+
+# Posted balances (main row plus slots) of the accounts in an applier batch, locking the main rows
+JOURNAL_BALANCES_FOR_UPDATE = (
+    select(_balance.c.INTERNAL_KEY, _balance.c.TOTAL_AMOUNT, _slot_total.label('SLOT_TOTAL'))
+    .select_from(_account.join(_balance, _account.c.INTERNAL_KEY == _balance.c.INTERNAL_KEY))
+    .where(_balance.c.INTERNAL_KEY.in_(bindparam('internal_keys', expanding=True)))
+    .order_by(_balance.c.INTERNAL_KEY)
+    .with_for_update(of=_balance)
+)
+
+# Executed once per account of a batch: net amount posted, and the debits whose reservation ends
+POST_JOURNAL_BALANCE = (
+    update(_balance)
+    .where(_balance.c.INTERNAL_KEY == bindparam('internal_key'))
+    .values(
+        TOTAL_AMOUNT=_balance.c.TOTAL_AMOUNT + bindparam('delta'),
+        RESERVED_AMOUNT=_balance.c.RESERVED_AMOUNT - bindparam('released'),
+        LAST_CHANGE_DATE=bindparam('changed_at')
+    )
+)
+
+INSERT_HISTORY = insert(_history)
@@ -2,15 +2,37 @@
 Data models for the banking application
 """
 
-from .account import Account, AccountBalance
+from .account import (
+    Account, AccountBalance, AccountBalanceSlot, AccountBalanceSnapshot, AccountJournal, HotAccount,
+    JournalApplierState
+)
 from .transaction import TransactionHistory, TransferLog
 from .constraints import AccountRestraint, ClientTransactionLimit
+from .calendar import Branch, BranchHoliday, LocationHoliday
+from .read_models import (
+    AccountRecord, AccountBalanceRecord, TransactionHistoryRecord,
+    TransferLogRecord, AccountRestraintRecord, ClientTransactionLimitRecord
+)
 
 __all__ = [
     'Account',
     'AccountBalance', 
+    'AccountBalanceSlot',
+    'AccountBalanceSnapshot',
+    'AccountJournal',
+    'HotAccount',
+    'JournalApplierState',
     'TransactionHistory',
     'TransferLog',
     'AccountRestraint',
-    'ClientTransactionLimit'
+    'ClientTransactionLimit',
+    'Branch',
+    'BranchHoliday',
+    'LocationHoliday',
+    'AccountRecord',
+    'AccountBalanceRecord',
+    'TransactionHistoryRecord',
+    'TransferLogRecord',
+    'AccountRestraintRecord',
+    'ClientTransactionLimitRecord'
 ]
\ No newline at end of file
@@ -2,10 +2,10 @@
 Account-related data models
 """
 
-from sqlalchemy import Column, BigInteger, String, DECIMAL, DateTime, TIMESTAMP, ForeignKey, Index
+from sqlalchemy import Column, BigInteger, Integer, String, DECIMAL, Date, DateTime, TIMESTAMP, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
-from datetime import datetime
+from datetime import datetime, time, timedelta
 import decimal
 
 Base = declarative_base()
@@ -62,9 +62,10 @@ class AccountBalance(Base):
     
     INTERNAL_KEY = Column(BigInteger, ForeignKey('rb_acct.INTERNAL_KEY'), primary_key=True)
     CLIENT_NO = Column(String(20), nullable=False, index=True)
-    TOTAL_AMOUNT = Column(DECIMAL(20, 2), default=decimal.Decimal('0.00'))
+    TOTAL_AMOUNT = Column(DECIMAL(20, 2), default=decimal.Decimal('0.00'))  # Posted balance
     LAST_CHANGE_DATE = Column(DateTime, default=datetime.utcnow)
     TRAN_TIMESTAMP = Column(TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
+    RESERVED_AMOUNT = Column(DECIMAL(20, 2), default=decimal.Decimal('0.00'))  # Journaled debits not posted yet
     
     # Relationship to account
     account = relationship("Account", back_populates="balance")
@@ -77,20 +78,27 @@ class AccountBalance(Base):
         return {
             'internal_key': self.INTERNAL_KEY,
             'client_no': self.CLIENT_NO,
-            'balance': float(self.TOTAL_AMOUNT),
+            'balance': self.TOTAL_AMOUNT,
+            'reserved': self.RESERVED_AMOUNT or decimal.Decimal('0.00'),
+            'available_balance': self.available_amount,
             'last_change_date': self.LAST_CHANGE_DATE.isoformat() if self.LAST_CHANGE_DATE else None,
             'last_updated': self.TRAN_TIMESTAMP.isoformat() if self.TRAN_TIMESTAMP else None
         }
     
+    @property
+    def available_amount(self):
+        """Posted balance less the funds reserved by journaled debits"""
+        return self.TOTAL_AMOUNT - (self.RESERVED_AMOUNT or decimal.Decimal('0.00'))
+    
     def has_sufficient_balance(self, amount):
-        """Check if account has sufficient balance for the amount"""
-        return self.TOTAL_AMOUNT >= decimal.Decimal(str(amount))
+        """Check if account has sufficient available balance for the amount"""
+        return self.available_amount >= decimal.Decimal(str(amount))
     
     def debit(self, amount):
         """Debit amount from balance"""
         amount_decimal = decimal.Decimal(str(amount))
         if not self.has_sufficient_balance(amount_decimal):
-            raise ValueError(f"Insufficient balance: {self.TOTAL_AMOUNT} < {amount_decimal}")
+            raise ValueError(f"Insufficient balance: {self.available_amount} < {amount_decimal}")
         
         self.TOTAL_AMOUNT -= amount_decimal
         self.LAST_CHANGE_DATE = datetime.utcnow()
@@ -104,6 +112,133 @@ class AccountBalance(Base):
         return self.TOTAL_AMOUNT
 
 
+class AccountBalanceSlot(Base):
+    """Sub-balance slot of a hot account, representing rb_acct_balance_slot table"""
+    
+    __tablename__ = 'rb_acct_balance_slot'
+    
+    INTERNAL_KEY = Column(BigInteger, ForeignKey('rb_acct.INTERNAL_KEY'), primary_key=True)
+    SLOT_NO = Column(Integer, primary_key=True)
+    CLIENT_NO = Column(String(20), nullable=False)
+    SLOT_AMOUNT = Column(DECIMAL(20, 2), default=decimal.Decimal('0.00'))
+    LAST_CHANGE_DATE = Column(DateTime, default=datetime.utcnow)
+    TRAN_TIMESTAMP = Column(TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<AccountBalanceSlot(INTERNAL_KEY={self.INTERNAL_KEY}, SLOT_NO={self.SLOT_NO}, SLOT_AMOUNT={self.SLOT_AMOUNT})>"
+    
+    def credit(self, amount):
+        """Credit amount to the slot"""
+        self.SLOT_AMOUNT += decimal.Decimal(str(amount))
+        self.LAST_CHANGE_DATE = datetime.utcnow()
+        return self.SLOT_AMOUNT
+
+
+class HotAccount(Base):
+    """Account whose credits are spread over balance slots, representing rb_hot_acct table"""
+    
+    __tablename__ = 'rb_hot_acct'
+    
+    INTERNAL_KEY = Column(BigInteger, ForeignKey('rb_acct.INTERNAL_KEY'), primary_key=True)
+    BASE_ACCT_NO = Column(String(50), nullable=False, unique=True)
+    SLOT_COUNT = Column(Integer, nullable=False, default=8)
+    MARKED_BY = Column(String(10), default='MANUAL')  # MANUAL or AUTO
+    MARKED_AT = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<HotAccount(BASE_ACCT_NO='{self.BASE_ACCT_NO}', SLOT_COUNT={self.SLOT_COUNT})>"
+    
+    def to_dict(self):
+        """Convert hot account marker to dictionary"""
+        return {
+            'internal_key': self.INTERNAL_KEY,
+            'account_no': self.BASE_ACCT_NO,
+            'slot_count': self.SLOT_COUNT,
+            'marked_by': self.MARKED_BY,
+            'marked_at': self.MARKED_AT.isoformat() if self.MARKED_AT else None
+        }
+
+
+class AccountJournal(Base):
+    """Immutable ledger entry of the journal ledger mode, representing rb_acct_journal table"""
+    
+    __tablename__ = 'rb_acct_journal'
+    
+    JOURNAL_ID = Column(BigInteger().with_variant(Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    INTERNAL_KEY = Column(BigInteger, nullable=False)
+    CLIENT_NO = Column(String(20), nullable=False)
+    BASE_ACCT_NO = Column(String(50), nullable=False)
+    AMOUNT = Column(DECIMAL(20, 2), nullable=False)  # Signed: negative for debits
+    CR_DR_IND = Column(String(1), nullable=False)  # C for Credit, D for Debit
+    REFERENCE = Column(String(50), index=True)
+    NARRATIVE = Column(String(500))
+    CREATED_AT = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f"<AccountJournal(JOURNAL_ID={self.JOURNAL_ID}, BASE_ACCT_NO='{self.BASE_ACCT_NO}', AMOUNT={self.AMOUNT})>"
+    
+    @classmethod
+    def debit(cls, account, amount, reference, description="Transfer Out"):
+        """Create the journal entry of a debit"""
+        return cls(
+            INTERNAL_KEY=account.INTERNAL_KEY, CLIENT_NO=account.CLIENT_NO, BASE_ACCT_NO=account.BASE_ACCT_NO,
+            AMOUNT=-decimal.Decimal(str(amount)), CR_DR_IND='D', REFERENCE=reference, NARRATIVE=description
+        )
+    
+    @classmethod
+    def credit(cls, account, amount, reference, description="Transfer In"):
+        """Create the journal entry of a credit"""
+        return cls(
+            INTERNAL_KEY=account.INTERNAL_KEY, CLIENT_NO=account.CLIENT_NO, BASE_ACCT_NO=account.BASE_ACCT_NO,
+            AMOUNT=decimal.Decimal(str(amount)), CR_DR_IND='C', REFERENCE=reference, NARRATIVE=description
+        )
+
+
+class JournalApplierState(Base):
+    """Last journal entry folded into rb_acct_balance, representing rb_journal_applier table"""
+    
+    __tablename__ = 'rb_journal_applier'
+    
+    APPLIER = Column(String(20), primary_key=True)
+    LAST_JOURNAL_ID = Column(BigInteger, nullable=False, default=0)
+    TRAN_TIMESTAMP = Column(TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<JournalApplierState(APPLIER='{self.APPLIER}', LAST_JOURNAL_ID={self.LAST_JOURNAL_ID})>"
+
+
+class AccountBalanceSnapshot(Base):
+    """End-of-day account balance, representing rb_acct_balance_snapshot table"""
+    
+    __tablename__ = 'rb_acct_balance_snapshot'
+    
+    INTERNAL_KEY = Column(BigInteger, primary_key=True)
+    SNAPSHOT_DATE = Column(Date, primary_key=True)  # UTC day; covers history dated before the next midnight
+    CLIENT_NO = Column(String(20), nullable=False)
+    BASE_ACCT_NO = Column(String(50), nullable=False)
+    BALANCE = Column(DECIMAL(20, 2), nullable=False)
+    TRAN_COUNT = Column(Integer, default=0)  # History rows dated on SNAPSHOT_DATE
+    TRAN_TIMESTAMP = Column(TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<AccountBalanceSnapshot(INTERNAL_KEY={self.INTERNAL_KEY}, SNAPSHOT_DATE={self.SNAPSHOT_DATE}, BALANCE={self.BALANCE})>"
+    
+    @staticmethod
+    def cutoff(snapshot_date):
+        """Instant a snapshot's balance is valid at: midnight after its date"""
+        return datetime.combine(snapshot_date + timedelta(days=1), time.min)
+    
+    def to_dict(self):
+        """Convert balance snapshot to dictionary"""
+        return {
+            'internal_key': self.INTERNAL_KEY,
+            'account_no': self.BASE_ACCT_NO,
+            'snapshot_date': self.SNAPSHOT_DATE.isoformat() if self.SNAPSHOT_DATE else None,
+            'balance': self.BALANCE,
+            'transaction_count': self.TRAN_COUNT
+        }
+
 # Create indexes for better performance
 Index('idx_acct_client_status', Account.CLIENT_NO, Account.ACCT_STATUS)
-Index('idx_balance_client', AccountBalance.CLIENT_NO)
\ No newline at end of file
+Index('idx_balance_client', AccountBalance.CLIENT_NO)
+Index('idx_balance_snapshot_date', AccountBalanceSnapshot.SNAPSHOT_DATE)
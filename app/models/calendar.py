@@ -0,0 +1,107 @@
+"""
+Branch and holiday reference data models
+"""
+
+from sqlalchemy import Column, String, Date, TIMESTAMP, Index
+from sqlalchemy.ext.declarative import declarative_base
+from datetime import datetime
+
+Base = declarative_base()
+
+# STATE value of nationwide entries in fm_loc_holiday
+NATIONAL_STATE = 'ALL'
+
+
+class Branch(Base):
+    """Branch model representing fm_branch table"""
+
+    __tablename__ = 'fm_branch'
+
+    BRANCH = Column(String(20), primary_key=True)
+    BRANCH_NAME = Column(String(200))
+    COUNTRY = Column(String(3), default='CHN')
+    STATE = Column(String(10))  # Region code used by fm_loc_holiday
+    COMPANY = Column(String(20))
+    TRAN_TIMESTAMP = Column(TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<Branch(BRANCH='{self.BRANCH}', COUNTRY='{self.COUNTRY}', STATE='{self.STATE}')>"
+
+    def to_dict(self):
+        """Convert branch to dictionary"""
+        return {
+            'branch': self.BRANCH,
+            'branch_name': self.BRANCH_NAME,
+            'country': self.COUNTRY,
+            'state': self.STATE,
+            'company': self.COMPANY
+        }
+
+
+class BranchHoliday(Base):
+    """Branch-level calendar entry representing fm_branch_holiday table"""
+
+    __tablename__ = 'fm_branch_holiday'
+
+    BRANCH = Column(String(20), primary_key=True)
+    HOLIDAY_DATE = Column(Date, primary_key=True)
+    HOLIDAY_TYPE = Column(String(10))
+    HOLIDAY_DESC = Column(String(200))
+    WORKING_HOLIDAY = Column(String(1), default='N')  # Y marks a make-up working day
+    APPLY_IND = Column(String(1), default='Y')  # N disables the entry
+    COMPANY = Column(String(20))
+    TRAN_TIMESTAMP = Column(TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<BranchHoliday(BRANCH='{self.BRANCH}', HOLIDAY_DATE={self.HOLIDAY_DATE})>"
+
+    def to_dict(self):
+        """Convert branch holiday to dictionary"""
+        return {
+            'branch': self.BRANCH,
+            'holiday_date': self.HOLIDAY_DATE.isoformat() if self.HOLIDAY_DATE else None,
+            'holiday_type': self.HOLIDAY_TYPE,
+            'description': self.HOLIDAY_DESC,
+            'working_holiday': self.WORKING_HOLIDAY,
+            'apply_ind': self.APPLY_IND
+        }
+
+
+class LocationHoliday(Base):
+    """Regional or national calendar entry representing fm_loc_holiday table"""
+
+    __tablename__ = 'fm_loc_holiday'
+
+    COUNTRY = Column(String(3), primary_key=True)
+    STATE = Column(String(10), primary_key=True)  # Region code, or ALL for nationwide
+    HOLIDAY_DATE = Column(Date, primary_key=True)
+    HOLIDAY_TYPE = Column(String(10))
+    HOLIDAY_DESC = Column(String(200))
+    WORKING_HOLIDAY = Column(String(1), default='N')
+    APPLY_IND = Column(String(1), default='Y')
+    COMPANY = Column(String(20))
+    TRAN_TIMESTAMP = Column(TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<LocationHoliday(COUNTRY='{self.COUNTRY}', STATE='{self.STATE}', HOLIDAY_DATE={self.HOLIDAY_DATE})>"
+
+    def to_dict(self):
+        """Convert location holiday to dictionary"""
+        return {
+            'country': self.COUNTRY,
+            'state': self.STATE,
+            'holiday_date': self.HOLIDAY_DATE.isoformat() if self.HOLIDAY_DATE else None,
+            'holiday_type': self.HOLIDAY_TYPE,
+            'description': self.HOLIDAY_DESC,
+            'working_holiday': self.WORKING_HOLIDAY,
+            'apply_ind': self.APPLY_IND
+        }
+
+    def is_national(self):
+        """Check if the entry applies nationwide"""
+        return self.STATE == NATIONAL_STATE
+
+
+# Create indexes for better performance
+Index('idx_branch_holiday_date', BranchHoliday.HOLIDAY_DATE)
+Index('idx_loc_holiday_date', LocationHoliday.HOLIDAY_DATE)
@@ -9,6 +9,9 @@ import decimal
 
 Base = declarative_base()
 
+# Restraint types that block transfers while active
+FREEZE_RESTRAINT_TYPES = ('FREEZE', 'JUDICIAL', 'ADMIN')
+
 
 class AccountRestraint(Base):
     """Account restraint model representing rb_restraints table"""
@@ -33,7 +36,7 @@ class AccountRestraint(Base):
             'restraint_type': self.RESTRAINT_TYPE,
             'sequence_no': self.RES_SEQ_NO,
             'client_no': self.CLIENT_NO,
-            'restraint_amount': float(self.REAL_RESTRAINT_AMT),
+            'restraint_amount': self.REAL_RESTRAINT_AMT,
             'status': self.RESTRAINTS_STATUS,
             'timestamp': self.TRAN_TIMESTAMP.isoformat() if self.TRAN_TIMESTAMP else None
         }
@@ -44,7 +47,7 @@ class AccountRestraint(Base):
     
     def is_freeze_restraint(self):
         """Check if this is a freeze restraint"""
-        return self.RESTRAINT_TYPE in ['FREEZE', 'JUDICIAL', 'ADMIN']
+        return self.RESTRAINT_TYPE in FREEZE_RESTRAINT_TYPES
     
     def affects_transfers(self):
         """Check if this restraint affects transfers"""
@@ -75,8 +78,8 @@ class ClientTransactionLimit(Base):
             'limit_reference': self.LIMIT_REF,
             'currency': self.ACCT_CCY,
             'client_no': self.CLIENT_NO,
-            'max_amount': float(self.LIMIT_MAX_AMT) if self.LIMIT_MAX_AMT else None,
-            'min_amount': float(self.LIMIT_MIN_AMT) if self.LIMIT_MIN_AMT else None,
+            'max_amount': self.LIMIT_MAX_AMT,
+            'min_amount': self.LIMIT_MIN_AMT,
             'transaction_date': self.TRAN_DATE.isoformat() if self.TRAN_DATE else None,
             'timestamp': self.TRAN_TIMESTAMP.isoformat() if self.TRAN_TIMESTAMP else None
         }
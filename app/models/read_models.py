@@ -0,0 +1,176 @@
+"""
+Read-only records for query endpoints
+
+Tuple-backed, immutable counterparts of the ORM models. They are hydrated
+straight from Core result rows, so read endpoints skip identity-map and
+change-tracking bookkeeping. Field names match the ORM column attributes, so
+code that only reads attributes works with either. ORM instances remain the
+only way to write.
+"""
+
+from collections import namedtuple
+from decimal import Decimal
+
+ZERO_AMOUNT = Decimal('0.00')
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _amount(value):
+    return value if value is not None else ZERO_AMOUNT
+
+
+class AccountRecord(namedtuple('AccountRecord', [
+    'INTERNAL_KEY', 'CLIENT_NO', 'BASE_ACCT_NO', 'ACCT_NAME', 'ACCT_CCY',
+    'ACCT_STATUS', 'ACCT_BRANCH', 'ACCT_OPEN_DATE', 'TRAN_TIMESTAMP'
+])):
+    """Read-only row of rb_acct"""
+
+    __slots__ = ()
+
+    def to_dict(self):
+        """Convert account to dictionary"""
+        return {
+            'internal_key': self.INTERNAL_KEY,
+            'client_no': self.CLIENT_NO,
+            'account_no': self.BASE_ACCT_NO,
+            'account_name': self.ACCT_NAME,
+            'currency': self.ACCT_CCY,
+            'status': self.ACCT_STATUS,
+            'branch': self.ACCT_BRANCH,
+            'open_date': _iso(self.ACCT_OPEN_DATE),
+            'last_updated': _iso(self.TRAN_TIMESTAMP)
+        }
+
+    def is_active(self):
+        """Check if account is active"""
+        return self.ACCT_STATUS == 'A'
+
+
+class AccountBalanceRecord(namedtuple('AccountBalanceRecord', [
+    'INTERNAL_KEY', 'CLIENT_NO', 'TOTAL_AMOUNT', 'LAST_CHANGE_DATE', 'TRAN_TIMESTAMP', 'RESERVED_AMOUNT'
+], defaults=(ZERO_AMOUNT,))):
+    """Read-only row of rb_acct_balance"""
+
+    __slots__ = ()
+
+    @property
+    def available_amount(self):
+        """Posted balance less the funds reserved by journaled debits"""
+        return self.TOTAL_AMOUNT - _amount(self.RESERVED_AMOUNT)
+
+    def to_dict(self):
+        """Convert balance to dictionary"""
+        return {
+            'internal_key': self.INTERNAL_KEY,
+            'client_no': self.CLIENT_NO,
+            'balance': self.TOTAL_AMOUNT,
+            'reserved': _amount(self.RESERVED_AMOUNT),
+            'available_balance': self.available_amount,
+            'last_change_date': _iso(self.LAST_CHANGE_DATE),
+            'last_updated': _iso(self.TRAN_TIMESTAMP)
+        }
+
+
+class TransactionHistoryRecord(namedtuple('TransactionHistoryRecord', [
+    'SEQ_NO', 'INTERNAL_KEY', 'CLIENT_NO', 'BASE_ACCT_NO', 'TRAN_TYPE', 'TRAN_AMT',
+    'PREVIOUS_BAL_AMT', 'ACTUAL_BAL', 'CR_DR_IND', 'TRAN_DATE', 'REFERENCE',
+    'NARRATIVE', 'TRAN_STATUS', 'TRAN_TIMESTAMP'
+])):
+    """Read-only row of rb_tran_hist"""
+
+    __slots__ = ()
+
+    def to_dict(self):
+        """Convert transaction to dictionary"""
+        return {
+            'seq_no': self.SEQ_NO,
+            'internal_key': self.INTERNAL_KEY,
+            'client_no': self.CLIENT_NO,
+            'account_no': self.BASE_ACCT_NO,
+            'transaction_type': self.TRAN_TYPE,
+            'amount': _amount(self.TRAN_AMT),
+            'previous_balance': _amount(self.PREVIOUS_BAL_AMT),
+            'new_balance': _amount(self.ACTUAL_BAL),
+            'credit_debit_indicator': self.CR_DR_IND,
+            'transaction_date': _iso(self.TRAN_DATE),
+            'reference': self.REFERENCE,
+            'description': self.NARRATIVE,
+            'status': self.TRAN_STATUS,
+            'timestamp': _iso(self.TRAN_TIMESTAMP)
+        }
+
+
+class TransferLogRecord(namedtuple('TransferLogRecord', [
+    'id', 'transfer_id', 'from_account', 'to_account', 'amount', 'currency',
+    'status', 'error_message', 'created_at', 'updated_at'
+])):
+    """Read-only row of transfer_log"""
+
+    __slots__ = ()
+
+    def to_dict(self):
+        """Convert transfer log to dictionary"""
+        return {
+            'id': self.id,
+            'transfer_id': self.transfer_id,
+            'from_account': self.from_account,
+            'to_account': self.to_account,
+            'amount': self.amount,
+            'currency': self.currency,
+            'status': self.status,
+            'error_message': self.error_message,
+            'created_at': _iso(self.created_at),
+            'updated_at': _iso(self.updated_at)
+        }
+
+
+class AccountRestraintRecord(namedtuple('AccountRestraintRecord', [
+    'INTERNAL_KEY', 'RESTRAINT_TYPE', 'RES_SEQ_NO', 'CLIENT_NO',
+    'REAL_RESTRAINT_AMT', 'RESTRAINTS_STATUS', 'TRAN_TIMESTAMP'
+])):
+    """Read-only row of rb_restraints"""
+
+    __slots__ = ()
+
+    def to_dict(self):
+        """Convert restraint to dictionary"""
+        return {
+            'internal_key': self.INTERNAL_KEY,
+            'restraint_type': self.RESTRAINT_TYPE,
+            'sequence_no': self.RES_SEQ_NO,
+            'client_no': self.CLIENT_NO,
+            'restraint_amount': self.REAL_RESTRAINT_AMT,
+            'status': self.RESTRAINTS_STATUS,
+            'timestamp': _iso(self.TRAN_TIMESTAMP)
+        }
+
+
+class ClientTransactionLimitRecord(namedtuple('ClientTransactionLimitRecord', [
+    'BASE_ACCT_NO', 'LIMIT_REF', 'ACCT_CCY', 'CLIENT_NO', 'LIMIT_MAX_AMT',
+    'LIMIT_MIN_AMT', 'TRAN_DATE', 'TRAN_TIMESTAMP'
+])):
+    """Read-only row of rb_lm_client_tran_limit"""
+
+    __slots__ = ()
+
+    def to_dict(self):
+        """Convert limit to dictionary"""
+        return {
+            'account_no': self.BASE_ACCT_NO,
+            'limit_reference': self.LIMIT_REF,
+            'currency': self.ACCT_CCY,
+            'client_no': self.CLIENT_NO,
+            'max_amount': self.LIMIT_MAX_AMT,
+            'min_amount': self.LIMIT_MIN_AMT,
+            'transaction_date': _iso(self.TRAN_DATE),
+            'timestamp': _iso(self.TRAN_TIMESTAMP)
+        }
+
+
+def record_columns(model, record_class):
+    """Table columns of a model in the field order of its record class"""
+    columns = model.__table__.c
+    return [columns[field] for field in record_class._fields]
@@ -2,7 +2,7 @@
 Transaction-related data models
 """
 
-from sqlalchemy import Column, BigInteger, String, DECIMAL, DateTime, TIMESTAMP, Text, Enum, Index
+from sqlalchemy import Column, BigInteger, Integer, String, DECIMAL, DateTime, TIMESTAMP, Text, Enum, Index
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 import decimal
@@ -10,6 +10,8 @@ import uuid
 
 Base = declarative_base()
 
+ZERO_AMOUNT = decimal.Decimal('0.00')
+
 
 class TransactionHistory(Base):
     """Transaction history model representing rb_tran_hist table"""
@@ -47,9 +49,9 @@ class TransactionHistory(Base):
             'client_no': self.CLIENT_NO,
             'account_no': self.BASE_ACCT_NO,
             'transaction_type': self.TRAN_TYPE,
-            'amount': float(self.TRAN_AMT) if self.TRAN_AMT else 0.0,
-            'previous_balance': float(self.PREVIOUS_BAL_AMT) if self.PREVIOUS_BAL_AMT else 0.0,
-            'new_balance': float(self.ACTUAL_BAL) if self.ACTUAL_BAL else 0.0,
+            'amount': self.TRAN_AMT if self.TRAN_AMT is not None else ZERO_AMOUNT,
+            'previous_balance': self.PREVIOUS_BAL_AMT if self.PREVIOUS_BAL_AMT is not None else ZERO_AMOUNT,
+            'new_balance': self.ACTUAL_BAL if self.ACTUAL_BAL is not None else ZERO_AMOUNT,
             'credit_debit_indicator': self.CR_DR_IND,
             'transaction_date': self.TRAN_DATE.isoformat() if self.TRAN_DATE else None,
             'reference': self.REFERENCE,
@@ -100,7 +102,8 @@ class TransferLog(Base):
     
     __tablename__ = 'transfer_log'
     
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    # SQLite only autoincrements INTEGER primary keys (benchmark stand-in)
+    id = Column(BigInteger().with_variant(Integer, 'sqlite'), primary_key=True, autoincrement=True)
     transfer_id = Column(String(50), unique=True, nullable=False, index=True)
     from_account = Column(String(50), nullable=False, index=True)
     to_account = Column(String(50), nullable=False, index=True)
@@ -108,6 +111,7 @@ class TransferLog(Base):
     currency = Column(String(3), default='CNY')
     status = Column(Enum('PENDING', 'SUCCESS', 'FAILED', 'ROLLBACK'), default='PENDING', index=True)
     error_message = Column(Text)
+    retry_count = Column(Integer, default=0)  # deadlock / lock wait retries before the final attempt
     created_at = Column(TIMESTAMP, default=datetime.utcnow, index=True)
     updated_at = Column(TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -126,10 +130,11 @@ class TransferLog(Base):
             'transfer_id': self.transfer_id,
             'from_account': self.from_account,
             'to_account': self.to_account,
-            'amount': float(self.amount),
+            'amount': self.amount,
             'currency': self.currency,
             'status': self.status,
             'error_message': self.error_message,
+            'retry_count': self.retry_count or 0,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
@@ -156,6 +161,7 @@ class TransferLog(Base):
 
 # Create composite indexes for better query performance
 Index('idx_tran_hist_account_date', TransactionHistory.BASE_ACCT_NO, TransactionHistory.TRAN_DATE)
+Index('idx_tran_hist_key_date', TransactionHistory.INTERNAL_KEY, TransactionHistory.TRAN_DATE)
 Index('idx_tran_hist_client_date', TransactionHistory.CLIENT_NO, TransactionHistory.TRAN_DATE)
 Index('idx_transfer_log_accounts', TransferLog.from_account, TransferLog.to_account)
 Index('idx_transfer_log_status_date', TransferLog.status, TransferLog.created_at)
\ No newline at end of file
@@ -3,12 +3,18 @@ Account service for account-related business operations
 """
 
 import logging
+import random
+import time
 from decimal import Decimal
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import and_
 
-from app.models.account import Account, AccountBalance
-from app.models.constraints import AccountRestraint, ClientTransactionLimit
+from app.database import statements
+from app.models.account import AccountBalanceSlot, AccountJournal
+from app.models.read_models import (
+    AccountRecord, AccountBalanceRecord, TransactionHistoryRecord,
+    AccountRestraintRecord
+)
+from app.services.balance_snapshots import balance_at
+from app.services.limit_profiles import load_limit_profile
 from app.utils.exceptions import (
     AccountNotFoundException, AccountInactiveException, 
     InsufficientBalanceException, AccountRestrictedException,
@@ -18,18 +24,52 @@ from app.utils.exceptions import (
 logger = logging.getLogger(__name__)
 
 
+def _balance_records(row):
+    """Split an ACCOUNT_WITH_BALANCE_ROW row into account and balance records"""
+    split = len(AccountRecord._fields)
+    account, balance = AccountRecord._make(row[:split]), AccountBalanceRecord._make(row[split:-1])
+    
+    # Hot accounts hold part of their balance in slots
+    if row.SLOT_TOTAL:
+        balance = balance._replace(TOTAL_AMOUNT=balance.TOTAL_AMOUNT + Decimal(str(row.SLOT_TOTAL)))
+    
+    return account, balance
+
+
 class AccountService:
     """Service for account operations"""
     
-    def __init__(self, session):
+    def __init__(self, session, restraint_index=None, hot_accounts=None, limit_profiles=None, archive=None,
+                 deadline=None):
         self.session = session
+        self.restraint_index = restraint_index
+        self.hot_accounts = hot_accounts
+        self.limit_profiles = limit_profiles
+        self.archive = archive
+        self.deadline = deadline
+    
+    def _bound(self, step):
+        """Check the deadline and bound the next statements to what is left of it"""
+        if self.deadline is not None:
+            self.deadline.apply(self.session, step)
+    
+    def _slot_count(self, account_no):
+        """Number of balance slots of a hot account, 0 for regular accounts"""
+        return self.hot_accounts.slot_count(account_no) if self.hot_accounts is not None else 0
+    
+    def get_balance_slot_total(self, internal_key):
+        """Get the sum of a hot account's balance slots"""
+        total = self.session.execute(
+            statements.BALANCE_SLOT_TOTAL, {'internal_key': internal_key}
+        ).scalar()
+        return Decimal(str(total or 0))
     
     def get_account_by_number(self, account_no):
         """Get account by account number"""
         try:
-            account = self.session.query(Account).filter(
-                Account.BASE_ACCT_NO == account_no
-            ).first()
+            account = self.session.execute(
+                statements.ACCOUNT_BY_NUMBER, {'account_no': account_no}
+            ).scalars().first()
             
             if not account:
                 raise AccountNotFoundException(account_no)
@@ -44,9 +84,9 @@ class AccountService:
         """Get account balance by account number"""
         try:
             # Join account and balance tables
-            result = self.session.query(Account, AccountBalance).join(
-                AccountBalance, Account.INTERNAL_KEY == AccountBalance.INTERNAL_KEY
-            ).filter(Account.BASE_ACCT_NO == account_no).first()
+            result = self.session.execute(
+                statements.ACCOUNT_WITH_BALANCE, {'account_no': account_no}
+            ).first()
             
             if not result:
                 raise AccountNotFoundException(account_no)
@@ -58,9 +98,67 @@ class AccountService:
             logger.error(f"Error getting balance for account {account_no}: {str(e)}")
             raise
     
+    def get_account_balance_record(self, account_no):
+        """Get read-only account and balance records by account number"""
+        try:
+            row = self.session.execute(
+                statements.ACCOUNT_WITH_BALANCE_ROW, {'account_no': account_no}
+            ).first()
+            
+            if not row:
+                raise AccountNotFoundException(account_no)
+            
+            return _balance_records(row)
+            
+        except Exception as e:
+            logger.error(f"Error getting balance for account {account_no}: {str(e)}")
+            raise
+    
+    def get_account_balance_records(self, account_nos):
+        """Get account and balance records of several accounts in one query, keyed by account number"""
+        try:
+            if not account_nos:
+                return {}
+            records = (
+                _balance_records(row) for row in self.session.execute(
+                    statements.ACCOUNTS_WITH_BALANCE_ROWS, {'account_nos': list(account_nos)}
+                )
+            )
+            return {account.BASE_ACCT_NO: (account, balance) for account, balance in records}
+            
+        except Exception as e:
+            logger.error(f"Error getting balances for {len(account_nos)} accounts: {str(e)}")
+            raise
+    
+    def get_client_balance_records(self, client_no):
+        """Get account and balance records of all accounts of a client, keyed by account number"""
+        try:
+            records = (
+                _balance_records(row) for row in self.session.execute(
+                    statements.CLIENT_BALANCE_ROWS, {'client_no': client_no}
+                )
+            )
+            return {account.BASE_ACCT_NO: (account, balance) for account, balance in records}
+            
+        except Exception as e:
+            logger.error(f"Error getting balances for client {client_no}: {str(e)}")
+            raise
+    
+    def get_balance_at(self, account_no, at):
+        """Get an account's balance at a past instant from the nearest balance snapshot"""
+        try:
+            account, balance = self.get_account_balance_record(account_no)
+            point = balance_at(self.session, account.INTERNAL_KEY, at, balance.TOTAL_AMOUNT)
+            return account, point
+            
+        except Exception as e:
+            logger.error(f"Error getting balance at {at} for account {account_no}: {str(e)}")
+            raise
+    
     def validate_account_for_transfer(self, account_no, is_source=True):
         """Validate account for transfer operations"""
         try:
+            self._bound('validate account')
             account, balance = self.get_account_balance(account_no)
             
             # Check if account is active
@@ -68,11 +166,9 @@ class AccountService:
                 raise AccountInactiveException(account_no, account.ACCT_STATUS)
             
             # Check for account restrictions
-            restrictions = self.get_account_restrictions(account.INTERNAL_KEY)
-            active_restrictions = [r for r in restrictions if r.affects_transfers()]
+            restriction_types = self.get_transfer_restriction_types(account.INTERNAL_KEY)
             
-            if active_restrictions:
-                restriction_types = [r.RESTRAINT_TYPE for r in active_restrictions]
+            if restriction_types:
                 raise AccountRestrictedException(account_no, ', '.join(restriction_types))
             
             return account, balance
@@ -84,12 +180,9 @@ class AccountService:
     def get_account_restrictions(self, internal_key):
         """Get active restrictions for an account"""
         try:
-            restrictions = self.session.query(AccountRestraint).filter(
-                and_(
-                    AccountRestraint.INTERNAL_KEY == internal_key,
-                    AccountRestraint.RESTRAINTS_STATUS == 'A'
-                )
-            ).all()
+            restrictions = self.session.execute(
+                statements.ACTIVE_RESTRAINTS, {'internal_key': internal_key}
+            ).scalars().all()
             
             return restrictions
             
@@ -97,32 +190,37 @@ class AccountService:
             logger.error(f"Error getting restrictions for account {internal_key}: {str(e)}")
             raise
     
+    def get_transfer_restriction_types(self, internal_key):
+        """Get the types of active restrictions that block transfers"""
+        # A fresh index answers the common unrestricted case without a query;
+        # restrained or stale answers are confirmed against the database
+        if self.restraint_index is not None:
+            indexed_types = self.restraint_index.lookup(internal_key)
+            if indexed_types is not None and not indexed_types:
+                return []
+        
+        restrictions = self.get_account_restrictions(internal_key)
+        return [r.RESTRAINT_TYPE for r in restrictions if r.affects_transfers()]
+    
+    def get_limit_profile(self, account_no):
+        """Get all limits of an account as one profile"""
+        if self.limit_profiles is not None:
+            return self.limit_profiles.get_profile(self.session, account_no)
+        return load_limit_profile(self.session, account_no)
+    
     def check_transfer_limits(self, account_no, amount):
         """Check if transfer amount is within limits"""
         try:
-            # Get daily transfer limit
-            daily_limit = self.session.query(ClientTransactionLimit).filter(
-                and_(
-                    ClientTransactionLimit.BASE_ACCT_NO == account_no,
-                    ClientTransactionLimit.LIMIT_REF == 'DailyTransferLimit'
+            # Every transfer limit type is evaluated against one cached profile
+            violations = self.get_limit_profile(account_no).evaluate(amount)
+            
+            if violations:
+                violation = violations[0]
+                raise TransferLimitExceededException(
+                    violation.limit_type,
+                    violation.limit_amount,
+                    amount
                 )
-            ).first()
-            
-            if daily_limit:
-                is_valid, message = daily_limit.is_amount_within_limits(amount)
-                if not is_valid:
-                    if amount > daily_limit.LIMIT_MAX_AMT:
-                        raise TransferLimitExceededException(
-                            'Daily Transfer Limit',
-                            daily_limit.LIMIT_MAX_AMT,
-                            amount
-                        )
-                    elif amount < daily_limit.LIMIT_MIN_AMT:
-                        raise TransferLimitExceededException(
-                            'Minimum Transfer Amount',
-                            daily_limit.LIMIT_MIN_AMT,
-                            amount
-                        )
             
             return True
             
@@ -133,12 +231,21 @@ class AccountService:
     def validate_sufficient_balance(self, account_no, amount):
         """Validate if account has sufficient balance"""
         try:
-            account, balance = self.get_account_balance(account_no)
+            self._bound('validate balance')
+            result = self.session.execute(
+                statements.ACCOUNT_WITH_BALANCE_AND_SLOTS, {'account_no': account_no}
+            ).first()
             
-            if not balance.has_sufficient_balance(amount):
+            if not result:
+                raise AccountNotFoundException(account_no)
+            
+            account, balance, slot_total = result
+            available = balance.available_amount + Decimal(str(slot_total))
+            
+            if available < Decimal(str(amount)):
                 raise InsufficientBalanceException(
                     account_no, 
-                    balance.TOTAL_AMOUNT, 
+                    available, 
                     amount
                 )
             
@@ -148,19 +255,27 @@ class AccountService:
             logger.error(f"Balance validation failed for {account_no}: {str(e)}")
             raise
     
+    def _lock_account(self, account_no, statement):
+        """Run a FOR UPDATE account lookup, returning its row"""
+        # Lock both account and balance records, waiting no longer than the deadline allows
+        self._bound('lock account')
+        started = time.perf_counter()
+        result = self.session.execute(statement, {'account_no': account_no}).first()
+        
+        # Repeated long lock waits put the account in hot mode
+        if self.hot_accounts is not None:
+            self.hot_accounts.record_lock_wait(account_no, (time.perf_counter() - started) * 1000)
+        
+        if not result:
+            raise AccountNotFoundException(account_no)
+        
+        logger.debug(f"Account {account_no} locked for update")
+        return result
+    
     def lock_account_for_update(self, account_no):
         """Lock account balance for update (SELECT FOR UPDATE)"""
         try:
-            # Lock both account and balance records
-            result = self.session.query(Account, AccountBalance).join(
-                AccountBalance, Account.INTERNAL_KEY == AccountBalance.INTERNAL_KEY
-            ).filter(Account.BASE_ACCT_NO == account_no).with_for_update().first()
-            
-            if not result:
-                raise AccountNotFoundException(account_no)
-            
-            account, balance = result
-            logger.debug(f"Account {account_no} locked for update")
+            account, balance = self._lock_account(account_no, statements.ACCOUNT_WITH_BALANCE_FOR_UPDATE)
             return account, balance
             
         except Exception as e:
@@ -171,21 +286,29 @@ class AccountService:
         """Debit amount from account"""
         try:
             # Lock account for update
-            account, balance = self.lock_account_for_update(account_no)
+            account, balance, slot_total = self._lock_account(
+                account_no, statements.ACCOUNT_WITH_BALANCE_AND_SLOTS_FOR_UPDATE
+            )
+            slot_total = Decimal(str(slot_total))
+            
+            # Slots are folded in only when the main balance falls short
+            if slot_total and not balance.has_sufficient_balance(amount):
+                self._fold_balance_slots(account, balance)
+                slot_total = self.get_balance_slot_total(account.INTERNAL_KEY)
             
             # Validate sufficient balance
             if not balance.has_sufficient_balance(amount):
                 raise InsufficientBalanceException(
                     account_no, 
-                    balance.TOTAL_AMOUNT, 
+                    balance.available_amount, 
                     amount
                 )
             
             # Record previous balance
-            previous_balance = balance.TOTAL_AMOUNT
+            previous_balance = balance.TOTAL_AMOUNT + slot_total
             
             # Debit the amount
-            new_balance = balance.debit(amount)
+            new_balance = balance.debit(amount) + slot_total
             
             logger.info(f"Debited {amount} from account {account_no}. "
                        f"Previous: {previous_balance}, New: {new_balance}")
@@ -204,6 +327,10 @@ class AccountService:
     def credit_account(self, account_no, amount, reference, description="Transfer In"):
         """Credit amount to account"""
         try:
+            slot_count = self._slot_count(account_no)
+            if slot_count:
+                return self._credit_balance_slot(account_no, amount, slot_count)
+            
             # Lock account for update
             account, balance = self.lock_account_for_update(account_no)
             
@@ -227,18 +354,165 @@ class AccountService:
             logger.error(f"Error crediting account {account_no}: {str(e)}")
             raise
     
-    def get_account_transaction_history(self, account_no, limit=10, offset=0):
-        """Get transaction history for an account"""
+    def journal_debit(self, account, amount, reference, description="Transfer Out"):
+        """Reserve funds and append a debit entry (journal ledger mode)"""
+        try:
+            amount = Decimal(str(amount))
+            
+            reserved, row = self._reserve_funds(account, amount)
+            
+            # Funds in a hot account's slots count as in validate_sufficient_balance:
+            # when the main balance falls short, fold them in and reserve again
+            if not reserved and row.SLOT_TOTAL:
+                self.consolidate_balance_slots(account.BASE_ACCT_NO)
+                self.session.flush()
+                reserved, row = self._reserve_funds(account, amount)
+            
+            new_balance = row.TOTAL_AMOUNT - row.RESERVED_AMOUNT + Decimal(str(row.SLOT_TOTAL))
+            if not reserved:
+                raise InsufficientBalanceException(account.BASE_ACCT_NO, new_balance, amount)
+            
+            self.session.add(AccountJournal.debit(account, amount, reference, description))
+            
+            logger.info(f"Reserved {amount} on account {account.BASE_ACCT_NO}. "
+                       f"Available: {new_balance + amount} -> {new_balance}")
+            
+            return {
+                'account': account,
+                'previous_balance': new_balance + amount,
+                'new_balance': new_balance,
+                'amount': amount
+            }
+            
+        except Exception as e:
+            logger.error(f"Error debiting account {account.BASE_ACCT_NO}: {str(e)}")
+            raise
+    
+    def _reserve_funds(self, account, amount):
+        """Reserve amount on an account, returning whether it was reserved and the balance row after"""
+        # Checks the available balance and takes the row lock in one statement
+        self._bound('reserve funds')
+        started = time.perf_counter()
+        reserved = self.session.execute(
+            statements.RESERVE_FUNDS, {'internal_key': account.INTERNAL_KEY, 'amount': amount}
+        ).rowcount
+        if self.hot_accounts is not None:
+            self.hot_accounts.record_lock_wait(account.BASE_ACCT_NO, (time.perf_counter() - started) * 1000)
+        
+        row = self.session.execute(
+            statements.BALANCE_RESERVATION_ROW, {'internal_key': account.INTERNAL_KEY}
+        ).first()
+        if row is None:
+            raise AccountNotFoundException(account.BASE_ACCT_NO)
+        return reserved, row
+    
+    def journal_credit(self, account, amount, reference, description="Transfer In"):
+        """Append a credit entry without locking the account (journal ledger mode)"""
         try:
-            from app.models.transaction import TransactionHistory
+            self._bound('journal credit')
+            self.session.add(AccountJournal.credit(account, amount, reference, description))
             
-            transactions = self.session.query(TransactionHistory).filter(
-                TransactionHistory.BASE_ACCT_NO == account_no
-            ).order_by(
-                TransactionHistory.TRAN_DATE.desc()
-            ).limit(limit).offset(offset).all()
+            logger.info(f"Journaled credit of {amount} to account {account.BASE_ACCT_NO}")
             
-            return [tx.to_dict() for tx in transactions]
+            # The posted balance is only known once the applier has folded the entry
+            return {
+                'account': account,
+                'previous_balance': None,
+                'new_balance': None,
+                'amount': Decimal(str(amount))
+            }
+            
+        except Exception as e:
+            logger.error(f"Error crediting account {account.BASE_ACCT_NO}: {str(e)}")
+            raise
+    
+    def _credit_balance_slot(self, account_no, amount, slot_count):
+        """Credit a hot account through one randomly chosen balance slot"""
+        # The main balance row is read without a lock; only the slot is locked
+        account, balance = self.get_account_balance(account_no)
+        slot_no = random.randrange(slot_count)
+        
+        self._bound('lock balance slot')
+        slot = self.session.execute(
+            statements.BALANCE_SLOT_FOR_UPDATE,
+            {'internal_key': account.INTERNAL_KEY, 'slot_no': slot_no}
+        ).scalars().first()
+        
+        if slot is None:
+            slot = AccountBalanceSlot(
+                INTERNAL_KEY=account.INTERNAL_KEY, SLOT_NO=slot_no,
+                CLIENT_NO=account.CLIENT_NO, SLOT_AMOUNT=Decimal('0.00')
+            )
+            self.session.add(slot)
+        
+        # Running balance as visible to this transaction; concurrent slot credits may interleave
+        previous_balance = balance.TOTAL_AMOUNT + self.get_balance_slot_total(account.INTERNAL_KEY)
+        slot.credit(amount)
+        new_balance = previous_balance + Decimal(str(amount))
+        
+        logger.info(f"Credited {amount} to hot account {account_no} slot {slot_no}. "
+                   f"Previous: {previous_balance}, New: {new_balance}")
+        
+        return {
+            'account': account,
+            'previous_balance': previous_balance,
+            'new_balance': new_balance,
+            'amount': amount
+        }
+    
+    def _fold_balance_slots(self, account, balance):
+        """Move all slot amounts of a locked hot account into its main balance"""
+        # Lock order is always main balance row first, then slots by SLOT_NO
+        self._bound('lock balance slots')
+        slots = self.session.execute(
+            statements.BALANCE_SLOTS_FOR_UPDATE, {'internal_key': account.INTERNAL_KEY}
+        ).scalars().all()
+        
+        folded = sum((slot.SLOT_AMOUNT for slot in slots), Decimal('0.00'))
+        if folded:
+            balance.credit(folded)
+            for slot in slots:
+                slot.SLOT_AMOUNT = Decimal('0.00')
+        
+        return folded
+    
+    def consolidate_balance_slots(self, account_no):
+        """Fold a hot account's balance slots into its main balance"""
+        try:
+            account, balance = self.lock_account_for_update(account_no)
+            folded = self._fold_balance_slots(account, balance)
+            
+            if folded:
+                logger.info(f"Folded {folded} from balance slots into account {account_no}")
+            
+            return folded
+            
+        except Exception as e:
+            logger.error(f"Error consolidating balance slots for {account_no}: {str(e)}")
+            raise
+    
+    def get_account_transaction_history(self, account_no, limit=10, offset=0):
+        """Get transaction history for an account"""
+        try:
+            rows = self.session.execute(
+                statements.TRANSACTION_HISTORY_PAGE_ROWS,
+                {'account_no': account_no, 'limit': limit, 'offset': offset}
+            )
+            history = [TransactionHistoryRecord._make(row) for row in rows]
+            
+            # A page running past the rows still in the table continues in the archive
+            if self.archive is not None and len(history) < limit:
+                if history:
+                    table_rows = offset + len(history)
+                else:
+                    table_rows = self.session.execute(
+                        statements.TRANSACTION_HISTORY_COUNT, {'account_no': account_no}
+                    ).scalar()
+                history.extend(self.archive.read(
+                    'rb_tran_hist', account_no, limit - len(history), max(0, offset - table_rows)
+                ))
+            
+            return [record.to_dict() for record in history]
             
         except Exception as e:
             logger.error(f"Error getting transaction history for {account_no}: {str(e)}")
@@ -247,21 +521,23 @@ class AccountService:
     def get_account_info(self, account_no):
         """Get complete account information"""
         try:
-            account, balance = self.get_account_balance(account_no)
+            account, balance = self.get_account_balance_record(account_no)
             
             # Get restrictions
-            restrictions = self.get_account_restrictions(account.INTERNAL_KEY)
+            restrictions = [
+                AccountRestraintRecord._make(row) for row in self.session.execute(
+                    statements.ACTIVE_RESTRAINTS_ROWS, {'internal_key': account.INTERNAL_KEY}
+                )
+            ]
             
             # Get transaction limits
-            limits = self.session.query(ClientTransactionLimit).filter(
-                ClientTransactionLimit.BASE_ACCT_NO == account_no
-            ).all()
+            limits = self.get_limit_profile(account_no).to_dicts()
             
             return {
                 'account': account.to_dict(),
                 'balance': balance.to_dict(),
                 'restrictions': [r.to_dict() for r in restrictions],
-                'limits': [l.to_dict() for l in limits]
+                'limits': limits
             }
             
         except Exception as e:
@@ -0,0 +1,288 @@
+"""
+Bulk account statements generated by a process pool
+
+Month-end statements for every account cannot be built by paging
+get_account_transaction_history account by account. StatementGenerator
+instead splits the accounts of one database into INTERNAL_KEY ranges and
+hands each range to a worker process. A worker reads its range with three
+queries, whatever the number of accounts in it:
+
+- the accounts and current balances (slots included) of the range,
+- the net amount posted per account after the period, for accounts without
+  activity in the period, whose closing balance is their current balance
+  less what came after,
+- the period's history of the whole range as one scan ordered by
+  (INTERNAL_KEY, TRAN_DATE), which idx_tran_hist_key_date serves directly,
+  streamed yield_per rows at a time and merged with the account list.
+
+Balances come from the history rows themselves: the opening balance is the
+first row's PREVIOUS_BAL_AMT and every line carries its ACTUAL_BAL. Failed
+rows are left out.
+
+Each partition renders to part-NNNNN.csv (and .txt with the text format)
+through a large write buffer, writing a temporary file that is renamed into
+place, and then records its counts in part-NNNNN.done. The partition plan
+is saved in plan.json, so rerunning an interrupted period regenerates only
+the partitions without a .done file:
+
+    <STATEMENT_DIR>/<database>/<first day>_<last day>/part-00000.csv
+
+Workers are forked, so they start with the parent's session factory; the
+engine's inherited connections are discarded (not closed) in each child.
+"""
+
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from app.database import statements
+
+logger = logging.getLogger(__name__)
+
+Partition = namedtuple('Partition', ['index', 'low_key', 'high_key'])
+
+PartitionResult = namedtuple('PartitionResult', ['index', 'accounts', 'transactions', 'bytes', 'seconds'])
+
+StatementAccount = namedtuple('StatementAccount', [
+    'internal_key', 'account_no', 'client_no', 'name', 'currency', 'balance'
+])
+
+CSV_HEADER = (
+    'account_no', 'client_no', 'currency', 'date', 'seq_no', 'type',
+    'reference', 'description', 'debit', 'credit', 'balance'
+)
+
+FORMATS = ('csv', 'text')
+
+_EXTENSIONS = {'csv': 'csv', 'text': 'txt'}
+
+ZERO = Decimal('0.00')
+
+# Set in each worker process by _init_worker
+_worker = None
+
+
+def _money(amount):
+    return f'{amount:.2f}' if amount is not None else ''
+
+
+def _init_worker(generator):
+    global _worker
+    _worker = generator
+    if generator.engine is not None:
+        # Connections inherited from the parent belong to the parent
+        generator.engine.dispose(close=False)
+
+
+def _generate(since, until, partition):
+    return _worker.generate_partition(since, until, partition)
+
+
+class StatementGenerator:
+    """Renders the statements of one database for one period"""
+
+    def __init__(self, name, session_factory, output_dir, engine=None, workers=1, partitions=None,
+                 fetch_rows=5000, buffer_bytes=1 << 20, formats=('csv',)):
+        unknown = set(formats) - set(FORMATS)
+        if unknown:
+            raise ValueError(f"Unknown statement formats: {', '.join(sorted(unknown))}")
+        self.name = name
+        self.session_factory = session_factory
+        self.output_dir = output_dir
+        self.engine = engine
+        self.workers = workers
+        self.partitions = partitions or workers * 4
+        self.fetch_rows = fetch_rows
+        self.buffer_bytes = buffer_bytes
+        self.formats = tuple(formats)
+
+    def directory(self, since, until):
+        last_day = (until - timedelta(days=1)).date()
+        return os.path.join(self.output_dir, self.name, f'{since.date().isoformat()}_{last_day.isoformat()}')
+
+    def _part_path(self, since, until, index, extension):
+        return os.path.join(self.directory(since, until), f'part-{index:05d}.{extension}')
+
+    def plan(self, since, until):
+        """Split the accounts into key ranges, reusing the plan of an interrupted run"""
+        directory = self.directory(since, until)
+        path = os.path.join(directory, 'plan.json')
+        if os.path.exists(path):
+            with open(path) as f:
+                return [Partition(*partition) for partition in json.load(f)['partitions']]
+
+        with self.session_factory() as session:
+            low, high = session.execute(statements.STATEMENT_KEY_RANGE).one()
+        partitions = []
+        if low is not None:
+            step = max(1, -(-(high - low + 1) // self.partitions))
+            partitions = [
+                Partition(index, key, min(key + step, high + 1))
+                for index, key in enumerate(range(low, high + 1, step))
+            ]
+
+        os.makedirs(directory, exist_ok=True)
+        with open(f'{path}.tmp', 'w') as f:
+            json.dump({'partitions': partitions, 'formats': self.formats}, f)
+        os.replace(f'{path}.tmp', path)
+        return partitions
+
+    def completed(self, since, until):
+        """Indexes of the partitions already written"""
+        return {
+            int(name[5:10]) for name in os.listdir(self.directory(since, until))
+            if name.startswith('part-') and name.endswith('.done')
+        }
+
+    def _read(self, session, since, until, partition):
+        keys = {'low_key': partition.low_key, 'high_key': partition.high_key}
+        accounts = [StatementAccount(*row) for row in session.execute(statements.STATEMENT_ACCOUNTS, keys)]
+        after = {key: amount for key, amount, _ in session.execute(
+            statements.STATEMENT_DELTAS_AFTER, dict(keys, until=until)
+        )}
+        history = session.execute(
+            statements.STATEMENT_HISTORY, dict(keys, since=since, until=until),
+            execution_options={'stream_results': True, 'yield_per': self.fetch_rows}
+        )
+        return accounts, after, history
+
+    def _statements(self, accounts, after, history):
+        """Merge the ordered accounts and history into (account, opening, closing, rows)"""
+        rows = iter(history)
+        row = next(rows, None)
+        for account in accounts:
+            # Rows of accounts missing from rb_acct cannot be addressed; skip them
+            while row is not None and row.INTERNAL_KEY < account.internal_key:
+                row = next(rows, None)
+            lines = []
+            while row is not None and row.INTERNAL_KEY == account.internal_key:
+                lines.append(row)
+                row = next(rows, None)
+
+            if lines:
+                opening, closing = lines[0].PREVIOUS_BAL_AMT, lines[-1].ACTUAL_BAL
+            else:
+                closing = Decimal(str(account.balance or ZERO)) - Decimal(str(after.get(account.internal_key, ZERO)))
+                opening = closing
+            yield account, opening, closing, lines
+
+    def _write_csv(self, f, since, last_day, statement):
+        account, opening, closing, lines = statement
+        head = (account.account_no, account.client_no, account.currency)
+        out = [head + (since.date().isoformat(), '', 'OPENING', '', '', '', '', _money(opening))]
+        for line in lines:
+            debit = line.CR_DR_IND != 'C'
+            out.append(head + (
+                line.TRAN_DATE.isoformat(sep=' ') if line.TRAN_DATE else '', line.SEQ_NO, line.TRAN_TYPE,
+                line.REFERENCE or '', line.NARRATIVE or '',
+                _money(line.TRAN_AMT) if debit else '', '' if debit else _money(line.TRAN_AMT),
+                _money(line.ACTUAL_BAL)
+            ))
+        out.append(head + (last_day.isoformat(), '', 'CLOSING', '', '', '', '', _money(closing)))
+        f.writerows(out)
+
+    def _write_text(self, f, since, last_day, statement):
+        account, opening, closing, lines = statement
+        out = [
+            f"Statement {since.date().isoformat()} to {last_day.isoformat()}",
+            f"Account {account.account_no}  Client {account.client_no}  {account.currency}  {account.name or ''}",
+            f"{'Date':<19}  {'Reference':<30}  {'Debit':>15}  {'Credit':>15}  {'Balance':>17}",
+            f"{'':<19}  {'Opening balance':<30}  {'':>15}  {'':>15}  {_money(opening):>17}"
+        ]
+        for line in lines:
+            debit = line.CR_DR_IND != 'C'
+            out.append(
+                f"{line.TRAN_DATE.isoformat(sep=' ') if line.TRAN_DATE else '':<19}  "
+                f"{(line.REFERENCE or line.SEQ_NO)[:30]:<30}  "
+                f"{_money(line.TRAN_AMT) if debit else '':>15}  {'' if debit else _money(line.TRAN_AMT):>15}  "
+                f"{_money(line.ACTUAL_BAL):>17}"
+            )
+        out.append(f"{'':<19}  {'Closing balance':<30}  {'':>15}  {'':>15}  {_money(closing):>17}")
+        f.write('\n'.join(out) + '\n\n')
+
+    def generate_partition(self, since, until, partition):
+        """Write the statements of one key range, returning its counts"""
+        started = time.perf_counter()
+        last_day = (until - timedelta(days=1)).date()
+        paths = {fmt: self._part_path(since, until, partition.index, _EXTENSIONS[fmt]) for fmt in self.formats}
+        files = {fmt: open(f'{path}.tmp', 'w', encoding='utf-8', newline='', buffering=self.buffer_bytes)
+                 for fmt, path in paths.items()}
+        accounts = transactions = 0
+        try:
+            writers = {}
+            if 'csv' in files:
+                writers['csv'] = csv.writer(files['csv'])
+                writers['csv'].writerow(CSV_HEADER)
+            with self.session_factory() as session:
+                for statement in self._statements(*self._read(session, since, until, partition)):
+                    if 'csv' in writers:
+                        self._write_csv(writers['csv'], since, last_day, statement)
+                    if 'text' in files:
+                        self._write_text(files['text'], since, last_day, statement)
+                    accounts += 1
+                    transactions += len(statement[3])
+        finally:
+            for f in files.values():
+                f.close()
+
+        written = 0
+        for path in paths.values():
+            os.replace(f'{path}.tmp', path)
+            written += os.path.getsize(path)
+        result = PartitionResult(partition.index, accounts, transactions, written,
+                                 round(time.perf_counter() - started, 3))
+        with open(self._part_path(since, until, partition.index, 'done'), 'w') as f:
+            json.dump(result._asdict(), f)
+
+        logger.info(f"Statements {self.name} part {partition.index}: {accounts} accounts, "
+                    f"{transactions} transactions in {result.seconds}s")
+        return result
+
+    def run(self, since, until):
+        """Generate every partition not written yet and report throughput"""
+        started = time.perf_counter()
+        partitions = self.plan(since, until)
+        done = self.completed(since, until)
+        pending = [partition for partition in partitions if partition.index not in done]
+
+        if self.workers > 1 and len(pending) > 1:
+            executor = ProcessPoolExecutor(
+                max_workers=min(self.workers, len(pending)), mp_context=multiprocessing.get_context('fork'),
+                initializer=_init_worker, initargs=(self,)
+            )
+            with executor:
+                futures = [executor.submit(_generate, since, until, partition) for partition in pending]
+                results = [future.result() for future in futures]
+        else:
+            results = [self.generate_partition(since, until, partition) for partition in pending]
+
+        seconds = time.perf_counter() - started
+        accounts = sum(r.accounts for r in results)
+        transactions = sum(r.transactions for r in results)
+        written = sum(r.bytes for r in results)
+        return {
+            'database': self.name,
+            'directory': self.directory(since, until),
+            'partitions': len(partitions),
+            'skipped': len(partitions) - len(pending),
+            'accounts': accounts,
+            'transactions': transactions,
+            'bytes': written,
+            'seconds': round(seconds, 3),
+            'accounts_per_second': round(accounts / seconds, 1) if seconds else None,
+            'transactions_per_second': round(transactions / seconds, 1) if seconds else None,
+            'mb_per_second': round(written / seconds / 1024 / 1024, 2) if seconds else None
+        }
+
+
+def statement_period(first_day, last_day):
+    """UTC [since, until) of the days first_day..last_day"""
+    since = datetime.combine(first_day, datetime.min.time())
+    return since, datetime.combine(last_day, datetime.min.time()) + timedelta(days=1)
@@ -0,0 +1,298 @@
+"""
+Columnar analytics export and vectorized turnover reports
+
+Turnover, branch volume and client aggregates used to be ad-hoc GROUP BY
+queries on the production rb_tran_hist. ColumnarExporter instead streams
+each closed UTC day of history once, from the replica when there is one,
+into a directory of NumPy arrays:
+
+    <ANALYTICS_DIR>/<database>/days/<YYYY-MM-DD>/<column>.npy
+
+One array per column: ``account``, ``client``, ``branch`` and ``tran_type``
+are int32 codes into append-only dictionaries (dictionaries/<column>.txt,
+one value per line, code = line number, so codes written on earlier days
+stay valid); ``cents`` is the int64 amount in cents, ``sign`` is +1 for
+credits and -1 for debits, ``second`` is the int32 second of the day and
+``failed`` marks TRAN_STATUS = 'F'. A day is written to a temporary
+directory and renamed into place, so readers never see half a day.
+
+The reports memory-map those arrays and aggregate with vectorized NumPy
+operations: integer-cent sums per code with np.add.at, so totals are exact,
+accumulated day by day into arrays indexed by dictionary code. Analytics
+therefore never queries the OLTP databases, and a month of history is a few
+array scans instead of a GROUP BY over a table under transfer load. Failed
+rows are excluded from every report.
+
+NumPy is only needed by this module and the tool that drives it
+(python -m app.tools.analytics); the API does not import it.
+"""
+
+import json
+import logging
+import os
+import shutil
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from app.database import statements
+
+logger = logging.getLogger(__name__)
+
+ONE_DAY = timedelta(days=1)
+
+# Columns stored as codes into per-database dictionaries
+DICTIONARY_COLUMNS = ('account', 'client', 'branch', 'tran_type')
+
+COLUMN_TYPES = {
+    'account': 'int32', 'client': 'int32', 'branch': 'int32', 'tran_type': 'int32',
+    'cents': 'int64', 'sign': 'int8', 'second': 'int32', 'failed': 'bool'
+}
+
+DayColumns = namedtuple('DayColumns', list(COLUMN_TYPES))
+
+_CENT = Decimal('0.01')
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("Columnar analytics needs NumPy (pip install numpy)")
+
+
+def _amount(cents):
+    return (Decimal(int(cents)) * _CENT).quantize(_CENT)
+
+
+class ColumnarStore:
+    """Exported history columns and dictionaries of one database"""
+
+    def __init__(self, root, name):
+        _require_numpy()
+        self.name = name
+        self.directory = os.path.join(root, name)
+        self._dictionaries = {}
+
+    def day_path(self, day):
+        return os.path.join(self.directory, 'days', day.isoformat())
+
+    def days(self, start=None, end=None):
+        """Exported days in [start, end], oldest first"""
+        try:
+            names = os.listdir(os.path.join(self.directory, 'days'))
+        except FileNotFoundError:
+            return []
+        days = sorted(date.fromisoformat(n) for n in names if not n.startswith('.'))
+        return [d for d in days if (start is None or d >= start) and (end is None or d <= end)]
+
+    def dictionary(self, column):
+        """Values of a dictionary-encoded column, indexed by code"""
+        path = os.path.join(self.directory, 'dictionaries', f'{column}.txt')
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return []
+        cached = self._dictionaries.get(column)
+        if cached is None or cached[0] != mtime:
+            with open(path, encoding='utf-8') as f:
+                cached = (mtime, f.read().splitlines())
+            self._dictionaries[column] = cached
+        return cached[1]
+
+    def save_dictionary(self, column, values):
+        """Replace a dictionary file atomically"""
+        directory = os.path.join(self.directory, 'dictionaries')
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{column}.txt')
+        with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+            f.write(''.join(f'{value}\n' for value in values))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(f'{path}.tmp', path)
+
+    def load(self, day):
+        """Memory-map the columns of one exported day"""
+        path = self.day_path(day)
+        return DayColumns(*(np.load(os.path.join(path, f'{column}.npy'), mmap_mode='r') for column in COLUMN_TYPES))
+
+    def write(self, day, columns, rows):
+        """Write the columns of one day, replacing any earlier export of it"""
+        final = self.day_path(day)
+        temporary = os.path.join(self.directory, 'days', f'.{day.isoformat()}.tmp')
+        shutil.rmtree(temporary, ignore_errors=True)
+        os.makedirs(temporary)
+        for column, dtype in COLUMN_TYPES.items():
+            np.save(os.path.join(temporary, f'{column}.npy'), np.asarray(columns[column], dtype=dtype))
+        with open(os.path.join(temporary, 'meta.json'), 'w') as f:
+            json.dump({'day': day.isoformat(), 'rows': rows, 'exported_at': datetime.utcnow().isoformat()}, f)
+
+        if os.path.exists(final):
+            shutil.rmtree(final)
+        os.replace(temporary, final)
+
+
+class ColumnarExporter:
+    """Streams closed days of rb_tran_hist of one database into a ColumnarStore"""
+
+    def __init__(self, store, session_factory, chunk_rows=50000, max_backfill_days=7):
+        self.store = store
+        self.session_factory = session_factory
+        self.chunk_rows = chunk_rows
+        self.max_backfill_days = max_backfill_days
+
+    def export_day(self, day):
+        """Export one UTC day, returning its row count"""
+        since = datetime.combine(day, datetime.min.time())
+        dictionaries = {column: list(self.store.dictionary(column)) for column in DICTIONARY_COLUMNS}
+        codes = {column: {value: code for code, value in enumerate(values)}
+                 for column, values in dictionaries.items()}
+
+        def encode(column, value):
+            value = '' if value is None else str(value)
+            code = codes[column].get(value)
+            if code is None:
+                code = codes[column][value] = len(dictionaries[column])
+                dictionaries[column].append(value)
+            return code
+
+        chunks = {column: [] for column in COLUMN_TYPES}
+        rows = 0
+        with self.session_factory() as session:
+            result = session.execute(
+                statements.ANALYTICS_HISTORY_DAY, {'since': since, 'until': since + ONE_DAY},
+                execution_options={'stream_results': True, 'yield_per': self.chunk_rows}
+            )
+            for partition in result.partitions(self.chunk_rows):
+                account_nos, client_nos, branches, tran_types, indicators, amounts, tran_dates, status = zip(*partition)
+                chunks['account'].append(np.fromiter((encode('account', v) for v in account_nos), 'int32'))
+                chunks['client'].append(np.fromiter((encode('client', v) for v in client_nos), 'int32'))
+                chunks['branch'].append(np.fromiter((encode('branch', v) for v in branches), 'int32'))
+                chunks['tran_type'].append(np.fromiter((encode('tran_type', v) for v in tran_types), 'int32'))
+                chunks['cents'].append(np.fromiter((int(Decimal(str(a or 0)).scaleb(2)) for a in amounts), 'int64'))
+                chunks['sign'].append(np.fromiter((1 if i == 'C' else -1 for i in indicators), 'int8'))
+                chunks['second'].append(np.fromiter(
+                    ((t - since).seconds if t is not None else 0 for t in tran_dates), 'int32'
+                ))
+                chunks['failed'].append(np.fromiter((s == 'F' for s in status), 'bool'))
+                rows += len(partition)
+
+        # Dictionaries first: a day never refers to a code its dictionary lacks
+        for column in DICTIONARY_COLUMNS:
+            if len(dictionaries[column]) != len(self.store.dictionary(column)):
+                self.store.save_dictionary(column, dictionaries[column])
+        self.store.write(day, {
+            column: np.concatenate(parts) if parts else np.empty(0, COLUMN_TYPES[column])
+            for column, parts in chunks.items()
+        }, rows)
+
+        logger.info(f"Exported {rows} history rows of {day} from {self.store.name}")
+        return rows
+
+    def run_due(self, now=None):
+        """Export every closed day not exported yet, within the backfill window"""
+        last_closed = (now or datetime.utcnow()).date() - ONE_DAY
+        exported = set(self.store.days())
+        day = last_closed - timedelta(days=self.max_backfill_days - 1)
+        built = []
+        while day <= last_closed:
+            if day not in exported:
+                self.export_day(day)
+                built.append(day)
+            day += ONE_DAY
+        return built
+
+
+def _group_sum(codes, values, size):
+    """Exact per-code sums of integer values"""
+    totals = np.zeros(size, dtype='int64')
+    np.add.at(totals, codes, values)
+    return totals
+
+
+def _accumulate(store, start, end, column):
+    """Credit, debit and count totals per code of a column over a date range"""
+    size = len(store.dictionary(column))
+    credits, debits, counts = (np.zeros(size, dtype='int64') for _ in range(3))
+
+    for day in store.days(start, end):
+        columns = store.load(day)
+        valid = ~np.asarray(columns.failed)
+        codes = np.asarray(getattr(columns, column))[valid]
+        cents = np.asarray(columns.cents)[valid]
+        credit = np.asarray(columns.sign)[valid] > 0
+
+        # A day exported after the dictionary was read may use newer codes
+        if codes.size and codes.max() >= size:
+            grow = int(codes.max()) + 1 - size
+            credits, debits, counts = (np.pad(totals, (0, grow)) for totals in (credits, debits, counts))
+            size += grow
+
+        credits += _group_sum(codes[credit], cents[credit], size)
+        debits += _group_sum(codes[~credit], cents[~credit], size)
+        counts += np.bincount(codes, minlength=size)
+    return credits, debits, counts
+
+
+def daily_turnover(store, start, end):
+    """Credit and debit totals and transaction counts per day"""
+    report = []
+    for day in store.days(start, end):
+        columns = store.load(day)
+        valid = ~np.asarray(columns.failed)
+        cents = np.asarray(columns.cents)[valid]
+        credit = np.asarray(columns.sign)[valid] > 0
+        credits, debits = int(cents[credit].sum()), int(cents[~credit].sum())
+        report.append({
+            'date': day.isoformat(),
+            'credits': _amount(credits),
+            'debits': _amount(debits),
+            'turnover': _amount(credits + debits),
+            'transactions': int(valid.sum())
+        })
+    return report
+
+
+def hourly_turnover(store, day):
+    """Turnover and transaction counts per UTC hour of one day"""
+    columns = store.load(day)
+    valid = ~np.asarray(columns.failed)
+    hours = np.asarray(columns.second)[valid] // 3600
+    turnover = _group_sum(hours, np.asarray(columns.cents)[valid], 24)
+    counts = np.bincount(hours, minlength=24)
+    return [
+        {'hour': hour, 'turnover': _amount(turnover[hour]), 'transactions': int(counts[hour])}
+        for hour in range(24)
+    ]
+
+
+def _ranked(store, column, credits, debits, counts, top, label):
+    values = store.dictionary(column)
+    turnover = credits + debits
+    active = np.flatnonzero(counts)
+    order = active[np.argsort(-turnover[active], kind='stable')]
+    if top:
+        order = order[:top]
+    return [
+        {
+            label: values[code] if code < len(values) else None,
+            'credits': _amount(credits[code]),
+            'debits': _amount(debits[code]),
+            'turnover': _amount(turnover[code]),
+            'transactions': int(counts[code])
+        }
+        for code in order
+    ]
+
+
+def branch_volume(store, start, end, top=None):
+    """Turnover per account branch, largest first"""
+    return _ranked(store, 'branch', *_accumulate(store, start, end, 'branch'), top, 'branch')
+
+
+def client_aggregates(store, start, end, top=20):
+    """Turnover per client, largest first"""
+    return _ranked(store, 'client', *_accumulate(store, start, end, 'client'), top, 'client_no')
@@ -0,0 +1,367 @@
+"""
+Tiered archival of rb_tran_hist and transfer_log to compressed segment files
+
+Neither table is partitioned, so every row ever written stays in its indexes
+and years of history crowd the recent rows out of the buffer pool. Rows
+older than a retention window move to segment files: one immutable file per
+database, table and UTC day, under
+
+    <ARCHIVE_DIR>/<database>/<table>/<YYYY-MM-DD>.<part>.seg
+
+A segment holds the day's rows sorted by account number in zlib-compressed
+blocks of block_rows rows, followed by a JSON footer with a sparse index: the
+first and last account number, offset and size of every block. Finding an
+account's rows reads the footer once (footers are cached; files never
+change) and decompresses only the blocks whose key range covers it. The
+account is BASE_ACCT_NO for rb_tran_hist; for transfer_log it is the account
+the database holds, from_account in the source and to_account in the
+destination, matching the outgoing and incoming history queries.
+
+Archiver.archive_day streams a day in segment order into a temporary file,
+fsyncs it and renames it into place, then deletes the archived rows from
+MySQL by primary key in small batches, committing and pausing after each so
+replication and concurrent transfers keep up. A run cut short is safe to
+repeat: rows already in a segment of the day are skipped, rows that arrived
+later go to a new part, and the delete covers both. Archival runs from a
+scheduler (python -m app.tools.archive) on one host; the API workers only
+read. ARCHIVE_DIR must be shared between that host and the API servers.
+
+History reads page through MySQL first and continue newest-first through the
+segments when a page runs past the rows still in the table. Point-in-time
+balances cannot replay archived history, so keep ARCHIVE_RETENTION_DAYS at
+least BALANCE_SNAPSHOT_RETENTION_DAYS.
+"""
+
+import bisect
+import json
+import logging
+import os
+import struct
+import time
+import zlib
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from functools import lru_cache
+
+from app.database import statements
+from app.models.read_models import TransactionHistoryRecord, TransferLogRecord
+
+logger = logging.getLogger(__name__)
+
+# Global segment archive registry keyed by database name ('source', 'dest')
+segment_archives = {}
+
+SEGMENT_SUFFIX = '.seg'
+
+SEGMENT_MAGIC = b'BANKSEG1'
+
+# Last bytes of a segment: footer offset, footer length, magic
+_TRAILER = struct.Struct('>QI8s')
+
+ONE_DAY = timedelta(days=1)
+
+ArchivedTable = namedtuple('ArchivedTable', [
+    'name', 'record', 'date_field', 'pk_field', 'key_fields', 'decimal_fields', 'datetime_fields'
+])
+
+ARCHIVED_TABLES = {
+    'rb_tran_hist': ArchivedTable(
+        'rb_tran_hist', TransactionHistoryRecord, 'TRAN_DATE', 'SEQ_NO',
+        {'source': 'BASE_ACCT_NO', 'dest': 'BASE_ACCT_NO'},
+        ('TRAN_AMT', 'PREVIOUS_BAL_AMT', 'ACTUAL_BAL'), ('TRAN_DATE', 'TRAN_TIMESTAMP')
+    ),
+    'transfer_log': ArchivedTable(
+        'transfer_log', TransferLogRecord, 'created_at', 'id',
+        {'source': 'from_account', 'dest': 'to_account'},
+        ('amount',), ('created_at', 'updated_at')
+    )
+}
+
+# Key field -> its position in the record; the key fields of both tables are distinct
+_KEY_INDEXES = {
+    key_field: table.record._fields.index(key_field)
+    for table in ARCHIVED_TABLES.values() for key_field in table.key_fields.values()
+}
+
+SegmentIndex = namedtuple('SegmentIndex', ['key_field', 'rows', 'first_keys', 'last_keys', 'blocks'])
+
+
+def _encode(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot archive {type(value).__name__} values")
+
+
+def _decoder(table):
+    """Turn a stored row back into a record of the table"""
+    fields = table.record._fields
+    decimals = [fields.index(field) for field in table.decimal_fields]
+    datetimes = [fields.index(field) for field in table.datetime_fields]
+
+    def decode(row):
+        for i in decimals:
+            if row[i] is not None:
+                row[i] = Decimal(row[i])
+        for i in datetimes:
+            if row[i] is not None:
+                row[i] = datetime.fromisoformat(row[i])
+        return table.record._make(row)
+    return decode
+
+
+def write_segment(path, table, day, key_field, records, block_rows=256):
+    """Write records sorted by key_field to a new segment, returning its row count"""
+    key_index = table.record._fields.index(key_field)
+    temporary = f"{path}.tmp"
+    blocks, rows = [], 0
+
+    with open(temporary, 'wb') as f:
+        f.write(SEGMENT_MAGIC)
+
+        def flush(block):
+            data = zlib.compress(json.dumps(block, default=_encode, separators=(',', ':')).encode('utf-8'))
+            blocks.append([block[0][key_index], block[-1][key_index], f.tell(), len(data), len(block)])
+            f.write(data)
+
+        block = []
+        for record in records:
+            block.append(list(record))
+            if len(block) >= block_rows:
+                flush(block)
+                rows += len(block)
+                block = []
+        if block:
+            flush(block)
+            rows += len(block)
+
+        footer = json.dumps({
+            'table': table.name, 'day': day.isoformat(), 'key_field': key_field,
+            'fields': list(table.record._fields), 'rows': rows, 'blocks': blocks
+        }).encode('utf-8')
+        offset = f.tell()
+        f.write(footer)
+        f.write(_TRAILER.pack(offset, len(footer), SEGMENT_MAGIC))
+        f.flush()
+        os.fsync(f.fileno())
+
+    if not rows:
+        os.remove(temporary)
+        return 0
+    os.replace(temporary, path)
+    return rows
+
+
+@lru_cache(maxsize=1024)
+def read_segment_index(path):
+    """Read the sparse index of a segment (cached: segments never change)"""
+    with open(path, 'rb') as f:
+        f.seek(-_TRAILER.size, os.SEEK_END)
+        offset, length, magic = _TRAILER.unpack(f.read(_TRAILER.size))
+        if magic != SEGMENT_MAGIC:
+            raise ValueError(f"Not a segment file: {path}")
+        f.seek(offset)
+        footer = json.loads(f.read(length))
+
+    blocks = footer['blocks']
+    return SegmentIndex(
+        footer['key_field'], footer['rows'],
+        [block[0] for block in blocks], [block[1] for block in blocks],
+        [(block[2], block[3]) for block in blocks]
+    )
+
+
+def read_segment_blocks(path, positions):
+    """Decompress the blocks at the given (offset, length) positions, returning their rows"""
+    rows = []
+    with open(path, 'rb') as f:
+        for offset, length in positions:
+            f.seek(offset)
+            rows.extend(json.loads(zlib.decompress(f.read(length))))
+    return rows
+
+
+class SegmentArchive:
+    """Segment files of one database"""
+
+    def __init__(self, name, root, block_rows=256):
+        self.name = name
+        self.root = root
+        self.block_rows = block_rows
+        # table -> (directory mtime, {day: [paths by part]})
+        self._listings = {}
+
+    def directory(self, table):
+        return os.path.join(self.root, self.name, table)
+
+    def segments(self, table):
+        """Segment paths of a table grouped by day, {day: [paths]}"""
+        directory = self.directory(table)
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+
+        cached = self._listings.get(table)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        parts = {}
+        for entry in os.scandir(directory):
+            if entry.name.endswith(SEGMENT_SUFFIX):
+                day, part, _ = entry.name.split('.')
+                parts.setdefault(date.fromisoformat(day), []).append((int(part), entry.path))
+        days = {day: [path for _, path in sorted(entries)] for day, entries in parts.items()}
+        self._listings[table] = (mtime, days)
+        return days
+
+    def write(self, table, day, records):
+        """Write one more segment part for a day, returning its row count"""
+        spec = ARCHIVED_TABLES[table]
+        directory = self.directory(table)
+        os.makedirs(directory, exist_ok=True)
+        part = len(self.segments(table).get(day, []))
+        path = os.path.join(directory, f"{day.isoformat()}.{part}{SEGMENT_SUFFIX}")
+        return write_segment(path, spec, day, spec.key_fields[self.name], records, self.block_rows)
+
+    def primary_keys(self, table, day):
+        """Primary keys of every row archived for a day"""
+        pk_index = ARCHIVED_TABLES[table].record._fields.index(ARCHIVED_TABLES[table].pk_field)
+        keys = set()
+        for path in self.segments(table).get(day, []):
+            index = read_segment_index(path)
+            keys.update(row[pk_index] for row in read_segment_blocks(path, index.blocks))
+        return keys
+
+    def _account_rows(self, path, account_no):
+        index = read_segment_index(path)
+        if not index.blocks or not index.first_keys[0] <= account_no <= index.last_keys[-1]:
+            return []
+
+        # Blocks are in key order; an account may span several consecutive ones
+        first = bisect.bisect_left(index.last_keys, account_no)
+        last = bisect.bisect_right(index.first_keys, account_no)
+        if first >= last:
+            return []
+        key_index = _KEY_INDEXES[index.key_field]
+        return [row for row in read_segment_blocks(path, index.blocks[first:last]) if row[key_index] == account_no]
+
+    def read(self, table, account_no, limit, offset=0):
+        """Archived records of an account, newest first"""
+        spec = ARCHIVED_TABLES[table]
+        decode = _decoder(spec)
+        date_index = spec.record._fields.index(spec.date_field)
+
+        records = []
+        segments = self.segments(table)
+        for day in sorted(segments, reverse=True):
+            rows = []
+            for path in segments[day]:
+                rows.extend(self._account_rows(path, account_no))
+            if not rows:
+                continue
+            if offset >= len(rows):
+                offset -= len(rows)
+                continue
+
+            rows.sort(key=lambda row: row[date_index] or '', reverse=True)
+            records.extend(decode(row) for row in rows[offset:offset + limit - len(records)])
+            offset = 0
+            if len(records) >= limit:
+                break
+        return records
+
+
+
+class Archiver:
+    """Moves rows past the retention window of one database into its segment archive"""
+
+    def __init__(self, name, session_factory, archive, retention_days=400,
+                 delete_batch_size=1000, delete_pause=0.1, max_days=7):
+        self.name = name
+        self.session_factory = session_factory
+        self.archive = archive
+        self.retention_days = retention_days
+        self.delete_batch_size = delete_batch_size
+        self.delete_pause = delete_pause
+        self.max_days = max_days
+
+    def oldest_day(self, table):
+        """UTC day of the oldest row still in a table, or None if it is empty"""
+        with self.session_factory() as session:
+            oldest = session.execute(statements.ARCHIVE_OLDEST_DATE[table]).scalar()
+        return oldest.date() if oldest is not None else None
+
+    def archive_day(self, table, day):
+        """Archive and delete one day of a table, returning (rows written, rows deleted)"""
+        spec = ARCHIVED_TABLES[table]
+        pk_index = spec.record._fields.index(spec.pk_field)
+        since = datetime.combine(day, datetime.min.time())
+        bounds = {'since': since, 'until': since + ONE_DAY}
+        archived = self.archive.primary_keys(table, day)
+
+        with self.session_factory() as session:
+            # Streamed: a day of rows never sits in memory at once
+            result = session.execute(
+                statements.ARCHIVE_DAY_ROWS[table][spec.key_fields[self.name]], bounds,
+                execution_options={'stream_results': True, 'yield_per': 1000}
+            )
+            new_keys = []
+
+            def records():
+                for row in result:
+                    if row[pk_index] not in archived:
+                        new_keys.append(row[pk_index])
+                        yield row
+
+            written = self.archive.write(table, day, records())
+
+        keys = sorted(archived.union(new_keys))
+        deleted = 0
+        for start in range(0, len(keys), self.delete_batch_size):
+            with self.session_factory() as session:
+                deleted += session.execute(
+                    statements.ARCHIVE_DELETE[table],
+                    dict(bounds, keys=keys[start:start + self.delete_batch_size])
+                ).rowcount
+                session.commit()
+            if self.delete_pause:
+                time.sleep(self.delete_pause)
+
+        logger.info(f"Archived {written} {table} rows of {day} on {self.name}, deleted {deleted}")
+        return written, deleted
+
+    def run_due(self, now=None, tables=tuple(ARCHIVED_TABLES)):
+        """Archive the oldest days past retention, up to max_days per table; returns {table: [days]}"""
+        cutoff = (now or datetime.utcnow()).date() - timedelta(days=self.retention_days)
+        archived = {}
+        for table in tables:
+            days = archived[table] = []
+            while len(days) < self.max_days:
+                day = self.oldest_day(table)
+                if day is None or day >= cutoff:
+                    break
+                self.archive_day(table, day)
+                days.append(day)
+        return archived
+
+
+def init_archives(app):
+    """Open the segment archive of each database for history reads"""
+    if not app.config.get('ARCHIVE_ENABLED', False):
+        logger.info("Segment archive reads disabled by configuration")
+        return {}
+
+    segment_archives.clear()
+    for name in ('source', 'dest'):
+        segment_archives[name] = SegmentArchive(
+            name, app.config.get('ARCHIVE_DIR'), block_rows=int(app.config.get('ARCHIVE_BLOCK_ROWS', 256))
+        )
+    return segment_archives
+
+
+def get_segment_archive(name):
+    """Get the segment archive of a database, or None if archive reads are disabled"""
+    return segment_archives.get(name)
@@ -0,0 +1,286 @@
+"""
+Point-in-time balances from end-of-day balance snapshots
+
+"Balance of account X at time T" used to mean walking rb_tran_hist backwards
+from the current rb_acct_balance, reading every row since T; for an active
+account that is most of its history. rb_acct_balance_snapshot keeps one
+compact row per account and UTC day: the balance after every history row
+dated before the following midnight. A point-in-time query starts from the
+nearest snapshot and replays only the rows between its cutoff and T,
+forward from an earlier snapshot or backward from a later one, so its cost
+is bounded by about a day of the account's activity. An account without any
+snapshot falls back to replaying backwards from its current balance.
+
+The balance at T covers every history row dated before T. Credits add
+TRAN_AMT, debits subtract it, and rows with TRAN_STATUS = 'F' are skipped.
+
+Snapshots are written by a streaming job. It walks accounts in INTERNAL_KEY
+order, batch_size at a time, and for each batch reads the previous day's
+snapshots and the day's history summed per account, so memory stays bounded
+by the batch. An account without a previous snapshot (the first run, a gap,
+a new account) is seeded from its current balance less the history since the
+cutoff, read in the same transaction. Each batch replaces its rows and
+commits, so rebuilding a day is idempotent. The background thread builds
+every closed day once a settle delay has passed after midnight, so in-flight
+transfers are dated, and prunes snapshots past retention. The job writes to
+the primaries and every gunicorn worker would run its own copy, so it is off
+by default: run it from cron with ``python -m app.tools.balance_snapshots``
+or enable the thread on one single-worker instance.
+"""
+
+import logging
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from app.database import statements
+from app.models.account import AccountBalanceSnapshot
+
+logger = logging.getLogger(__name__)
+
+# Global snapshot job registry keyed by database name ('source', 'dest')
+balance_snapshot_jobs = {}
+
+ONE_DAY = timedelta(days=1)
+
+NO_DELTA = (Decimal('0.00'), 0)
+
+BalancePoint = namedtuple('BalancePoint', ['balance', 'snapshot_date', 'direction', 'replayed'])
+
+snapshot_cutoff = AccountBalanceSnapshot.cutoff
+
+
+def history_deltas(session, statement, internal_keys, **params):
+    """Sum history per account, returning {INTERNAL_KEY: (net amount, row count)}"""
+    if not internal_keys:
+        return {}
+    rows = session.execute(statement, dict(params, internal_keys=list(internal_keys)))
+    return {internal_key: (Decimal(str(amount)), count) for internal_key, amount, count in rows}
+
+
+def balance_at(session, internal_key, at, current_balance):
+    """Get an account's balance at an instant, replaying history from the nearest snapshot"""
+    # Snapshot D is valid at midnight after D, so D <= at.date() - 1 precedes at
+    before = session.execute(
+        statements.SNAPSHOT_ON_OR_BEFORE,
+        {'internal_key': internal_key, 'snapshot_date': at.date() - ONE_DAY}
+    ).first()
+
+    # A later snapshot is only worth a look when the earlier one is more than a day away
+    after = None
+    if before is None or at - snapshot_cutoff(before.SNAPSHOT_DATE) > ONE_DAY:
+        after = session.execute(
+            statements.SNAPSHOT_ON_OR_AFTER,
+            {'internal_key': internal_key, 'snapshot_date': at.date()}
+        ).first()
+
+    if after is not None and (
+            before is None or snapshot_cutoff(after.SNAPSHOT_DATE) - at < at - snapshot_cutoff(before.SNAPSHOT_DATE)):
+        delta, count = history_deltas(
+            session, statements.HISTORY_DELTAS_BETWEEN, [internal_key],
+            since=at, until=snapshot_cutoff(after.SNAPSHOT_DATE)
+        ).get(internal_key, NO_DELTA)
+        return BalancePoint(Decimal(str(after.BALANCE)) - delta, after.SNAPSHOT_DATE, 'backward', count)
+
+    if before is not None:
+        delta, count = history_deltas(
+            session, statements.HISTORY_DELTAS_BETWEEN, [internal_key],
+            since=snapshot_cutoff(before.SNAPSHOT_DATE), until=at
+        ).get(internal_key, NO_DELTA)
+        return BalancePoint(Decimal(str(before.BALANCE)) + delta, before.SNAPSHOT_DATE, 'forward', count)
+
+    delta, count = history_deltas(
+        session, statements.HISTORY_DELTAS_SINCE, [internal_key], since=at
+    ).get(internal_key, NO_DELTA)
+    return BalancePoint(Decimal(str(current_balance)) - delta, None, 'backward', count)
+
+
+class BalanceSnapshotJob:
+    """Builds end-of-day balance snapshots for one database"""
+
+    def __init__(self, name, session_factory, batch_size=500, check_interval=300,
+                 settle_seconds=300, retention_days=400, max_backfill_days=7):
+        self.name = name
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.check_interval = check_interval
+        self.settle_seconds = settle_seconds
+        self.retention_days = retention_days
+        self.max_backfill_days = max_backfill_days
+
+        self._completed_through = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self.builds = 0
+        self.last_build = None
+
+    def _snapshot_rows(self, session, snapshot_date, accounts):
+        """Compute one batch of snapshot rows from the previous day and the day's history"""
+        cutoff = snapshot_cutoff(snapshot_date)
+        keys = [account[0] for account in accounts]
+
+        previous = dict(session.execute(
+            statements.SNAPSHOT_BALANCES_ON_DATE,
+            {'snapshot_date': snapshot_date - ONE_DAY, 'internal_keys': keys}
+        ).all())
+        day = history_deltas(
+            session, statements.HISTORY_DELTAS_BETWEEN, keys, since=cutoff - ONE_DAY, until=cutoff
+        )
+        # Accounts without yesterday's snapshot start from the current balance
+        later = history_deltas(
+            session, statements.HISTORY_DELTAS_SINCE,
+            [key for key in keys if key not in previous], since=cutoff
+        )
+
+        rows = []
+        for internal_key, client_no, account_no, current_balance in accounts:
+            delta, count = day.get(internal_key, NO_DELTA)
+            if internal_key in previous:
+                balance = Decimal(str(previous[internal_key])) + delta
+            else:
+                balance = Decimal(str(current_balance)) - later.get(internal_key, NO_DELTA)[0]
+            rows.append({
+                'INTERNAL_KEY': internal_key,
+                'SNAPSHOT_DATE': snapshot_date,
+                'CLIENT_NO': client_no,
+                'BASE_ACCT_NO': account_no,
+                'BALANCE': balance,
+                'TRAN_COUNT': count,
+                'TRAN_TIMESTAMP': datetime.utcnow()
+            })
+        return rows
+
+    def build(self, snapshot_date):
+        """Build or rebuild the snapshots of one day, returning the number of accounts"""
+        started = time.monotonic()
+        after_key, total = 0, 0
+
+        while True:
+            with self.session_factory() as session:
+                accounts = session.execute(
+                    statements.SNAPSHOT_ACCOUNTS_AFTER, {'after_key': after_key, 'limit': self.batch_size}
+                ).all()
+                if not accounts:
+                    break
+
+                rows = self._snapshot_rows(session, snapshot_date, accounts)
+                session.execute(
+                    statements.DELETE_BALANCE_SNAPSHOTS,
+                    {'snapshot_date': snapshot_date, 'internal_keys': [row['INTERNAL_KEY'] for row in rows]}
+                )
+                session.execute(statements.INSERT_BALANCE_SNAPSHOTS, rows)
+                session.commit()
+
+            after_key = accounts[-1][0]
+            total += len(accounts)
+            if len(accounts) < self.batch_size:
+                break
+
+        elapsed = time.monotonic() - started
+        self.builds += 1
+        self.last_build = {'date': snapshot_date.isoformat(), 'accounts': total, 'seconds': round(elapsed, 3)}
+        logger.info(f"Built {total} balance snapshots for {snapshot_date} on {self.name} in {elapsed:.1f}s")
+        return total
+
+    def run_due(self, now=None):
+        """Build every closed day not built yet, returning the dates built"""
+        now = now or datetime.utcnow()
+        last_closed = (now - timedelta(seconds=self.settle_seconds)).date() - ONE_DAY
+
+        if self._completed_through is None:
+            with self.session_factory() as session:
+                latest = session.execute(statements.LATEST_SNAPSHOT_DATE).scalar()
+            # The latest stored day may have been cut short by a restart; rebuild it
+            start = latest if latest is not None else last_closed
+        else:
+            start = self._completed_through + ONE_DAY
+        start = max(start, last_closed - timedelta(days=self.max_backfill_days - 1))
+
+        built = []
+        day = start
+        while day <= last_closed:
+            self.build(day)
+            self._completed_through = day
+            built.append(day)
+            day += ONE_DAY
+
+        if built and self.retention_days:
+            with self.session_factory() as session:
+                pruned = session.execute(
+                    statements.DELETE_SNAPSHOTS_BEFORE,
+                    {'before': last_closed - timedelta(days=self.retention_days)}
+                ).rowcount
+                session.commit()
+            if pruned:
+                logger.info(f"Pruned {pruned} balance snapshots past retention on {self.name}")
+
+        return built
+
+    def stats(self):
+        """Get build progress"""
+        return {
+            'name': self.name,
+            'completed_through': self._completed_through.isoformat() if self._completed_through else None,
+            'builds': self.builds,
+            'last_build': self.last_build
+        }
+
+    def start(self):
+        """Start the background build thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name=f"balance-snapshots-{self.name}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background build thread"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.wait(self.check_interval):
+            try:
+                self.run_due()
+            except Exception as e:
+                logger.error(f"Balance snapshot build on {self.name} failed: {str(e)}")
+
+
+def init_balance_snapshots(app):
+    """Create and start the balance snapshot job for each database"""
+    from app.database.connection import get_source_session, get_dest_session
+
+    if not app.config.get('BALANCE_SNAPSHOT_ENABLED', False):
+        logger.info("Balance snapshot job disabled by configuration")
+        return {}
+
+    for job in balance_snapshot_jobs.values():
+        job.stop()
+    balance_snapshot_jobs.clear()
+
+    for name, session_factory in (('source', get_source_session), ('dest', get_dest_session)):
+        job = BalanceSnapshotJob(
+            name,
+            session_factory,
+            batch_size=int(app.config.get('BALANCE_SNAPSHOT_BATCH_SIZE', 500)),
+            check_interval=float(app.config.get('BALANCE_SNAPSHOT_CHECK_INTERVAL', 300)),
+            settle_seconds=float(app.config.get('BALANCE_SNAPSHOT_SETTLE_SECONDS', 300)),
+            retention_days=int(app.config.get('BALANCE_SNAPSHOT_RETENTION_DAYS', 400)),
+            max_backfill_days=int(app.config.get('BALANCE_SNAPSHOT_MAX_BACKFILL_DAYS', 7))
+        )
+        job.start()
+        balance_snapshot_jobs[name] = job
+
+    return balance_snapshot_jobs
+
+
+def get_balance_snapshot_job(name):
+    """Get the balance snapshot job for a database, or None if it is not running"""
+    return balance_snapshot_jobs.get(name)
@@ -0,0 +1,332 @@
+"""
+Precomputed business calendar keyed by branch
+
+The deposit flow used to issue three holiday lookups per transaction: the
+branch (fm_branch_holiday), its region and the whole country (fm_loc_holiday
+with STATE = region code / 'ALL'). The calendar loads those tables once and
+resolves the inheritance up front. Each branch gets one bitmap per year, one
+bit per day, set on business days: weekdays are open, then nationwide,
+regional and branch entries are applied in that order. Each entry either
+closes the day or, with WORKING_HOLIDAY = 'Y', opens it (a make-up working
+day). A per-year ``next_open`` table makes next-business-day an index
+lookup, so neither question costs a query.
+
+Branches that resolve to the same days share one bitmap, so memory grows
+with the number of distinct calendars rather than the number of branches.
+Years without any entries use a weekend-only bitmap. Unknown branches follow
+the national calendar.
+
+A background thread polls row counts and the latest TRAN_TIMESTAMP of the
+three tables and rebuilds the whole calendar when they change. The new
+snapshot replaces the old one with a single assignment, so readers see
+either the old or the new calendar and never a mix.
+"""
+
+import calendar as _calendar
+import logging
+import threading
+import time
+from array import array
+from datetime import date
+from functools import lru_cache
+
+from app.database import statements
+from app.models.calendar import NATIONAL_STATE
+
+logger = logging.getLogger(__name__)
+
+# Global calendar registry keyed by database name ('source', 'dest')
+business_calendars = {}
+
+# next_open value for days with no business day later in the same year
+_NO_OPEN = 0xFFFF
+
+
+class YearCalendar:
+    """Business-day bitmap of one calendar year"""
+
+    __slots__ = ('year', 'first_ordinal', 'days', 'bits', 'next_open')
+
+    def __init__(self, year, overrides=()):
+        first = date(year, 1, 1)
+        self.year = year
+        self.first_ordinal = first.toordinal()
+        self.days = 366 if _calendar.isleap(year) else 365
+
+        first_weekday = first.weekday()
+        bits = 0
+        for offset in range(self.days):
+            if (first_weekday + offset) % 7 < 5:
+                bits |= 1 << offset
+
+        # overrides: (date, is_open) pairs, applied in order so later layers win
+        for day, is_open in overrides:
+            offset = day.toordinal() - self.first_ordinal
+            if is_open:
+                bits |= 1 << offset
+            else:
+                bits &= ~(1 << offset)
+        self.bits = bits
+
+        next_open = array('H', bytes(2 * self.days))
+        upcoming = _NO_OPEN
+        for offset in range(self.days - 1, -1, -1):
+            if bits >> offset & 1:
+                upcoming = offset
+            next_open[offset] = upcoming
+        self.next_open = next_open
+
+    def is_open(self, day):
+        """Check if a day of this year is a business day"""
+        return bool(self.bits >> (day.toordinal() - self.first_ordinal) & 1)
+
+    def next_open_date(self, day):
+        """First business day on or after a day of this year, or None if there is none this year"""
+        offset = self.next_open[day.toordinal() - self.first_ordinal]
+        if offset == _NO_OPEN:
+            return None
+        return date.fromordinal(self.first_ordinal + offset)
+
+    def business_days(self):
+        """Count business days in the year"""
+        return bin(self.bits).count('1')
+
+
+@lru_cache(maxsize=64)
+def weekend_calendar(year):
+    """Calendar of a year without holiday entries"""
+    return YearCalendar(year)
+
+
+class CalendarSnapshot:
+    """Immutable set of resolved branch calendars"""
+
+    def __init__(self, national, branches, signature=None):
+        # national: {year: YearCalendar}; branches: {branch: {year: YearCalendar}}
+        self.national = national
+        self.branches = branches
+        self.signature = signature
+        self.loaded_at = time.monotonic()
+
+    def year(self, branch, year):
+        """Calendar of a branch for a year"""
+        calendar = self.branches.get(branch, self.national).get(year)
+        return calendar if calendar is not None else weekend_calendar(year)
+
+
+def build_snapshot(branches, branch_holidays, loc_holidays, country='CHN', signature=None):
+    """
+    Resolve holiday entries into per-branch, per-year calendars.
+
+    branches: (BRANCH, COUNTRY, STATE) rows; branch_holidays: (BRANCH,
+    HOLIDAY_DATE, WORKING_HOLIDAY) rows; loc_holidays: (COUNTRY, STATE,
+    HOLIDAY_DATE, WORKING_HOLIDAY) rows.
+    """
+    def overrides_by_year(rows):
+        by_year = {}
+        for day, working in rows:
+            by_year.setdefault(day.year, {})[day] = working == 'Y'
+        return by_year
+
+    region_rows, branch_rows = {}, {}
+    for row in loc_holidays:
+        region_rows.setdefault((row.COUNTRY, row.STATE), []).append((row.HOLIDAY_DATE, row.WORKING_HOLIDAY))
+    for row in branch_holidays:
+        branch_rows.setdefault(row.BRANCH, []).append((row.HOLIDAY_DATE, row.WORKING_HOLIDAY))
+
+    region_overrides = {key: overrides_by_year(rows) for key, rows in region_rows.items()}
+    branch_overrides = {key: overrides_by_year(rows) for key, rows in branch_rows.items()}
+    years = set()
+    for overrides in list(region_overrides.values()) + list(branch_overrides.values()):
+        years.update(overrides)
+
+    # Calendars are shared between layers and branches that resolve to the same days
+    shared = {}
+
+    def resolve(layers, year):
+        merged = {}
+        for layer in layers:
+            merged.update(layer.get(year, ()))
+        if not merged:
+            return weekend_calendar(year)
+        key = (year, frozenset(merged.items()))
+        if key not in shared:
+            shared[key] = YearCalendar(year, sorted(merged.items()))
+        return shared[key]
+
+    def resolve_all(layers):
+        return {year: resolve(layers, year) for year in years}
+
+    national_layer = region_overrides.get((country, NATIONAL_STATE), {})
+    national = resolve_all([national_layer])
+
+    regions = {}
+    branch_regions = {row.BRANCH: (row.COUNTRY or country, row.STATE) for row in branches}
+    resolved = {}
+    for branch in set(branch_regions) | set(branch_overrides):
+        region_country, state = branch_regions.get(branch, (country, NATIONAL_STATE))
+        region_key = (region_country, state)
+        if region_key not in regions:
+            layers = [region_overrides.get((region_country, NATIONAL_STATE), {})]
+            if state and state != NATIONAL_STATE:
+                layers.append(region_overrides.get(region_key, {}))
+            regions[region_key] = (layers, resolve_all(layers))
+
+        layers, region_calendars = regions[region_key]
+        if branch in branch_overrides:
+            resolved[branch] = resolve_all(layers + [branch_overrides[branch]])
+        else:
+            resolved[branch] = region_calendars
+
+    return CalendarSnapshot(national, resolved, signature)
+
+
+class BusinessCalendar:
+    """Business-day calendar of all branches in one database"""
+
+    def __init__(self, name, session_factory, country='CHN', refresh_interval=60):
+        self.name = name
+        self.session_factory = session_factory
+        self.country = country
+        self.refresh_interval = refresh_interval
+
+        self._snapshot = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self.reloads = 0
+
+    def load(self):
+        """Rebuild the calendar from the holiday tables and swap it in"""
+        with self.session_factory() as session:
+            # Read the signature first so changes made during the load trigger another one
+            signature = tuple(session.execute(statements.CALENDAR_SIGNATURE).one())
+            branches = session.execute(statements.CALENDAR_BRANCHES).all()
+            branch_holidays = session.execute(statements.CALENDAR_BRANCH_HOLIDAYS).all()
+            loc_holidays = session.execute(statements.CALENDAR_LOC_HOLIDAYS).all()
+
+        self._snapshot = build_snapshot(branches, branch_holidays, loc_holidays, self.country, signature)
+        self.reloads += 1
+
+        logger.info(f"Business calendar {self.name} loaded: {len(branches)} branches, "
+                    f"{len(branch_holidays)} branch and {len(loc_holidays)} location entries")
+
+    def refresh(self):
+        """Reload the calendar if the holiday tables changed"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            self.load()
+            return
+
+        with self.session_factory() as session:
+            signature = tuple(session.execute(statements.CALENDAR_SIGNATURE).one())
+        if signature != snapshot.signature:
+            self.load()
+
+    def is_loaded(self):
+        """Check if a calendar has been loaded"""
+        return self._snapshot is not None
+
+    def is_business_day(self, branch, day):
+        """Check if a day is a business day for a branch, or None before the first load"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+        return snapshot.year(branch, day.year).is_open(day)
+
+    def next_business_day(self, branch, day, inclusive=False):
+        """
+        Get the first business day after a day for a branch.
+
+        With inclusive=True the day itself is returned if it is a business
+        day. Returns None before the first load.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+
+        if not inclusive:
+            day = date.fromordinal(day.toordinal() + 1)
+        year = day.year
+        for _ in range(10):
+            found = snapshot.year(branch, year).next_open_date(day)
+            if found is not None:
+                return found
+            year += 1
+            day = date(year, 1, 1)
+        raise ValueError(f"No business day within 10 years after {day} for branch {branch}")
+
+    def business_date(self, branch, day):
+        """Get the business date a transaction on a day is booked on for a branch"""
+        return self.next_business_day(branch, day, inclusive=True)
+
+    def stats(self):
+        """Get calendar size and reload counters"""
+        snapshot = self._snapshot
+        return {
+            'name': self.name,
+            'loaded': snapshot is not None,
+            'branches': len(snapshot.branches) if snapshot else 0,
+            'years': sorted(snapshot.national) if snapshot else [],
+            'age_seconds': round(time.monotonic() - snapshot.loaded_at, 3) if snapshot else None,
+            'reloads': self.reloads
+        }
+
+    def start(self):
+        """Start the background change-detection thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name=f"business-calendar-{self.name}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background change-detection thread"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Business calendar {self.name} refresh failed: {str(e)}")
+
+
+def init_business_calendars(app):
+    """Create, load and start the business calendar for each database"""
+    from app.database.connection import get_source_session, get_dest_session
+
+    if not app.config.get('BUSINESS_CALENDAR_ENABLED', True):
+        logger.info("Business calendar disabled by configuration")
+        return {}
+
+    for business_calendar in business_calendars.values():
+        business_calendar.stop()
+    business_calendars.clear()
+
+    for name, session_factory in (('source', get_source_session), ('dest', get_dest_session)):
+        business_calendar = BusinessCalendar(
+            name,
+            session_factory,
+            country=app.config.get('BUSINESS_CALENDAR_COUNTRY', 'CHN'),
+            refresh_interval=float(app.config.get('BUSINESS_CALENDAR_REFRESH_INTERVAL', 60))
+        )
+        try:
+            business_calendar.load()
+        except Exception as e:
+            # Lookups answer None until the refresh thread manages a load
+            logger.error(f"Initial load of business calendar {name} failed: {str(e)}")
+        business_calendar.start()
+        business_calendars[name] = business_calendar
+
+    return business_calendars
+
+
+def get_business_calendar(name):
+    """Get the business calendar for a database, or None if it is not running"""
+    return business_calendars.get(name)
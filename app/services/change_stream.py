@@ -0,0 +1,413 @@
+"""
+Binlog change stream of the banking tables
+
+Both databases write a row-based binlog (config/mysql.cnf), so every
+committed change to rb_acct, rb_acct_balance, rb_restraints,
+rb_lm_client_tran_limit and transfer_log is already recorded with its
+before and after image. A ChangeStream tails one database's binlog like a
+replica, decodes the row events of those tables into RowChange records and
+pushes them to its subscribers one committed transaction at a time, so
+caches and derived indexes are invalidated exactly when the data changes
+instead of when a TTL or watermark poll comes around.
+
+A subscriber implements:
+
+- ``apply_changes(changes, caught_up)``: called with the changes of up to
+  CHANGE_STREAM_BATCH_SIZE committed transactions, and at the end of every
+  poll, possibly with none. ``caught_up`` is true on the last call of a poll:
+  everything committed before the poll started has then been delivered, so
+  subscribers may take it as a freshness stamp.
+- ``reset()``: called when the stream starts and when it lost its place in
+  the binlog (e.g. the file was purged); the subscriber rebuilds its state
+  from the tables.
+
+Delivery is at least once: the position only moves past a batch once every
+subscriber accepted it, and a failed batch is read again on the next poll.
+A stream with a checkpoint saves that position after each delivered batch
+and resumes from it after a restart; without one it starts at the end of
+the binlog, which suits in-process caches that load their state anyway.
+
+The reader is mysql-replication (``pymysqlreplication``). It needs the
+REPLICATION SLAVE and REPLICATION CLIENT privileges and
+``binlog_row_metadata = FULL`` for column names. Without the package
+the stream is not started and the caches keep their polling refresh.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+from sqlalchemy import text
+
+from app.utils.encoding import ResponseEncoder
+
+try:
+    from pymysqlreplication import BinLogStreamReader
+    from pymysqlreplication.event import XidEvent
+    from pymysqlreplication.row_event import DeleteRowsEvent, UpdateRowsEvent, WriteRowsEvent
+except ImportError:
+    BinLogStreamReader = None
+
+logger = logging.getLogger(__name__)
+
+# Global stream registry keyed by database name ('source', 'dest')
+change_streams = {}
+
+INSERT, UPDATE, DELETE = 'insert', 'update', 'delete'
+
+# Tables on the stream, with the columns identifying a row
+CHANGE_TABLES = {
+    'rb_acct': ('INTERNAL_KEY',),
+    'rb_acct_balance': ('INTERNAL_KEY',),
+    'rb_restraints': ('INTERNAL_KEY', 'RESTRAINT_TYPE', 'RES_SEQ_NO'),
+    'rb_lm_client_tran_limit': ('BASE_ACCT_NO', 'LIMIT_REF'),
+    'transfer_log': ('id',)
+}
+
+# Row event kinds by event class name, so decoding does not depend on the reader package
+_ROW_EVENT_KINDS = {'WriteRowsEvent': INSERT, 'UpdateRowsEvent': UPDATE, 'DeleteRowsEvent': DELETE}
+
+_COMMIT_EVENT = 'XidEvent'
+
+# MySQL error when the binlog position asked for no longer exists
+BINLOG_POSITION_LOST = 1236
+
+_MASTER_STATUS = text("SHOW MASTER STATUS")
+
+
+class BinlogPosition(namedtuple('BinlogPosition', ['log_file', 'log_pos'])):
+    """Position in a database's binlog"""
+
+    __slots__ = ()
+
+    def to_dict(self):
+        return {'log_file': self.log_file, 'log_pos': self.log_pos}
+
+
+class RowChange(namedtuple('RowChange', [
+    'database', 'table', 'kind', 'before', 'after', 'position', 'committed_at'
+])):
+    """One committed row change; before is None for inserts and after is None for deletes"""
+
+    __slots__ = ()
+
+    @property
+    def row(self):
+        """Latest image of the row"""
+        return self.after if self.after is not None else self.before
+
+    @property
+    def key(self):
+        """Values of the columns identifying the row"""
+        return tuple(self.row.get(column) for column in CHANGE_TABLES[self.table])
+
+    def to_dict(self):
+        """Convert change to dictionary"""
+        return {
+            'database': self.database,
+            'table': self.table,
+            'kind': self.kind,
+            'key': list(self.key),
+            'before': self.before,
+            'after': self.after,
+            'position': self.position.to_dict() if self.position else None,
+            'committed_at': self.committed_at
+        }
+
+
+def decode_event(event, database, position=None, tables=CHANGE_TABLES):
+    """Decode a binlog row event into RowChanges; other events and tables give none"""
+    kind = _ROW_EVENT_KINDS.get(type(event).__name__)
+    if kind is None or event.table not in tables:
+        return []
+
+    changes = []
+    for row in event.rows:
+        if kind == UPDATE:
+            before, after = row['before_values'], row['after_values']
+        elif kind == INSERT:
+            before, after = None, row['values']
+        else:
+            before, after = row['values'], None
+        changes.append(RowChange(database, event.table, kind, before, after, position, event.timestamp))
+    return changes
+
+
+class FileCheckpoint:
+    """Binlog position of a durable stream, kept in a JSON file"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        """Saved position, or None"""
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return None
+        return BinlogPosition(saved['log_file'], saved['log_pos'])
+
+    def save(self, position):
+        """Replace the saved position atomically"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(position.to_dict(), f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        """Forget the saved position"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def connection_settings(engine):
+    """Reader connection settings and schema of an engine"""
+    url = engine.url
+    settings = {
+        'host': url.host,
+        'port': url.port or 3306,
+        'user': url.username,
+        'passwd': url.password or '',
+        'charset': 'utf8mb4'
+    }
+    return settings, url.database
+
+
+class ChangeStream:
+    """Tails one database's binlog and pushes committed row changes to subscribers"""
+
+    def __init__(self, name, engine, server_id, tables=CHANGE_TABLES, checkpoint=None,
+                 poll_interval=0.5, batch_size=500, reader_factory=None):
+        self.name = name
+        self.engine = engine
+        self.server_id = server_id
+        self.tables = tables
+        self.checkpoint = checkpoint
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.reader_factory = reader_factory or self._binlog_reader
+
+        # (subscriber, frozenset of tables or None for all)
+        self._subscribers = []
+        self.position = checkpoint.load() if checkpoint else None
+        self._last_poll = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self.changes = 0
+        self.transactions = 0
+        self.resets = 0
+        self.failed_batches = 0
+
+    def subscribe(self, subscriber, tables=None):
+        """Push changes of the given tables (default: all) to a subscriber"""
+        self._subscribers.append((subscriber, frozenset(tables) if tables else None))
+
+    def _binlog_reader(self, position):
+        settings, schema = connection_settings(self.engine)
+        return BinLogStreamReader(
+            connection_settings=settings,
+            server_id=self.server_id,
+            blocking=False,
+            resume_stream=True,
+            log_file=position.log_file,
+            log_pos=position.log_pos,
+            only_schemas=[schema],
+            only_tables=list(self.tables),
+            only_events=[WriteRowsEvent, UpdateRowsEvent, DeleteRowsEvent, XidEvent]
+        )
+
+    def _master_position(self):
+        with self.engine.connect() as conn:
+            row = conn.execute(_MASTER_STATUS).first()
+        if row is None:
+            raise RuntimeError(f"Binary logging is off on {self.name}")
+        return BinlogPosition(row[0], int(row[1]))
+
+    def _reset(self):
+        """Start over from the end of the binlog and have subscribers rebuild their state"""
+        # Take the position first, so changes made while subscribers reload are delivered afterwards
+        self.position = self._master_position()
+        self.resets += 1
+        for subscriber, _ in self._subscribers:
+            subscriber.reset()
+        if self.checkpoint:
+            self.checkpoint.save(self.position)
+        logger.info(f"Change stream {self.name} starts at {self.position.log_file}:{self.position.log_pos}")
+
+    def _deliver(self, changes, caught_up):
+        for subscriber, tables in self._subscribers:
+            subscriber.apply_changes(
+                changes if tables is None else [c for c in changes if c.table in tables], caught_up
+            )
+
+    def poll(self):
+        """Read the binlog up to its current end and push what was committed since the last poll"""
+        if self.position is None:
+            self._reset()
+
+        reader = self.reader_factory(self.position)
+        batch, pending, transactions, end = [], [], 0, self.position
+        try:
+            for event in reader:
+                position = BinlogPosition(reader.log_file, reader.log_pos)
+                if type(event).__name__ != _COMMIT_EVENT:
+                    pending.extend(decode_event(event, self.name, position, self.tables))
+                    continue
+                # Only whole transactions are delivered, and only commits are safe resume points
+                batch.extend(pending)
+                pending, end = [], position
+                transactions += 1
+                if transactions >= self.batch_size:
+                    self._commit_batch(batch, transactions, end, caught_up=False)
+                    batch, transactions = [], 0
+        except Exception as e:
+            args = getattr(e, 'args', ())
+            if args and args[0] == BINLOG_POSITION_LOST:
+                logger.error(f"Change stream {self.name} lost its binlog position, resetting: {str(e)}")
+                self.position = None
+                return
+            raise
+        finally:
+            reader.close()
+
+        self._commit_batch(batch, transactions, end, caught_up=True)
+        self._last_poll = time.monotonic()
+
+    def _commit_batch(self, batch, transactions, position, caught_up):
+        try:
+            self._deliver(batch, caught_up)
+        except Exception:
+            # The position stays put, so the batch is read again next time
+            self.failed_batches += 1
+            raise
+        self.position = position
+        self.changes += len(batch)
+        self.transactions += transactions
+        if self.checkpoint and transactions:
+            self.checkpoint.save(position)
+
+    def is_current(self, max_age):
+        """Check if the stream reached the end of the binlog within max_age seconds"""
+        last_poll = self._last_poll
+        return last_poll is not None and time.monotonic() - last_poll <= max_age
+
+    def stats(self):
+        """Get position, lag and delivery counters"""
+        last_poll = self._last_poll
+        return {
+            'name': self.name,
+            'server_id': self.server_id,
+            'position': self.position.to_dict() if self.position else None,
+            'age_seconds': round(time.monotonic() - last_poll, 3) if last_poll else None,
+            'subscribers': len(self._subscribers),
+            'changes': self.changes,
+            'transactions': self.transactions,
+            'resets': self.resets,
+            'failed_batches': self.failed_batches
+        }
+
+    def start(self):
+        """Start the background tailing thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name=f"change-stream-{self.name}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background tailing thread"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval * 2 + 5)
+            self._thread = None
+
+    def run_forever(self):
+        """Tail in the calling thread until stop() is called"""
+        self._stop_event.clear()
+        self._run()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Change stream {self.name} poll failed: {str(e)}")
+            self._stop_event.wait(self.poll_interval)
+
+
+class RedisChangePublisher:
+    """Subscriber appending changes to a Redis stream, for consumers in other processes"""
+
+    def __init__(self, redis_client, stream_key, maxlen=100000):
+        self.redis = redis_client
+        self.stream_key = stream_key
+        self.maxlen = maxlen
+        self.encoder = ResponseEncoder(decimal_mode='string')
+
+    def apply_changes(self, changes, caught_up):
+        """Append each change as a JSON entry, in one round trip"""
+        if not changes:
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        for change in changes:
+            pipe.xadd(self.stream_key, {'change': self.encoder.encode_json(change.to_dict())},
+                      maxlen=self.maxlen, approximate=True)
+        pipe.execute()
+
+    def reset(self):
+        """Tell consumers to rebuild: changes before this entry may be missing"""
+        self.redis.xadd(self.stream_key, {'reset': '1'}, maxlen=self.maxlen, approximate=True)
+
+
+def init_change_streams(app):
+    """Create and start a change stream per database, feeding the in-process caches"""
+    from app.database.connection import get_source_engine, get_dest_engine
+    from app.services.limit_profiles import get_limit_profile_cache
+    from app.services.restraint_index import get_restraint_index
+
+    if not app.config.get('CHANGE_STREAM_ENABLED', False):
+        logger.info("Change stream disabled by configuration")
+        return {}
+
+    if BinLogStreamReader is None:
+        logger.warning("mysql-replication is not installed; caches keep their polling refresh")
+        return {}
+
+    for stream in change_streams.values():
+        stream.stop()
+    change_streams.clear()
+
+    # Every tailer needs a server_id of its own on the database, so each worker process adds its pid
+    server_id = int(app.config.get('CHANGE_STREAM_SERVER_ID', 100000)) + os.getpid()
+
+    for name, get_engine in (('source', get_source_engine), ('dest', get_dest_engine)):
+        stream = ChangeStream(
+            name, get_engine(), server_id,
+            poll_interval=float(app.config.get('CHANGE_STREAM_POLL_INTERVAL', 0.5)),
+            batch_size=int(app.config.get('CHANGE_STREAM_BATCH_SIZE', 500))
+        )
+        restraint_index = get_restraint_index(name)
+        if restraint_index is not None:
+            stream.subscribe(restraint_index, tables=('rb_restraints',))
+        limit_profiles = get_limit_profile_cache(name)
+        if limit_profiles is not None:
+            stream.subscribe(limit_profiles, tables=('rb_lm_client_tran_limit',))
+        stream.start()
+        change_streams[name] = stream
+
+    return change_streams
+
+
+def get_change_stream(name):
+    """Get the change stream of a database, or None if it is not running"""
+    return change_streams.get(name)
@@ -0,0 +1,250 @@
+"""
+Hot-account registry, lock-wait detection and slot compaction
+
+Merchant and settlement accounts receive credits faster than a single
+rb_acct_balance row lock can serialize them. A hot account spreads credits
+over SLOT_COUNT rows in rb_acct_balance_slot; its balance is the main row plus
+the sum of its slots. AccountService does the slot bookkeeping; this module
+decides which accounts are hot and periodically folds slots back into the
+main balance so debits rarely need to consolidate.
+
+Accounts become hot either manually (``mark_hot`` or app.tools.hot_accounts) or
+automatically when FOR UPDATE waits on their balance row repeatedly exceed a
+threshold within a sliding window. Detection only queues the account: the
+transfer that measured the wait still holds the row lock, and the inserts of
+mark_hot reference rb_acct, so they would wait on that lock. The registry's
+background thread marks queued accounts once woken.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+from app.database import statements
+from app.models.account import AccountBalanceSlot, HotAccount
+from app.utils.exceptions import AccountNotFoundException
+
+logger = logging.getLogger(__name__)
+
+# Global registry per database name ('source', 'dest')
+hot_account_registries = {}
+
+
+class HotAccountRegistry:
+    """Hot accounts of one database, with auto-detection and background compaction"""
+
+    def __init__(self, name, session_factory, default_slots=8, refresh_interval=30,
+                 compact_interval=60, auto_detect=True, lock_wait_ms=50,
+                 lock_wait_count=20, detect_window=60):
+        self.name = name
+        self.session_factory = session_factory
+        self.default_slots = default_slots
+        self.refresh_interval = refresh_interval
+        self.compact_interval = compact_interval
+        self.auto_detect = auto_detect
+        self.lock_wait_ms = lock_wait_ms
+        self.lock_wait_count = lock_wait_count
+        self.detect_window = detect_window
+
+        # BASE_ACCT_NO -> (INTERNAL_KEY, SLOT_COUNT); replaced wholesale on refresh
+        self._accounts = {}
+        self._lock_waits = {}
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._thread = None
+        self._last_refresh = None
+
+    def refresh(self):
+        """Reload the hot-account set from rb_hot_acct"""
+        with self.session_factory() as session:
+            rows = session.execute(statements.HOT_ACCOUNTS).all()
+
+        self._accounts = {row.BASE_ACCT_NO: (row.INTERNAL_KEY, row.SLOT_COUNT) for row in rows}
+        self._last_refresh = time.monotonic()
+
+    def slot_count(self, account_no):
+        """Number of balance slots of an account, 0 when it is not hot"""
+        entry = self._accounts.get(account_no)
+        return entry[1] if entry else 0
+
+    def is_hot(self, account_no):
+        """Check if an account is in hot mode"""
+        return account_no in self._accounts
+
+    def hot_accounts(self):
+        """Account numbers currently in hot mode"""
+        return list(self._accounts)
+
+    def mark_hot(self, account_no, slot_count=None, marked_by='MANUAL'):
+        """Put an account in hot mode and create its balance slots"""
+        slot_count = slot_count or self.default_slots
+
+        with self.session_factory() as session:
+            account = session.execute(
+                statements.ACCOUNT_BY_NUMBER, {'account_no': account_no}
+            ).scalars().first()
+            if not account:
+                raise AccountNotFoundException(account_no)
+
+            marker = session.get(HotAccount, account.INTERNAL_KEY)
+            if marker is None:
+                marker = HotAccount(
+                    INTERNAL_KEY=account.INTERNAL_KEY,
+                    BASE_ACCT_NO=account_no,
+                    SLOT_COUNT=slot_count,
+                    MARKED_BY=marked_by
+                )
+                session.add(marker)
+                # Slots are created up front so concurrent credits never race to insert them
+                for slot_no in range(slot_count):
+                    session.add(AccountBalanceSlot(
+                        INTERNAL_KEY=account.INTERNAL_KEY,
+                        SLOT_NO=slot_no,
+                        CLIENT_NO=account.CLIENT_NO
+                    ))
+                session.commit()
+                logger.info(f"Account {account_no} marked hot in {self.name} "
+                            f"({slot_count} slots, {marked_by})")
+
+            result = marker.to_dict()
+
+        accounts = dict(self._accounts)
+        accounts[account_no] = (result['internal_key'], result['slot_count'])
+        self._accounts = accounts
+        return result
+
+    def record_lock_wait(self, account_no, wait_ms):
+        """
+        Record how long a FOR UPDATE on an account's balance row took.
+
+        Returns True when the wait queued the account for hot mode; the
+        background thread marks it, outside the caller's transaction.
+        """
+        if not self.auto_detect or wait_ms < self.lock_wait_ms or self.is_hot(account_no):
+            return False
+
+        now = time.monotonic()
+        with self._lock:
+            waits = self._lock_waits.setdefault(account_no, deque())
+            waits.append(now)
+            while waits and now - waits[0] > self.detect_window:
+                waits.popleft()
+            if len(waits) < self.lock_wait_count:
+                return False
+            del self._lock_waits[account_no]
+            self._pending.add(account_no)
+
+        logger.warning(f"Account {account_no} had {len(waits)} lock waits over "
+                       f"{self.lock_wait_ms}ms in {self.detect_window}s, queued for hot mode")
+        self._wake_event.set()
+        return True
+
+    def mark_pending(self):
+        """Mark the accounts queued by lock-wait detection hot, returning how many were marked"""
+        with self._lock:
+            pending, self._pending = self._pending, set()
+
+        marked = 0
+        for account_no in pending:
+            try:
+                self.mark_hot(account_no, marked_by='AUTO')
+                marked += 1
+            except Exception as e:
+                logger.error(f"Failed to mark account {account_no} hot: {str(e)}")
+        return marked
+
+    def compact(self):
+        """Fold the slots of every hot account back into its main balance"""
+        from app.services.account_service import AccountService
+
+        folded_accounts = 0
+        for account_no in self.hot_accounts():
+            try:
+                with self.session_factory() as session:
+                    folded = AccountService(session, hot_accounts=self).consolidate_balance_slots(account_no)
+                    session.commit()
+                if folded:
+                    folded_accounts += 1
+            except Exception as e:
+                logger.error(f"Slot compaction failed for {account_no}: {str(e)}")
+
+        if folded_accounts:
+            logger.info(f"Compacted balance slots of {folded_accounts} hot accounts in {self.name}")
+        return folded_accounts
+
+    def start(self):
+        """Start the background refresh and compaction thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=f"hot-accounts-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread"""
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        last_compact = time.monotonic()
+        while not self._stop_event.is_set():
+            # Lock-wait detection wakes the thread early to mark its accounts
+            self._wake_event.wait(min(self.refresh_interval, self.compact_interval))
+            self._wake_event.clear()
+            if self._stop_event.is_set():
+                break
+            try:
+                self.mark_pending()
+                if self._last_refresh is None or time.monotonic() - self._last_refresh >= self.refresh_interval:
+                    self.refresh()
+                if time.monotonic() - last_compact >= self.compact_interval:
+                    self.compact()
+                    last_compact = time.monotonic()
+            except Exception as e:
+                logger.error(f"Hot account maintenance for {self.name} failed: {str(e)}")
+
+
+def init_hot_accounts(app):
+    """Create the hot-account registry for each database and start maintenance"""
+    from app.database.connection import get_source_session, get_dest_session
+
+    if not app.config.get('HOT_ACCOUNT_ENABLED', True):
+        logger.info("Hot account mode disabled by configuration")
+        return {}
+
+    for registry in hot_account_registries.values():
+        registry.stop()
+    hot_account_registries.clear()
+
+    for name, session_factory in (('source', get_source_session), ('dest', get_dest_session)):
+        registry = HotAccountRegistry(
+            name,
+            session_factory,
+            default_slots=int(app.config.get('HOT_ACCOUNT_DEFAULT_SLOTS', 8)),
+            refresh_interval=float(app.config.get('HOT_ACCOUNT_REFRESH_INTERVAL', 30)),
+            compact_interval=float(app.config.get('HOT_ACCOUNT_COMPACT_INTERVAL', 60)),
+            auto_detect=app.config.get('HOT_ACCOUNT_AUTO_DETECT', True),
+            lock_wait_ms=float(app.config.get('HOT_ACCOUNT_LOCK_WAIT_MS', 50)),
+            lock_wait_count=int(app.config.get('HOT_ACCOUNT_LOCK_WAIT_COUNT', 20)),
+            detect_window=float(app.config.get('HOT_ACCOUNT_DETECT_WINDOW', 60))
+        )
+        try:
+            registry.refresh()
+        except Exception as e:
+            logger.error(f"Initial load of hot accounts for {name} failed: {str(e)}")
+        registry.start()
+        hot_account_registries[name] = registry
+
+    return hot_account_registries
+
+
+def get_hot_account_registry(name):
+    """Get the hot-account registry for a database, or None if hot mode is off"""
+    return hot_account_registries.get(name)
+
@@ -0,0 +1,247 @@
+"""
+Journal ledger mode and the applier that materializes balances
+
+In the default ``balance`` ledger mode each transfer reads and rewrites
+rb_acct_balance under FOR UPDATE on both sides, so an account takes one
+transfer per row-lock hold time. With ``LEDGER_MODE=journal`` transfers
+append immutable rb_acct_journal entries instead:
+
+- a credit is a plain insert and takes no lock on the account;
+- a debit reserves the funds with one conditional UPDATE of
+  RESERVED_AMOUNT (``TOTAL_AMOUNT - RESERVED_AMOUNT >= amount``) and
+  inserts its entry. Debits of one account still serialize on that row,
+  which is what prevents overdrafts, but the lock covers a single statement.
+
+A JournalApplier per database folds the entries into rb_acct_balance in
+JOURNAL_ID order, many at a time: one locking read of the batch's balances,
+one UPDATE per account with the net amount (releasing the reservations of
+its debits), the rb_tran_hist rows with their running balances, and the
+new position in rb_journal_applier, all in one transaction. A rerun after
+a crash starts from the committed position, so no entry is applied twice.
+
+Balances then read as:
+
+- posted (``balance``): TOTAL_AMOUNT, every entry the applier has folded;
+  history, snapshots and statements add up to it;
+- available (``available_balance``): posted less reserved, what a debit
+  may take now. A credit becomes available once it is posted, normally
+  within LEDGER_APPLIER_INTERVAL.
+
+Auto-increment ids are assigned at insert and committed out of order, so a
+gap in the journal may be a transaction that has not committed yet. The
+applier stops at a gap until the entry after it is LEDGER_GAP_TIMEOUT
+seconds old; by then the missing id was rolled back (transfers give up
+after TRANSACTION_TIMEOUT), and the gap is skipped.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from app.database import statements
+from app.models.account import JournalApplierState
+from app.models.transaction import TransactionHistory
+
+logger = logging.getLogger(__name__)
+
+LEDGER_MODES = ('balance', 'journal')
+
+APPLIER_NAME = 'balance'
+
+# Global applier registry keyed by database name ('source', 'dest')
+journal_appliers = {}
+
+
+class JournalApplier:
+    """Folds journal entries of one database into rb_acct_balance and rb_tran_hist"""
+
+    def __init__(self, name, session_factory, batch_size=1000, interval=0.2, gap_timeout=60,
+                 clock=datetime.utcnow):
+        self.name = name
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.interval = interval
+        self.gap_timeout = timedelta(seconds=gap_timeout)
+        self.clock = clock
+
+        self.last_journal_id = None
+        self.applied = 0
+        self.skipped_gaps = 0
+        self._last_run = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _contiguous(self, rows, after):
+        """Rows up to the first gap that may still be filled by an uncommitted entry"""
+        expected = after + 1
+        for index, row in enumerate(rows):
+            if row.JOURNAL_ID != expected:
+                if self.clock() - row.CREATED_AT < self.gap_timeout:
+                    return rows[:index]
+                logger.warning(f"Journal {self.name} skips ids {expected}..{row.JOURNAL_ID - 1}: "
+                               f"never committed")
+                self.skipped_gaps += 1
+            expected = row.JOURNAL_ID + 1
+        return rows
+
+    def apply_once(self):
+        """Fold the next batch of committed entries, returning how many were applied"""
+        with self.session_factory() as session:
+            # The position row lock also keeps concurrent appliers of a database apart
+            state = session.execute(
+                statements.JOURNAL_APPLIER_FOR_UPDATE, {'applier': APPLIER_NAME}
+            ).scalars().first()
+            if state is None:
+                state = JournalApplierState(APPLIER=APPLIER_NAME, LAST_JOURNAL_ID=0)
+                session.add(state)
+
+            rows = self._contiguous(session.execute(
+                statements.JOURNAL_ENTRIES_AFTER, {'after': state.LAST_JOURNAL_ID, 'limit': self.batch_size}
+            ).all(), state.LAST_JOURNAL_ID)
+
+            if rows:
+                self._post(session, rows)
+                state.LAST_JOURNAL_ID = rows[-1].JOURNAL_ID
+            last_journal_id = state.LAST_JOURNAL_ID
+            session.commit()
+
+        self.last_journal_id = last_journal_id
+        self.applied += len(rows)
+        self._last_run = time.monotonic()
+        return len(rows)
+
+    def _post(self, session, rows):
+        """Update the balances of a batch and write its history rows"""
+        # Locks in INTERNAL_KEY order, like every other multi-row balance lock
+        balances = {
+            row.INTERNAL_KEY: row.TOTAL_AMOUNT + Decimal(str(row.SLOT_TOTAL))
+            for row in session.execute(
+                statements.JOURNAL_BALANCES_FOR_UPDATE, {'internal_keys': sorted({r.INTERNAL_KEY for r in rows})}
+            )
+        }
+
+        # INTERNAL_KEY -> [net amount, released reservation]
+        postings = OrderedDict()
+        history = []
+        for row in rows:
+            previous_balance = balances[row.INTERNAL_KEY]
+            balances[row.INTERNAL_KEY] = new_balance = previous_balance + row.AMOUNT
+            posting = postings.setdefault(row.INTERNAL_KEY, [Decimal('0.00'), Decimal('0.00')])
+            posting[0] += row.AMOUNT
+            if row.CR_DR_IND == 'D':
+                posting[1] -= row.AMOUNT
+            history.append({
+                'SEQ_NO': TransactionHistory.generate_seq_no(),
+                'INTERNAL_KEY': row.INTERNAL_KEY,
+                'CLIENT_NO': row.CLIENT_NO,
+                'BASE_ACCT_NO': row.BASE_ACCT_NO,
+                'TRAN_TYPE': 'TRANSFER',
+                'TRAN_AMT': abs(row.AMOUNT),
+                'PREVIOUS_BAL_AMT': previous_balance,
+                'ACTUAL_BAL': new_balance,
+                'CR_DR_IND': row.CR_DR_IND,
+                'TRAN_DATE': row.CREATED_AT,
+                'REFERENCE': row.REFERENCE,
+                'NARRATIVE': row.NARRATIVE,
+                'TRAN_STATUS': 'N'
+            })
+
+        changed_at = self.clock()
+        session.execute(statements.POST_JOURNAL_BALANCE, [
+            {'internal_key': key, 'delta': delta, 'released': released, 'changed_at': changed_at}
+            for key, (delta, released) in postings.items()
+        ])
+        session.execute(statements.INSERT_HISTORY, history)
+
+    def drain(self):
+        """Apply batches until the journal is caught up, returning the entries applied"""
+        total = 0
+        while True:
+            applied = self.apply_once()
+            total += applied
+            if applied < self.batch_size:
+                return total
+
+    def stats(self):
+        """Get position and counters"""
+        last_run = self._last_run
+        return {
+            'name': self.name,
+            'last_journal_id': self.last_journal_id,
+            'age_seconds': round(time.monotonic() - last_run, 3) if last_run else None,
+            'applied': self.applied,
+            'skipped_gaps': self.skipped_gaps
+        }
+
+    def start(self):
+        """Start the background applier thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name=f"journal-applier-{self.name}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background applier thread"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval * 2 + 5)
+            self._thread = None
+
+    def run_forever(self):
+        """Apply in the calling thread until stop() is called"""
+        self._stop_event.clear()
+        self._run()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                # A full batch means more is waiting; go on without pausing
+                if self.apply_once() >= self.batch_size:
+                    continue
+            except Exception as e:
+                logger.error(f"Journal applier {self.name} failed: {str(e)}")
+            self._stop_event.wait(self.interval)
+
+
+def create_journal_applier(name, session_factory, config):
+    """Create a journal applier with the LEDGER_* settings of a configuration mapping"""
+    return JournalApplier(
+        name, session_factory,
+        batch_size=int(config.get('LEDGER_APPLIER_BATCH_SIZE', 1000)),
+        interval=float(config.get('LEDGER_APPLIER_INTERVAL', 0.2)),
+        gap_timeout=float(config.get('LEDGER_GAP_TIMEOUT', 60))
+    )
+
+
+def init_journal_appliers(app):
+    """Start the in-process journal appliers, when this instance is configured to run them"""
+    from app.database.connection import get_source_session, get_dest_session
+
+    if app.config.get('LEDGER_MODE', 'balance') not in LEDGER_MODES:
+        raise ValueError(f"Unsupported LEDGER_MODE: {app.config.get('LEDGER_MODE')}")
+
+    if not app.config.get('LEDGER_APPLIER_ENABLED', False):
+        logger.info("Journal applier not run in this process")
+        return {}
+
+    for applier in journal_appliers.values():
+        applier.stop()
+    journal_appliers.clear()
+
+    for name, session_factory in (('source', get_source_session), ('dest', get_dest_session)):
+        applier = create_journal_applier(name, session_factory, app.config)
+        applier.start()
+        journal_appliers[name] = applier
+
+    return journal_appliers
+
+
+def get_journal_applier(name):
+    """Get the in-process journal applier of a database, or None if it is not running"""
+    return journal_appliers.get(name)
@@ -0,0 +1,321 @@
+"""
+Versioned cache of per-account transfer limit profiles
+
+A limit profile holds every rb_lm_client_tran_limit row of one account
+(BASE_ACCT_NO and its CLIENT_NO), keyed by LIMIT_REF, as one immutable
+object. ``evaluate`` checks an amount against all transfer limit types in
+one call, so a transfer costs no limit query when the profile is cached and
+a single query for all LIMIT_REFs when it is not.
+
+Each profile is stamped with the newest TRAN_TIMESTAMP of its rows. A
+background thread reads the accounts whose limits changed since the
+watermark (re-reading ``watermark - overlap`` like the restraint index) and
+reloads the cached ones with one bulk query. Profiles whose version did not
+move are kept as they are. A periodic full reload of the cached accounts
+catches deleted rows. Once the last successful refresh is older than the
+freshness window the cache stops answering and callers query the database.
+
+When the binlog change stream runs, it drops the profile of every account
+whose limit rows change as the change commits, and the watermark refresh
+pauses while it does.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import timedelta
+from decimal import Decimal
+
+from app.database import statements
+from app.models.read_models import ClientTransactionLimitRecord
+
+logger = logging.getLogger(__name__)
+
+# Global cache registry keyed by database name ('source', 'dest')
+limit_profile_caches = {}
+
+# LIMIT_REFs checked for transfers, with the limit names used in errors
+TRANSFER_LIMIT_NAMES = {
+    'DailyTransferLimit': 'Daily Transfer Limit',
+    'RcNotMtTransferLimitPd': 'Non-Counter Transfer Limit'
+}
+
+LimitViolation = namedtuple('LimitViolation', ['limit_ref', 'limit_type', 'limit_amount', 'bound'])
+
+
+class LimitProfile:
+    """Immutable set of the limits configured for one account"""
+
+    __slots__ = ('account_no', 'client_no', 'limits', 'version')
+
+    def __init__(self, account_no, records):
+        self.account_no = account_no
+        self.limits = {record.LIMIT_REF: record for record in records}
+        self.client_no = next((r.CLIENT_NO for r in self.limits.values() if r.CLIENT_NO), None)
+        stamps = [r.TRAN_TIMESTAMP for r in self.limits.values() if r.TRAN_TIMESTAMP is not None]
+        self.version = max(stamps) if stamps else None
+
+    def get(self, limit_ref):
+        """Get the limit record of a LIMIT_REF, or None"""
+        return self.limits.get(limit_ref)
+
+    def evaluate(self, amount, limit_refs=None):
+        """
+        Check an amount against the account's limits.
+
+        Returns a LimitViolation per exceeded limit, in the order of
+        limit_refs (all transfer limit types by default).
+        """
+        amount = Decimal(str(amount))
+        violations = []
+        for limit_ref in limit_refs or TRANSFER_LIMIT_NAMES:
+            record = self.limits.get(limit_ref)
+            if record is None:
+                continue
+            if record.LIMIT_MAX_AMT is not None and amount > record.LIMIT_MAX_AMT:
+                violations.append(LimitViolation(
+                    limit_ref, TRANSFER_LIMIT_NAMES.get(limit_ref, limit_ref), record.LIMIT_MAX_AMT, 'MAX'
+                ))
+            elif record.LIMIT_MIN_AMT is not None and amount < record.LIMIT_MIN_AMT:
+                violations.append(LimitViolation(
+                    limit_ref, 'Minimum Transfer Amount', record.LIMIT_MIN_AMT, 'MIN'
+                ))
+        return violations
+
+    def to_dicts(self):
+        """Convert the limits to dictionaries ordered by LIMIT_REF"""
+        return [self.limits[ref].to_dict() for ref in sorted(self.limits)]
+
+
+def load_limit_profile(session, account_no):
+    """Load the limit profile of an account with one query"""
+    rows = session.execute(statements.LIMITS_BY_ACCOUNT_ROWS, {'account_no': account_no})
+    return LimitProfile(account_no, [ClientTransactionLimitRecord._make(row) for row in rows])
+
+
+class LimitProfileCache:
+    """Bounded LRU cache of limit profiles for one database"""
+
+    def __init__(self, name, session_factory, max_entries=100000, max_staleness=5,
+                 refresh_interval=1, overlap_seconds=5, full_reload_interval=300, batch_size=500):
+        self.name = name
+        self.session_factory = session_factory
+        self.max_entries = max_entries
+        self.max_staleness = max_staleness
+        self.refresh_interval = refresh_interval
+        self.overlap = timedelta(seconds=overlap_seconds)
+        self.full_reload_interval = full_reload_interval
+        self.batch_size = batch_size
+
+        self._profiles = OrderedDict()
+        self._watermark = None
+        self._last_refresh = None
+        self._last_full_load = None
+        self._last_push = None
+        # Bumped by pushed invalidations, so profiles read before one are not stored after it
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self.hits = 0
+        self.misses = 0
+        self.stale_misses = 0
+        self.reloaded = 0
+
+    def is_fresh(self):
+        """Check if the cache was refreshed within the freshness window"""
+        last_refresh = self._last_refresh
+        return last_refresh is not None and time.monotonic() - last_refresh <= self.max_staleness
+
+    def get_profile(self, session, account_no):
+        """Get the limit profile of an account, loading it through session on a miss"""
+        if not self.is_fresh():
+            self.stale_misses += 1
+            return load_limit_profile(session, account_no)
+
+        with self._lock:
+            profile = self._profiles.get(account_no)
+            if profile is not None:
+                self._profiles.move_to_end(account_no)
+                self.hits += 1
+                return profile
+
+        self.misses += 1
+        generation = self._generation
+        profile = load_limit_profile(session, account_no)
+        self._store([profile], generation=generation)
+        return profile
+
+    def _store(self, profiles, only_cached=False, generation=None):
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            for profile in profiles:
+                if only_cached and profile.account_no not in self._profiles:
+                    continue
+                self._profiles[profile.account_no] = profile
+                self._profiles.move_to_end(profile.account_no)
+            while len(self._profiles) > self.max_entries:
+                self._profiles.popitem(last=False)
+
+    def invalidate(self, account_no):
+        """Drop an account's profile, e.g. after changing its limits"""
+        with self._lock:
+            self._profiles.pop(account_no, None)
+
+    def apply_changes(self, changes, caught_up):
+        """Drop profiles whose limit rows changed, as pushed by the binlog change stream"""
+        with self._lock:
+            for change in changes:
+                for row in (change.before, change.after):
+                    if row is not None:
+                        self._profiles.pop(row.get('BASE_ACCT_NO'), None)
+            if changes:
+                self._generation += 1
+            if caught_up:
+                self._last_push = self._last_refresh = time.monotonic()
+
+    def reset(self):
+        """Drop all profiles when the change stream (re)starts"""
+        with self._lock:
+            self._profiles.clear()
+            self._generation += 1
+
+    def _pushed_recently(self):
+        # The stream keeps the cache current; polling resumes within half the window once it stops
+        last_push = self._last_push
+        return last_push is not None and time.monotonic() - last_push <= self.max_staleness / 2
+
+    def _load_many(self, session, account_nos):
+        """Load profiles of several accounts with one query per batch"""
+        records = {account_no: [] for account_no in account_nos}
+        account_nos = list(account_nos)
+        for start in range(0, len(account_nos), self.batch_size):
+            rows = session.execute(
+                statements.LIMITS_BY_ACCOUNTS_ROWS,
+                {'account_nos': account_nos[start:start + self.batch_size]}
+            )
+            for row in rows:
+                record = ClientTransactionLimitRecord._make(row)
+                records[record.BASE_ACCT_NO].append(record)
+        return [LimitProfile(account_no, rows) for account_no, rows in records.items()]
+
+    def refresh(self):
+        """Reload cached profiles whose limits changed since the watermark"""
+        full = (self._last_full_load is None or self._watermark is None or
+                time.monotonic() - self._last_full_load >= self.full_reload_interval)
+        if not full and self._pushed_recently():
+            return
+
+        generation = self._generation
+        with self.session_factory() as session:
+            if full:
+                # Read the watermark first so rows changed during the reload are re-read
+                watermark = session.execute(statements.LIMIT_WATERMARK).scalar()
+                with self._lock:
+                    account_nos = list(self._profiles)
+                changed = None
+            else:
+                watermark = self._watermark
+                changed = {}
+                for row in session.execute(
+                    statements.LIMITS_CHANGED_SINCE, {'since': self._watermark - self.overlap}
+                ):
+                    changed[row.BASE_ACCT_NO] = max(row.TRAN_TIMESTAMP, changed.get(row.BASE_ACCT_NO, row.TRAN_TIMESTAMP))
+                    if row.TRAN_TIMESTAMP > watermark:
+                        watermark = row.TRAN_TIMESTAMP
+                with self._lock:
+                    account_nos = [
+                        account_no for account_no, version in changed.items()
+                        if account_no in self._profiles and self._profiles[account_no].version != version
+                    ]
+
+            profiles = self._load_many(session, account_nos) if account_nos else []
+
+        self._store(profiles, only_cached=True, generation=generation)
+        self.reloaded += len(profiles)
+        self._watermark = watermark
+        self._last_refresh = time.monotonic()
+        if full:
+            self._last_full_load = self._last_refresh
+            logger.info(f"Limit profile cache {self.name} fully reloaded: {len(profiles)} profiles")
+
+    def stats(self):
+        """Get cache size, freshness and lookup counters"""
+        last_refresh = self._last_refresh
+        return {
+            'name': self.name,
+            'profiles': len(self._profiles),
+            'watermark': self._watermark.isoformat() if self._watermark else None,
+            'age_seconds': round(time.monotonic() - last_refresh, 3) if last_refresh else None,
+            'fresh': self.is_fresh(),
+            'hits': self.hits,
+            'misses': self.misses,
+            'stale_misses': self.stale_misses,
+            'reloaded': self.reloaded
+        }
+
+    def start(self):
+        """Start the background refresh thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name=f"limit-profiles-{self.name}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background refresh thread"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.refresh_interval * 2)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Limit profile cache {self.name} refresh failed: {str(e)}")
+            self._stop_event.wait(self.refresh_interval)
+
+
+def init_limit_profile_caches(app):
+    """Create and start the limit profile cache for each database"""
+    from app.database.connection import get_source_session, get_dest_session
+
+    if not app.config.get('LIMIT_PROFILE_CACHE_ENABLED', True):
+        logger.info("Limit profile cache disabled by configuration")
+        return {}
+
+    for cache in limit_profile_caches.values():
+        cache.stop()
+    limit_profile_caches.clear()
+
+    for name, session_factory in (('source', get_source_session), ('dest', get_dest_session)):
+        cache = LimitProfileCache(
+            name,
+            session_factory,
+            max_entries=int(app.config.get('LIMIT_PROFILE_MAX_ENTRIES', 100000)),
+            max_staleness=float(app.config.get('LIMIT_PROFILE_MAX_STALENESS', 5)),
+            refresh_interval=float(app.config.get('LIMIT_PROFILE_REFRESH_INTERVAL', 1)),
+            overlap_seconds=float(app.config.get('LIMIT_PROFILE_OVERLAP', 5)),
+            full_reload_interval=float(app.config.get('LIMIT_PROFILE_FULL_RELOAD_INTERVAL', 300))
+        )
+        try:
+            cache.refresh()
+        except Exception as e:
+            # Lookups query the database until the refresh thread succeeds
+            logger.error(f"Initial refresh of limit profile cache {name} failed: {str(e)}")
+        cache.start()
+        limit_profile_caches[name] = cache
+
+    return limit_profile_caches
+
+
+def get_limit_profile_cache(name):
+    """Get the limit profile cache for a database, or None if it is not running"""
+    return limit_profile_caches.get(name)
@@ -0,0 +1,248 @@
+"""
+In-memory index of accounts with active transfer-blocking restraints
+
+Active FREEZE/JUDICIAL/ADMIN restraints apply to a tiny fraction of accounts,
+yet every transfer used to query rb_restraints for both sides. The index keeps
+the set of restrained INTERNAL_KEYs per database, so the common "no restraint"
+answer needs no query.
+
+The index is loaded once at startup and then refreshed incrementally from the
+TRAN_TIMESTAMP watermark by a background thread. Rows are re-read from
+``watermark - overlap`` so writes whose timestamp was assigned before a slow
+commit are still picked up, and a periodic full reload catches anything the
+watermark cannot see (hard deletes, writers that do not bump TRAN_TIMESTAMP).
+Lookups refuse to answer once the last successful refresh is older than the
+freshness window, and callers then fall back to querying the database.
+
+When the binlog change stream runs, it pushes rb_restraints changes to the
+index as they commit, and the incremental refresh pauses while it does.
+"""
+
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from app.database import statements
+from app.models.constraints import FREEZE_RESTRAINT_TYPES
+
+logger = logging.getLogger(__name__)
+
+# Global index registry keyed by database name ('source', 'dest')
+restraint_indexes = {}
+
+
+class RestraintIndex:
+    """Set of INTERNAL_KEYs with active transfer-blocking restraints for one database"""
+
+    def __init__(self, name, session_factory, max_staleness=5, refresh_interval=1,
+                 overlap_seconds=5, full_reload_interval=300):
+        self.name = name
+        self.session_factory = session_factory
+        self.max_staleness = max_staleness
+        self.refresh_interval = refresh_interval
+        self.overlap = timedelta(seconds=overlap_seconds)
+        self.full_reload_interval = full_reload_interval
+
+        # INTERNAL_KEY -> {RES_SEQ_NO: RESTRAINT_TYPE}; inner dicts are replaced, never mutated
+        self._restraints = {}
+        self._watermark = None
+        self._last_refresh = None
+        self._last_full_load = None
+        self._last_push = None
+        self._pushed_during_load = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self.hits = 0
+        self.restrained_hits = 0
+        self.stale_misses = 0
+
+    def load(self):
+        """Fully reload the index from the database"""
+        with self._lock:
+            # Changes pushed while the scan runs are replayed on top of it
+            self._pushed_during_load = []
+        with self.session_factory() as session:
+            # Read the watermark first so rows changed during the scan are re-read on refresh
+            watermark = session.execute(statements.FREEZE_RESTRAINT_WATERMARK).scalar()
+            restraints = {}
+            for row in session.execute(statements.ACTIVE_FREEZE_RESTRAINTS):
+                restraints.setdefault(row.INTERNAL_KEY, {})[row.RES_SEQ_NO] = row.RESTRAINT_TYPE
+
+        with self._lock:
+            self._restraints = restraints
+            self._apply_changes(self._pushed_during_load)
+            self._pushed_during_load = None
+            self._watermark = watermark
+            self._last_full_load = self._last_refresh = time.monotonic()
+
+        logger.info(f"Restraint index {self.name} loaded: {len(restraints)} restrained accounts")
+
+    def refresh(self):
+        """Apply restraint changes since the watermark, or fully reload when due"""
+        if (self._last_full_load is None or self._watermark is None or
+                time.monotonic() - self._last_full_load >= self.full_reload_interval):
+            self.load()
+            return
+
+        if self._pushed_recently():
+            return
+
+        with self.session_factory() as session:
+            rows = session.execute(
+                statements.FREEZE_RESTRAINTS_CHANGED_SINCE,
+                {'since': self._watermark - self.overlap}
+            ).all()
+
+        with self._lock:
+            watermark = self._watermark
+            for row in rows:
+                self._apply(row)
+                if row.TRAN_TIMESTAMP is not None and row.TRAN_TIMESTAMP > watermark:
+                    watermark = row.TRAN_TIMESTAMP
+            self._watermark = watermark
+            self._last_refresh = time.monotonic()
+
+    def _apply(self, row):
+        self._set(row.INTERNAL_KEY, row.RES_SEQ_NO, row.RESTRAINT_TYPE if row.RESTRAINTS_STATUS == 'A' else None)
+
+    def _set(self, internal_key, seq_no, restraint_type):
+        entries = dict(self._restraints.get(internal_key, ()))
+        if restraint_type is not None:
+            entries[seq_no] = restraint_type
+        else:
+            entries.pop(seq_no, None)
+
+        if entries:
+            self._restraints[internal_key] = entries
+        else:
+            self._restraints.pop(internal_key, None)
+
+    def apply_changes(self, changes, caught_up):
+        """Apply rb_restraints changes pushed by the binlog change stream"""
+        with self._lock:
+            if self._pushed_during_load is not None:
+                self._pushed_during_load.extend(changes)
+            self._apply_changes(changes)
+            if caught_up:
+                self._last_push = self._last_refresh = time.monotonic()
+
+    def _apply_changes(self, changes):
+        for change in changes:
+            if change.before is not None:
+                self._set(change.before['INTERNAL_KEY'], change.before['RES_SEQ_NO'], None)
+            after = change.after
+            if (after is not None and after.get('RESTRAINTS_STATUS') == 'A' and
+                    after.get('RESTRAINT_TYPE') in FREEZE_RESTRAINT_TYPES):
+                self._set(after['INTERNAL_KEY'], after['RES_SEQ_NO'], after['RESTRAINT_TYPE'])
+
+    def reset(self):
+        """Reload the index when the change stream (re)starts"""
+        self.load()
+
+    def _pushed_recently(self):
+        # The stream keeps the index current; polling resumes within half the window once it stops
+        last_push = self._last_push
+        return last_push is not None and time.monotonic() - last_push <= self.max_staleness / 2
+
+    def is_fresh(self):
+        """Check if the index was refreshed within the freshness window"""
+        last_refresh = self._last_refresh
+        return last_refresh is not None and time.monotonic() - last_refresh <= self.max_staleness
+
+    def lookup(self, internal_key):
+        """
+        Get the blocking restraint types of an account.
+
+        Returns an empty frozenset when the account has no active blocking
+        restraint, or None when the index is too stale to answer.
+        """
+        if not self.is_fresh():
+            self.stale_misses += 1
+            return None
+
+        self.hits += 1
+        entries = self._restraints.get(internal_key)
+        if not entries:
+            return frozenset()
+
+        self.restrained_hits += 1
+        return frozenset(entries.values())
+
+    def stats(self):
+        """Get index size, freshness and lookup counters"""
+        last_refresh = self._last_refresh
+        return {
+            'name': self.name,
+            'restrained_accounts': len(self._restraints),
+            'watermark': self._watermark.isoformat() if self._watermark else None,
+            'age_seconds': round(time.monotonic() - last_refresh, 3) if last_refresh else None,
+            'fresh': self.is_fresh(),
+            'hits': self.hits,
+            'restrained_hits': self.restrained_hits,
+            'stale_misses': self.stale_misses
+        }
+
+    def start(self):
+        """Start the background refresh thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name=f"restraint-index-{self.name}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background refresh thread"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.refresh_interval * 2)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Restraint index {self.name} refresh failed: {str(e)}")
+            self._stop_event.wait(self.refresh_interval)
+
+
+def init_restraint_indexes(app):
+    """Create, load and start the restraint index for each database"""
+    from app.database.connection import get_source_session, get_dest_session
+
+    if not app.config.get('RESTRAINT_INDEX_ENABLED', True):
+        logger.info("Restraint index disabled by configuration")
+        return {}
+
+    for index in restraint_indexes.values():
+        index.stop()
+    restraint_indexes.clear()
+
+    for name, session_factory in (('source', get_source_session), ('dest', get_dest_session)):
+        index = RestraintIndex(
+            name,
+            session_factory,
+            max_staleness=float(app.config.get('RESTRAINT_INDEX_MAX_STALENESS', 5)),
+            refresh_interval=float(app.config.get('RESTRAINT_INDEX_REFRESH_INTERVAL', 1)),
+            overlap_seconds=float(app.config.get('RESTRAINT_INDEX_OVERLAP', 5)),
+            full_reload_interval=float(app.config.get('RESTRAINT_INDEX_FULL_RELOAD_INTERVAL', 300))
+        )
+        try:
+            index.load()
+        except Exception as e:
+            # Lookups fall back to queries until the refresh thread manages a load
+            logger.error(f"Initial load of restraint index {name} failed: {str(e)}")
+        index.start()
+        restraint_indexes[name] = index
+
+    return restraint_indexes
+
+
+def get_restraint_index(name):
+    """Get the restraint index for a database, or None if it is not running"""
+    return restraint_indexes.get(name)
@@ -4,7 +4,7 @@ Distributed transaction manager for handling cross-database transactions
 
 import logging
 from app.database.connection import DatabaseManager
-from app.utils.exceptions import DistributedTransactionException
+from app.utils.exceptions import DistributedTransactionException, TimeoutException
 
 logger = logging.getLogger(__name__)
 
@@ -12,17 +12,25 @@ logger = logging.getLogger(__name__)
 class DistributedTransactionManager(DatabaseManager):
     """
     Enhanced database manager with distributed transaction capabilities
-    Implements a simplified two-phase commit protocol
+    Implements a simplified two-phase commit protocol.
+    
+    With a deadline, no phase starts after it has passed and the prepare
+    flush runs under statement limits sized to what is left; once the
+    commit phase has started it always runs to the end.
     """
     
-    def __init__(self):
+    def __init__(self, deadline=None):
         super().__init__()
         self.transaction_id = None
         self.phase = None
+        self.deadline = deadline
+        self.commit_started = False
     
     def begin_distributed_transaction(self):
         """Begin distributed transaction with enhanced logging"""
         try:
+            if self.deadline is not None:
+                self.deadline.check('begin')
             super().begin_distributed_transaction()
             self.phase = 'STARTED'
             logger.info("Distributed transaction started successfully")
@@ -30,6 +38,8 @@ class DistributedTransactionManager(DatabaseManager):
         except Exception as e:
             self.phase = 'FAILED'
             logger.error(f"Failed to start distributed transaction: {str(e)}")
+            if isinstance(e, TimeoutException):
+                raise
             raise DistributedTransactionException(str(e), 'START')
     
     def prepare_phase(self):
@@ -42,6 +52,9 @@ class DistributedTransactionManager(DatabaseManager):
             logger.debug("Starting prepare phase")
             
             # Flush changes to both databases but don't commit
+            if self.deadline is not None:
+                self.deadline.apply(self.source_session, 'prepare')
+                self.deadline.apply(self.dest_session, 'prepare')
             self.source_session.flush()
             self.dest_session.flush()
             
@@ -52,6 +65,9 @@ class DistributedTransactionManager(DatabaseManager):
         except Exception as e:
             self.phase = 'PREPARE_FAILED'
             logger.error(f"Prepare phase failed: {str(e)}")
+            timeout = self.deadline.timeout_error(e, 'prepare') if self.deadline is not None else None
+            if timeout is not None:
+                raise timeout from e
             raise DistributedTransactionException(str(e), 'PREPARE')
     
     def commit_phase(self):
@@ -59,8 +75,13 @@ class DistributedTransactionManager(DatabaseManager):
         if self.phase != 'PREPARED':
             raise DistributedTransactionException("Transaction not in prepared state", 'COMMIT')
         
+        # Last point to give up; a started commit is not interrupted
+        if self.deadline is not None:
+            self.deadline.check('commit')
+        
         try:
             self.phase = 'COMMITTING'
+            self.commit_started = True
             logger.debug("Starting commit phase")
             
             # Commit both transactions
@@ -0,0 +1,122 @@
+"""
+Retries of transfers that lost a lock conflict
+
+A transfer that hits an InnoDB deadlock (1213) or lock wait timeout (1205)
+has done nothing wrong; its transaction was chosen as the victim or waited
+behind a long one. TransferService rolls both sides back and runs the whole
+distributed transaction again with the same transfer_id instead of failing
+the request, so transient contention is not seen by clients.
+
+Retries are bounded three ways, so they do not amplify an overload:
+
+- attempts: at most TRANSFER_RETRY_MAX_ATTEMPTS per transfer, with full
+  jitter exponential backoff (a random delay up to base x 2^(n-1), capped)
+  so transfers that collided do not collide again in lockstep;
+- the transfer's deadline: no retry whose backoff would not end before it;
+- a retry budget per process: every transfer deposits
+  TRANSFER_RETRY_BUDGET_RATIO of a token and every retry spends a whole one,
+  with TRANSFER_RETRY_BUDGET_RESERVE tokens at most. Under sustained
+  contention retries are limited to that ratio of the traffic.
+
+Only failures before the commit phase are retried: once either database
+has started committing, a rerun could apply the transfer twice. The number
+of retries a transfer took is stored in transfer_log.retry_count.
+"""
+
+import logging
+import random
+import threading
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+# MySQL error codes worth running the transaction again for
+RETRYABLE_ERRORS = {1213: 'deadlock', 1205: 'lock_wait_timeout'}
+
+RetryDecision = namedtuple('RetryDecision', ['reason', 'delay'])
+
+# Global retry budget of the process, created by get_retry_budget
+_retry_budget = None
+_retry_budget_lock = threading.Lock()
+
+
+def retryable_error(error):
+    """Name of the retryable database error behind an exception, or None"""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        args = getattr(getattr(error, 'orig', None), 'args', ())
+        if args and args[0] in RETRYABLE_ERRORS:
+            return RETRYABLE_ERRORS[args[0]]
+        error = error.__cause__ or error.__context__
+    return None
+
+
+class RetryBudget:
+    """Token bucket limiting retries to a share of all transfers"""
+
+    def __init__(self, ratio=0.1, reserve=10):
+        self.ratio = ratio
+        self.reserve = reserve
+        self.tokens = float(reserve)
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        """Credit the budget for one transfer"""
+        with self._lock:
+            self.tokens = min(self.reserve, self.tokens + self.ratio)
+
+    def withdraw(self):
+        """Spend a token on a retry, returning False when the budget is exhausted"""
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+def get_retry_budget(config):
+    """Get the retry budget shared by the transfers of this process"""
+    global _retry_budget
+    with _retry_budget_lock:
+        if _retry_budget is None:
+            _retry_budget = RetryBudget(config.TRANSFER_RETRY_BUDGET_RATIO, config.TRANSFER_RETRY_BUDGET_RESERVE)
+        return _retry_budget
+
+
+class TransferRetryPolicy:
+    """Decides whether and when a failed transfer attempt runs again"""
+
+    def __init__(self, budget, max_attempts=3, base_delay=0.02, max_delay=0.5, rng=random.random):
+        self.budget = budget
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rng = rng
+
+    @classmethod
+    def for_config(cls, config):
+        """Get a policy for a configuration, drawing on the process retry budget"""
+        return cls(
+            get_retry_budget(config),
+            max_attempts=config.TRANSFER_RETRY_MAX_ATTEMPTS,
+            base_delay=config.TRANSFER_RETRY_BASE_DELAY,
+            max_delay=config.TRANSFER_RETRY_MAX_DELAY
+        )
+
+    def backoff(self, attempt):
+        """Full jitter delay before the attempt after `attempt`"""
+        return self.rng() * min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+
+    def decide(self, error, attempt, commit_started, deadline=None):
+        """RetryDecision for a failed attempt, or None to give up"""
+        reason = retryable_error(error)
+        if reason is None or commit_started or attempt >= self.max_attempts:
+            return None
+        delay = self.backoff(attempt)
+        if deadline is not None and deadline.remaining() <= delay:
+            return None
+        if not self.budget.withdraw():
+            logger.warning(f"Retry budget exhausted; not retrying {reason}")
+            return None
+        return RetryDecision(reason, delay)
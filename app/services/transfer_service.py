@@ -3,18 +3,28 @@ Transfer service for handling money transfers between accounts
 """
 
 import logging
+import time
 from decimal import Decimal
 from datetime import datetime
 
+from app.database import statements
+from app.database.replica_router import record_write
 from app.models.transaction import TransactionHistory, TransferLog
+from app.models.read_models import TransferLogRecord
 from app.services.account_service import AccountService
+from app.services.archive import get_segment_archive
+from app.services.business_calendar import get_business_calendar
+from app.services.hot_accounts import get_hot_account_registry
+from app.services.limit_profiles import get_limit_profile_cache
+from app.services.restraint_index import get_restraint_index
 from app.services.transaction_manager import DistributedTransactionManager
+from app.services.transfer_retry import TransferRetryPolicy
+from app.utils.deadline import Deadline
 from app.utils.exceptions import (
-    TransferException, SameAccountTransferException, 
-    CurrencyMismatchException, TransferLimitExceededException,
-    BusinessRuleException
+    TransferException, CurrencyMismatchException, BusinessRuleException
 )
 from app.utils.logger import TransactionLogger, log_transaction
+from app.utils.transfer_rules import TransferRules
 
 logger = logging.getLogger(__name__)
 
@@ -27,9 +37,21 @@ class TransferService:
         self.max_transfer_amount = Decimal(str(config.MAX_TRANSFER_AMOUNT))
         self.min_transfer_amount = Decimal(str(config.MIN_TRANSFER_AMOUNT))
         self.daily_transfer_limit = Decimal(str(config.DAILY_TRANSFER_LIMIT))
+        self.rules = TransferRules.for_config(config)
+        self.retry_policy = TransferRetryPolicy.for_config(config)
+        self.journal_mode = getattr(config, 'LEDGER_MODE', 'balance') == 'journal'
     
-    def process_transfer(self, transfer_request):
-        """Process a transfer between accounts in different databases"""
+    def process_transfer(self, transfer_request, validated=False, deadline=None):
+        """
+        Process a transfer between accounts in different databases.
+        
+        Pass validated=True for a request already normalized by
+        TransferRules.validate, to skip validating it again. Without a
+        deadline the transfer gets TRANSACTION_TIMEOUT seconds from now; past
+        it the transfer is rolled back and TimeoutException raised.
+        """
+        if deadline is None:
+            deadline = Deadline(self.config.TRANSACTION_TIMEOUT, 'transfer')
         
         # Generate transfer ID
         transfer_id = TransferLog.generate_transfer_id()
@@ -37,105 +59,89 @@ class TransferService:
         with TransactionLogger(transfer_id, "Transfer Processing"):
             try:
                 # Validate transfer request
-                self._validate_transfer_request(transfer_request)
-                
-                # Initialize distributed transaction manager
-                tx_manager = DistributedTransactionManager()
-                
-                # Begin distributed transaction
-                tx_manager.begin_distributed_transaction()
+                if not validated:
+                    transfer_request = self._validate_transfer_request(transfer_request)
                 
-                try:
-                    # Create transfer log entry
-                    transfer_log = self._create_transfer_log(transfer_id, transfer_request)
-                    
-                    # Process the transfer
-                    result = self._execute_transfer(
-                        tx_manager, transfer_log, transfer_request
-                    )
-                    
-                    # Commit distributed transaction
-                    tx_manager.commit_distributed_transaction()
-                    
-                    # Update transfer log status
-                    self._update_transfer_log_in_both_dbs(
-                        tx_manager, transfer_log.transfer_id, 'SUCCESS'
-                    )
+                # Lock conflicts rerun the whole distributed transaction under the same transfer_id
+                self.retry_policy.budget.deposit()
+                attempt = 1
+                while True:
+                    # Initialize distributed transaction manager
+                    tx_manager = DistributedTransactionManager(deadline)
                     
-                    log_transaction(transfer_id, "Transfer completed successfully")
-                    return result
+                    # Begin distributed transaction
+                    tx_manager.begin_distributed_transaction()
                     
-                except Exception as e:
-                    # Rollback distributed transaction
-                    tx_manager.rollback_distributed_transaction()
-                    
-                    # Update transfer log status
-                    self._update_transfer_log_in_both_dbs(
-                        tx_manager, transfer_log.transfer_id, 'ROLLBACK', str(e)
-                    )
-                    
-                    log_transaction(transfer_id, f"Transfer failed: {str(e)}", level='ERROR')
-                    raise TransferException(f"Transfer failed: {str(e)}")
+                    try:
+                        # Create transfer log entry
+                        transfer_log = self._create_transfer_log(transfer_id, transfer_request, attempt - 1)
+                        
+                        # Process the transfer
+                        result = self._execute_transfer(
+                            tx_manager, transfer_log, transfer_request, deadline
+                        )
+                        
+                        # Commit distributed transaction (transfer logs are committed as SUCCESS)
+                        tx_manager.commit_distributed_transaction()
+                        
+                        # Keep reads of both accounts on the primaries until replicas catch up
+                        record_write('source', transfer_request['from_account'])
+                        record_write('dest', transfer_request['to_account'])
+                        
+                        log_transaction(transfer_id, "Transfer completed successfully")
+                        return result
+                        
+                    except Exception as e:
+                        # Rollback distributed transaction
+                        tx_manager.rollback_distributed_transaction()
+                        
+                        retry = self.retry_policy.decide(e, attempt, tx_manager.commit_started, deadline)
+                        if retry is not None:
+                            log_transaction(transfer_id, f"Attempt {attempt} lost a lock conflict ({retry.reason}), "
+                                                         f"retrying in {retry.delay * 1000:.0f}ms", level='WARNING')
+                            time.sleep(retry.delay)
+                            attempt += 1
+                            continue
+                        
+                        # Update transfer log status
+                        self._update_transfer_log_in_both_dbs(
+                            tx_manager, transfer_id, 'ROLLBACK', str(e)
+                        )
+                        
+                        log_transaction(transfer_id, f"Transfer failed: {str(e)}", level='ERROR')
+                        timeout = deadline.timeout_error(e, 'transfer')
+                        if timeout is not None:
+                            raise timeout from e
+                        raise TransferException(f"Transfer failed: {str(e)}")
                 
             except Exception as e:
                 logger.error(f"Transfer processing error: {str(e)}")
                 raise
     
     def _validate_transfer_request(self, request):
-        """Validate transfer request"""
-        
-        # Check required fields
-        required_fields = ['from_account', 'to_account', 'amount', 'currency']
-        for field in required_fields:
-            if not request.get(field):
-                raise TransferException(f"Missing required field: {field}")
-        
-        # Check same account transfer
-        if request['from_account'] == request['to_account']:
-            raise SameAccountTransferException(request['from_account'])
-        
-        # Validate amount
-        amount = Decimal(str(request['amount']))
-        if amount <= 0:
-            raise TransferException("Transfer amount must be positive")
-        
-        if amount < self.min_transfer_amount:
-            raise TransferLimitExceededException(
-                'Minimum Transfer Amount',
-                self.min_transfer_amount,
-                amount
-            )
-        
-        if amount > self.max_transfer_amount:
-            raise TransferLimitExceededException(
-                'Maximum Transfer Amount',
-                self.max_transfer_amount,
-                amount
-            )
-        
-        # Validate currency
-        if request['currency'] != 'CNY':
-            raise CurrencyMismatchException(request['currency'], 'CNY')
+        """Validate transfer request, returning it with the amount as Decimal"""
+        return self.rules.check(request)
     
-    def _create_transfer_log(self, transfer_id, request):
+    def _create_transfer_log(self, transfer_id, request, retry_count=0):
         """Create transfer log entry"""
         transfer_log = TransferLog(
             transfer_id=transfer_id,
             from_account=request['from_account'],
             to_account=request['to_account'],
-            amount=Decimal(str(request['amount'])),
+            amount=request['amount'],
             currency=request['currency'],
-            status='PENDING'
+            status='PENDING',
+            retry_count=retry_count
         )
         
         return transfer_log
     
-    def _execute_transfer(self, tx_manager, transfer_log, request):
+    def _execute_transfer(self, tx_manager, transfer_log, request, deadline=None):
         """Execute the actual transfer"""
         
         from_account = request['from_account']
         to_account = request['to_account']
-        amount = Decimal(str(request['amount']))
+        amount = request['amount']
         reference = transfer_log.transfer_id
         
         # Get database sessions
@@ -143,8 +149,14 @@ class TransferService:
         dest_session = tx_manager.get_dest_session()
         
         # Initialize account services
-        source_account_service = AccountService(source_session)
-        dest_account_service = AccountService(dest_session)
+        source_account_service = AccountService(
+            source_session, get_restraint_index('source'), get_hot_account_registry('source'),
+            get_limit_profile_cache('source'), deadline=deadline
+        )
+        dest_account_service = AccountService(
+            dest_session, get_restraint_index('dest'), get_hot_account_registry('dest'),
+            get_limit_profile_cache('dest'), deadline=deadline
+        )
         
         # Step 1: Validate and lock source account
         log_transaction(reference, "Validating source account")
@@ -155,8 +167,9 @@ class TransferService:
         # Check transfer limits for source account
         source_account_service.check_transfer_limits(from_account, amount)
         
-        # Validate sufficient balance
-        source_account_service.validate_sufficient_balance(from_account, amount)
+        # Validate sufficient balance (the journal debit checks it when reserving)
+        if not self.journal_mode:
+            source_account_service.validate_sufficient_balance(from_account, amount)
         
         # Step 2: Validate destination account
         log_transaction(reference, "Validating destination account")
@@ -168,55 +181,84 @@ class TransferService:
         if not source_account.is_same_currency(dest_account.ACCT_CCY):
             raise CurrencyMismatchException(source_account.ACCT_CCY, dest_account.ACCT_CCY)
         
+        # Book on the source branch's business date (calendar lookup, no query)
+        value_date = self._value_date(source_account)
+        
         # Step 3: Add transfer log to both databases
         source_session.add(transfer_log)
-        dest_session.add(TransferLog(
+        dest_transfer_log = TransferLog(
             transfer_id=transfer_log.transfer_id,
             from_account=transfer_log.from_account,
             to_account=transfer_log.to_account,
             amount=transfer_log.amount,
             currency=transfer_log.currency,
-            status='PENDING'
-        ))
-        
-        # Step 4: Debit source account
-        log_transaction(reference, f"Debiting {amount} from {from_account}")
-        debit_result = source_account_service.debit_account(
-            from_account, amount, reference, 
-            f"Transfer to {to_account}"
-        )
-        
-        # Step 5: Credit destination account
-        log_transaction(reference, f"Crediting {amount} to {to_account}")
-        credit_result = dest_account_service.credit_account(
-            to_account, amount, reference,
-            f"Transfer from {from_account}"
+            status='PENDING',
+            retry_count=transfer_log.retry_count
         )
+        dest_session.add(dest_transfer_log)
         
-        # Step 6: Create transaction history records
-        self._create_transaction_history(
-            source_session, debit_result, reference, 'D'
-        )
+        if self.journal_mode:
+            # Steps 4-6: Reserve and journal the debit, journal the credit;
+            # the journal applier posts the balances and history rows
+            log_transaction(reference, f"Journaling {amount} from {from_account} to {to_account}")
+            debit_result = source_account_service.journal_debit(
+                source_account, amount, reference, f"Transfer to {to_account}"
+            )
+            credit_result = dest_account_service.journal_credit(
+                dest_account, amount, reference, f"Transfer from {from_account}"
+            )
+        else:
+            # Step 4: Debit source account
+            log_transaction(reference, f"Debiting {amount} from {from_account}")
+            debit_result = source_account_service.debit_account(
+                from_account, amount, reference, 
+                f"Transfer to {to_account}"
+            )
+            
+            # Step 5: Credit destination account
+            log_transaction(reference, f"Crediting {amount} to {to_account}")
+            credit_result = dest_account_service.credit_account(
+                to_account, amount, reference,
+                f"Transfer from {from_account}"
+            )
+            
+            # Step 6: Create transaction history records
+            self._create_transaction_history(
+                source_session, debit_result, reference, 'D'
+            )
+            
+            self._create_transaction_history(
+                dest_session, credit_result, reference, 'C'
+            )
         
-        self._create_transaction_history(
-            dest_session, credit_result, reference, 'C'
-        )
+        # Step 7: Mark both transfer logs successful in the same transaction
+        transfer_log.update_status('SUCCESS')
+        dest_transfer_log.update_status('SUCCESS')
         
         # Prepare result
         result = {
             'transfer_id': reference,
             'from_account': from_account,
             'to_account': to_account,
-            'amount': float(amount),
+            'amount': amount,
             'currency': request['currency'],
             'status': 'SUCCESS',
-            'source_new_balance': float(debit_result['new_balance']),
-            'dest_new_balance': float(credit_result['new_balance']),
+            'retry_count': transfer_log.retry_count,
+            'source_new_balance': debit_result['new_balance'],
+            'dest_new_balance': credit_result['new_balance'],
+            'value_date': value_date.isoformat() if value_date else None,
             'transaction_time': datetime.utcnow().isoformat()
         }
         
         return result
     
+    def _value_date(self, account):
+        """Get the business date of the account's branch, or None without a loaded calendar"""
+        business_calendar = get_business_calendar('source')
+        if business_calendar is None:
+            return None
+        return business_calendar.business_date(account.ACCT_BRANCH, datetime.utcnow().date())
+    
     def _create_transaction_history(self, session, account_result, reference, cr_dr_ind):
         """Create transaction history record"""
         
@@ -254,76 +296,84 @@ class TransferService:
         try:
             # Update in source database
             source_session = tx_manager.get_source_session()
-            source_log = source_session.query(TransferLog).filter(
-                TransferLog.transfer_id == transfer_id
-            ).first()
+            source_log = source_session.execute(
+                statements.TRANSFER_LOG_BY_ID, {'transfer_id': transfer_id}
+            ).scalars().first()
             if source_log:
                 source_log.update_status(status, error_message)
             
             # Update in destination database
             dest_session = tx_manager.get_dest_session()
-            dest_log = dest_session.query(TransferLog).filter(
-                TransferLog.transfer_id == transfer_id
-            ).first()
+            dest_log = dest_session.execute(
+                statements.TRANSFER_LOG_BY_ID, {'transfer_id': transfer_id}
+            ).scalars().first()
             if dest_log:
                 dest_log.update_status(status, error_message)
             
         except Exception as e:
             logger.error(f"Error updating transfer log status: {str(e)}")
     
-    def get_transfer_status(self, transfer_id):
+    def get_transfer_status(self, transfer_id, written_at=None):
         """Get transfer status by transfer ID"""
         try:
-            # Try to get from source database first
-            from app.database.connection import get_source_session
+            from app.database.connection import (
+                get_source_read_session, get_dest_read_session,
+                get_source_session, get_dest_session, is_replica_session
+            )
             
-            with get_source_session() as session:
-                transfer_log = session.query(TransferLog).filter(
-                    TransferLog.transfer_id == transfer_id
-                ).first()
-                
-                if transfer_log:
-                    return transfer_log.to_dict()
-                
-                # If not found in source, try destination database
-                from app.database.connection import get_dest_session
-                
-                with get_dest_session() as session:
-                    transfer_log = session.query(TransferLog).filter(
-                        TransferLog.transfer_id == transfer_id
+            # Try source database first, then destination
+            replica_used = False
+            for get_session in (get_source_read_session, get_dest_read_session):
+                with get_session(written_at=written_at) as session:
+                    row = session.execute(
+                        statements.TRANSFER_LOG_BY_ID_ROW, {'transfer_id': transfer_id}
                     ).first()
                     
-                    if transfer_log:
-                        return transfer_log.to_dict()
-                
-                return None
+                    if row:
+                        return TransferLogRecord._make(row).to_dict()
+                    replica_used = replica_used or is_replica_session(session)
+            
+            # A transfer the replicas have not received yet is still on the primaries
+            if replica_used:
+                for get_session in (get_source_session, get_dest_session):
+                    with get_session() as session:
+                        row = session.execute(
+                            statements.TRANSFER_LOG_BY_ID_ROW, {'transfer_id': transfer_id}
+                        ).first()
+                        
+                        if row:
+                            return TransferLogRecord._make(row).to_dict()
+            
+            return None
                 
         except Exception as e:
             logger.error(f"Error getting transfer status: {str(e)}")
             raise
     
-    def get_transfer_history(self, account_no, limit=10, offset=0):
+    def get_transfer_history(self, account_no, limit=10, offset=0, written_at=None):
         """Get transfer history for an account"""
         try:
             # This would need to query both databases and merge results
             # For now, we'll implement a basic version
-            from app.database.connection import get_source_session, get_dest_session
+            from app.database.connection import get_source_read_session, get_dest_read_session
             
             transfers = []
             
-            # Get transfers from source database (outgoing)
-            with get_source_session() as session:
-                source_transfers = session.query(TransferLog).filter(
-                    TransferLog.from_account == account_no
-                ).order_by(TransferLog.created_at.desc()).limit(limit).all()
-                transfers.extend([t.to_dict() for t in source_transfers])
-            
-            # Get transfers from destination database (incoming)
-            with get_dest_session() as session:
-                dest_transfers = session.query(TransferLog).filter(
-                    TransferLog.to_account == account_no
-                ).order_by(TransferLog.created_at.desc()).limit(limit).all()
-                transfers.extend([t.to_dict() for t in dest_transfers])
+            # Get transfers from source database (outgoing), then destination (incoming);
+            # an account with fewer rows left in a table continues in its archive
+            for get_session, statement, archive_name in (
+                    (get_source_read_session, statements.OUTGOING_TRANSFERS_ROWS, 'source'),
+                    (get_dest_read_session, statements.INCOMING_TRANSFERS_ROWS, 'dest')):
+                with get_session((account_no,), written_at) as session:
+                    records = [
+                        TransferLogRecord._make(row)
+                        for row in session.execute(statement, {'account_no': account_no, 'limit': limit})
+                    ]
+                
+                archive = get_segment_archive(archive_name)
+                if archive is not None and len(records) < limit:
+                    records.extend(archive.read('transfer_log', account_no, limit - len(records)))
+                transfers.extend(record.to_dict() for record in records)
             
             # Sort by created_at and apply limit
             transfers.sort(key=lambda x: x['created_at'], reverse=True)
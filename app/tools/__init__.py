@@ -0,0 +1,3 @@
+"""
+Operational command-line tools for the banking application
+"""
@@ -0,0 +1,90 @@
+"""
+Generate the account statements of a period with a process pool
+
+Run from cron on one host after month end, e.g. on the 2nd:
+
+    python -m app.tools.account_statements --month 2025-06
+    python -m app.tools.account_statements --from 2025-06-01 --to 2025-06-15 --database source --format text
+    python -m app.tools.account_statements --month 2025-06 --workers 16 --partitions 256 --json
+
+Statements are written under STATEMENT_DIR. Rerunning the same period
+resumes it: partitions that completed are skipped. Statements read the
+primaries, since they must include the last transfers of the period.
+"""
+
+import argparse
+import json
+import logging
+import sys
+from datetime import date, timedelta
+
+from app.config.settings import Config
+from app.services.account_statements import FORMATS, StatementGenerator, statement_period
+
+
+def _month(value):
+    first_day = date.fromisoformat(f'{value}-01')
+    next_month = (first_day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return first_day, next_month - timedelta(days=1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate account statements")
+    parser.add_argument('--month', type=_month, help='Statement month, YYYY-MM')
+    parser.add_argument('--from', dest='start', type=date.fromisoformat, help='First day of the period')
+    parser.add_argument('--to', dest='end', type=date.fromisoformat, help='Last day of the period')
+    parser.add_argument('--database', choices=('source', 'dest'), action='append',
+                        help='Database to generate statements for (default: both)')
+    parser.add_argument('--format', choices=FORMATS, action='append', help='Output format (default: csv)')
+    parser.add_argument('--workers', type=int, default=Config.STATEMENT_WORKERS, help='Worker processes')
+    parser.add_argument('--partitions', type=int, help='Account key ranges (default: 4 per worker)')
+    parser.add_argument('--json', action='store_true', help='Print the run summary as JSON')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    if args.month:
+        first_day, last_day = args.month
+    elif args.start and args.end:
+        first_day, last_day = args.start, args.end
+    else:
+        parser.error('give --month or both --from and --to')
+    since, until = statement_period(first_day, last_day)
+
+    from app.database import connection
+
+    # Connection settings come from the DB1_* / DB2_* environment variables
+    connection.init_databases(None)
+    targets = {
+        'source': (connection.get_source_session, connection.source_engine),
+        'dest': (connection.get_dest_session, connection.dest_engine)
+    }
+
+    failed = False
+    summaries = []
+    for name in args.database or ('source', 'dest'):
+        session_factory, engine = targets[name]
+        generator = StatementGenerator(
+            name, session_factory, Config.STATEMENT_DIR, engine=engine,
+            workers=args.workers, partitions=args.partitions,
+            fetch_rows=Config.STATEMENT_FETCH_ROWS, formats=args.format or ('csv',)
+        )
+        try:
+            summaries.append(generator.run(since, until))
+        except Exception as e:
+            logging.getLogger(__name__).error(f"Statements on {name} failed: {str(e)}")
+            failed = True
+
+    if args.json:
+        json.dump(summaries, sys.stdout, indent=2)
+        print()
+    else:
+        for s in summaries:
+            print(f"{s['database']:<6} {s['accounts']} accounts, {s['transactions']} transactions, "
+                  f"{s['bytes'] / 1024 / 1024:.1f} MB in {s['seconds']}s "
+                  f"({s['accounts_per_second']} accounts/s, {s['mb_per_second']} MB/s); "
+                  f"{s['skipped']} of {s['partitions']} partitions already done -> {s['directory']}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
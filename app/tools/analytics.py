@@ -0,0 +1,102 @@
+"""
+Export history to columnar files and run turnover reports over them
+
+Export closed days from cron on one host (reads the replica when one is
+configured), then run reports anywhere ANALYTICS_DIR is mounted; reports
+never connect to a database:
+
+    python -m app.tools.analytics export
+    python -m app.tools.analytics export --date 2025-07-06 --database source
+    python -m app.tools.analytics turnover --from 2025-07-01 --to 2025-07-06
+    python -m app.tools.analytics hourly --date 2025-07-06
+    python -m app.tools.analytics branches --from 2025-07-01 --to 2025-07-06
+    python -m app.tools.analytics clients --from 2025-07-01 --to 2025-07-06 --top 20 --json
+"""
+
+import argparse
+import json
+import logging
+import sys
+from datetime import date
+
+from app.config.settings import Config
+from app.services import analytics
+
+
+def _export(args):
+    from app.database.connection import (
+        init_databases, init_replicas, replica_sessions, get_source_session, get_dest_session
+    )
+
+    # Connection settings come from the DB1_* / DB2_* (and *_REPLICA_HOST) environment variables
+    init_databases(None)
+    init_replicas()
+    primaries = {'source': get_source_session, 'dest': get_dest_session}
+
+    failed = False
+    for name in args.database or ('source', 'dest'):
+        exporter = analytics.ColumnarExporter(
+            analytics.ColumnarStore(Config.ANALYTICS_DIR, name),
+            replica_sessions.get(name) or primaries[name],
+            chunk_rows=Config.ANALYTICS_CHUNK_ROWS,
+            max_backfill_days=Config.ANALYTICS_MAX_BACKFILL_DAYS
+        )
+        try:
+            if args.date:
+                exporter.export_day(args.date)
+            else:
+                exporter.run_due()
+        except Exception as e:
+            logging.getLogger(__name__).error(f"Analytics export on {name} failed: {str(e)}")
+            failed = True
+    return failed
+
+
+def _print(report, as_json, columns):
+    if as_json:
+        json.dump(report, sys.stdout, indent=2, default=str)
+        print()
+        return
+    print('  '.join(f'{column:>18}' for column in columns))
+    for row in report:
+        print('  '.join(f'{str(row[column]):>18}' for column in columns))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Columnar history export and turnover reports")
+    parser.add_argument('command', choices=('export', 'turnover', 'hourly', 'branches', 'clients'))
+    parser.add_argument('--database', choices=('source', 'dest'), action='append',
+                        help='Database to export or report on (default: both for export, source for reports)')
+    parser.add_argument('--date', type=date.fromisoformat, help='Day to export, or for the hourly report')
+    parser.add_argument('--from', dest='start', type=date.fromisoformat, help='First day of the report')
+    parser.add_argument('--to', dest='end', type=date.fromisoformat, help='Last day of the report')
+    parser.add_argument('--top', type=int, default=20, help='Rows of the branch and client reports')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    if args.command == 'export':
+        return 1 if _export(args) else 0
+
+    store = analytics.ColumnarStore(Config.ANALYTICS_DIR, (args.database or ['source'])[0])
+    if args.command == 'turnover':
+        report = analytics.daily_turnover(store, args.start, args.end)
+        columns = ('date', 'credits', 'debits', 'turnover', 'transactions')
+    elif args.command == 'hourly':
+        if args.date is None:
+            parser.error('hourly needs --date')
+        report = analytics.hourly_turnover(store, args.date)
+        columns = ('hour', 'turnover', 'transactions')
+    elif args.command == 'branches':
+        report = analytics.branch_volume(store, args.start, args.end, top=args.top)
+        columns = ('branch', 'credits', 'debits', 'turnover', 'transactions')
+    else:
+        report = analytics.client_aggregates(store, args.start, args.end, top=args.top)
+        columns = ('client_no', 'credits', 'debits', 'turnover', 'transactions')
+
+    _print(report, args.json, columns)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
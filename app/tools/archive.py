@@ -0,0 +1,75 @@
+"""
+Move rb_tran_hist and transfer_log rows past retention into segment files
+
+Run from a scheduler on one host with ARCHIVE_DIR shared with the API
+servers, e.g. nightly from cron:
+
+    python -m app.tools.archive
+    python -m app.tools.archive --database source --table rb_tran_hist --max-days 30
+
+Each run archives up to --max-days of the oldest days older than
+ARCHIVE_RETENTION_DAYS per database and table, deleting them from MySQL in
+throttled batches (ARCHIVE_DELETE_BATCH_SIZE rows, ARCHIVE_DELETE_PAUSE
+seconds apart). --list shows what is already archived.
+"""
+
+import argparse
+import logging
+import sys
+
+from app.config.settings import Config
+from app.services.archive import ARCHIVED_TABLES, Archiver, SegmentArchive, read_segment_index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archive history past retention into segment files")
+    parser.add_argument('--database', choices=('source', 'dest'), action='append',
+                        help='Database to archive (default: both)')
+    parser.add_argument('--table', choices=sorted(ARCHIVED_TABLES), action='append',
+                        help='Table to archive (default: both)')
+    parser.add_argument('--max-days', type=int, default=Config.ARCHIVE_MAX_DAYS_PER_RUN,
+                        help='Days to archive per database and table')
+    parser.add_argument('--list', action='store_true', help='List archived days instead of archiving')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    databases = args.database or ('source', 'dest')
+    tables = args.table or tuple(ARCHIVED_TABLES)
+    archives = {
+        name: SegmentArchive(name, Config.ARCHIVE_DIR, block_rows=Config.ARCHIVE_BLOCK_ROWS)
+        for name in databases
+    }
+
+    if args.list:
+        for name, archive in archives.items():
+            for table in tables:
+                for day, paths in sorted(archive.segments(table).items()):
+                    rows = sum(read_segment_index(path).rows for path in paths)
+                    print(f"{name:<6} {table:<13} {day}  {rows:>9} rows  {len(paths)} part(s)")
+        return 0
+
+    from app.database.connection import init_databases, get_source_session, get_dest_session
+
+    # Connection settings come from the DB1_* / DB2_* environment variables
+    init_databases(None)
+    session_factories = {'source': get_source_session, 'dest': get_dest_session}
+
+    failed = False
+    for name, archive in archives.items():
+        archiver = Archiver(
+            name, session_factories[name], archive,
+            retention_days=Config.ARCHIVE_RETENTION_DAYS,
+            delete_batch_size=Config.ARCHIVE_DELETE_BATCH_SIZE,
+            delete_pause=Config.ARCHIVE_DELETE_PAUSE,
+            max_days=args.max_days
+        )
+        try:
+            archiver.run_due(tables=tables)
+        except Exception as e:
+            logging.getLogger(__name__).error(f"Archival on {name} failed: {str(e)}")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""
+Build end-of-day balance snapshots from a scheduler
+
+The background snapshot job is off in the API workers, since each gunicorn
+worker would otherwise run its own copy against the primaries. Schedule this
+instead, e.g. every 15 minutes from cron on one host:
+
+    python -m app.tools.balance_snapshots
+    python -m app.tools.balance_snapshots --date 2025-07-06
+
+Without --date it builds every closed day not built yet on both databases,
+the same as one round of the background job; with --date it rebuilds that
+day. Batch size, settle delay, retention and backfill come from the
+BALANCE_SNAPSHOT_* settings.
+"""
+
+import argparse
+import logging
+import sys
+from datetime import date
+
+from app.config.settings import Config
+from app.services.balance_snapshots import BalanceSnapshotJob
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build end-of-day balance snapshots")
+    parser.add_argument('--date', type=date.fromisoformat, help='Rebuild one UTC day (YYYY-MM-DD)')
+    parser.add_argument('--database', choices=('source', 'dest'), action='append',
+                        help='Database to build (default: both)')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    from app.database.connection import init_databases, get_source_session, get_dest_session
+
+    # Connection settings come from the DB1_* / DB2_* environment variables
+    init_databases(None)
+    session_factories = {'source': get_source_session, 'dest': get_dest_session}
+
+    failed = False
+    for name in args.database or ('source', 'dest'):
+        job = BalanceSnapshotJob(
+            name,
+            session_factories[name],
+            batch_size=Config.BALANCE_SNAPSHOT_BATCH_SIZE,
+            settle_seconds=Config.BALANCE_SNAPSHOT_SETTLE_SECONDS,
+            retention_days=Config.BALANCE_SNAPSHOT_RETENTION_DAYS,
+            max_backfill_days=Config.BALANCE_SNAPSHOT_MAX_BACKFILL_DAYS
+        )
+        try:
+            if args.date:
+                job.build(args.date)
+            else:
+                job.run_due()
+        except Exception as e:
+            logging.getLogger(__name__).error(f"Balance snapshot build on {name} failed: {str(e)}")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
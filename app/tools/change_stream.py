@@ -0,0 +1,87 @@
+"""
+Publish the binlog change streams of both databases to Redis
+
+Run one publisher per database, next to the API:
+
+    python -m app.tools.change_stream
+    python -m app.tools.change_stream --database source --reset
+
+Committed row changes of the banking tables are appended as JSON entries to
+the Redis streams ``<CHANGE_STREAM_REDIS_PREFIX>:<database>``, for caches and
+derived indexes outside the API processes to consume with XREAD. The binlog
+position is checkpointed under CHANGE_STREAM_DIR after every batch, so a
+restarted publisher resumes where it stopped; a ``reset`` entry tells
+consumers to rebuild when the position was lost or --reset was given.
+"""
+
+import argparse
+import logging
+import os
+import signal
+import sys
+import threading
+
+from app.config.settings import Config
+from app.services.change_stream import BinLogStreamReader, ChangeStream, FileCheckpoint, RedisChangePublisher
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Publish binlog change streams to Redis")
+    parser.add_argument('--database', choices=('source', 'dest'), action='append',
+                        help='Database to publish (default: both)')
+    parser.add_argument('--reset', action='store_true', help='Forget the checkpoints and start at the binlog end')
+    parser.add_argument('--once', action='store_true', help='Publish what is in the binlog now and exit')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    logger = logging.getLogger(__name__)
+
+    if BinLogStreamReader is None:
+        logger.error("mysql-replication is not installed")
+        return 1
+
+    import redis
+    from app.database import connection
+
+    # Connection settings come from the DB1_* / DB2_* environment variables
+    connection.init_databases(None)
+    engines = {'source': connection.source_engine, 'dest': connection.dest_engine}
+    redis_client = redis.Redis(host=Config.REDIS_HOST, port=Config.REDIS_PORT, password=Config.REDIS_PASSWORD)
+
+    streams = []
+    for name in args.database or ('source', 'dest'):
+        checkpoint = FileCheckpoint(os.path.join(Config.CHANGE_STREAM_DIR, f'{name}.json'))
+        if args.reset:
+            checkpoint.clear()
+        stream = ChangeStream(
+            name, engines[name], Config.CHANGE_STREAM_SERVER_ID, checkpoint=checkpoint,
+            poll_interval=Config.CHANGE_STREAM_POLL_INTERVAL, batch_size=Config.CHANGE_STREAM_BATCH_SIZE
+        )
+        stream.subscribe(RedisChangePublisher(
+            redis_client, f'{Config.CHANGE_STREAM_REDIS_PREFIX}:{name}', maxlen=Config.CHANGE_STREAM_REDIS_MAXLEN
+        ))
+        streams.append(stream)
+
+    if args.once:
+        failed = False
+        for stream in streams:
+            try:
+                stream.poll()
+                print(stream.stats())
+            except Exception as e:
+                logger.error(f"Publishing {stream.name} failed: {str(e)}")
+                failed = True
+        return 1 if failed else 0
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stop.set())
+    for stream in streams:
+        stream.start()
+    stop.wait()
+    for stream in streams:
+        stream.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
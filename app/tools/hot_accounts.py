@@ -0,0 +1,59 @@
+"""
+Put accounts in hot mode or fold their balance slots by hand
+
+Accounts are also marked hot automatically by lock-wait detection in the API
+workers and their slots folded periodically; use this for a merchant known
+to be busy ahead of time, or to fold slots before a reconciliation run:
+
+    python -m app.tools.hot_accounts mark --db source 6230399991006371427 --slots 8
+    python -m app.tools.hot_accounts compact --db source
+
+Without --slots an account gets HOT_ACCOUNT_DEFAULT_SLOTS slots.
+"""
+
+import argparse
+import logging
+import sys
+
+from app.config.settings import Config
+from app.services.hot_accounts import HotAccountRegistry
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage hot-account mode")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    mark = subparsers.add_parser('mark', help='Put an account in hot mode')
+    mark.add_argument('account_no')
+    mark.add_argument('--db', choices=('source', 'dest'), required=True)
+    mark.add_argument('--slots', type=int, help='Balance slots (default: HOT_ACCOUNT_DEFAULT_SLOTS)')
+
+    compact = subparsers.add_parser('compact', help='Fold all hot-account slots now')
+    compact.add_argument('--db', choices=('source', 'dest'), required=True)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    logger = logging.getLogger(__name__)
+
+    from app.database.connection import init_databases, get_source_session, get_dest_session
+
+    # Connection settings come from the DB1_* / DB2_* environment variables
+    init_databases(None)
+    session_factory = get_source_session if args.db == 'source' else get_dest_session
+    registry = HotAccountRegistry(args.db, session_factory, default_slots=Config.HOT_ACCOUNT_DEFAULT_SLOTS)
+
+    try:
+        if args.command == 'mark':
+            result = registry.mark_hot(args.account_no, args.slots)
+            logger.info(f"Account {args.account_no} is hot in {args.db} with {result['slot_count']} slots")
+        else:
+            registry.refresh()
+            logger.info(f"Compacted {registry.compact()} hot accounts in {args.db}")
+    except Exception as e:
+        logger.error(f"Hot account {args.command} on {args.db} failed: {str(e)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""
+Post journal entries to the account balances
+
+With LEDGER_MODE=journal, transfers append rb_acct_journal entries and one
+applier per database folds them into rb_acct_balance and rb_tran_hist. Run
+it as a long-lived process on one host (a second one only waits on the
+position lock):
+
+    python -m app.tools.ledger_applier
+    python -m app.tools.ledger_applier --database source
+    python -m app.tools.ledger_applier --once
+
+--once posts everything committed so far and exits, e.g. before switching
+LEDGER_MODE back to balance. Batch size, poll interval and gap timeout come
+from the LEDGER_* settings.
+"""
+
+import argparse
+import logging
+import signal
+import sys
+import threading
+
+from app.config.settings import Config
+from app.database import statements
+from app.services.ledger import create_journal_applier
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Post journal entries to the account balances")
+    parser.add_argument('--database', choices=('source', 'dest'), action='append',
+                        help='Database to apply (default: both)')
+    parser.add_argument('--once', action='store_true', help='Apply what is committed and exit')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    logger = logging.getLogger(__name__)
+
+    from app.database.connection import init_databases, get_source_session, get_dest_session
+
+    # Connection settings come from the DB1_* / DB2_* environment variables
+    init_databases(None)
+    session_factories = {'source': get_source_session, 'dest': get_dest_session}
+    settings = {name: getattr(Config, name) for name in dir(Config) if name.startswith('LEDGER_')}
+    appliers = [
+        create_journal_applier(name, session_factories[name], settings)
+        for name in args.database or ('source', 'dest')
+    ]
+
+    if args.once:
+        failed = False
+        for applier in appliers:
+            try:
+                applied = applier.drain()
+                with applier.session_factory() as session:
+                    last_id = session.execute(statements.JOURNAL_LAST_ID).scalar()
+                logger.info(f"Journal {applier.name}: applied {applied} entries, "
+                            f"position {applier.last_journal_id} of {last_id}")
+            except Exception as e:
+                logger.error(f"Journal applier on {applier.name} failed: {str(e)}")
+                failed = True
+        return 1 if failed else 0
+
+    # One thread per database; SIGTERM and SIGINT stop them after the current batch
+    for applier in appliers:
+        applier.start()
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopped.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stopped.set())
+    stopped.wait()
+    for applier in appliers:
+        applier.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,286 @@
+"""
+Cross-database transfer reconciliation with hash-tree diffing
+
+Every transfer writes a transfer_log row in both databases, and a successful
+one adds a 'D' rb_tran_hist row in the source and a 'C' row in the
+destination, all keyed by the transfer id (rb_tran_hist.REFERENCE).
+Transfer ids are TRF followed by the UTC creation time to the second, so an
+id prefix is a time partition of every one of those tables and an index
+range scan.
+
+A day is checked by comparing partition digests rather than rows. Each
+database sums a CRC32 per row of (transfer id, amount in cents, status) for
+transfer_log and of (REFERENCE, amount in cents, direction) for
+rb_tran_hist, grouped by partition. The aggregation runs inside the
+database, so an hour of any size comes back as one row per table. Sums do
+not depend on row order and, unlike XOR, duplicated rows do not cancel out.
+Destination credits are hashed as the mirror of source debits, so matching
+legs give equal digests.
+
+A partition is split further when the two databases disagree, or when
+either side does not add up on its own: its SUCCESS transfers must match its
+history legs in count and amount, which catches a transfer missing both
+legs. Mismatching hours are split into minutes, those into seconds, and
+only the mismatching seconds are compared row by row to name the discrepant
+transfer ids. Digest queries run on a thread pool, one hour per task at the
+top level, so both servers scan in parallel.
+
+    python -m app.tools.reconcile 2025-07-07
+    python -m app.tools.reconcile 2025-07-07 --workers 16 --json > report.json
+"""
+
+import argparse
+import json
+import sys
+import time
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from decimal import Decimal
+
+from app.database import statements
+
+TRANSFER_ID_PREFIX = 'TRF'
+
+LEVELS = ('hour', 'minute', 'second')
+
+SIDES = ('source', 'dest')
+
+PartitionDigest = namedtuple('PartitionDigest', [
+    'log_rows', 'log_hash', 'success_rows', 'success_cents',
+    'history_rows', 'history_hash', 'history_cents'
+])
+
+EMPTY_DIGEST = PartitionDigest(0, 0, 0, 0, 0, 0, 0)
+
+# History leg expected on each side, and the issue names used for it
+_LEGS = {'source': ('D', 'DEBIT'), 'dest': ('C', 'CREDIT')}
+
+
+def partition_bounds(prefix):
+    """Key range [low, high) of the transfer ids starting with a prefix"""
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def hour_partitions(day):
+    """Transfer id prefixes of the 24 hours of a UTC day"""
+    return [f"{TRANSFER_ID_PREFIX}{day.strftime('%Y%m%d')}{hour:02d}" for hour in range(24)]
+
+
+def partitions_differ(source, dest):
+    """Check if a partition needs a closer look"""
+    if (source.log_rows, source.log_hash, source.history_rows, source.history_hash) != \
+            (dest.log_rows, dest.log_hash, dest.history_rows, dest.history_hash):
+        return True
+    return any(
+        (digest.success_rows, digest.success_cents) != (digest.history_rows, digest.history_cents)
+        for digest in (source, dest)
+    )
+
+
+def _amount(cents):
+    return Decimal(cents).scaleb(-2) if cents is not None else None
+
+
+def transfer_issues(source_log, dest_log, source_legs, dest_legs):
+    """
+    List what is wrong with one transfer.
+
+    Logs are (cents, status) or None; legs are lists of (cents, direction,
+    seq_no). A transfer with SUCCESS on either side needs exactly one leg of
+    the logged amount on each side; any other transfer needs none.
+    """
+    issues = []
+    if source_log is None:
+        issues.append('MISSING_SOURCE_LOG')
+    if dest_log is None:
+        issues.append('MISSING_DEST_LOG')
+    if source_log is not None and dest_log is not None:
+        if source_log[0] != dest_log[0]:
+            issues.append('AMOUNT_MISMATCH')
+        if source_log[1] != dest_log[1]:
+            issues.append('STATUS_MISMATCH')
+
+    logs = [log for log in (source_log, dest_log) if log is not None]
+    succeeded = any(status == 'SUCCESS' for _, status in logs)
+    cents = logs[0][0] if logs else None
+
+    for side, legs in (('source', source_legs), ('dest', dest_legs)):
+        direction, leg = _LEGS[side]
+        if any(d != direction for _, d, _ in legs):
+            issues.append(f'{side.upper()}_WRONG_DIRECTION')
+        legs = [l for l in legs if l[1] == direction]
+        if not succeeded:
+            if legs:
+                issues.append(f'UNEXPECTED_{leg}')
+        elif not legs:
+            issues.append(f'MISSING_{leg}')
+        elif len(legs) > 1:
+            issues.append(f'DUPLICATE_{leg}')
+        elif cents is not None and legs[0][0] != cents:
+            issues.append(f'{leg}_AMOUNT_MISMATCH')
+
+    return issues
+
+
+class Reconciler:
+    """Compares transfer records of the source and destination databases"""
+
+    def __init__(self, source_session_factory, dest_session_factory, workers=8):
+        self.session_factories = {'source': source_session_factory, 'dest': dest_session_factory}
+        self.workers = workers
+
+    def _query(self, side, statement, prefix):
+        low, high = partition_bounds(prefix)
+        with self.session_factories[side]() as session:
+            return session.execute(statement, {'low': low, 'high': high}).all()
+
+    def _run(self, executor, tasks):
+        """Run (side, statement, prefix) queries in parallel, returning rows per task"""
+        futures = [executor.submit(self._query, *task) for task in tasks]
+        return [future.result() for future in futures]
+
+    def _digests(self, executor, parents, length):
+        """Digests of the child partitions of parents, per side"""
+        tasks = [
+            (side, statement, prefix)
+            for side in SIDES
+            for statement in (statements.RECONCILE_LOG_DIGESTS[length],
+                              statements.RECONCILE_HISTORY_DIGESTS[side][length])
+            for prefix in parents
+        ]
+        results = iter(self._run(executor, tasks))
+
+        digests = {}
+        for side in SIDES:
+            logs, history = {}, {}
+            for target in (logs, history):
+                for _ in parents:
+                    for row in next(results):
+                        target[row[0]] = tuple(int(value or 0) for value in row[1:])
+            digests[side] = {
+                partition: PartitionDigest(*logs.get(partition, (0, 0, 0, 0)), *history.get(partition, (0, 0, 0)))
+                for partition in set(logs) | set(history)
+            }
+        return digests['source'], digests['dest']
+
+    def _compare_rows(self, executor, prefixes):
+        """Compare the rows of the given partitions, returning the discrepancies"""
+        tasks = [
+            (side, statement, prefix)
+            for side in SIDES
+            for statement in (statements.RECONCILE_LOG_ROWS, statements.RECONCILE_HISTORY_ROWS)
+            for prefix in prefixes
+        ]
+        results = iter(self._run(executor, tasks))
+
+        logs = {side: {} for side in SIDES}
+        legs = {side: defaultdict(list) for side in SIDES}
+        for side in SIDES:
+            for _ in prefixes:
+                for transfer_id, cents, status in next(results):
+                    logs[side][transfer_id] = (int(cents), status)
+            for _ in prefixes:
+                for reference, cents, direction, seq_no in next(results):
+                    legs[side][reference].append((int(cents), direction, seq_no))
+
+        transfer_ids = set()
+        for side in SIDES:
+            transfer_ids.update(logs[side], legs[side])
+
+        discrepancies = []
+        for transfer_id in sorted(transfer_ids):
+            issues = transfer_issues(
+                logs['source'].get(transfer_id), logs['dest'].get(transfer_id),
+                legs['source'].get(transfer_id, []), legs['dest'].get(transfer_id, [])
+            )
+            if issues:
+                discrepancies.append({
+                    'transfer_id': transfer_id,
+                    'issues': issues,
+                    **{side: self._describe(logs[side].get(transfer_id), legs[side].get(transfer_id, []))
+                       for side in SIDES}
+                })
+        return discrepancies
+
+    @staticmethod
+    def _describe(log, legs):
+        return {
+            'log': {'amount': _amount(log[0]), 'status': log[1]} if log is not None else None,
+            'legs': [{'seq_no': seq_no, 'amount': _amount(cents), 'direction': direction}
+                     for cents, direction, seq_no in legs]
+        }
+
+    def reconcile(self, day):
+        """Reconcile the transfers of one UTC day"""
+        started = time.monotonic()
+        partitions = {}
+        parents = hour_partitions(day)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for level, length in zip(LEVELS, statements.RECONCILE_PARTITION_LENGTHS):
+                source, dest = self._digests(executor, parents, length)
+                children = sorted(set(source) | set(dest))
+                parents = [
+                    child for child in children
+                    if partitions_differ(source.get(child, EMPTY_DIGEST), dest.get(child, EMPTY_DIGEST))
+                ]
+                partitions[level] = {'checked': len(children), 'mismatched': len(parents)}
+                if not parents:
+                    break
+
+            discrepancies = self._compare_rows(executor, parents) if parents else []
+
+        return {
+            'date': day.isoformat(),
+            'partitions': partitions,
+            'discrepancies': discrepancies,
+            'seconds': round(time.monotonic() - started, 3)
+        }
+
+
+def format_report(report):
+    """Render the report as text"""
+    lines = [f"Reconciliation of {report['date']} in {report['seconds']}s"]
+    for level in LEVELS:
+        counts = report['partitions'].get(level)
+        if counts:
+            lines.append(f"  {level:<7} partitions: {counts['checked']:>6} checked, {counts['mismatched']:>6} mismatched")
+
+    lines.append('')
+    if not report['discrepancies']:
+        lines.append('No discrepancies')
+    for discrepancy in report['discrepancies']:
+        lines.append(f"{discrepancy['transfer_id']}  {', '.join(discrepancy['issues'])}")
+        for side in SIDES:
+            log = discrepancy[side]['log']
+            logged = f"{log['amount']} {log['status']}" if log else 'no log'
+            legs = ' '.join(f"{leg['direction']} {leg['amount']} ({leg['seq_no']})" for leg in discrepancy[side]['legs'])
+            lines.append(f"    {side:<6} {logged}; legs: {legs or 'none'}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reconcile transfers between the source and destination databases")
+    parser.add_argument('date', type=date.fromisoformat, help='UTC day to check (YYYY-MM-DD)')
+    parser.add_argument('--workers', type=int, default=8, help='Concurrent digest queries')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args(argv)
+
+    from app.database.connection import init_databases, get_source_session, get_dest_session
+
+    # Connection settings come from the DB1_* / DB2_* environment variables
+    init_databases(None)
+    report = Reconciler(get_source_session, get_dest_session, workers=args.workers).reconcile(args.date)
+
+    if args.json:
+        json.dump(report, sys.stdout, indent=2, default=str)
+        print()
+    else:
+        print(format_report(report))
+    # Non-zero exit for discrepancies, so schedulers can alert on it
+    return 1 if report['discrepancies'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
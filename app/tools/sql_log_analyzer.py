@@ -0,0 +1,681 @@
+"""
+Streaming analyzer for distributed SQL proxy logs
+
+Reads proxy execution logs in the format of "deposit SQL.txt":
+
+    [2025-07-07 16:26:48 504101] INFO topic=...&tid=21380&con=0xfffc60540000&...
+        &sql_chop=SELECT%20...&autocommit=0&...&event_timecost=0.179&timecost=0.655
+
+and reports:
+
+- latency percentiles per SQL fingerprint (URL-decoded, literals replaced by ?)
+- the slowest transactions per connection with their critical path: the
+  statements and client-side gaps that make up most of the transaction time
+- lock-wait suspects: locking statements that took far longer than usual for
+  their fingerprint, with the transactions that held locks on the same table
+  at that time
+
+Memory stays constant in the file size. Latencies go into log-bucketed
+histograms, only the top-N transactions and suspects are kept, and only
+transactions still open on a connection are buffered. Uncompressed files are
+split into line-aligned byte ranges and parsed on several processes. The
+per-connection transaction fragments at chunk edges are stitched back
+together in file order. timecost and event_timecost are taken to be
+milliseconds. The log timestamp marks the end of the statement.
+
+    python -m app.tools.sql_log_analyzer "deposit SQL.txt"
+    python -m app.tools.sql_log_analyzer /data/proxy/*.log --workers 8 --json > report.json
+"""
+
+import argparse
+import gzip
+import hashlib
+import heapq
+import itertools
+import json
+import math
+import os
+import re
+import sys
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from urllib.parse import unquote
+
+LINE_PATTERN = re.compile(r'\[(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d) (\d{6})\] \w+ (.*)')
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'?")
+_NUMBER_LITERAL = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?(?:e[+-]?\d+)?\b')
+_HEX_LITERAL = re.compile(r'\b0x[0-9a-f]+\b')
+_WHITESPACE = re.compile(r'\s+')
+_IN_LIST = re.compile(r'\bin\s*\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_VALUES_LIST = re.compile(r'\bvalues\s*(\([^()]*\))(?:\s*,\s*\([^()]*\))+')
+_LOCKING_TABLE = re.compile(
+    r'^(?:update\s+(?:low_priority\s+|ignore\s+)*|insert\s+(?:ignore\s+)?into\s+|'
+    r'replace\s+into\s+|delete\s+from\s+)`?([\w.]+)'
+)
+_FROM_TABLE = re.compile(r'\bfrom\s+`?([\w.]+)')
+
+BOUNDARY_COMMIT = 'commit'
+BOUNDARY_ROLLBACK = 'rollback'
+BOUNDARY_BEGIN = 'begin'
+
+DEFAULT_CHUNK_SIZE = 64 * 1024 * 1024
+
+
+def fingerprint_sql(sql, chopped=False):
+    """Normalize a statement so executions with different literals share one fingerprint"""
+    text = _WHITESPACE.sub(' ', sql).strip().lower()
+    text = _STRING_LITERAL.sub('?', text)
+    text = _HEX_LITERAL.sub('?', text)
+    text = _NUMBER_LITERAL.sub('?', text)
+    text = _IN_LIST.sub('in (?+)', text)
+    text = _VALUES_LIST.sub(r'values \1 /*+*/', text)
+    text = text.rstrip(' ;')
+    if chopped:
+        # The proxy cuts long statements at a fixed size; drop the partial token
+        # so chops at different offsets of the same statement still match
+        cut = max(text.rfind(' '), text.rfind(','))
+        if cut > 0 and not text.endswith('?'):
+            text = text[:cut].rstrip(' ,')
+        text += ' /*chopped*/'
+    return text
+
+
+def fingerprint_id(fingerprint):
+    return hashlib.blake2b(fingerprint.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def classify_statement(fingerprint):
+    """Return (boundary, locking table) for a normalized statement"""
+    if fingerprint in (BOUNDARY_COMMIT, 'commit work'):
+        return BOUNDARY_COMMIT, None
+    if fingerprint in (BOUNDARY_ROLLBACK, 'rollback work'):
+        return BOUNDARY_ROLLBACK, None
+    if fingerprint in (BOUNDARY_BEGIN, 'start transaction'):
+        return BOUNDARY_BEGIN, None
+
+    match = _LOCKING_TABLE.match(fingerprint)
+    if match:
+        return None, match.group(1)
+    if fingerprint.startswith('select') and (' for update' in fingerprint or ' lock in share mode' in fingerprint):
+        match = _FROM_TABLE.search(fingerprint)
+        return None, match.group(1) if match else '?'
+    return None, None
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram (about 1% relative error) that merges across processes"""
+
+    GROWTH = 1.02
+    MINIMUM = 0.001
+    _LOG_GROWTH = math.log(GROWTH)
+
+    def __init__(self):
+        self.buckets = Counter()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        index = -1 if value < self.MINIMUM else int(math.log(value / self.MINIMUM) / self._LOG_GROWTH)
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        self.buckets.update(other.buckets)
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, pct):
+        if not self.count:
+            return None
+        if pct >= 100:
+            return self.max
+        rank = max(1, math.ceil(pct / 100.0 * self.count))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                if index < 0:
+                    return 0.0
+                return min(self.max, self.MINIMUM * self.GROWTH ** (index + 0.5))
+        return self.max
+
+
+class Statement(namedtuple('Statement', ['end_us', 'timecost', 'event_timecost', 'fid', 'table', 'tid'])):
+    """One executed statement; table is set for statements that take row locks"""
+
+    __slots__ = ()
+
+    @property
+    def start_us(self):
+        return self.end_us - int(self.timecost * 1000)
+
+
+class LogParser:
+    """Parses proxy log lines into entries, caching timestamp conversion per second"""
+
+    def __init__(self):
+        self._seconds = {}
+
+    def _epoch_us(self, second, micros):
+        base = self._seconds.get(second)
+        if base is None:
+            if len(self._seconds) > 100000:
+                self._seconds.clear()
+            base = int(datetime.strptime(second, '%Y-%m-%d %H:%M:%S').timestamp()) * 1000000
+            self._seconds[second] = base
+        return base + int(micros)
+
+    def parse(self, line):
+        """Return a dict of fields plus end_us/sql/chopped, or None for malformed lines"""
+        match = LINE_PATTERN.match(line)
+        if not match:
+            return None
+
+        fields = {}
+        for part in match.group(3).split('&'):
+            key, sep, value = part.partition('=')
+            if sep:
+                fields[key] = value
+
+        sql = fields.get('sql')
+        chopped = False
+        if sql is None:
+            sql = fields.get('sql_chop')
+            chopped = True
+        if sql is None:
+            return None
+
+        try:
+            fields['timecost'] = float(fields.get('timecost', 0))
+            fields['event_timecost'] = float(fields.get('event_timecost', 0))
+        except ValueError:
+            return None
+
+        fields['end_us'] = self._epoch_us(match.group(1), match.group(2))
+        fields['sql'] = unquote(sql)
+        fields['chopped'] = chopped
+        return fields
+
+
+def summarize_transaction(connection, statements, partial=False, path_limit=10):
+    """Span, database and idle time, lock hold time and critical path of one transaction"""
+    statements = sorted(statements, key=lambda s: s.end_us)
+    start = min(s.start_us for s in statements)
+    end = max(s.end_us for s in statements)
+    span_ms = (end - start) / 1000.0
+    db_ms = sum(s.timecost for s in statements)
+
+    lock_starts = [s.start_us for s in statements if s.table]
+    lock_start = min(lock_starts) if lock_starts else None
+
+    # Each step is a statement plus the client-side gap before it
+    steps = []
+    previous_end = start
+    for position, s in enumerate(statements):
+        gap_ms = max(0.0, (s.start_us - previous_end) / 1000.0)
+        steps.append({
+            'position': position,
+            'offset_ms': round((s.start_us - start) / 1000.0, 3),
+            'fingerprint': s.fid,
+            'timecost_ms': s.timecost,
+            'gap_before_ms': round(gap_ms, 3),
+            'locks': s.table
+        })
+        previous_end = max(previous_end, s.end_us)
+
+    critical = sorted(steps, key=lambda step: step['timecost_ms'] + step['gap_before_ms'], reverse=True)
+    critical = sorted(critical[:path_limit], key=lambda step: step['position'])
+
+    return {
+        'connection': connection,
+        'tid': statements[0].tid,
+        'start': datetime.fromtimestamp(start / 1000000.0).isoformat(),
+        'start_us': start,
+        'end_us': end,
+        'span_ms': round(span_ms, 3),
+        'db_ms': round(db_ms, 3),
+        'idle_ms': round(max(0.0, span_ms - db_ms), 3),
+        'statements': len(statements),
+        'lock_hold_ms': round((end - lock_start) / 1000.0, 3) if lock_start is not None else 0.0,
+        'lock_start_us': lock_start,
+        'locked_tables': sorted({s.table for s in statements if s.table}),
+        'partial': partial,
+        'critical_path': critical
+    }
+
+
+class _TopN:
+    """Bounded collection of the N largest items by key"""
+
+    def __init__(self, n):
+        self.n = n
+        self.heap = []
+        self._counter = itertools.count()
+
+    def push(self, key, item):
+        entry = (key, next(self._counter), item)
+        if len(self.heap) < self.n:
+            heapq.heappush(self.heap, entry)
+        elif key > self.heap[0][0]:
+            heapq.heapreplace(self.heap, entry)
+
+    def items(self):
+        return [item for _, _, item in sorted(self.heap, key=lambda e: (e[0], -e[1]), reverse=True)]
+
+
+class ChunkAnalyzer:
+    """Accumulates statistics for a sequence of log lines"""
+
+    def __init__(self, top=20, lock_wait_ms=50.0, path_limit=10):
+        self.top = top
+        self.lock_wait_ms = lock_wait_ms
+        self.path_limit = path_limit
+        self.parser = LogParser()
+
+        self.lines = 0
+        self.malformed = 0
+        self.statements = 0
+        self.transactions = 0
+        self.first_us = None
+        self.last_us = None
+
+        self.histograms = {}
+        self.samples = {}
+        self.fingerprint_cache = {}
+        # Per connection: statements before the first boundary in this chunk, and whether one was seen
+        self.heads = {}
+        self.open = {}
+        self.slow_transactions = _TopN(top)
+        self.lock_holders = _TopN(top * 5)
+        self.lock_candidates = _TopN(top * 5)
+
+    def feed(self, line):
+        line = line.strip()
+        if not line:
+            return
+        self.lines += 1
+        entry = self.parser.parse(line)
+        if entry is None:
+            self.malformed += 1
+            return
+        self.statements += 1
+
+        sql = entry['sql']
+        cache_key = (sql, entry['chopped'])
+        cached = self.fingerprint_cache.get(cache_key)
+        if cached is None:
+            fingerprint = fingerprint_sql(sql, entry['chopped'])
+            fid = fingerprint_id(fingerprint)
+            boundary, table = classify_statement(fingerprint)
+            cached = (fid, fingerprint, boundary, table)
+            if len(self.fingerprint_cache) > 10000:
+                self.fingerprint_cache.clear()
+            self.fingerprint_cache[cache_key] = cached
+        fid, fingerprint, boundary, table = cached
+
+        histogram = self.histograms.get(fid)
+        if histogram is None:
+            histogram = self.histograms[fid] = LatencyHistogram()
+            self.samples[fid] = fingerprint[:500]
+        histogram.add(entry['timecost'])
+
+        end_us = entry['end_us']
+        if self.first_us is None or end_us < self.first_us:
+            self.first_us = end_us
+        if self.last_us is None or end_us > self.last_us:
+            self.last_us = end_us
+
+        statement = Statement(end_us, entry['timecost'], entry['event_timecost'], fid, table, entry.get('tid'))
+        connection = f"{entry.get('proxyHost', '')}/{entry.get('con', '')}"
+
+        if table and entry['timecost'] >= self.lock_wait_ms:
+            self.lock_candidates.push(entry['timecost'], {
+                'connection': connection,
+                'tid': statement.tid,
+                'fingerprint': fid,
+                'table': table,
+                'timecost_ms': entry['timecost'],
+                'start_us': statement.start_us,
+                'end_us': end_us,
+                'at': datetime.fromtimestamp(end_us / 1000000.0).isoformat()
+            })
+
+        # Autocommit statements are their own transaction
+        if entry.get('autocommit') == '1' and boundary is None:
+            return
+        self._track(connection, statement, boundary)
+
+    def _track(self, connection, statement, boundary):
+        head = self.heads.get(connection)
+        if head is None:
+            head = self.heads[connection] = [[], False]
+
+        if boundary == BOUNDARY_BEGIN:
+            # A new transaction starts; whatever was open before ends here
+            if not head[1]:
+                head[1] = True
+            else:
+                self._finish(connection, self.open.pop(connection, []))
+            self.open[connection] = [statement]
+            return
+
+        if not head[1]:
+            head[0].append(statement)
+            if boundary:
+                head[1] = True
+            return
+
+        statements = self.open.setdefault(connection, [])
+        statements.append(statement)
+        if boundary:
+            self._finish(connection, self.open.pop(connection))
+
+    def _finish(self, connection, statements, partial=False):
+        if not statements:
+            return
+        summary = summarize_transaction(connection, statements, partial, self.path_limit)
+        self.add_transaction(summary)
+
+    def add_transaction(self, summary):
+        self.transactions += 1
+        self.slow_transactions.push(summary['span_ms'], summary)
+        if summary['lock_hold_ms'] > 0:
+            self.lock_holders.push(summary['lock_hold_ms'], summary)
+
+    def result(self):
+        """Plain-data result for merging in the parent process"""
+        return {
+            'lines': self.lines,
+            'malformed': self.malformed,
+            'statements': self.statements,
+            'transactions': self.transactions,
+            'first_us': self.first_us,
+            'last_us': self.last_us,
+            'histograms': self.histograms,
+            'samples': self.samples,
+            'heads': {c: (s, closed) for c, (s, closed) in self.heads.items() if s},
+            'tails': {c: s for c, s in self.open.items() if s},
+            'slow_transactions': self.slow_transactions.items(),
+            'lock_holders': self.lock_holders.items(),
+            'lock_candidates': self.lock_candidates.items()
+        }
+
+
+def _open_text(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', errors='replace')
+    return open(path, 'r', encoding='utf-8', errors='replace')
+
+
+def analyze_range(path, start, end, options):
+    """Analyze the lines of a file that start within [start, end)"""
+    analyzer = ChunkAnalyzer(**options)
+    with open(path, 'rb') as f:
+        if start:
+            f.seek(start - 1)
+            # Skip the line that started before this range, unless the range begins on a line start
+            f.readline()
+        position = f.tell()
+        while position < end:
+            raw = f.readline()
+            if not raw:
+                break
+            position += len(raw)
+            analyzer.feed(raw.decode('utf-8', errors='replace'))
+    return analyzer.result()
+
+
+def analyze_stream(path, options):
+    """Analyze a whole file sequentially (used for compressed input)"""
+    analyzer = ChunkAnalyzer(**options)
+    with _open_text(path) as f:
+        for line in f:
+            analyzer.feed(line)
+    return analyzer.result()
+
+
+def plan_chunks(path, chunk_size):
+    size = os.path.getsize(path)
+    return [(start, min(start + chunk_size, size)) for start in range(0, size, chunk_size)] or [(0, 0)]
+
+
+class Report:
+    """Merges chunk results in file order and builds the final report"""
+
+    def __init__(self, top=20, lock_wait_ms=50.0, lock_wait_ratio=10.0, path_limit=10):
+        self.top = top
+        self.lock_wait_ms = lock_wait_ms
+        self.lock_wait_ratio = lock_wait_ratio
+        self.merger = ChunkAnalyzer(top=top, lock_wait_ms=lock_wait_ms, path_limit=path_limit)
+        # Per connection: transaction still open at the end of the last merged chunk
+        self.pending = {}
+        self.unterminated = 0
+        self.files = []
+
+    def begin_file(self, path):
+        # Transactions never span files; anything still open is left unterminated
+        self.files.append(path)
+        self.unterminated += len(self.pending)
+        self.pending = {}
+
+    def merge(self, result, first_chunk):
+        m = self.merger
+        m.lines += result['lines']
+        m.malformed += result['malformed']
+        m.statements += result['statements']
+        m.transactions += result['transactions']
+        for bound in ('first_us', 'last_us'):
+            value = result[bound]
+            if value is None:
+                continue
+            current = getattr(m, bound)
+            if current is None or (value < current if bound == 'first_us' else value > current):
+                setattr(m, bound, value)
+
+        for fid, histogram in result['histograms'].items():
+            if fid in m.histograms:
+                m.histograms[fid].merge(histogram)
+            else:
+                m.histograms[fid] = histogram
+                m.samples[fid] = result['samples'][fid]
+
+        for summary in result['slow_transactions']:
+            m.slow_transactions.push(summary['span_ms'], summary)
+        for summary in result['lock_holders']:
+            m.lock_holders.push(summary['lock_hold_ms'], summary)
+        for candidate in result['lock_candidates']:
+            m.lock_candidates.push(candidate['timecost_ms'], candidate)
+
+        # Stitch transaction fragments that cross the chunk boundary
+        for connection, (statements, closed) in result['heads'].items():
+            carried = self.pending.pop(connection, None)
+            combined = (carried or []) + list(statements)
+            if closed:
+                summary = summarize_transaction(
+                    connection, combined, partial=first_chunk and carried is None,
+                    path_limit=m.path_limit
+                )
+                m.add_transaction(summary)
+            else:
+                self.pending[connection] = combined
+        for connection, statements in result['tails'].items():
+            self.pending[connection] = list(statements)
+
+    def build(self):
+        m = self.merger
+        fingerprints = []
+        for fid, histogram in m.histograms.items():
+            fingerprints.append({
+                'fingerprint': fid,
+                'sql': m.samples[fid],
+                'count': histogram.count,
+                'total_ms': round(histogram.total, 3),
+                'mean_ms': round(histogram.total / histogram.count, 3),
+                'p50_ms': _round(histogram.percentile(50)),
+                'p95_ms': _round(histogram.percentile(95)),
+                'p99_ms': _round(histogram.percentile(99)),
+                'max_ms': round(histogram.max, 3)
+            })
+        fingerprints.sort(key=lambda f: f['total_ms'], reverse=True)
+
+        suspects = []
+        holders = m.lock_holders.items()
+        for candidate in m.lock_candidates.items():
+            median = m.histograms[candidate['fingerprint']].percentile(50) or 0.0
+            if candidate['timecost_ms'] < self.lock_wait_ratio * median:
+                continue
+            blockers = [
+                {
+                    'connection': h['connection'],
+                    'tid': h['tid'],
+                    'start': h['start'],
+                    'lock_hold_ms': h['lock_hold_ms'],
+                    'locked_tables': h['locked_tables']
+                }
+                for h in holders
+                if h['connection'] != candidate['connection']
+                and candidate['table'] in h['locked_tables']
+                and h['lock_start_us'] < candidate['end_us'] and h['end_us'] > candidate['start_us']
+            ]
+            suspects.append(dict(
+                {k: v for k, v in candidate.items() if k not in ('start_us', 'end_us')},
+                fingerprint_p50_ms=_round(median),
+                sql=m.samples[candidate['fingerprint']],
+                blockers=blockers
+            ))
+            if len(suspects) >= self.top:
+                break
+
+        transactions = []
+        for summary in m.slow_transactions.items():
+            transactions.append({k: v for k, v in summary.items()
+                                 if k not in ('start_us', 'end_us', 'lock_start_us')})
+
+        return {
+            'files': self.files,
+            'summary': {
+                'lines': m.lines,
+                'malformed': m.malformed,
+                'statements': m.statements,
+                'transactions': m.transactions,
+                'unterminated_transactions': self.unterminated + len(self.pending),
+                'fingerprints': len(m.histograms),
+                'first': datetime.fromtimestamp(m.first_us / 1000000.0).isoformat() if m.first_us else None,
+                'last': datetime.fromtimestamp(m.last_us / 1000000.0).isoformat() if m.last_us else None
+            },
+            'fingerprints': fingerprints[:self.top * 5],
+            'slow_transactions': transactions,
+            'lock_wait_suspects': suspects
+        }
+
+
+def _round(value):
+    return round(value, 3) if value is not None else None
+
+
+def analyze(paths, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, top=20,
+            lock_wait_ms=50.0, lock_wait_ratio=10.0, path_limit=10):
+    """Analyze proxy log files, returning the report as a dict"""
+    options = {'top': top, 'lock_wait_ms': lock_wait_ms, 'path_limit': path_limit}
+    report = Report(top, lock_wait_ms, lock_wait_ratio, path_limit)
+    workers = workers or os.cpu_count() or 1
+
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for path in paths:
+            report.begin_file(path)
+            if path.endswith('.gz'):
+                report.merge(analyze_stream(path, options), first_chunk=True)
+                continue
+
+            chunks = plan_chunks(path, chunk_size)
+            if executor is None or len(chunks) == 1:
+                results = (analyze_range(path, start, end, options) for start, end in chunks)
+            else:
+                # map() yields in submission order, so fragments are stitched in file order
+                results = executor.map(
+                    analyze_range, itertools.repeat(path), *zip(*chunks), itertools.repeat(options)
+                )
+            for index, result in enumerate(results):
+                report.merge(result, first_chunk=(index == 0))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    return report.build()
+
+
+def format_report(report):
+    """Render the report as text"""
+    lines = []
+    s = report['summary']
+    lines.append(f"Lines: {s['lines']}  statements: {s['statements']}  malformed: {s['malformed']}  "
+                 f"transactions: {s['transactions']}  unterminated: {s['unterminated_transactions']}")
+    lines.append(f"Time range: {s['first']} .. {s['last']}  fingerprints: {s['fingerprints']}")
+
+    lines.append('')
+    lines.append('== Fingerprints by total time (ms) ==')
+    lines.append(f"{'count':>8} {'total':>12} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}  fingerprint")
+    for f in report['fingerprints']:
+        lines.append(f"{f['count']:>8} {f['total_ms']:>12.3f} {f['p50_ms']:>9.3f} {f['p95_ms']:>9.3f} "
+                     f"{f['p99_ms']:>9.3f} {f['max_ms']:>9.3f}  {f['fingerprint']} {f['sql'][:100]}")
+
+    lines.append('')
+    lines.append('== Slowest transactions ==')
+    for t in report['slow_transactions']:
+        flag = ' (started before log)' if t['partial'] else ''
+        lines.append(f"{t['start']} {t['connection']} tid={t['tid']} span={t['span_ms']}ms db={t['db_ms']}ms "
+                     f"idle={t['idle_ms']}ms lock_hold={t['lock_hold_ms']}ms statements={t['statements']}{flag}")
+        for step in t['critical_path']:
+            lock = f" locks {step['locks']}" if step['locks'] else ''
+            lines.append(f"    +{step['offset_ms']:>10.3f}ms gap {step['gap_before_ms']:>9.3f}ms "
+                         f"exec {step['timecost_ms']:>9.3f}ms  {step['fingerprint']}{lock}")
+
+    lines.append('')
+    lines.append('== Lock-wait suspects ==')
+    if not report['lock_wait_suspects']:
+        lines.append('none')
+    for suspect in report['lock_wait_suspects']:
+        lines.append(f"{suspect['at']} {suspect['connection']} {suspect['timecost_ms']}ms "
+                     f"(p50 {suspect['fingerprint_p50_ms']}ms) on {suspect['table']}: {suspect['sql'][:100]}")
+        for blocker in suspect['blockers']:
+            lines.append(f"    held by {blocker['connection']} tid={blocker['tid']} since {blocker['start']} "
+                         f"for {blocker['lock_hold_ms']}ms on {', '.join(blocker['locked_tables'])}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze distributed SQL proxy logs")
+    parser.add_argument('paths', nargs='+', help='Log files (.gz is read sequentially)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Parser processes')
+    parser.add_argument('--chunk-mb', type=float, default=DEFAULT_CHUNK_SIZE / 1024 / 1024)
+    parser.add_argument('--top', type=int, default=20, help='Transactions and suspects to report')
+    parser.add_argument('--lock-wait-ms', type=float, default=50.0,
+                        help='Minimum time for a locking statement to be a lock-wait suspect')
+    parser.add_argument('--lock-wait-ratio', type=float, default=10.0,
+                        help='Minimum ratio to the fingerprint median for a lock-wait suspect')
+    parser.add_argument('--path-limit', type=int, default=10, help='Steps shown per critical path')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args(argv)
+
+    report = analyze(
+        args.paths, workers=args.workers, chunk_size=max(1, int(args.chunk_mb * 1024 * 1024)),
+        top=args.top, lock_wait_ms=args.lock_wait_ms, lock_wait_ratio=args.lock_wait_ratio,
+        path_limit=args.path_limit
+    )
+    if args.json:
+        json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    else:
+        print(format_report(report))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Request deadlines
+
+A transfer stuck behind a row lock used to wait innodb_lock_wait_timeout
+(50s by default) while gunicorn killed the worker after 30s, in the middle
+of the two-phase commit. A Deadline now starts with each transfer, sized by
+TRANSACTION_TIMEOUT, and travels with it through TransferService,
+DistributedTransactionManager and AccountService:
+
+- ``check(step)`` before each step raises TimeoutException once the budget
+  is spent, so no new work starts after the deadline. A commit that has
+  begun is never interrupted.
+- ``apply(session)`` before each locking statement bounds the statements to
+  the remaining budget on MySQL: innodb_lock_wait_timeout (whole seconds,
+  at least 1) for row lock waits and max_execution_time (milliseconds) for
+  reads. It only issues the SET when the values change, and connections
+  whose limits were changed are restored to the server defaults when they
+  return to the pool.
+- ``timeout_error(e, step)`` turns MySQL's lock wait timeout (1205) and
+  statement time limit (3024) errors into TimeoutException.
+
+The API answers TimeoutException with 504 after rolling back, so the worker
+survives as long as TRANSACTION_TIMEOUT stays below the gunicorn timeout.
+"""
+
+import logging
+import math
+import time
+
+from sqlalchemy import event, text
+
+from app.utils.exceptions import BankingException, TimeoutException
+
+logger = logging.getLogger(__name__)
+
+# MySQL error codes of statements stopped by the limits set here
+LOCK_WAIT_TIMEOUT = 1205
+MAX_EXECUTION_TIME_EXCEEDED = 3024
+
+_TIMEOUT_ERRORS = frozenset((LOCK_WAIT_TIMEOUT, MAX_EXECUTION_TIME_EXCEEDED))
+
+_SET_LIMITS = text("SET SESSION innodb_lock_wait_timeout = :lock_wait, max_execution_time = :execution_ms")
+
+_RESET_LIMITS = "SET SESSION innodb_lock_wait_timeout = DEFAULT, max_execution_time = DEFAULT"
+
+# Connection record info key marking connections with changed limits
+_LIMITS_KEY = 'deadline_limits'
+
+
+class Deadline:
+    """Time budget of one operation"""
+
+    def __init__(self, timeout, operation='request', clock=time.monotonic):
+        self.timeout = timeout
+        self.operation = operation
+        self.clock = clock
+        self.expires_at = clock() + timeout
+
+    def remaining(self):
+        """Seconds left, never negative"""
+        return max(0.0, self.expires_at - self.clock())
+
+    @property
+    def expired(self):
+        return self.clock() >= self.expires_at
+
+    def _exception(self, step):
+        exception = TimeoutException(self.operation, self.timeout)
+        exception.details['step'] = step
+        return exception
+
+    def check(self, step):
+        """Raise TimeoutException when the deadline has passed"""
+        if self.expired:
+            logger.warning(f"Deadline of {self.operation} passed before {step}")
+            raise self._exception(step)
+
+    def timeout_error(self, error, step):
+        """TimeoutException for an error caused by the deadline, or None"""
+        if isinstance(error, TimeoutException):
+            return error
+        args = getattr(getattr(error, 'orig', None), 'args', ())
+        if args and args[0] in _TIMEOUT_ERRORS:
+            return self._exception(step)
+        # Business rejections stand as they are; anything else past the deadline is the deadline's doing
+        if self.expired and not isinstance(error, BankingException):
+            return self._exception(step)
+        return None
+
+    def apply(self, session, step):
+        """Check the deadline and bound the session's next statements to what is left"""
+        self.check(step)
+        if session.get_bind().dialect.name != 'mysql':
+            return
+
+        remaining = self.remaining()
+        limits = (max(1, math.ceil(remaining)), max(1, int(remaining * 1000)))
+        connection = session.connection()
+        info = connection.connection.info
+        # Lock waits are whole seconds; a change of the millisecond limit alone is not worth a round trip
+        if info.get(_LIMITS_KEY, (None,))[0] == limits[0]:
+            return
+        connection.execute(_SET_LIMITS, {'lock_wait': limits[0], 'execution_ms': limits[1]})
+        info[_LIMITS_KEY] = limits
+
+
+def _reset_limits(dbapi_connection, connection_record, reset_state):
+    if connection_record is None or connection_record.info.pop(_LIMITS_KEY, None) is None:
+        return
+    # On failure the pool invalidates the connection, so short limits never leak to the next user
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(_RESET_LIMITS)
+    finally:
+        cursor.close()
+
+
+def install_limit_reset(engine):
+    """Restore the server's statement limits on connections returned to an engine's pool"""
+    if not event.contains(engine, 'reset', _reset_limits):
+        event.listen(engine, 'reset', _reset_limits)
@@ -0,0 +1,216 @@
+"""
+Response encoding for the banking API
+
+Serializes response payloads with exact Decimal amounts and native datetime
+support, using orjson when it is installed and a built-in encoder otherwise.
+MessagePack is offered as a compact alternative when the client asks for it
+via the Accept header and msgpack is installed.
+
+Decimal amounts are written according to ``JSON_DECIMAL_MODE``:
+
+- ``number``: an exact JSON number literal, e.g. ``12345678901234567.89``
+- ``string``: a JSON string, e.g. ``"12345678901234567.89"``
+- ``cents``: an integer number of minor units, e.g. ``1234567890123456789``
+"""
+
+import json
+from datetime import date, datetime, time
+from decimal import Decimal, ROUND_HALF_UP
+from json.encoder import encode_basestring
+
+from flask import has_request_context, request
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+DECIMAL_MODES = ('number', 'string', 'cents')
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPES = ('application/msgpack', 'application/x-msgpack')
+
+_CENT = Decimal('0.01')
+
+
+def _decimal_literal(value):
+    """Format a Decimal as a plain JSON number literal"""
+    if not value.is_finite():
+        raise ValueError(f"Cannot encode non-finite Decimal {value}")
+    return format(value, 'f')
+
+
+def _decimal_cents(value):
+    """Convert a Decimal amount to an integer number of cents"""
+    return int(value.quantize(_CENT, rounding=ROUND_HALF_UP).scaleb(2))
+
+
+class ResponseEncoder:
+    """Encodes response payloads to JSON or MessagePack bytes"""
+
+    def __init__(self, decimal_mode='number', use_orjson=True):
+        if decimal_mode not in DECIMAL_MODES:
+            raise ValueError(f"Unsupported decimal mode: {decimal_mode}")
+
+        self.decimal_mode = decimal_mode
+        # Exact number literals need orjson.Fragment (orjson >= 3.9.14)
+        self.use_orjson = bool(
+            use_orjson and orjson is not None and
+            (decimal_mode != 'number' or hasattr(orjson, 'Fragment'))
+        )
+
+    @property
+    def backend(self):
+        """Name of the JSON backend in use"""
+        return 'orjson' if self.use_orjson else 'builtin'
+
+    def encode_json(self, obj):
+        """Encode an object to UTF-8 JSON bytes"""
+        if self.use_orjson:
+            return orjson.dumps(obj, default=self._orjson_default)
+
+        parts = []
+        self._write(obj, parts)
+        return ''.join(parts).encode('utf-8')
+
+    def encode_msgpack(self, obj):
+        """Encode an object to MessagePack bytes"""
+        if msgpack is None:
+            raise RuntimeError("msgpack is not installed")
+        return msgpack.packb(obj, default=self._msgpack_default, use_bin_type=True)
+
+    def _convert_decimal(self, value):
+        if self.decimal_mode == 'cents':
+            return _decimal_cents(value)
+        if self.decimal_mode == 'string':
+            return _decimal_literal(value)
+        return None
+
+    def _orjson_default(self, obj):
+        if isinstance(obj, Decimal):
+            converted = self._convert_decimal(obj)
+            if converted is None:
+                return orjson.Fragment(_decimal_literal(obj))
+            return converted
+        if hasattr(obj, 'to_dict'):
+            return obj.to_dict()
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    def _msgpack_default(self, obj):
+        if isinstance(obj, Decimal):
+            converted = self._convert_decimal(obj)
+            # MessagePack has no decimal type, so exact numbers travel as strings
+            return _decimal_literal(obj) if converted is None else converted
+        if isinstance(obj, (datetime, date, time)):
+            return obj.isoformat()
+        if hasattr(obj, 'to_dict'):
+            return obj.to_dict()
+        raise TypeError(f"Object of type {type(obj).__name__} is not MessagePack serializable")
+
+    def _write(self, obj, parts):
+        """Built-in JSON writer used when orjson is unavailable"""
+        if isinstance(obj, str):
+            parts.append(encode_basestring(obj))
+        elif obj is None:
+            parts.append('null')
+        elif obj is True:
+            parts.append('true')
+        elif obj is False:
+            parts.append('false')
+        elif isinstance(obj, int):
+            parts.append(int.__repr__(obj))
+        elif isinstance(obj, float):
+            if obj != obj or obj in (float('inf'), float('-inf')):
+                raise ValueError(f"Cannot encode non-finite float {obj}")
+            parts.append(float.__repr__(obj))
+        elif isinstance(obj, Decimal):
+            converted = self._convert_decimal(obj)
+            if converted is None:
+                parts.append(_decimal_literal(obj))
+            elif isinstance(converted, int):
+                parts.append(int.__repr__(converted))
+            else:
+                parts.append(encode_basestring(converted))
+        elif isinstance(obj, dict):
+            parts.append('{')
+            first = True
+            for key, value in obj.items():
+                if not first:
+                    parts.append(',')
+                first = False
+                parts.append(encode_basestring(key if isinstance(key, str) else str(key)))
+                parts.append(':')
+                self._write(value, parts)
+            parts.append('}')
+        elif isinstance(obj, (list, tuple)):
+            parts.append('[')
+            first = True
+            for value in obj:
+                if not first:
+                    parts.append(',')
+                first = False
+                self._write(value, parts)
+            parts.append(']')
+        elif isinstance(obj, (datetime, date, time)):
+            parts.append(encode_basestring(obj.isoformat()))
+        elif hasattr(obj, 'to_dict'):
+            self._write(obj.to_dict(), parts)
+        else:
+            raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class BankingJSONProvider(JSONProvider):
+    """
+    Flask JSON provider backed by ResponseEncoder.
+
+    Every ``jsonify`` call and dict returned from a view goes through
+    ``response``, so all blueprints get the same encoding and Accept
+    negotiation. Request bodies are parsed with floats as Decimal so amounts
+    keep their exact value.
+    """
+
+    mimetype = JSON_MIMETYPE
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.encoder = ResponseEncoder(
+            decimal_mode=app.config.get('JSON_DECIMAL_MODE', 'number'),
+            use_orjson=app.config.get('JSON_USE_ORJSON', True)
+        )
+        self.msgpack_enabled = bool(app.config.get('MSGPACK_ENABLED', True) and msgpack is not None)
+
+    def dumps(self, obj, **kwargs):
+        return self.encoder.encode_json(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return json.loads(s, parse_float=Decimal)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        app = self._app
+
+        if self.msgpack_enabled:
+            mimetype = negotiate_mimetype()
+            if mimetype != JSON_MIMETYPE:
+                response = app.response_class(self.encoder.encode_msgpack(obj), mimetype=mimetype)
+            else:
+                response = app.response_class(self.encoder.encode_json(obj), mimetype=self.mimetype)
+            response.vary.add('Accept')
+            return response
+
+        return app.response_class(self.encoder.encode_json(obj), mimetype=self.mimetype)
+
+
+def negotiate_mimetype():
+    """Pick the response mimetype from the request Accept header, defaulting to JSON"""
+    if not has_request_context():
+        return JSON_MIMETYPE
+    best = request.accept_mimetypes.best_match((JSON_MIMETYPE,) + MSGPACK_MIMETYPES)
+    return best or JSON_MIMETYPE
+
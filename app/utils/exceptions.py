@@ -67,8 +67,8 @@ class InsufficientBalanceException(AccountException):
             'INSUFFICIENT_BALANCE',
             {
                 'account_no': account_no,
-                'available_balance': float(available_balance),
-                'requested_amount': float(requested_amount)
+                'available_balance': available_balance,
+                'requested_amount': requested_amount
             }
         )
 
@@ -98,8 +98,8 @@ class TransferLimitExceededException(TransferException):
             'TRANSFER_LIMIT_EXCEEDED',
             {
                 'limit_type': limit_type,
-                'limit_amount': float(limit_amount),
-                'requested_amount': float(requested_amount)
+                'limit_amount': limit_amount,
+                'requested_amount': requested_amount
             }
         )
 
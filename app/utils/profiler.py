@@ -0,0 +1,283 @@
+"""
+On-demand stack-sampling profiler for live workers
+
+When a worker is slow in production it can be profiled in place, without a
+redeploy or a restart: POST /admin/profiles (admin JWT), or send SIGUSR2 to
+the worker's pid, starts a SamplingProfiler in that process for a number of
+seconds. Send the signal to a worker, never to the gunicorn master, which
+takes SIGUSR2 as a binary upgrade.
+
+A sampler thread wakes every PROFILER_INTERVAL_MS and reads the stacks of
+all threads with sys._current_frames(); nothing is traced, so the code under
+load runs as usual between samples. Each stack is attributed to the request
+its thread serves: the root frame is the blueprint (transfer, account,
+health) and samples are also counted per endpoint. Threads not serving a
+request (pool, cache refreshers, the idle gunicorn loop) are left out unless
+all_threads is set.
+
+The result is written to PROFILER_DIR as ``<name>.collapsed``, one
+``root;caller;callee count`` line per distinct stack, which flamegraph.pl,
+speedscope and inferno read as is, and ``<name>.json`` with the per-endpoint
+counts and the sampler's own CPU time. Files go to a directory rather than
+into the response because the request that reads them back may reach another
+worker; the newest PROFILER_KEEP profiles are kept.
+"""
+
+import json
+import logging
+import os
+import re
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import request
+
+logger = logging.getLogger(__name__)
+
+PROFILE_NAME = re.compile(r'^profile-\d+-\d{8}T\d{6}$')
+
+MAX_DEPTH = 128
+
+# Request each thread is serving: thread ident -> (blueprint, endpoint)
+request_labels = {}
+
+# Profiler running in this process, if any
+active_profiler = None
+_profiler_lock = threading.Lock()
+
+_settings = {}
+
+
+class ProfilerBusy(Exception):
+    """A profile is already running in this process"""
+
+
+class SamplingProfiler:
+    """Samples the stacks of this process's threads for a fixed duration"""
+
+    def __init__(self, seconds, interval=0.01, all_threads=False, labels=None):
+        self.seconds = seconds
+        self.interval = interval
+        self.all_threads = all_threads
+        self.labels = request_labels if labels is None else labels
+
+        self.stacks = Counter()
+        self.by_blueprint = Counter()
+        self.by_endpoint = Counter()
+        self.ticks = 0
+        self.sampler_cpu_seconds = 0.0
+        self.started_at = None
+        self.finished_at = None
+        self._frame_labels = {}
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _frame_label(self, code):
+        # Formatted once per code object; sampling then only does dictionary lookups
+        label = self._frame_labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            for prefix in sys.path:
+                if prefix and filename.startswith(prefix + os.sep):
+                    filename = filename[len(prefix) + 1:]
+                    break
+            label = self._frame_labels[code] = f"{code.co_name} ({filename})"
+        return label
+
+    def sample(self):
+        """Record the current stack of every thread serving a request"""
+        own = threading.get_ident()
+        names = None
+        self.ticks += 1
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            label = self.labels.get(ident)
+            if label is None:
+                if not self.all_threads:
+                    continue
+                if names is None:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                root = f"thread:{names.get(ident, ident)}"
+            else:
+                root = label[0]
+                self.by_blueprint[root] += 1
+                self.by_endpoint[label[1]] += 1
+
+            frames = []
+            while frame is not None and len(frames) < MAX_DEPTH:
+                frames.append(self._frame_label(frame.f_code))
+                frame = frame.f_back
+            frames.append(root)
+            frames.reverse()
+            self.stacks[';'.join(frames)] += 1
+
+    def run(self):
+        """Sample until the duration is over or stop() is called"""
+        self.started_at = self.started_at or datetime.utcnow()
+        cpu_started = time.thread_time()
+        deadline = time.monotonic() + self.seconds
+        while not self._stop_event.is_set():
+            self.sample()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self._stop_event.wait(min(self.interval, remaining))
+        self.sampler_cpu_seconds = time.thread_time() - cpu_started
+        self.finished_at = datetime.utcnow()
+
+    def start(self, on_finish=None):
+        """Sample in a background thread, calling on_finish(profiler) when done"""
+        def run():
+            try:
+                self.run()
+                if on_finish is not None:
+                    on_finish(self)
+            except Exception as e:
+                logger.error(f"Profiler failed: {str(e)}")
+
+        # Set here so the profile's name is known as soon as it starts
+        self.started_at = datetime.utcnow()
+        self._thread = threading.Thread(target=run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling early"""
+        self._stop_event.set()
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def collapsed(self):
+        """Samples in collapsed-stack format, heaviest stacks first"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self):
+        """Sample counts per blueprint and endpoint, and what the sampling cost"""
+        elapsed = (self.finished_at - self.started_at).total_seconds() if self.finished_at else None
+        return {
+            'pid': os.getpid(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'seconds': round(elapsed, 3) if elapsed is not None else None,
+            'interval_ms': round(self.interval * 1000, 3),
+            'ticks': self.ticks,
+            'samples': sum(self.stacks.values()),
+            'by_blueprint': dict(self.by_blueprint.most_common()),
+            'by_endpoint': dict(self.by_endpoint.most_common()),
+            'sampler_cpu_seconds': round(self.sampler_cpu_seconds, 4),
+            # Share of one core spent sampling
+            'overhead': round(self.sampler_cpu_seconds / elapsed, 4) if elapsed else None
+        }
+
+
+def _track_request():
+    request_labels[threading.get_ident()] = (request.blueprint or 'app', request.endpoint or 'unmatched')
+
+
+def _untrack_request(exception=None):
+    request_labels.pop(threading.get_ident(), None)
+
+
+def profile_name(profiler):
+    """File name stem of a profile: worker pid and start time"""
+    return f"profile-{os.getpid()}-{profiler.started_at.strftime('%Y%m%dT%H%M%S')}"
+
+
+def save_profile(profiler, directory, keep=20):
+    """Write the collapsed stacks and summary of a finished profile, dropping the oldest beyond keep"""
+    os.makedirs(directory, exist_ok=True)
+    name = profile_name(profiler)
+    for suffix, content in (('.collapsed', profiler.collapsed()),
+                            ('.json', json.dumps(profiler.summary(), indent=2))):
+        tmp_path = os.path.join(directory, f"{name}{suffix}.tmp")
+        with open(tmp_path, 'w') as f:
+            f.write(content)
+        os.replace(tmp_path, os.path.join(directory, name + suffix))
+
+    for old in list_profiles(directory)[keep:]:
+        for suffix in ('.collapsed', '.json'):
+            try:
+                os.remove(os.path.join(directory, old + suffix))
+            except FileNotFoundError:
+                pass
+    logger.info(f"Profile {name} written: {profiler.summary()['samples']} samples")
+    return name
+
+
+def list_profiles(directory):
+    """Names of the saved profiles, newest first"""
+    try:
+        files = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    names = [name for name, suffix in map(os.path.splitext, files)
+             if suffix == '.collapsed' and PROFILE_NAME.match(name)]
+    # By start time, then pid
+    return sorted(names, key=lambda name: name.split('-')[::-1], reverse=True)
+
+
+def start_profile(seconds, interval=None, all_threads=False):
+    """Start profiling this process, saving the result to PROFILER_DIR; raises ProfilerBusy"""
+    global active_profiler
+
+    with _profiler_lock:
+        if active_profiler is not None:
+            raise ProfilerBusy(f"A profile is already running in worker {os.getpid()}")
+        profiler = SamplingProfiler(
+            seconds, interval if interval is not None else _settings.get('interval', 0.01), all_threads
+        )
+        active_profiler = profiler
+
+    def finish(profiler):
+        global active_profiler
+        try:
+            save_profile(profiler, _settings.get('directory', 'profiles'), _settings.get('keep', 20))
+        finally:
+            active_profiler = None
+
+    profiler.start(finish)
+    return profiler
+
+
+def _on_signal(signum, frame):
+    try:
+        start_profile(_settings.get('signal_seconds', 30))
+        logger.info(f"Profiling worker {os.getpid()} for {_settings.get('signal_seconds', 30)}s on signal")
+    except ProfilerBusy as e:
+        logger.warning(str(e))
+
+
+def install_signal_handler():
+    """Profile this process on SIGUSR2; gunicorn resets the signal in each worker, so call it after fork"""
+    if not _settings.get('enabled') or not hasattr(signal, 'SIGUSR2'):
+        return False
+    try:
+        signal.signal(signal.SIGUSR2, _on_signal)
+    except ValueError:
+        # Only the main thread may install handlers; the endpoint still works
+        logger.warning("Profiler signal handler not installed outside the main thread")
+        return False
+    return True
+
+
+def init_profiler(app):
+    """Attribute samples to requests and configure on-demand profiling"""
+    _settings.clear()
+    _settings.update({
+        'enabled': app.config.get('PROFILER_ENABLED', True),
+        'directory': app.config.get('PROFILER_DIR', '/app/data/profiles'),
+        'interval': float(app.config.get('PROFILER_INTERVAL_MS', 10)) / 1000,
+        'signal_seconds': float(app.config.get('PROFILER_SIGNAL_SECONDS', 30)),
+        'keep': int(app.config.get('PROFILER_KEEP', 20))
+    })
+    if not _settings['enabled']:
+        logger.info("Profiler disabled by configuration")
+        return
+
+    app.before_request(_track_request)
+    app.teardown_request(_untrack_request)
@@ -0,0 +1,40 @@
+"""
+Client read-your-writes token
+
+The API runs several worker processes, so a client's next read may land on a
+worker that never saw its transfer. Write responses therefore carry the write
+time in a header and cookie; reads that present it stay on the primary until
+replicas have caught up.
+"""
+
+import time
+
+from flask import current_app, request
+
+READ_AFTER_HEADER = 'X-Read-After'
+READ_AFTER_COOKIE = 'read_after'
+
+
+def client_written_at():
+    """Wall-clock time of the client's last write, or None"""
+    value = request.headers.get(READ_AFTER_HEADER) or request.cookies.get(READ_AFTER_COOKIE)
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def mark_client_write(response, written_at=None):
+    """Attach the write time to a response so the client's following reads see the write"""
+    token = f"{written_at or time.time():.3f}"
+    config = current_app.config
+    # Long enough to cover the router's widest sticky window
+    max_age = max(config.get('REPLICA_STICKY_SECONDS', 5),
+                  config.get('REPLICA_MAX_LAG', 2) + config.get('REPLICA_LAG_CHECK_INTERVAL', 1))
+    response.headers[READ_AFTER_HEADER] = token
+    response.set_cookie(
+        READ_AFTER_COOKIE, token,
+        max_age=int(max_age) + 1,
+        httponly=True, samesite='Strict'
+    )
+    return response
@@ -0,0 +1,233 @@
+"""
+Compiled validation rules for transfer requests
+
+The request checks used to live in three places: app.utils.validators,
+TransferService._validate_transfer_request and the API handlers, each with
+its own uncompiled regexes and Decimal conversions. TransferRules holds the
+whole rule set: required fields, account number format, same-account,
+amount parsing, scale and configured bounds, and supported currencies. The
+rule set is compiled once per configuration: the account format becomes a
+single precompiled pattern, and bounds and currencies become a Decimal
+pair and a frozenset.
+
+``validate`` makes one pass over a request and returns every violation; a
+well-formed request takes a fast path of a few comparisons. ``check``
+raises the exception of the first violation, the one the service layer has
+always raised. ``validate_batch`` validates a list of requests column by
+column. Each distinct account number and amount is checked once, and only
+rejected rows run the full rule list.
+"""
+
+import re
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+
+from app.utils.exceptions import (
+    ValidationException, TransferException, SameAccountTransferException,
+    TransferLimitExceededException, CurrencyMismatchException
+)
+
+REQUIRED_FIELDS = ('from_account', 'to_account', 'amount', 'currency')
+
+ACCOUNT_NUMBER_PATTERN = re.compile(r'[0-9A-Za-z]{10,50}')
+
+# Amounts carry at most two decimal places
+AMOUNT_QUANTUM = Decimal('0.01')
+
+RuleViolation = namedtuple('RuleViolation', ['code', 'field', 'message', 'details'])
+
+# Violation code -> exception raised by TransferRules.check
+_EXCEPTIONS = {
+    'MISSING_FIELD': lambda v: TransferException(v.message),
+    'INVALID_ACCOUNT': lambda v: ValidationException(v.message, v.field),
+    'SAME_ACCOUNT': lambda v: SameAccountTransferException(v.details['account_no']),
+    'INVALID_AMOUNT': lambda v: ValidationException(v.message, v.field),
+    'NON_POSITIVE_AMOUNT': lambda v: TransferException(v.message),
+    'BELOW_MINIMUM': lambda v: TransferLimitExceededException(
+        'Minimum Transfer Amount', v.details['limit_amount'], v.details['requested_amount']
+    ),
+    'ABOVE_MAXIMUM': lambda v: TransferLimitExceededException(
+        'Maximum Transfer Amount', v.details['limit_amount'], v.details['requested_amount']
+    ),
+    'AMOUNT_SCALE': lambda v: ValidationException(v.message, v.field),
+    'INVALID_CURRENCY': lambda v: ValidationException(v.message, v.field),
+    'UNSUPPORTED_CURRENCY': lambda v: CurrencyMismatchException(
+        v.details['currency'], v.details['expected']
+    )
+}
+
+
+def violation_exception(violation):
+    """Build the exception the service layer raises for a violation"""
+    return _EXCEPTIONS[violation.code](violation)
+
+
+def account_number_error(account_no):
+    """Describe why an account number is invalid, or None if it is valid"""
+    if not isinstance(account_no, str):
+        return "Account number must be a string"
+    if ACCOUNT_NUMBER_PATTERN.fullmatch(account_no):
+        return None
+    if not 10 <= len(account_no) <= 50:
+        return "Account number length must be between 10 and 50 characters"
+    return "Account number contains invalid characters"
+
+
+class TransferRules:
+    """Transfer request rule set compiled for one set of configured limits"""
+
+    def __init__(self, min_amount, max_amount, currencies=('CNY',)):
+        self.min_amount = Decimal(str(min_amount))
+        self.max_amount = Decimal(str(max_amount))
+        self.currencies = frozenset(c.upper() for c in currencies)
+        self.default_currency = currencies[0]
+
+    @classmethod
+    def for_config(cls, config):
+        """Get the shared rule set for a configuration's transfer limits"""
+        return _rules(str(config.MIN_TRANSFER_AMOUNT), str(config.MAX_TRANSFER_AMOUNT))
+
+    def parse_amount(self, amount):
+        """Parse an amount, returning (Decimal or None, violation or None)"""
+        try:
+            value = Decimal(str(amount))
+        except (InvalidOperation, ValueError):
+            return None, RuleViolation('INVALID_AMOUNT', 'amount', "Amount must be a valid number", {})
+        if not value.is_finite():
+            return None, RuleViolation('INVALID_AMOUNT', 'amount', "Amount must be a valid number", {})
+
+        if value <= 0:
+            return value, RuleViolation('NON_POSITIVE_AMOUNT', 'amount', "Transfer amount must be positive", {})
+        if value < self.min_amount:
+            return value, RuleViolation(
+                'BELOW_MINIMUM', 'amount', "Minimum Transfer Amount limit exceeded",
+                {'limit_amount': self.min_amount, 'requested_amount': value}
+            )
+        if value > self.max_amount:
+            return value, RuleViolation(
+                'ABOVE_MAXIMUM', 'amount', "Maximum Transfer Amount limit exceeded",
+                {'limit_amount': self.max_amount, 'requested_amount': value}
+            )
+        if value.quantize(AMOUNT_QUANTUM) != value:
+            return value, RuleViolation(
+                'AMOUNT_SCALE', 'amount', "Amount cannot have more than 2 decimal places", {}
+            )
+        return value, None
+
+    def _collect(self, request, account_error, parse_amount):
+        """Apply every rule to one request, returning (normalized request, violations)"""
+        violations = []
+        for field in REQUIRED_FIELDS:
+            if not request.get(field):
+                violations.append(RuleViolation(
+                    'MISSING_FIELD', field, f"Missing required field: {field}", {}
+                ))
+
+        from_account = request.get('from_account')
+        to_account = request.get('to_account')
+        for field, account_no in (('from_account', from_account), ('to_account', to_account)):
+            if account_no:
+                error = account_error(account_no)
+                if error:
+                    violations.append(RuleViolation('INVALID_ACCOUNT', field, error, {'account_no': account_no}))
+
+        if from_account and from_account == to_account:
+            violations.append(RuleViolation(
+                'SAME_ACCOUNT', 'to_account', "Cannot transfer to the same account", {'account_no': from_account}
+            ))
+
+        amount = request.get('amount')
+        if amount:
+            amount, violation = parse_amount(amount)
+            if violation:
+                violations.append(violation)
+
+        currency = request.get('currency')
+        if currency and not isinstance(currency, str):
+            # Lists and objects are unhashable; reject them before the set lookup
+            violations.append(RuleViolation(
+                'INVALID_CURRENCY', 'currency', "Currency must be a string", {'currency': currency}
+            ))
+        elif currency:
+            normalized = currency.upper()
+            if normalized not in self.currencies:
+                violations.append(RuleViolation(
+                    'UNSUPPORTED_CURRENCY', 'currency',
+                    f"Unsupported currency. Supported: {', '.join(sorted(self.currencies))}",
+                    {'currency': currency, 'expected': self.default_currency}
+                ))
+            currency = normalized
+
+        normalized_request = dict(request, amount=amount, currency=currency)
+        return normalized_request, violations
+
+    def validate(self, request):
+        """Validate one request, returning (normalized request, violations)"""
+        from_account = request.get('from_account')
+        to_account = request.get('to_account')
+        currency = request.get('currency')
+        amount = request.get('amount')
+
+        # Well-formed requests pass with a few comparisons; anything else
+        # goes through every rule to report all of its violations
+        if (type(from_account) is str and type(to_account) is str and from_account != to_account
+                and type(currency) is str and currency in self.currencies and amount
+                and _account_match(from_account) and _account_match(to_account)):
+            value, violation = self.parse_amount(amount)
+            if violation is None:
+                return dict(request, amount=value), []
+
+        return self._collect(request, account_number_error, self.parse_amount)
+
+    def check(self, request):
+        """Validate one request, raising the exception of its first violation"""
+        normalized, violations = self.validate(request)
+        if violations:
+            raise violation_exception(violations[0])
+        return normalized
+
+    def validate_batch(self, requests):
+        """
+        Validate many requests column by column.
+
+        Returns (amounts, violations): per request, the parsed Decimal amount
+        (None if it could not be parsed) and its violations (an empty tuple
+        when the request is valid).
+        """
+        from_accounts = [request.get('from_account') for request in requests]
+        to_accounts = [request.get('to_account') for request in requests]
+        amount_keys = [str(amount) if amount else None for amount in (r.get('amount') for r in requests)]
+
+        # One check per distinct account number and amount
+        valid_accounts = {
+            account_no for account_no in set(
+                a for a in from_accounts + to_accounts if type(a) is str
+            ) if _account_match(account_no)
+        }
+        parsed_amounts = {key: self.parse_amount(key) for key in set(amount_keys) if key is not None}
+
+        amounts, violations = [], []
+        currencies = self.currencies
+        for request, from_account, to_account, amount_key in zip(requests, from_accounts, to_accounts, amount_keys):
+            if (type(from_account) is str and type(to_account) is str and from_account != to_account
+                    and from_account in valid_accounts and to_account in valid_accounts
+                    and amount_key is not None and type(request.get('currency')) is str
+                    and request.get('currency') in currencies):
+                value, violation = parsed_amounts[amount_key]
+                if violation is None:
+                    amounts.append(value)
+                    violations.append(())
+                    continue
+            normalized, request_violations = self._collect(request, account_number_error, self.parse_amount)
+            amounts.append(normalized['amount'])
+            violations.append(request_violations)
+        return amounts, violations
+
+
+_account_match = ACCOUNT_NUMBER_PATTERN.fullmatch
+
+
+@lru_cache(maxsize=8)
+def _rules(min_amount, max_amount):
+    return TransferRules(min_amount, max_amount)
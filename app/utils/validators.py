@@ -3,8 +3,13 @@ Validation utilities for the banking application
 """
 
 import re
+from datetime import datetime, timezone
 from decimal import Decimal, InvalidOperation
+from app.config.settings import Config
 from app.utils.exceptions import ValidationException
+from app.utils.transfer_rules import TransferRules, account_number_error
+
+CLIENT_NUMBER_PATTERN = re.compile(r'[0-9]+')
 
 
 def validate_account_number(account_no):
@@ -12,16 +17,9 @@ def validate_account_number(account_no):
     if not account_no:
         raise ValidationException("Account number is required", "account_no")
     
-    if not isinstance(account_no, str):
-        raise ValidationException("Account number must be a string", "account_no")
-    
-    # Check length (assuming 19 digits for Chinese bank accounts)
-    if len(account_no) < 10 or len(account_no) > 50:
-        raise ValidationException("Account number length must be between 10 and 50 characters", "account_no")
-    
-    # Check if it contains only digits and allowed characters
-    if not re.match(r'^[0-9A-Za-z]+$', account_no):
-        raise ValidationException("Account number contains invalid characters", "account_no")
+    error = account_number_error(account_no)
+    if error:
+        raise ValidationException(error, "account_no")
     
     return True
 
@@ -77,7 +75,7 @@ def validate_client_number(client_no):
         raise ValidationException("Client number length must be between 5 and 20 characters", "client_no")
     
     # Check format (digits only for now)
-    if not re.match(r'^[0-9]+$', client_no):
+    if not CLIENT_NUMBER_PATTERN.fullmatch(client_no):
         raise ValidationException("Client number must contain only digits", "client_no")
     
     return True
@@ -85,44 +83,36 @@ def validate_client_number(client_no):
 
 def validate_transfer_request(request_data):
     """Validate complete transfer request"""
-    errors = []
-    
-    # Validate from_account
-    try:
-        validate_account_number(request_data.get('from_account'))
-    except ValidationException as e:
-        errors.append(f"from_account: {e.message}")
-    
-    # Validate to_account
-    try:
-        validate_account_number(request_data.get('to_account'))
-    except ValidationException as e:
-        errors.append(f"to_account: {e.message}")
-    
-    # Validate amount
-    try:
-        validate_amount(request_data.get('amount'))
-    except ValidationException as e:
-        errors.append(f"amount: {e.message}")
-    
-    # Validate currency
-    try:
-        validate_currency(request_data.get('currency', 'CNY'))
-    except ValidationException as e:
-        errors.append(f"currency: {e.message}")
-    
-    # Check if from_account and to_account are different
-    if (request_data.get('from_account') and 
-        request_data.get('to_account') and 
-        request_data.get('from_account') == request_data.get('to_account')):
-        errors.append("from_account and to_account cannot be the same")
+    request = dict(request_data, currency=request_data.get('currency', 'CNY'))
+    _, violations = TransferRules.for_config(Config).validate(request)
     
-    if errors:
+    if violations:
+        errors = [f"{v.field}: {v.message}" for v in violations]
         raise ValidationException(f"Validation failed: {'; '.join(errors)}")
     
     return True
 
 
+def validate_timestamp(value, field='timestamp'):
+    """Parse an ISO 8601 date-time into a naive UTC datetime"""
+    if not value:
+        raise ValidationException(f"{field} is required", field)
+    
+    try:
+        # fromisoformat only accepts a 'Z' suffix from Python 3.11
+        if isinstance(value, str) and value[-1:] in ('Z', 'z'):
+            value = value[:-1] + '+00:00'
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValidationException(f"{field} must be an ISO 8601 date-time", field)
+    
+    # Stored timestamps are naive UTC
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    
+    return parsed
+
+
 def validate_pagination_params(limit, offset):
     """Validate pagination parameters"""
     try:
@@ -0,0 +1,135 @@
+"""
+Throughput benchmark for response encoding, per endpoint payload shape
+
+Compares the previous path (amounts converted to float, encoded by the stdlib
+json module with Flask's default settings) against ResponseEncoder with each
+available backend and MessagePack.
+
+    python -m benchmarks.bench_encoding --seconds 0.5
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from app.models.read_models import (
+    AccountRecord, AccountBalanceRecord, TransactionHistoryRecord,
+    TransferLogRecord, AccountRestraintRecord, ClientTransactionLimitRecord
+)
+from app.utils.encoding import ResponseEncoder, msgpack, orjson
+
+
+def _history_rows(count):
+    now = datetime(2025, 7, 7, 16, 26, 48)
+    return [
+        TransactionHistoryRecord(
+            f"TXN20250707{i:08d}", 1, '1108803572', '6230399991006371427', 'TRANSFER',
+            Decimal('83986.57'), Decimal('1000000.00'), Decimal('916013.43'), 'D',
+            now - timedelta(minutes=i), f"TRF20250707{i:08d}", 'Transfer Out', 'N', now
+        ).to_dict()
+        for i in range(count)
+    ]
+
+
+def _transfer_rows(count):
+    now = datetime(2025, 7, 7, 16, 26, 48)
+    return [
+        TransferLogRecord(
+            i, f"TRF20250707{i:08d}", '6230399991006371427', '6230399991006371430',
+            Decimal('83986.57'), 'CNY', 'SUCCESS', None, now, now
+        ).to_dict()
+        for i in range(count)
+    ]
+
+
+def build_payloads():
+    """Representative response bodies for each read/transfer endpoint"""
+    now = datetime(2025, 7, 7, 16, 26, 48)
+    account = AccountRecord(1, '1108803572', '6230399991006371427', '张三', 'CNY', 'A', '0503', now, now)
+    balance = AccountBalanceRecord(1, '1108803572', Decimal('12345678901234567.89'), now, now)
+    restraint = AccountRestraintRecord(1, 'FREEZE', 'R1', '1108803572', Decimal('500.00'), 'A', now)
+    limit = ClientTransactionLimitRecord(
+        '6230399991006371427', 'DailyTransferLimit', 'CNY', '1108803572',
+        Decimal('50000.00'), Decimal('0.01'), now.date(), now
+    )
+
+    return {
+        'GET /accounts/<no>/balance': {'success': True, 'data': {
+            'account_no': account.BASE_ACCT_NO, 'balance': balance.TOTAL_AMOUNT,
+            'currency': account.ACCT_CCY, 'last_updated': now.isoformat(), 'database': 'source'
+        }},
+        'GET /accounts/<no>': {'success': True, 'data': {
+            'account': account.to_dict(), 'balance': balance.to_dict(),
+            'restrictions': [restraint.to_dict()], 'limits': [limit.to_dict()]
+        }},
+        'GET /accounts/<no>/transactions?limit=100': {'success': True, 'data': {
+            'account_no': account.BASE_ACCT_NO, 'transactions': _history_rows(100),
+            'count': 100, 'limit': 100, 'offset': 0
+        }},
+        'GET /transfers/<id>': {'success': True, 'data': _transfer_rows(1)[0]},
+        'GET /transfers/history/<no>?limit=100': {'success': True, 'data': {
+            'account_no': account.BASE_ACCT_NO, 'transfers': _transfer_rows(100),
+            'count': 100, 'limit': 100, 'offset': 0
+        }}
+    }
+
+
+def _to_float(obj):
+    """Apply the previous float conversion of amounts"""
+    if isinstance(obj, dict):
+        return {k: _to_float(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_to_float(v) for v in obj]
+    if isinstance(obj, Decimal):
+        return float(obj)
+    return obj
+
+
+def _throughput(func, seconds):
+    count = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        func()
+        count += 1
+    return count / seconds
+
+
+def run(seconds=0.5):
+    """Measure encodes per second for each payload and encoder"""
+    encoders = {'builtin': ResponseEncoder('number', use_orjson=False)}
+    if orjson is not None:
+        encoders['orjson'] = ResponseEncoder('number', use_orjson=True)
+
+    results = {}
+    for endpoint, payload in build_payloads().items():
+        legacy_payload = _to_float(payload)
+        row = {
+            'stdlib_float': _throughput(
+                lambda: json.dumps(legacy_payload, sort_keys=True).encode('utf-8'), seconds
+            )
+        }
+        for name, encoder in encoders.items():
+            row[name] = _throughput(lambda: encoder.encode_json(payload), seconds)
+        if msgpack is not None:
+            row['msgpack'] = _throughput(lambda: encoders['builtin'].encode_msgpack(payload), seconds)
+
+        results[endpoint] = {name: round(value) for name, value in row.items()}
+        results[endpoint]['json_bytes'] = len(encoders['builtin'].encode_json(payload))
+        if msgpack is not None:
+            results[endpoint]['msgpack_bytes'] = len(encoders['builtin'].encode_msgpack(payload))
+
+    return {'unit': 'encodes/second', 'endpoints': results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--seconds', type=float, default=0.5, help='Measurement time per cell')
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.seconds), indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
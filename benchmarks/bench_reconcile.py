@@ -0,0 +1,151 @@
+"""
+Benchmark: reconciling one day of transfers, row by row vs hash-tree digests
+
+Seeds the same day of transfers into two SQLite files standing in for the
+source and destination databases, damages a few of them, then reconciles
+the day twice. The row-by-row variant fetches every transfer_log and
+rb_tran_hist row of the day from both databases and compares them per
+transfer id, as a hand-written check would. The Reconciler compares hour
+digests computed inside each database and fetches rows only for the seconds
+that disagree.
+
+    python -m benchmarks.bench_reconcile --transfers 200000 --damaged 5
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date
+
+from sqlalchemy import create_engine, insert, select, update
+from sqlalchemy.orm import sessionmaker
+
+from app.models.transaction import TransactionHistory, TransferLog
+from app.tools.reconcile import Reconciler, SIDES, transfer_issues
+from benchmarks.common import create_schema, register_mysql_functions
+
+DAY = date(2025, 7, 7)
+
+
+def _legacy_reconcile(session_factories, day):
+    """Fetch every row of the day from both databases and compare per transfer id"""
+    low, high = f"TRF{day.strftime('%Y%m%d')}", f"TRF{day.strftime('%Y%m%d')}~"
+    logs = {side: {} for side in SIDES}
+    legs = {side: defaultdict(list) for side in SIDES}
+    rows = 0
+    for side in SIDES:
+        with session_factories[side]() as session:
+            for log in session.execute(
+                    select(TransferLog).where(TransferLog.transfer_id >= low, TransferLog.transfer_id < high)
+            ).scalars():
+                logs[side][log.transfer_id] = (int(log.amount * 100), log.status)
+                rows += 1
+            for history in session.execute(
+                    select(TransactionHistory)
+                    .where(TransactionHistory.REFERENCE >= low, TransactionHistory.REFERENCE < high)
+            ).scalars():
+                legs[side][history.REFERENCE].append((int(history.TRAN_AMT * 100), history.CR_DR_IND, history.SEQ_NO))
+                rows += 1
+
+    transfer_ids = set()
+    for side in SIDES:
+        transfer_ids.update(logs[side], legs[side])
+    discrepancies = [
+        transfer_id for transfer_id in sorted(transfer_ids)
+        if transfer_issues(logs['source'].get(transfer_id), logs['dest'].get(transfer_id),
+                           legs['source'].get(transfer_id, []), legs['dest'].get(transfer_id, []))
+    ]
+    return discrepancies, rows
+
+
+def seed(engines, count, damaged, seed=42):
+    """Insert a day of transfers into both databases, returning the damaged transfer ids"""
+    rng = random.Random(seed)
+    transfer_ids = sorted(
+        f"TRF{DAY.strftime('%Y%m%d')}{rng.randrange(86400) // 3600:02d}"
+        f"{rng.randrange(60):02d}{rng.randrange(60):02d}{i:08X}"
+        for i in range(count)
+    )
+    amounts = [rng.randint(1, 500000) for _ in range(count)]
+
+    for side, indicator in (('source', 'D'), ('dest', 'C')):
+        with engines[side].begin() as conn:
+            conn.execute(insert(TransferLog.__table__), [
+                {'transfer_id': transfer_id, 'from_account': '6230399991000000001',
+                 'to_account': '6230399991000000002', 'amount': cents / 100, 'status': 'SUCCESS'}
+                for transfer_id, cents in zip(transfer_ids, amounts)
+            ])
+            conn.execute(insert(TransactionHistory.__table__), [
+                {'SEQ_NO': f"{indicator}{transfer_id}", 'INTERNAL_KEY': 1, 'REFERENCE': transfer_id,
+                 'TRAN_AMT': cents / 100, 'CR_DR_IND': indicator, 'TRAN_STATUS': 'N'}
+                for transfer_id, cents in zip(transfer_ids, amounts)
+            ])
+
+    # Alter the credit leg of a few transfers in the destination
+    broken = sorted(rng.sample(transfer_ids, damaged))
+    with engines['dest'].begin() as conn:
+        for transfer_id in broken:
+            conn.execute(
+                update(TransactionHistory.__table__)
+                .where(TransactionHistory.REFERENCE == transfer_id)
+                .values(TRAN_AMT=TransactionHistory.TRAN_AMT + 1)
+            )
+    return broken
+
+
+def run(transfers=200000, damaged=5, workers=8):
+    """Reconcile the seeded day both ways, returning timings and rows fetched"""
+    directory = tempfile.mkdtemp(prefix='bank-reconcile-')
+    try:
+        engines = {}
+        for side in SIDES:
+            engine = create_engine(
+                f"sqlite:///{os.path.join(directory, side + '.db')}",
+                connect_args={'check_same_thread': False}
+            )
+            register_mysql_functions(engine)
+            create_schema(engine)
+            engines[side] = engine
+        broken = seed(engines, transfers, damaged)
+        session_factories = {side: sessionmaker(bind=engine) for side, engine in engines.items()}
+
+        started = time.perf_counter()
+        legacy_found, legacy_rows = _legacy_reconcile(session_factories, DAY)
+        legacy_seconds = time.perf_counter() - started
+
+        report = Reconciler(session_factories['source'], session_factories['dest'], workers=workers).reconcile(DAY)
+        found = [d['transfer_id'] for d in report['discrepancies']]
+
+        for engine in engines.values():
+            engine.dispose()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return {
+        'transfers': transfers,
+        'damaged': damaged,
+        'found': {'row_by_row': legacy_found == broken, 'hash_tree': found == broken},
+        'rows_compared': legacy_rows,
+        'partitions': report['partitions'],
+        'seconds': {'row_by_row': round(legacy_seconds, 3), 'hash_tree': report['seconds']},
+        'speedup': round(legacy_seconds / report['seconds'], 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--transfers', type=int, default=200000)
+    parser.add_argument('--damaged', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.transfers, args.damaged, args.workers), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""
+Benchmark: time until every worker serves, fresh imports vs a preloaded master
+
+Seeds two SQLite files standing in for the source and destination
+databases, then starts the application the two ways gunicorn can. Without
+preload every worker is its own interpreter that imports the application,
+runs create_app and loads its caches. With preload one master imports and
+runs create_app (lazy startup: no engine, no thread) and forks the workers,
+which only create their engines and load their caches. Times are wall
+clock from launching the processes, interpreter start included.
+
+    python -m benchmarks.bench_startup --workers 4 --accounts 20000
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.common import create_schema, create_sqlite_file_engine, seed_accounts
+
+
+def seed(directory, accounts):
+    """Create the two databases, with an active restraint on every 50th account"""
+    from app.models.constraints import AccountRestraint
+
+    for name, prefix in (('source', '6230399991'), ('dest', '6230399992')):
+        engine = create_sqlite_file_engine(os.path.join(directory, f'{name}.db'))
+        create_schema(engine)
+        with sessionmaker(bind=engine)() as session:
+            seed_accounts(session, accounts, account_prefix=prefix)
+            session.add_all(
+                AccountRestraint(INTERNAL_KEY=key, RESTRAINT_TYPE='FREEZE', RES_SEQ_NO=f'R{key}',
+                                 RESTRAINTS_STATUS='A', TRAN_TIMESTAMP=datetime.utcnow())
+                for key in range(1, accounts + 1, 50)
+            )
+            session.commit()
+        engine.dispose()
+
+
+def _bench_config(directory):
+    from app.config.settings import Config
+
+    class BenchConfig(Config):
+        LOG_LEVEL = 'WARNING'
+        LOG_FILE = os.path.join(directory, 'banking.log')
+        LAZY_STARTUP = True
+        ADMISSION_ENABLED = False
+    return BenchConfig
+
+
+def _start_worker(app, directory):
+    """Bind the worker to the SQLite files and start its caches, returning when it was ready"""
+    from app import start_worker
+    from app.database.connection import use_engines
+
+    use_engines(*(create_sqlite_file_engine(os.path.join(directory, f'{name}.db')) for name in ('source', 'dest')))
+    start_worker(app)
+    return time.time()
+
+
+def _worker(directory):
+    """One worker without preload: import, create_app and load caches in this process"""
+    from app import create_app
+
+    app = create_app(_bench_config(directory))
+    print(json.dumps({'ready_at': _start_worker(app, directory)}))
+
+
+def _master(directory, workers):
+    """A preloading master: create_app once, then fork the workers"""
+    from app import create_app
+    from app.database import connection
+
+    app = create_app(_bench_config(directory))
+    preloaded_at = time.time()
+    master_engines = sum(engine is not None for engine in (connection.source_engine, connection.dest_engine))
+
+    pipes = []
+    for _ in range(workers):
+        read_fd, write_fd = os.pipe()
+        if os.fork() == 0:
+            os.close(read_fd)
+            os.write(write_fd, json.dumps({'ready_at': _start_worker(app, directory)}).encode())
+            os._exit(0)
+        os.close(write_fd)
+        pipes.append(read_fd)
+
+    results = []
+    for read_fd in pipes:
+        with os.fdopen(read_fd) as pipe:
+            results.append(json.loads(pipe.read())['ready_at'])
+    for _ in range(workers):
+        os.wait()
+    print(json.dumps({'preloaded_at': preloaded_at, 'master_engines': master_engines, 'ready_at': results}))
+
+
+def _launch(role, directory, workers):
+    return subprocess.Popen(
+        [sys.executable, '-m', 'benchmarks.bench_startup', '--role', role, '--dir', directory,
+         '--workers', str(workers)],
+        stdout=subprocess.PIPE, text=True
+    )
+
+
+def run(workers=4, accounts=20000):
+    """Start the workers both ways, returning timings"""
+    directory = tempfile.mkdtemp(prefix='bank-startup-')
+    try:
+        seed(directory, accounts)
+
+        launched = time.time()
+        processes = [_launch('worker', directory, workers) for _ in range(workers)]
+        fresh = [json.loads(process.communicate()[0])['ready_at'] - launched for process in processes]
+
+        launched = time.time()
+        preload = json.loads(_launch('master', directory, workers).communicate()[0])
+        preloaded = [ready_at - launched for ready_at in preload['ready_at']]
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return {
+        'workers': workers,
+        'accounts': accounts,
+        'fresh': {
+            'all_ready_seconds': round(max(fresh), 3),
+            'worker_ready_median': round(statistics.median(fresh), 3)
+        },
+        'preload': {
+            'all_ready_seconds': round(max(preloaded), 3),
+            'master_seconds': round(preload['preloaded_at'] - launched, 3),
+            'master_engines': preload['master_engines'],
+            'worker_ready_median': round(statistics.median(preloaded), 3)
+        },
+        'speedup': round(max(fresh) / max(preloaded), 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--accounts', type=int, default=20000)
+    parser.add_argument('--role', choices=('worker', 'master'), help=argparse.SUPPRESS)
+    parser.add_argument('--dir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.role == 'worker':
+        _worker(args.dir)
+    elif args.role == 'master':
+        _master(args.dir, args.workers)
+    else:
+        print(json.dumps(run(args.workers, args.accounts), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Micro-benchmark: CPU per transfer for ORM query chains vs pre-built statements
+
+Runs the read/lock query sequence of TransferService._execute_transfer against
+an in-memory SQLite database, once with per-call ``session.query(...)`` chains
+(the previous implementation) and once through AccountService, which uses the
+module-level statements in app.database.statements.
+
+    python -m benchmarks.bench_statements --iterations 2000
+"""
+
+import argparse
+import json
+from decimal import Decimal
+
+from sqlalchemy import and_
+
+from app.models.account import Account, AccountBalance
+from app.models.constraints import AccountRestraint, ClientTransactionLimit
+from app.models.transaction import TransferLog
+from app.database import statements
+from app.services.account_service import AccountService
+from benchmarks.common import create_seeded_database, measure_cpu
+
+
+def _legacy_transfer_queries(session, from_account, to_account):
+    """Query sequence of one transfer, built with session.query on every call"""
+
+    def account_with_balance(account_no, for_update=False):
+        query = session.query(Account, AccountBalance).join(
+            AccountBalance, Account.INTERNAL_KEY == AccountBalance.INTERNAL_KEY
+        ).filter(Account.BASE_ACCT_NO == account_no)
+        if for_update:
+            query = query.with_for_update()
+        return query.first()
+
+    def restrictions(internal_key):
+        return session.query(AccountRestraint).filter(
+            and_(
+                AccountRestraint.INTERNAL_KEY == internal_key,
+                AccountRestraint.RESTRAINTS_STATUS == 'A'
+            )
+        ).all()
+
+    source_account, _ = account_with_balance(from_account)
+    restrictions(source_account.INTERNAL_KEY)
+    session.query(ClientTransactionLimit).filter(
+        and_(
+            ClientTransactionLimit.BASE_ACCT_NO == from_account,
+            ClientTransactionLimit.LIMIT_REF == 'DailyTransferLimit'
+        )
+    ).first()
+    account_with_balance(from_account)
+
+    dest_account, _ = account_with_balance(to_account)
+    restrictions(dest_account.INTERNAL_KEY)
+
+    account_with_balance(from_account, for_update=True)
+    account_with_balance(to_account, for_update=True)
+    session.query(TransferLog).filter(TransferLog.transfer_id == 'TRF-BENCH').first()
+
+
+def _cached_transfer_queries(session, from_account, to_account):
+    """Query sequence of one transfer, through AccountService and cached statements"""
+    service = AccountService(session)
+    amount = Decimal('10.00')
+
+    service.validate_account_for_transfer(from_account, is_source=True)
+    service.check_transfer_limits(from_account, amount)
+    service.validate_sufficient_balance(from_account, amount)
+    service.validate_account_for_transfer(to_account, is_source=False)
+
+    service.lock_account_for_update(from_account)
+    service.lock_account_for_update(to_account)
+    session.execute(statements.TRANSFER_LOG_BY_ID, {'transfer_id': 'TRF-BENCH'}).scalars().first()
+
+
+def run(iterations=2000, accounts=100):
+    """Run both variants and return per-transfer CPU cost in microseconds"""
+    engine, Session, account_numbers = create_seeded_database(accounts)
+    pairs = [
+        (account_numbers[i % accounts], account_numbers[(i + 1) % accounts])
+        for i in range(iterations)
+    ]
+
+    def make_step(query_sequence):
+        def step(i):
+            with Session() as session:
+                query_sequence(session, *pairs[i])
+                session.rollback()
+        return step
+
+    results = {}
+    for name, sequence in (('orm_query', _legacy_transfer_queries),
+                           ('cached_statements', _cached_transfer_queries)):
+        step = make_step(sequence)
+        # Warm up the compiled cache so both variants are measured in steady state
+        measure_cpu(step, min(100, iterations))
+        results[name] = round(measure_cpu(step, iterations) * 1e6, 1)
+
+    engine.dispose()
+    return {
+        'iterations': iterations,
+        'cpu_us_per_transfer': results,
+        'speedup': round(results['orm_query'] / results['cached_statements'], 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--accounts', type=int, default=100)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.iterations, args.accounts), indent=2))
+
+
+if __name__ == '__main__':
+    main()
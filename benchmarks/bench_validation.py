@@ -0,0 +1,174 @@
+"""
+Micro-benchmark: CPU per transfer request for request validation
+
+Compares the previous validation path against TransferRules. The previous
+path ran the API-level checks of app.utils.validators (uncompiled regexes,
+errors collected by catching exceptions) followed by
+TransferService._validate_transfer_request with its own Decimal
+conversions. TransferRules is measured per request and with validate_batch
+over the whole set.
+
+    python -m benchmarks.bench_validation --requests 10000 --accounts 200
+"""
+
+import argparse
+import json
+import random
+import re
+import time
+from decimal import Decimal, InvalidOperation
+
+from app.config.settings import Config
+from app.utils.exceptions import (
+    BankingException, ValidationException, TransferException, SameAccountTransferException,
+    CurrencyMismatchException, TransferLimitExceededException
+)
+from app.utils.transfer_rules import TransferRules
+from benchmarks.common import ZipfSampler
+
+
+def _legacy_validate(request_data, min_amount, max_amount):
+    """Validation of one request as performed before TransferRules"""
+
+    def account_number(account_no):
+        if not account_no:
+            raise ValidationException("Account number is required", "account_no")
+        if not isinstance(account_no, str):
+            raise ValidationException("Account number must be a string", "account_no")
+        if len(account_no) < 10 or len(account_no) > 50:
+            raise ValidationException("Account number length must be between 10 and 50 characters", "account_no")
+        if not re.match(r'^[0-9A-Za-z]+$', account_no):
+            raise ValidationException("Account number contains invalid characters", "account_no")
+
+    def amount_value(amount):
+        if amount is None:
+            raise ValidationException("Amount is required", "amount")
+        try:
+            decimal_amount = Decimal(str(amount))
+        except (InvalidOperation, ValueError):
+            raise ValidationException("Amount must be a valid number", "amount")
+        if decimal_amount <= 0:
+            raise ValidationException("Amount must be positive", "amount")
+        if decimal_amount.as_tuple().exponent < -2:
+            raise ValidationException("Amount cannot have more than 2 decimal places", "amount")
+
+    def currency_code(currency):
+        if not currency:
+            raise ValidationException("Currency is required", "currency")
+        if currency.upper() not in ['CNY']:
+            raise ValidationException("Unsupported currency. Supported: CNY", "currency")
+
+    errors = []
+    for field, check in (('from_account', account_number), ('to_account', account_number),
+                         ('amount', amount_value), ('currency', currency_code)):
+        try:
+            check(request_data.get(field))
+        except ValidationException as e:
+            errors.append(f"{field}: {e.message}")
+    if request_data.get('from_account') and request_data.get('from_account') == request_data.get('to_account'):
+        errors.append("from_account and to_account cannot be the same")
+    if errors:
+        raise ValidationException(f"Validation failed: {'; '.join(errors)}")
+
+    for field in ['from_account', 'to_account', 'amount', 'currency']:
+        if not request_data.get(field):
+            raise TransferException(f"Missing required field: {field}")
+    if request_data['from_account'] == request_data['to_account']:
+        raise SameAccountTransferException(request_data['from_account'])
+    amount = Decimal(str(request_data['amount']))
+    if amount <= 0:
+        raise TransferException("Transfer amount must be positive")
+    if amount < min_amount:
+        raise TransferLimitExceededException('Minimum Transfer Amount', min_amount, amount)
+    if amount > max_amount:
+        raise TransferLimitExceededException('Maximum Transfer Amount', max_amount, amount)
+    if request_data['currency'] != 'CNY':
+        raise CurrencyMismatchException(request_data['currency'], 'CNY')
+
+
+def build_requests(count, accounts, invalid_ratio=0.05, seed=42):
+    """Transfer requests over a Zipf-skewed account set, a share of them invalid"""
+    rng = random.Random(seed)
+    sampler = ZipfSampler(accounts, 1.1, seed=seed)
+    numbers = [f"6230399991{i:09d}" for i in range(accounts)]
+    requests = []
+    for _ in range(count):
+        request = {
+            'from_account': numbers[sampler.sample()],
+            'to_account': numbers[sampler.sample()],
+            'amount': f"{rng.randint(1, 500000) / 100:.2f}",
+            'currency': 'CNY'
+        }
+        if rng.random() < invalid_ratio:
+            request[rng.choice(['amount', 'to_account', 'currency'])] = rng.choice(['-1', '62303-9999', 'USD'])
+        requests.append(request)
+    return requests
+
+
+def run(count=10000, accounts=200, repeat=3):
+    """Time each path over the same requests, returning the best microseconds per request"""
+    config = Config()
+    min_amount = Decimal(str(config.MIN_TRANSFER_AMOUNT))
+    max_amount = Decimal(str(config.MAX_TRANSFER_AMOUNT))
+    rules = TransferRules.for_config(config)
+    requests = build_requests(count, accounts)
+
+    def timed(func):
+        best = None
+        for _ in range(repeat):
+            started = time.process_time()
+            result = func()
+            elapsed = time.process_time() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best / count * 1e6, result
+
+    # Each variant keeps its per-request outcome, as a caller would
+    def legacy():
+        outcomes = []
+        for request in requests:
+            try:
+                _legacy_validate(request, min_amount, max_amount)
+                outcomes.append(None)
+            except BankingException as e:
+                outcomes.append(e)
+        return sum(1 for outcome in outcomes if outcome is not None)
+
+    def compiled():
+        outcomes = [rules.validate(request) for request in requests]
+        return sum(1 for _, violations in outcomes if violations)
+
+    def batch():
+        return sum(1 for violations in rules.validate_batch(requests)[1] if violations)
+
+    legacy_us, legacy_rejected = timed(legacy)
+    compiled_us, compiled_rejected = timed(compiled)
+    batch_us, batch_rejected = timed(batch)
+
+    return {
+        'requests': count,
+        'accounts': accounts,
+        'rejected': {'legacy': legacy_rejected, 'rules': compiled_rejected, 'batch': batch_rejected},
+        'us_per_request': {
+            'legacy': round(legacy_us, 3),
+            'rules': round(compiled_us, 3),
+            'batch': round(batch_us, 3)
+        },
+        'speedup': {
+            'rules': round(legacy_us / compiled_us, 2),
+            'batch': round(legacy_us / batch_us, 2)
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=10000)
+    parser.add_argument('--accounts', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per variant; the fastest is reported')
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.requests, args.accounts, args.repeat), indent=2))
+
+
+if __name__ == '__main__':
+    main()
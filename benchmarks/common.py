@@ -0,0 +1,151 @@
+"""
+Shared fixtures for benchmarks: an in-memory SQLite stand-in for the two
+MySQL databases, with the application schema and seeded accounts
+"""
+
+import bisect
+import decimal
+import math
+import random
+import time
+import zlib
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models.account import Base as AccountBase, Account, AccountBalance
+from app.models.calendar import Base as CalendarBase
+from app.models.constraints import Base as ConstraintBase, ClientTransactionLimit
+from app.models.transaction import Base as TransactionBase
+
+
+def _crc32(value):
+    return None if value is None else zlib.crc32(str(value).encode('utf-8'))
+
+
+def register_mysql_functions(engine):
+    """Provide the MySQL built-ins the application queries use (CRC32)"""
+    @event.listens_for(engine, 'connect')
+    def register(dbapi_connection, connection_record):
+        dbapi_connection.create_function('crc32', 1, _crc32, deterministic=True)
+
+
+def create_sqlite_engine():
+    """Create an in-memory SQLite engine shared across threads"""
+    engine = create_engine(
+        'sqlite://',
+        poolclass=StaticPool,
+        connect_args={'check_same_thread': False}
+    )
+    register_mysql_functions(engine)
+    return engine
+
+
+def create_sqlite_file_engine(path, busy_timeout=30):
+    """
+    Create a file-backed SQLite engine that allows concurrent connections.
+
+    SQLite ignores FOR UPDATE and pysqlite only begins a transaction at the
+    first write, so balance reads would race. Every transaction instead starts
+    with BEGIN IMMEDIATE, which takes the database write lock up front and
+    serializes writers the way the row locks do on MySQL.
+    """
+    engine = create_engine(
+        f'sqlite:///{path}',
+        connect_args={'check_same_thread': False, 'timeout': busy_timeout}
+    )
+
+    @event.listens_for(engine, 'connect')
+    def disable_pysqlite_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, 'begin')
+    def begin_immediate(conn):
+        conn.exec_driver_sql('BEGIN IMMEDIATE')
+
+    register_mysql_functions(engine)
+    return engine
+
+
+def create_schema(engine):
+    """Create all application tables on an engine"""
+    for base in (AccountBase, ConstraintBase, TransactionBase, CalendarBase):
+        base.metadata.create_all(engine)
+
+
+def seed_accounts(session, count, start_key=1, balance='100000.00', account_prefix='6230399991'):
+    """Insert accounts with balances and daily limits, returning their account numbers"""
+    account_numbers = []
+    for offset in range(count):
+        internal_key = start_key + offset
+        account_no = f"{account_prefix}{internal_key:09d}"
+        client_no = f"11088{internal_key:05d}"
+        session.add(Account(
+            INTERNAL_KEY=internal_key,
+            CLIENT_NO=client_no,
+            BASE_ACCT_NO=account_no,
+            ACCT_NAME=f"Benchmark {internal_key}",
+            ACCT_CCY='CNY',
+            ACCT_STATUS='A',
+            ACCT_BRANCH='0503'
+        ))
+        session.add(AccountBalance(
+            INTERNAL_KEY=internal_key,
+            CLIENT_NO=client_no,
+            TOTAL_AMOUNT=decimal.Decimal(balance)
+        ))
+        session.add(ClientTransactionLimit(
+            BASE_ACCT_NO=account_no,
+            LIMIT_REF='DailyTransferLimit',
+            ACCT_CCY='CNY',
+            CLIENT_NO=client_no,
+            LIMIT_MAX_AMT=decimal.Decimal('50000.00'),
+            LIMIT_MIN_AMT=decimal.Decimal('0.01')
+        ))
+        account_numbers.append(account_no)
+    session.commit()
+    return account_numbers
+
+
+def create_seeded_database(count, **seed_kwargs):
+    """Create a seeded in-memory database, returning (engine, session factory, account numbers)"""
+    engine = create_sqlite_engine()
+    create_schema(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as session:
+        account_numbers = seed_accounts(session, count, **seed_kwargs)
+    return engine, Session, account_numbers
+
+
+def measure_cpu(func, iterations):
+    """Run func iterations times, returning CPU seconds per call"""
+    started = time.process_time()
+    for i in range(iterations):
+        func(i)
+    return (time.process_time() - started) / iterations
+
+
+
+class ZipfSampler:
+    """Draw indexes in [0, n) with probability proportional to 1 / (rank + 1) ** skew"""
+
+    def __init__(self, n, skew=1.0, seed=None):
+        self.random = random.Random(seed)
+        total = 0.0
+        self.cumulative = []
+        for rank in range(n):
+            total += 1.0 / (rank + 1) ** skew
+            self.cumulative.append(total)
+        self.total = total
+
+    def sample(self):
+        return bisect.bisect_left(self.cumulative, self.random.random() * self.total)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = min(len(sorted_values), max(1, math.ceil(pct / 100.0 * len(sorted_values)))) - 1
+    return sorted_values[rank]
@@ -0,0 +1,346 @@
+"""
+Load test for the transfer pipeline
+
+Seeds N accounts in each of the two databases, then drives transfers from
+source accounts to destination accounts with a pool of worker threads, either
+through TransferService directly or through the HTTP API (an in-process app
+built from the blueprints, or a running server with --base-url). Account
+choice follows a Zipf distribution so a few accounts are hot; --skew 0 is
+uniform.
+
+The databases are local MySQL (--backend mysql with --source-url/--dest-url)
+or file-backed SQLite stand-ins. Both are bound through
+app.database.connection, so the service code runs unchanged.
+
+Reports throughput, latency percentiles and deadlock / lock-timeout / retry
+counts as JSON. TransferService reruns transfers that lose a lock conflict,
+so deadlocks and lock timeouts mostly never reach the client: service_retries
+and retried_transfers count those reruns, from the retry_count of each
+successful transfer. --service-attempts 1 turns the service's retries off, so
+every conflict is counted as a deadlock or lock timeout (service layer only). Pass --output to keep the run and --compare to diff it
+against an earlier one.
+
+    python -m benchmarks.load_test --accounts 1000 --skew 1.1 --concurrency 8 --duration 10
+    python -m benchmarks.load_test --layer http --transfers 2000 --output results/http.json
+    python -m benchmarks.load_test --skew 1.5 --concurrency 16 --service-attempts 1
+    python -m benchmarks.load_test --backend mysql --source-url mysql+pymysql://u:p@localhost/bench_source \\
+        --dest-url mysql+pymysql://u:p@localhost/bench_dest --seed
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.config.settings import Config, TestingConfig
+from app.database import connection
+from benchmarks.common import (
+    ZipfSampler, create_schema, create_sqlite_file_engine, percentile, seed_accounts
+)
+
+SOURCE_PREFIX = '6230399991'
+DEST_PREFIX = '6230399992'
+
+RETRYABLE_ERRORS = ('deadlock', 'lock_timeout')
+
+
+def classify_error(message):
+    """Map a transfer failure message to a result category"""
+    if 'Deadlock found' in message or '(1213' in message:
+        return 'deadlock'
+    if 'Lock wait timeout' in message or '(1205' in message or 'database is locked' in message:
+        return 'lock_timeout'
+    if 'Insufficient balance' in message or 'INSUFFICIENT_BALANCE' in message:
+        return 'insufficient_balance'
+    if 'limit' in message.lower():
+        return 'limit_exceeded'
+    return 'other'
+
+
+def prepare_databases(args):
+    """Create (and optionally seed) both databases, returning engines and account numbers"""
+    if args.backend == 'sqlite':
+        directory = tempfile.mkdtemp(prefix='bank-load-')
+        source = create_sqlite_file_engine(os.path.join(directory, 'source.db'))
+        dest = create_sqlite_file_engine(os.path.join(directory, 'dest.db'))
+        seed = True
+    else:
+        pool_size = args.concurrency + 2
+        source = create_engine(args.source_url, pool_size=pool_size, pool_pre_ping=True)
+        dest = create_engine(args.dest_url, pool_size=pool_size, pool_pre_ping=True)
+        seed = args.seed
+
+    if seed:
+        for engine, prefix in ((source, SOURCE_PREFIX), (dest, DEST_PREFIX)):
+            create_schema(engine)
+            with sessionmaker(bind=engine)() as session:
+                seed_accounts(session, args.accounts, start_key=args.start_key,
+                              balance=args.balance, account_prefix=prefix)
+
+    source_accounts = [f"{SOURCE_PREFIX}{args.start_key + i:09d}" for i in range(args.accounts)]
+    dest_accounts = [f"{DEST_PREFIX}{args.start_key + i:09d}" for i in range(args.accounts)]
+    return source, dest, source_accounts, dest_accounts
+
+
+class ServiceDriver:
+    """Submits transfers through TransferService"""
+
+    def __init__(self, max_attempts=None):
+        from app.services.transfer_service import TransferService
+        config = Config()
+        if max_attempts is not None:
+            config.TRANSFER_RETRY_MAX_ATTEMPTS = max_attempts
+        self.service = TransferService(config)
+
+    def transfer(self, request):
+        """Submit one transfer, returning (error or None, retries the service ran)"""
+        try:
+            result = self.service.process_transfer(request)
+            return None, result.get('retry_count') or 0
+        except Exception as e:
+            return str(e), 0
+
+
+class HttpDriver:
+    """Submits transfers through POST /api/v1/transfers"""
+
+    def __init__(self, base_url=None):
+        self.base_url = base_url.rstrip('/') if base_url else None
+        self.app = None if base_url else build_app()
+        self.local = threading.local()
+
+    def _client(self):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            if self.app is not None:
+                client = self.app.test_client()
+            else:
+                import requests
+                client = requests.Session()
+            self.local.client = client
+        return client
+
+    def transfer(self, request):
+        """Submit one transfer, returning (error or None, retries the service ran)"""
+        payload = dict(request, amount=str(request['amount']))
+        if self.app is not None:
+            response = self._client().post('/api/v1/transfers', json=payload)
+            status, body = response.status_code, response.get_data(as_text=True)
+        else:
+            response = self._client().post(f"{self.base_url}/api/v1/transfers", json=payload, timeout=60)
+            status, body = response.status_code, response.text
+        if status != 201:
+            return body, 0
+        return None, json.loads(body)['data'].get('retry_count') or 0
+
+
+def build_app():
+    """Flask app with the API blueprints, bound to the already configured databases"""
+    from flask import Flask
+    from flask_jwt_extended import JWTManager
+    from app.api.account_api import account_bp
+    from app.api.transfer_api import transfer_bp
+    from app.utils.encoding import BankingJSONProvider
+
+    app = Flask('load_test')
+    app.config.from_object(TestingConfig)
+    app.json = BankingJSONProvider(app)
+    JWTManager(app)
+    app.register_blueprint(account_bp, url_prefix='/api/v1')
+    app.register_blueprint(transfer_bp, url_prefix='/api/v1')
+    return app
+
+
+def run_load(driver, source_accounts, dest_accounts, concurrency=4, duration=10.0,
+             transfers=None, skew=1.0, retries=0, seed=42):
+    """Drive transfers from worker threads, returning the aggregated results"""
+    issued = itertools.count()
+    deadline = time.perf_counter() + duration
+
+    def worker(worker_id):
+        rng = random.Random(seed * 1000 + worker_id)
+        from_sampler = ZipfSampler(len(source_accounts), skew, seed=rng.random())
+        to_sampler = ZipfSampler(len(dest_accounts), skew, seed=rng.random())
+        latencies, outcomes = [], Counter()
+
+        while time.perf_counter() < deadline:
+            if transfers is not None and next(issued) >= transfers:
+                break
+
+            request = {
+                'from_account': source_accounts[from_sampler.sample()],
+                'to_account': dest_accounts[to_sampler.sample()],
+                'amount': Decimal(rng.randint(100, 10000)) / 100,
+                'currency': 'CNY',
+                'description': 'Load test',
+                'reference': ''
+            }
+
+            started = time.perf_counter()
+            for attempt in range(retries + 1):
+                error, service_retries = driver.transfer(request)
+                if service_retries:
+                    outcomes['service_retries'] += service_retries
+                    outcomes['retried_transfers'] += 1
+                category = classify_error(error) if error else None
+                if category:
+                    outcomes[category] += 1
+                if category not in RETRYABLE_ERRORS or attempt == retries:
+                    break
+                outcomes['retries'] += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+            outcomes['failed' if error else 'succeeded'] += 1
+
+        return latencies, outcomes
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(itertools.chain.from_iterable(r[0] for r in results))
+    outcomes = sum((r[1] for r in results), Counter())
+    errors = {k: v for k, v in outcomes.items()
+              if k not in ('succeeded', 'failed', 'retries', 'service_retries', 'retried_transfers')}
+
+    return {
+        'attempted': len(latencies),
+        'succeeded': outcomes['succeeded'],
+        'failed': outcomes['failed'],
+        'elapsed_seconds': round(elapsed, 3),
+        'throughput_tps': round(outcomes['succeeded'] / elapsed, 2) if elapsed else 0.0,
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies), 3) if latencies else None,
+            'p50': _round(percentile(latencies, 50)),
+            'p95': _round(percentile(latencies, 95)),
+            'p99': _round(percentile(latencies, 99)),
+            'max': _round(latencies[-1] if latencies else None)
+        },
+        'deadlocks': outcomes['deadlock'],
+        'lock_timeouts': outcomes['lock_timeout'],
+        'retries': outcomes['retries'],
+        'service_retries': outcomes['service_retries'],
+        'retried_transfers': outcomes['retried_transfers'],
+        'errors': errors
+    }
+
+
+def _round(value):
+    return round(value, 3) if value is not None else None
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(current, previous):
+    """Relative change of throughput and latency against an earlier run"""
+    def change(new, old):
+        if new is None or not old:
+            return None
+        return round((new - old) / old * 100, 2)
+
+    now, before = current['results'], previous['results']
+    comparison = {
+        'baseline_commit': previous.get('git_commit'),
+        'baseline_started_at': previous.get('started_at'),
+        'throughput_tps_change_pct': change(now['throughput_tps'], before['throughput_tps'])
+    }
+    for key in ('p50', 'p95', 'p99'):
+        comparison[f'{key}_latency_change_pct'] = change(now['latency_ms'][key], before['latency_ms'][key])
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--backend', choices=['sqlite', 'mysql'], default='sqlite')
+    parser.add_argument('--source-url', help='SQLAlchemy URL of the source MySQL database')
+    parser.add_argument('--dest-url', help='SQLAlchemy URL of the destination MySQL database')
+    parser.add_argument('--seed', action='store_true', help='Create tables and seed accounts (MySQL)')
+    parser.add_argument('--layer', choices=['service', 'http'], default='service')
+    parser.add_argument('--base-url', help='Drive a running server instead of an in-process app')
+    parser.add_argument('--accounts', type=int, default=1000, help='Accounts per database')
+    parser.add_argument('--start-key', type=int, default=900000001, help='First INTERNAL_KEY to seed')
+    parser.add_argument('--balance', default='100000000.00', help='Seed balance per account')
+    parser.add_argument('--skew', type=float, default=1.0, help='Zipf exponent; 0 for uniform')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds to run')
+    parser.add_argument('--transfers', type=int, help='Stop after this many transfers')
+    parser.add_argument('--retries', type=int, default=0, help='Retries on deadlock or lock timeout')
+    parser.add_argument('--service-attempts', type=int,
+                        help='TRANSFER_RETRY_MAX_ATTEMPTS of the service layer; 1 disables its retries')
+    parser.add_argument('--random-seed', type=int, default=42)
+    parser.add_argument('--output', help='Write the result JSON to this file')
+    parser.add_argument('--compare', help='Earlier result JSON to compare against')
+    parser.add_argument('--log-level', default='CRITICAL')
+    args = parser.parse_args()
+
+    if args.backend == 'mysql' and not (args.source_url and args.dest_url):
+        parser.error('--backend mysql needs --source-url and --dest-url')
+
+    logging.basicConfig(level=getattr(logging, args.log_level.upper()))
+
+    source, dest, source_accounts, dest_accounts = prepare_databases(args)
+    connection.use_engines(source, dest)
+    driver = HttpDriver(args.base_url) if args.layer == 'http' else ServiceDriver(args.service_attempts)
+
+    started_at = datetime.utcnow().isoformat()
+    results = run_load(
+        driver, source_accounts, dest_accounts,
+        concurrency=args.concurrency, duration=args.duration, transfers=args.transfers,
+        skew=args.skew, retries=args.retries, seed=args.random_seed
+    )
+
+    report = {
+        'benchmark': 'load_test',
+        'started_at': started_at,
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'config': {
+            'backend': args.backend,
+            'layer': args.layer,
+            'base_url': args.base_url,
+            'accounts': args.accounts,
+            'skew': args.skew,
+            'concurrency': args.concurrency,
+            'duration': args.duration,
+            'transfers': args.transfers,
+            'retries': args.retries,
+            'service_attempts': args.service_attempts,
+            'random_seed': args.random_seed
+        },
+        'results': results
+    }
+    if args.compare:
+        with open(args.compare) as f:
+            report['comparison'] = compare(report, json.load(f))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
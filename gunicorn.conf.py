@@ -0,0 +1,25 @@
+"""
+Gunicorn settings for the banking API
+
+    gunicorn -c gunicorn.conf.py app:app
+
+With preload_app the master imports the application once (blueprints,
+models, pre-built statements, the database driver) and workers fork from it
+with that work done. Nothing in the master connects to a database or starts
+a thread while LAZY_STARTUP is on; each worker starts its engines, caches and
+background threads in post_worker_init, before it accepts requests.
+"""
+
+import os
+
+bind = os.environ.get('GUNICORN_BIND') or '0.0.0.0:5000'
+workers = int(os.environ.get('WEB_CONCURRENCY') or 4)
+timeout = int(os.environ.get('GUNICORN_TIMEOUT') or 30)  # above TRANSACTION_TIMEOUT
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL') or 'info'
+preload_app = (os.environ.get('GUNICORN_PRELOAD') or 'true').lower() == 'true'
+
+
+def post_worker_init(worker):
+    from app import start_worker
+
+    start_worker(worker.wsgi)
@@ -24,6 +24,7 @@ CREATE TABLE IF NOT EXISTS rb_acct_balance (
     INTERNAL_KEY BIGINT PRIMARY KEY,
     CLIENT_NO VARCHAR(20) NOT NULL,
     TOTAL_AMOUNT DECIMAL(20,2) DEFAULT 0.00,
+    RESERVED_AMOUNT DECIMAL(20,2) DEFAULT 0.00,
     LAST_CHANGE_DATE DATETIME DEFAULT CURRENT_TIMESTAMP,
     TRAN_TIMESTAMP TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (INTERNAL_KEY) REFERENCES rb_acct(INTERNAL_KEY),
@@ -49,7 +50,8 @@ CREATE TABLE IF NOT EXISTS rb_tran_hist (
     INDEX idx_internal_key (INTERNAL_KEY),
     INDEX idx_reference (REFERENCE),
     INDEX idx_tran_date (TRAN_DATE),
-    INDEX idx_base_acct_no (BASE_ACCT_NO)
+    INDEX idx_base_acct_no (BASE_ACCT_NO),
+    INDEX idx_tran_hist_key_date (INTERNAL_KEY, TRAN_DATE)
 );
 
 -- Transfer Log table (shared across both databases)
@@ -62,6 +64,7 @@ CREATE TABLE IF NOT EXISTS transfer_log (
     currency VARCHAR(3) DEFAULT 'CNY',
     status ENUM('PENDING', 'SUCCESS', 'FAILED', 'ROLLBACK') DEFAULT 'PENDING',
     error_message TEXT,
+    retry_count SMALLINT DEFAULT 0,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     INDEX idx_transfer_id (transfer_id),
@@ -114,4 +117,117 @@ CREATE TABLE IF NOT EXISTS rb_lm_client_tran_limit (
 INSERT INTO rb_lm_client_tran_limit (BASE_ACCT_NO, ACCT_CCY, CLIENT_NO, LIMIT_REF, LIMIT_MAX_AMT, LIMIT_MIN_AMT, TRAN_DATE) VALUES
 ('6230399991006371430', 'CNY', '2108803575', 'DailyTransferLimit', 50000.00, 0.01, CURDATE()),
 ('6230399991006371431', 'CNY', '2108803576', 'DailyTransferLimit', 50000.00, 0.01, CURDATE()),
-('6230399991006371432', 'CNY', '2108803577', 'DailyTransferLimit', 50000.00, 0.01, CURDATE());
\ No newline at end of file
+('6230399991006371432', 'CNY', '2108803577', 'DailyTransferLimit', 50000.00, 0.01, CURDATE());
+
+-- Hot account balance slots: credits to high-contention accounts are spread
+-- over SLOT_COUNT rows instead of serializing on the rb_acct_balance row
+CREATE TABLE IF NOT EXISTS rb_hot_acct (
+    INTERNAL_KEY BIGINT PRIMARY KEY,
+    BASE_ACCT_NO VARCHAR(50) NOT NULL UNIQUE,
+    SLOT_COUNT INT NOT NULL DEFAULT 8,
+    MARKED_BY VARCHAR(10) DEFAULT 'MANUAL',
+    MARKED_AT DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (INTERNAL_KEY) REFERENCES rb_acct(INTERNAL_KEY)
+);
+
+CREATE TABLE IF NOT EXISTS rb_acct_balance_slot (
+    INTERNAL_KEY BIGINT,
+    SLOT_NO INT,
+    CLIENT_NO VARCHAR(20) NOT NULL,
+    SLOT_AMOUNT DECIMAL(20,2) DEFAULT 0.00,
+    LAST_CHANGE_DATE DATETIME DEFAULT CURRENT_TIMESTAMP,
+    TRAN_TIMESTAMP TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (INTERNAL_KEY, SLOT_NO),
+    FOREIGN KEY (INTERNAL_KEY) REFERENCES rb_acct(INTERNAL_KEY)
+);
+
+-- End-of-day balance snapshots: BALANCE covers every rb_tran_hist row dated
+-- before midnight (UTC) after SNAPSHOT_DATE; point-in-time balances replay
+-- rb_tran_hist from the nearest snapshot
+CREATE TABLE IF NOT EXISTS rb_acct_balance_snapshot (
+    INTERNAL_KEY BIGINT,
+    SNAPSHOT_DATE DATE,
+    CLIENT_NO VARCHAR(20) NOT NULL,
+    BASE_ACCT_NO VARCHAR(50) NOT NULL,
+    BALANCE DECIMAL(20,2) NOT NULL,
+    TRAN_COUNT INT DEFAULT 0,
+    TRAN_TIMESTAMP TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (INTERNAL_KEY, SNAPSHOT_DATE),
+    INDEX idx_snapshot_date (SNAPSHOT_DATE)
+);
+
+-- Journal ledger mode: transfers append entries (AMOUNT negative for debits)
+-- and the journal applier posts them to rb_acct_balance and rb_tran_hist,
+-- recording its position in rb_journal_applier
+CREATE TABLE IF NOT EXISTS rb_acct_journal (
+    JOURNAL_ID BIGINT AUTO_INCREMENT PRIMARY KEY,
+    INTERNAL_KEY BIGINT NOT NULL,
+    CLIENT_NO VARCHAR(20) NOT NULL,
+    BASE_ACCT_NO VARCHAR(50) NOT NULL,
+    AMOUNT DECIMAL(20,2) NOT NULL,
+    CR_DR_IND VARCHAR(1) NOT NULL,
+    REFERENCE VARCHAR(50),
+    NARRATIVE VARCHAR(500),
+    CREATED_AT DATETIME NOT NULL,
+    INDEX idx_reference (REFERENCE)
+);
+
+CREATE TABLE IF NOT EXISTS rb_journal_applier (
+    APPLIER VARCHAR(20) PRIMARY KEY,
+    LAST_JOURNAL_ID BIGINT NOT NULL DEFAULT 0,
+    TRAN_TIMESTAMP TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- Business calendar reference data: branch regions and holiday entries
+-- (WORKING_HOLIDAY = 'Y' marks a make-up working day, APPLY_IND = 'N' disables an entry)
+CREATE TABLE IF NOT EXISTS fm_branch (
+    BRANCH VARCHAR(20) PRIMARY KEY,
+    BRANCH_NAME VARCHAR(200),
+    COUNTRY VARCHAR(3) DEFAULT 'CHN',
+    STATE VARCHAR(10),
+    COMPANY VARCHAR(20),
+    TRAN_TIMESTAMP TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS fm_branch_holiday (
+    BRANCH VARCHAR(20),
+    HOLIDAY_DATE DATE,
+    HOLIDAY_TYPE VARCHAR(10),
+    HOLIDAY_DESC VARCHAR(200),
+    WORKING_HOLIDAY VARCHAR(1) DEFAULT 'N',
+    APPLY_IND VARCHAR(1) DEFAULT 'Y',
+    COMPANY VARCHAR(20),
+    TRAN_TIMESTAMP TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (BRANCH, HOLIDAY_DATE),
+    INDEX idx_holiday_date (HOLIDAY_DATE)
+);
+
+CREATE TABLE IF NOT EXISTS fm_loc_holiday (
+    COUNTRY VARCHAR(3),
+    STATE VARCHAR(10),
+    HOLIDAY_DATE DATE,
+    HOLIDAY_TYPE VARCHAR(10),
+    HOLIDAY_DESC VARCHAR(200),
+    WORKING_HOLIDAY VARCHAR(1) DEFAULT 'N',
+    APPLY_IND VARCHAR(1) DEFAULT 'Y',
+    COMPANY VARCHAR(20),
+    TRAN_TIMESTAMP TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (COUNTRY, STATE, HOLIDAY_DATE),
+    INDEX idx_holiday_date (HOLIDAY_DATE)
+);
+
+INSERT INTO fm_branch (BRANCH, BRANCH_NAME, COUNTRY, STATE) VALUES
+('0503', 'Guangzhou Branch', 'CHN', '44');
+
+INSERT INTO fm_loc_holiday (COUNTRY, STATE, HOLIDAY_DATE, HOLIDAY_TYPE, HOLIDAY_DESC, WORKING_HOLIDAY) VALUES
+('CHN', 'ALL', '2025-10-01', 'PUBLIC', 'National Day', 'N'),
+('CHN', 'ALL', '2025-10-02', 'PUBLIC', 'National Day', 'N'),
+('CHN', 'ALL', '2025-10-03', 'PUBLIC', 'National Day', 'N'),
+('CHN', 'ALL', '2025-10-06', 'PUBLIC', 'Mid-Autumn Festival', 'N'),
+('CHN', 'ALL', '2025-10-07', 'PUBLIC', 'National Day', 'N'),
+('CHN', 'ALL', '2025-10-08', 'PUBLIC', 'National Day', 'N'),
+('CHN', 'ALL', '2025-09-28', 'PUBLIC', 'National Day make-up working day', 'Y'),
+('CHN', 'ALL', '2025-10-11', 'PUBLIC', 'National Day make-up working day', 'Y');
+
+-- The application's binlog change stream reads the binlog like a replica
+GRANT REPLICATION SLAVE, REPLICATION CLIENT ON *.* TO 'bank_user'@'%';
@@ -0,0 +1,23 @@
+-- Adds the journal ledger mode tables and rb_acct_balance.RESERVED_AMOUNT to
+-- databases created before they existed. Run once against both bank_source and
+-- bank_dest before setting LEDGER_MODE=journal.
+ALTER TABLE rb_acct_balance ADD COLUMN RESERVED_AMOUNT DECIMAL(20,2) DEFAULT 0.00 AFTER TOTAL_AMOUNT;
+
+CREATE TABLE IF NOT EXISTS rb_acct_journal (
+    JOURNAL_ID BIGINT AUTO_INCREMENT PRIMARY KEY,
+    INTERNAL_KEY BIGINT NOT NULL,
+    CLIENT_NO VARCHAR(20) NOT NULL,
+    BASE_ACCT_NO VARCHAR(50) NOT NULL,
+    AMOUNT DECIMAL(20,2) NOT NULL,
+    CR_DR_IND VARCHAR(1) NOT NULL,
+    REFERENCE VARCHAR(50),
+    NARRATIVE VARCHAR(500),
+    CREATED_AT DATETIME NOT NULL,
+    INDEX idx_reference (REFERENCE)
+);
+
+CREATE TABLE IF NOT EXISTS rb_journal_applier (
+    APPLIER VARCHAR(20) PRIMARY KEY,
+    LAST_JOURNAL_ID BIGINT NOT NULL DEFAULT 0,
+    TRAN_TIMESTAMP TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
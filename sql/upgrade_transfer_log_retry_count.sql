@@ -0,0 +1,3 @@
+-- Adds transfer_log.retry_count to databases created before it existed.
+-- Run once against both bank_source and bank_dest.
+ALTER TABLE transfer_log ADD COLUMN retry_count SMALLINT DEFAULT 0 AFTER error_message;
@@ -0,0 +1,126 @@
+"""
+Shared test fixtures: SQLite stand-ins for the two MySQL databases, seeded
+with the application schema and accounts, and the API app bound to them
+"""
+
+import decimal
+import zlib
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import connection
+from app.models.account import Base as AccountBase, Account, AccountBalance
+from app.models.calendar import Base as CalendarBase
+from app.models.constraints import Base as ConstraintBase, ClientTransactionLimit
+from app.models.transaction import Base as TransactionBase
+
+
+def _crc32(value):
+    return None if value is None else zlib.crc32(str(value).encode('utf-8'))
+
+
+def _register_mysql_functions(engine):
+    @event.listens_for(engine, 'connect')
+    def register(dbapi_connection, connection_record):
+        dbapi_connection.create_function('crc32', 1, _crc32, deterministic=True)
+
+
+def _memory_engine():
+    # One shared connection: only safe for single-threaded tests
+    engine = create_engine('sqlite://', poolclass=StaticPool, connect_args={'check_same_thread': False})
+    _register_mysql_functions(engine)
+    return engine
+
+
+def _file_engine(path):
+    # Separate connections per thread; BEGIN IMMEDIATE serializes writers like MySQL row locks
+    engine = create_engine(f'sqlite:///{path}', connect_args={'check_same_thread': False, 'timeout': 30})
+
+    @event.listens_for(engine, 'connect')
+    def disable_pysqlite_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, 'begin')
+    def begin_immediate(conn):
+        conn.exec_driver_sql('BEGIN IMMEDIATE')
+
+    _register_mysql_functions(engine)
+    return engine
+
+
+def _seed_accounts(session, count, balance='100000.00', account_prefix='6230399991'):
+    account_numbers = []
+    for internal_key in range(1, count + 1):
+        account_no = f"{account_prefix}{internal_key:09d}"
+        client_no = f"11088{internal_key:05d}"
+        session.add(Account(
+            INTERNAL_KEY=internal_key, CLIENT_NO=client_no, BASE_ACCT_NO=account_no,
+            ACCT_NAME=f"Test {internal_key}", ACCT_CCY='CNY', ACCT_STATUS='A', ACCT_BRANCH='0503'
+        ))
+        session.add(AccountBalance(
+            INTERNAL_KEY=internal_key, CLIENT_NO=client_no, TOTAL_AMOUNT=decimal.Decimal(balance)
+        ))
+        session.add(ClientTransactionLimit(
+            BASE_ACCT_NO=account_no, LIMIT_REF='DailyTransferLimit', ACCT_CCY='CNY', CLIENT_NO=client_no,
+            LIMIT_MAX_AMT=decimal.Decimal('50000.00'), LIMIT_MIN_AMT=decimal.Decimal('0.01')
+        ))
+        account_numbers.append(account_no)
+    session.commit()
+    return account_numbers
+
+
+@pytest.fixture
+def database(tmp_path):
+    """
+    Factory for seeded databases, returning (engine, session factory, account numbers).
+
+    ``database(count)`` is in memory; pass ``name`` for a file-backed
+    database when the code under test queries from several threads.
+    """
+    engines = []
+
+    def create(count=0, name=None, **seed_kwargs):
+        engine = _file_engine(tmp_path / f'{name}.db') if name else _memory_engine()
+        engines.append(engine)
+        for base in (AccountBase, ConstraintBase, TransactionBase, CalendarBase):
+            base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        with Session() as session:
+            account_numbers = _seed_accounts(session, count, **seed_kwargs)
+        return engine, Session, account_numbers
+
+    yield create
+    for engine in engines:
+        engine.dispose()
+
+
+@pytest.fixture
+def bind_databases():
+    """Point the application sessions at test engines, restoring the originals afterwards"""
+    saved = (connection.source_engine, connection.dest_engine,
+             connection.SourceSession, connection.DestSession)
+    yield connection.use_engines
+    (connection.source_engine, connection.dest_engine,
+     connection.SourceSession, connection.DestSession) = saved
+
+
+@pytest.fixture
+def api_client():
+    """Test client for the API blueprints, using whatever databases are bound"""
+    from flask import Flask
+    from flask_jwt_extended import JWTManager
+    from app.api.account_api import account_bp
+    from app.api.transfer_api import transfer_bp
+    from app.config.settings import TestingConfig
+    from app.utils.encoding import BankingJSONProvider
+
+    app = Flask('tests')
+    app.config.from_object(TestingConfig)
+    app.json = BankingJSONProvider(app)
+    JWTManager(app)
+    app.register_blueprint(account_bp, url_prefix='/api/v1')
+    app.register_blueprint(transfer_bp, url_prefix='/api/v1')
+    return app.test_client()
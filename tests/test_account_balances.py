@@ -0,0 +1,84 @@
+"""
+Unit tests for the multi-account balance lookup
+"""
+
+import pytest
+from decimal import Decimal
+from unittest.mock import patch
+
+from app.config.settings import Config
+from app.services.account_service import AccountService
+
+
+class TestAccountBalances:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, database, bind_databases):
+        """Setup test fixtures"""
+        self.source_engine, self.source_session, self.source_accounts = database(
+            3, name='source', balance='1000.00', account_prefix='6230399991'
+        )
+        dest_engine, _, self.dest_accounts = database(2, name='dest', balance='500.00', account_prefix='6230399992')
+        bind_databases(self.source_engine, dest_engine)
+
+    def test_service_queries_accounts_and_clients(self):
+        """Test one IN-list query returns every known account, and the client query uses CLIENT_NO"""
+        with self.source_session() as session:
+            service = AccountService(session)
+            records = service.get_account_balance_records(self.source_accounts[:2] + ['6230399999000000001'])
+            assert sorted(records) == self.source_accounts[:2]
+            account, balance = records[self.source_accounts[1]]
+            assert account.CLIENT_NO == '1108800002' and balance.TOTAL_AMOUNT == 1000
+
+            assert list(service.get_client_balance_records('1108800003')) == [self.source_accounts[2]]
+            assert service.get_account_balance_records([]) == {}
+
+    def test_balances_from_both_databases_in_request_order(self, api_client):
+        """Test accounts of both databases come back in request order, unknown ones in not_found"""
+        account_nos = [self.dest_accounts[1], self.source_accounts[0], '6230399999000000001', self.source_accounts[0]]
+        response = api_client.post('/api/v1/accounts/balances', json={'account_nos': account_nos})
+
+        assert response.status_code == 200
+        data = response.get_json()['data']
+        assert [(b['account_no'], b['balance'], b['database']) for b in data['balances']] == [
+            (self.dest_accounts[1], Decimal('500.00'), 'destination'),
+            (self.source_accounts[0], Decimal('1000.00'), 'source')
+        ]
+        assert data['not_found'] == ['6230399999000000001']
+        assert data['unavailable'] == [] and data['count'] == 2
+
+    def test_balances_of_a_client(self, api_client):
+        """Test a client's accounts are collected from both databases"""
+        response = api_client.post('/api/v1/accounts/balances', json={'client_no': '1108800001'})
+
+        data = response.get_json()['data']
+        assert [b['account_no'] for b in data['balances']] == [self.source_accounts[0], self.dest_accounts[0]]
+        assert data['not_found'] == []
+
+    def test_failed_database_is_reported(self, api_client):
+        """Test a database that cannot answer is listed as unavailable instead of failing the request"""
+        def failing_records(service, account_nos):
+            if service.session.get_bind() is self.source_engine:
+                raise RuntimeError('source down')
+            return get_records(service, account_nos)
+
+        get_records = AccountService.get_account_balance_records
+        with patch.object(AccountService, 'get_account_balance_records', failing_records):
+            response = api_client.post('/api/v1/accounts/balances', json={
+                'account_nos': [self.source_accounts[0], self.dest_accounts[0]]
+            })
+
+        data = response.get_json()['data']
+        assert [b['account_no'] for b in data['balances']] == [self.dest_accounts[0]]
+        assert data['not_found'] == [self.source_accounts[0]] and data['unavailable'] == ['source']
+
+    def test_invalid_requests(self, api_client):
+        """Test malformed bodies and oversized lists get 400"""
+        for body in ({}, {'account_nos': []}, {'account_nos': [1]}, {'account_nos': ['1'], 'client_no': '1'}):
+            response = api_client.post('/api/v1/accounts/balances', json=body)
+            assert response.status_code == 400
+            assert response.get_json()['error']['code'] == 'INVALID_REQUEST'
+
+        with patch.object(Config, 'ACCOUNT_BALANCES_MAX_ACCOUNTS', 1):
+            response = api_client.post('/api/v1/accounts/balances', json={'account_nos': self.source_accounts[:2]})
+        assert response.get_json()['error']['code'] == 'TOO_MANY_ACCOUNTS'
@@ -0,0 +1,123 @@
+"""
+Unit tests for bulk account statement generation
+"""
+
+import csv
+import os
+import pytest
+from datetime import date, datetime
+from decimal import Decimal
+from unittest.mock import patch
+
+from app.models.transaction import TransactionHistory
+from app.services.account_statements import StatementGenerator, statement_period
+
+SINCE, UNTIL = statement_period(date(2025, 6, 1), date(2025, 6, 30))
+
+
+def _history(seq_no, internal_key, account_no, indicator, amount, previous, actual, tran_date, status='N'):
+    return TransactionHistory(
+        SEQ_NO=seq_no, INTERNAL_KEY=internal_key, BASE_ACCT_NO=account_no, TRAN_TYPE='TRANSFER',
+        TRAN_AMT=Decimal(amount), PREVIOUS_BAL_AMT=Decimal(previous), ACTUAL_BAL=Decimal(actual),
+        CR_DR_IND=indicator, TRAN_DATE=tran_date, REFERENCE=f'REF{seq_no}', TRAN_STATUS=status
+    )
+
+
+def _seed(Session, accounts):
+    first, second, third = accounts
+    with Session() as session:
+        session.add_all([
+            _history('S1', 1, first, 'D', '100.00', '100100.00', '100000.00', datetime(2025, 6, 3, 10)),
+            _history('S2', 1, first, 'C', '50.00', '100000.00', '100050.00', datetime(2025, 6, 20, 10)),
+            _history('S3', 1, first, 'D', '9.00', '100050.00', '100050.00', datetime(2025, 6, 21, 10), status='F'),
+            _history('S4', 1, first, 'D', '75.00', '100050.00', '99975.00', datetime(2025, 5, 31, 23)),
+            # Third account: no activity in June, 25.00 credited in July
+            _history('S5', 3, third, 'C', '25.00', '99975.00', '100000.00', datetime(2025, 7, 1, 8)),
+        ])
+        session.commit()
+
+
+def _read_csv(path):
+    with open(path, newline='') as f:
+        return list(csv.DictReader(f))
+
+
+class TestStatementGenerator:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, database, tmp_path):
+        """Setup test fixtures"""
+        self.engine, self.Session, self.accounts = database(3)
+        _seed(self.Session, self.accounts)
+        self.output = str(tmp_path / 'statements')
+
+    def test_statements_carry_history_balances(self):
+        """Test lines come from one ordered scan with balances from the history rows"""
+        generator = StatementGenerator('source', self.Session, self.output, partitions=2)
+        summary = generator.run(SINCE, UNTIL)
+        assert (summary['partitions'], summary['accounts'], summary['transactions']) == (2, 3, 2)
+
+        directory = generator.directory(SINCE, UNTIL)
+        assert directory.endswith(os.path.join('source', '2025-06-01_2025-06-30'))
+        rows = _read_csv(os.path.join(directory, 'part-00000.csv')) + \
+            _read_csv(os.path.join(directory, 'part-00001.csv'))
+
+        first = [(r['type'], r['debit'], r['credit'], r['balance']) for r in rows if r['account_no'] == self.accounts[0]]
+        assert first == [
+            ('OPENING', '', '', '100100.00'),
+            ('TRANSFER', '100.00', '', '100000.00'),
+            ('TRANSFER', '', '50.00', '100050.00'),
+            ('CLOSING', '', '', '100050.00')
+        ]
+        # Without June activity the closing balance is the current one less July's credit
+        third = [(r['type'], r['date'], r['balance']) for r in rows if r['account_no'] == self.accounts[2]]
+        assert third == [('OPENING', '2025-06-01', '99975.00'), ('CLOSING', '2025-06-30', '99975.00')]
+
+    def test_text_format(self):
+        """Test the text format renders one block per account"""
+        generator = StatementGenerator('source', self.Session, self.output, partitions=1, formats=('text',))
+        generator.run(SINCE, UNTIL)
+
+        with open(os.path.join(generator.directory(SINCE, UNTIL), 'part-00000.txt')) as f:
+            text = f.read()
+        assert text.count('Statement 2025-06-01 to 2025-06-30') == 3
+        assert f"Account {self.accounts[0]}" in text and 'REFS2' in text and 'REFS3' not in text
+
+    def test_rerun_resumes_unfinished_partitions(self):
+        """Test a rerun skips partitions with a .done file and keeps the original plan"""
+        generator = StatementGenerator('source', self.Session, self.output, partitions=3)
+        original = generator.generate_partition
+        calls = []
+
+        def crash_on_second(since, until, partition):
+            calls.append(partition.index)
+            if partition.index == 1:
+                raise RuntimeError('worker killed')
+            return original(since, until, partition)
+
+        with patch.object(generator, 'generate_partition', side_effect=crash_on_second):
+            with pytest.raises(RuntimeError):
+                generator.run(SINCE, UNTIL)
+        assert calls == [0, 1]
+
+        resumed = StatementGenerator('source', self.Session, self.output, partitions=10)
+        summary = resumed.run(SINCE, UNTIL)
+        assert (summary['partitions'], summary['skipped'], summary['accounts']) == (3, 1, 2)
+        assert not [n for n in os.listdir(resumed.directory(SINCE, UNTIL)) if n.endswith('.tmp')]
+
+
+class TestProcessPool:
+
+    def test_workers_write_every_partition(self, database, tmp_path):
+        """Test forked workers open their own connections and cover every account"""
+        engine, Session, accounts = database(3, name='statements')
+        _seed(Session, accounts)
+
+        generator = StatementGenerator('source', Session, str(tmp_path / 'out'), engine=engine,
+                                       workers=2, partitions=3)
+        summary = generator.run(SINCE, UNTIL)
+
+        assert (summary['accounts'], summary['transactions'], summary['skipped']) == (3, 2, 0)
+        directory = generator.directory(SINCE, UNTIL)
+        assert sorted(n for n in os.listdir(directory) if n.endswith('.done')) == \
+            ['part-00000.done', 'part-00001.done', 'part-00002.done']
@@ -0,0 +1,117 @@
+"""
+Unit tests for admission control
+"""
+
+import pytest
+from flask import Blueprint, Flask
+from flask_jwt_extended import JWTManager, create_access_token
+
+from app.config.settings import TestingConfig
+from app.utils import admission
+from app.utils.admission import AdmissionController, BucketLimit, LocalTokenBuckets, init_admission
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def _app(**settings):
+    app = Flask('tests')
+    app.config.from_object(TestingConfig)
+    app.config.update(ADMISSION_ENABLED=True, ADMISSION_REDIS_ENABLED=False, **settings)
+    JWTManager(app)
+
+    transfer_bp = Blueprint('transfer', __name__)
+    transfer_bp.route('/transfers', methods=['GET', 'POST'])(lambda: {'ok': True})
+    health_bp = Blueprint('health', __name__)
+    health_bp.route('/health')(lambda: {'ok': True})
+    app.register_blueprint(transfer_bp, url_prefix='/api/v1')
+    app.register_blueprint(health_bp)
+
+    init_admission(app)
+    return app
+
+
+@pytest.fixture(autouse=True)
+def restore_controller():
+    yield
+    admission.admission_controller = None
+
+
+class TestLocalTokenBuckets:
+
+    def test_refill_and_retry_after(self):
+        """Test a bucket allows its burst, then one request per 1/rate seconds"""
+        clock = FakeClock()
+        buckets = LocalTokenBuckets(clock=clock)
+        limit = BucketLimit(rate=2.0, burst=2)
+
+        assert [buckets.take('c', limit)[0] for _ in range(3)] == [True, True, False]
+        assert buckets.take('c', limit) == (False, 0.5)
+        clock.now += 0.5
+        assert buckets.take('c', limit) == (True, 0.0)
+        assert buckets.take('other', limit)[0]
+
+    def test_oldest_keys_are_evicted(self):
+        """Test memory stays bounded by max_keys"""
+        buckets = LocalTokenBuckets(max_keys=2, clock=FakeClock())
+        for key in ('a', 'b', 'c'):
+            buckets.take(key, BucketLimit(1.0, 1))
+        assert list(buckets._buckets) == ['b', 'c']
+
+
+class TestAdmission:
+
+    def test_rate_limit_per_client(self):
+        """Test an empty bucket gets 429 with Retry-After, per client and per kind"""
+        app = _app(ADMISSION_WRITE_RATE=0.5, ADMISSION_WRITE_BURST=1)
+        client = app.test_client()
+        with app.app_context():
+            token = create_access_token(identity='teller', additional_claims={'client_no': '1108800001'})
+
+        assert client.post('/api/v1/transfers').status_code == 200
+        refused = client.post('/api/v1/transfers')
+        assert refused.status_code == 429
+        assert refused.headers['Retry-After'] == '2'
+        assert refused.get_json()['error']['code'] == 'RATE_LIMITED'
+
+        # Reads, other clients and other blueprints have their own budgets
+        assert client.get('/api/v1/transfers').status_code == 200
+        headers = {'Authorization': f'Bearer {token}'}
+        assert client.post('/api/v1/transfers', headers=headers).status_code == 200
+        assert client.get('/health').status_code == 200
+
+    def test_in_flight_cap(self):
+        """Test requests past the in-flight cap get 503 and slots return after each request"""
+        app = _app(DB_POOL_SIZE=1)
+        client = app.test_client()
+        assert [client.get('/api/v1/transfers').status_code for _ in range(3)] == [200, 200, 200]
+
+        lease, rejection = admission.admission_controller.acquire()
+        refused = client.get('/api/v1/transfers')
+        assert refused.status_code == 503
+        assert refused.headers['Retry-After'] == '1'
+        assert refused.get_json()['error']['code'] == 'OVERLOADED'
+
+        admission.admission_controller.release(lease)
+        assert client.get('/api/v1/transfers').status_code == 200
+
+    def test_unreachable_redis_falls_back_to_process_limits(self):
+        """Test a Redis outage degrades to per-process limits instead of failing requests"""
+        redis = pytest.importorskip('redis')
+        controller = AdmissionController(
+            {'read': BucketLimit(1.0, 1)}, max_concurrency=10, local_concurrency=1,
+            redis_client=redis.Redis(port=1, socket_timeout=0.05, socket_connect_timeout=0.05)
+        )
+
+        assert controller.check_rate('ip:127.0.0.1', 'read') is None
+        assert controller.check_rate('ip:127.0.0.1', 'read').status == 429
+        lease, rejection = controller.acquire()
+        assert lease is controller.local_slots and rejection is None
+        assert controller.acquire()[1].status == 503
+        controller.release(lease)
@@ -0,0 +1,100 @@
+"""
+Unit tests for the columnar analytics export and reports
+"""
+
+import pytest
+from datetime import date, datetime
+from decimal import Decimal
+
+from app.models.transaction import TransactionHistory
+from app.services.analytics import (
+    ColumnarExporter, ColumnarStore, branch_volume, client_aggregates, daily_turnover, hourly_turnover
+)
+
+np = pytest.importorskip('numpy')
+
+DAY = date(2025, 7, 1)
+
+
+def _history(seq_no, internal_key, account_no, indicator, amount, tran_date, status='N'):
+    return TransactionHistory(
+        SEQ_NO=seq_no, INTERNAL_KEY=internal_key, BASE_ACCT_NO=account_no, CLIENT_NO=f"11088{internal_key:05d}",
+        TRAN_TYPE='TRANSFER', TRAN_AMT=Decimal(amount), CR_DR_IND=indicator, TRAN_DATE=tran_date,
+        TRAN_TIMESTAMP=tran_date, TRAN_STATUS=status
+    )
+
+
+class TestColumnarAnalytics:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, database, tmp_path):
+        """Setup test fixtures"""
+        self.engine, self.Session, self.accounts = database(2)
+        first, second = self.accounts
+        with self.Session() as session:
+            session.add_all([
+                _history('S1', 1, first, 'D', '100.10', datetime(2025, 7, 1, 9, 30)),
+                _history('S2', 2, second, 'C', '100.10', datetime(2025, 7, 1, 9, 30)),
+                _history('S3', 1, first, 'C', '5.05', datetime(2025, 7, 1, 14, 0)),
+                _history('S4', 2, second, 'D', '999.99', datetime(2025, 7, 1, 15, 0), status='F'),
+                _history('S5', 2, second, 'D', '20.00', datetime(2025, 7, 2, 8, 0)),
+                _history('S6', 1, first, 'D', '1.00', datetime(2025, 6, 30, 23, 59)),
+            ])
+            session.commit()
+
+        self.store = ColumnarStore(str(tmp_path), 'source')
+        self.exporter = ColumnarExporter(self.store, self.Session, chunk_rows=2)
+
+    def test_export_encodes_one_day(self):
+        """Test a day becomes dictionary-coded columns with integer cents"""
+        assert self.exporter.export_day(DAY) == 4
+
+        columns = self.store.load(DAY)
+        accounts = self.store.dictionary('account')
+        assert [accounts[code] for code in columns.account] == [self.accounts[0], self.accounts[1],
+                                                               self.accounts[0], self.accounts[1]]
+        assert self.store.dictionary('branch') == ['0503']
+        assert list(columns.cents) == [10010, 10010, 505, 99999]
+        assert list(columns.sign) == [-1, 1, 1, -1]
+        assert list(columns.second) == [34200, 34200, 50400, 54000]
+        assert list(columns.failed) == [False, False, False, True]
+
+    def test_codes_stay_valid_across_days(self):
+        """Test a later day appends to the dictionaries instead of renumbering"""
+        self.exporter.export_day(DAY)
+        accounts = list(self.store.dictionary('account'))
+        self.exporter.export_day(date(2025, 7, 2))
+
+        assert self.store.dictionary('account') == accounts
+        assert accounts[self.store.load(date(2025, 7, 2)).account[0]] == self.accounts[1]
+
+    def test_run_due_exports_closed_days_once(self):
+        """Test only closed days inside the backfill window are exported, and only once"""
+        exporter = ColumnarExporter(self.store, self.Session, max_backfill_days=2)
+        assert exporter.run_due(datetime(2025, 7, 3, 1, 0)) == [date(2025, 7, 1), date(2025, 7, 2)]
+        assert exporter.run_due(datetime(2025, 7, 3, 2, 0)) == []
+
+    def test_reports_exclude_failed_rows(self):
+        """Test turnover, hourly, branch and client reports sum exact amounts of successful rows"""
+        for day in (date(2025, 6, 30), DAY, date(2025, 7, 2)):
+            self.exporter.export_day(day)
+
+        assert daily_turnover(self.store, DAY, DAY) == [{
+            'date': '2025-07-01', 'credits': Decimal('105.15'), 'debits': Decimal('100.10'),
+            'turnover': Decimal('205.25'), 'transactions': 3
+        }]
+
+        hourly = hourly_turnover(self.store, DAY)
+        assert hourly[9] == {'hour': 9, 'turnover': Decimal('200.20'), 'transactions': 2}
+        assert hourly[15]['transactions'] == 0
+
+        branches = branch_volume(self.store, DAY, date(2025, 7, 2))
+        assert branches == [{
+            'branch': '0503', 'credits': Decimal('105.15'), 'debits': Decimal('120.10'),
+            'turnover': Decimal('225.25'), 'transactions': 4
+        }]
+
+        clients = client_aggregates(self.store, None, None, top=1)
+        assert [(c['client_no'], c['turnover'], c['transactions']) for c in clients] == [
+            ('1108800002', Decimal('120.10'), 2)
+        ]
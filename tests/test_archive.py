@@ -0,0 +1,127 @@
+"""
+Unit tests for tiered archival to segment files
+"""
+
+import pytest
+from datetime import date, datetime
+from decimal import Decimal
+from unittest.mock import patch
+
+from sqlalchemy import func, select
+
+from app.models.read_models import TransactionHistoryRecord
+from app.models.transaction import TransactionHistory, TransferLog
+from app.services import archive as archive_module
+from app.services.account_service import AccountService
+from app.services.archive import ARCHIVED_TABLES, Archiver, SegmentArchive, read_segment_index
+
+NOW = datetime(2025, 7, 7, 12, 0)
+
+
+def _history(seq_no, account_no, tran_date, amount='10.00'):
+    return TransactionHistory(
+        SEQ_NO=seq_no, INTERNAL_KEY=1, BASE_ACCT_NO=account_no, TRAN_TYPE='TRANSFER',
+        TRAN_AMT=Decimal(amount), CR_DR_IND='D', TRAN_DATE=tran_date, TRAN_TIMESTAMP=tran_date
+    )
+
+
+class TestSegments:
+
+    def test_sparse_index_reads_only_covering_blocks(self, tmp_path):
+        """Test an account lookup decompresses only the blocks holding its key range"""
+        archive = SegmentArchive('source', str(tmp_path), block_rows=2)
+        accounts = ['A000000001', 'A000000002', 'A000000003', 'A000000004']
+        records = [
+            TransactionHistoryRecord(f"S{a}{i}", 1, None, a, 'TRANSFER', Decimal('1.50'), None, None, 'D',
+                                     datetime(2024, 1, 1, i), None, None, 'N', None)
+            for a in accounts for i in range(3)
+        ]
+        assert archive.write('rb_tran_hist', date(2024, 1, 1), iter(records)) == 12
+
+        path = archive.segments('rb_tran_hist')[date(2024, 1, 1)][0]
+        assert len(read_segment_index(path).blocks) == 6
+
+        with patch.object(archive_module, 'read_segment_blocks', wraps=archive_module.read_segment_blocks) as reads:
+            found = archive.read('rb_tran_hist', 'A000000002', limit=10)
+        assert len(reads.call_args[0][1]) == 2
+        assert [r.SEQ_NO for r in found] == ['SA0000000022', 'SA0000000021', 'SA0000000020']
+        assert found[0].TRAN_AMT == Decimal('1.50') and found[0].TRAN_DATE == datetime(2024, 1, 1, 2)
+
+        assert archive.read('rb_tran_hist', 'A000000009', limit=10) == []
+
+
+class TestArchiver:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, database, tmp_path):
+        """Setup test fixtures"""
+        self.engine, self.Session, self.accounts = database(2)
+        self.account = self.accounts[0]
+        with self.Session() as session:
+            for day in (1, 2):
+                for hour in (9, 15):
+                    session.add(_history(f"OLD{day}{hour}", self.account, datetime(2024, 1, day, hour)))
+            session.add(_history('NEW1', self.account, datetime(2025, 7, 1, 10)))
+            session.add(_history('NEW2', self.account, datetime(2025, 7, 2, 10)))
+            session.add(TransferLog(transfer_id='TRF20240101090000AAAAAAAA', from_account=self.account,
+                                    to_account=self.accounts[1], amount=Decimal('10.00'), status='SUCCESS',
+                                    created_at=datetime(2024, 1, 1, 9)))
+            session.commit()
+
+        self.archive = SegmentArchive('source', str(tmp_path))
+        self.archiver = Archiver('source', self.Session, self.archive, retention_days=400, delete_pause=0,
+                                 delete_batch_size=1)
+
+    def _count(self, model):
+        with self.Session() as session:
+            return session.execute(select(func.count()).select_from(model)).scalar()
+
+    def test_run_due_moves_days_past_retention(self):
+        """Test old days move to segments and leave the table; recent rows stay"""
+        assert self.archiver.run_due(NOW) == {
+            'rb_tran_hist': [date(2024, 1, 1), date(2024, 1, 2)],
+            'transfer_log': [date(2024, 1, 1)]
+        }
+        assert self._count(TransactionHistory) == 2
+        assert self._count(TransferLog) == 0
+        assert sorted(self.archive.segments('rb_tran_hist')) == [date(2024, 1, 1), date(2024, 1, 2)]
+
+        assert self.archiver.run_due(NOW) == {'rb_tran_hist': [], 'transfer_log': []}
+
+    def test_interrupted_day_is_completed(self):
+        """Test a rerun skips archived rows, writes late ones to a new part and deletes both"""
+        self.archiver.archive_day('rb_tran_hist', date(2024, 1, 1))
+        with self.Session() as session:
+            # A crash before the delete leaves archived rows behind; a late row arrives
+            session.add(_history('OLD19', self.account, datetime(2024, 1, 1, 9)))
+            session.add(_history('LATE', self.account, datetime(2024, 1, 1, 20)))
+            session.commit()
+
+        assert self.archiver.archive_day('rb_tran_hist', date(2024, 1, 1)) == (1, 2)
+        paths = self.archive.segments('rb_tran_hist')[date(2024, 1, 1)]
+        assert [read_segment_index(path).rows for path in paths] == [2, 1]
+        assert self.archive.primary_keys('rb_tran_hist', date(2024, 1, 1)) == {'OLD19', 'OLD115', 'LATE'}
+
+    def test_history_pages_continue_in_the_archive(self):
+        """Test history pages read the table first and run on into the segments"""
+        self.archiver.run_due(NOW)
+
+        with self.Session() as session:
+            service = AccountService(session, archive=self.archive)
+            pages = [
+                [tx['seq_no'] for tx in service.get_account_transaction_history(self.account, 3, offset)]
+                for offset in (0, 3, 6)
+            ]
+            without_archive = AccountService(session).get_account_transaction_history(self.account, 3, 0)
+
+        assert pages == [['NEW2', 'NEW1', 'OLD215'], ['OLD29', 'OLD115', 'OLD19'], []]
+        assert len(without_archive) == 2
+
+    def test_transfer_log_is_keyed_by_the_database_account(self):
+        """Test the source archives transfer_log under from_account"""
+        self.archiver.run_due(NOW)
+
+        assert ARCHIVED_TABLES['transfer_log'].key_fields['source'] == 'from_account'
+        transfers = self.archive.read('transfer_log', self.account, limit=5)
+        assert [(t.transfer_id, t.amount) for t in transfers] == [('TRF20240101090000AAAAAAAA', Decimal('10.00'))]
+        assert self.archive.read('transfer_log', self.accounts[1], limit=5) == []
@@ -0,0 +1,154 @@
+"""
+Unit tests for balance snapshots and point-in-time balances
+"""
+
+import pytest
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import func, select
+
+from app.models.account import AccountBalanceSnapshot
+from app.models.transaction import TransactionHistory
+from app.services.account_service import AccountService
+from app.services.balance_snapshots import BalanceSnapshotJob, balance_at
+
+# (TRAN_DATE, CR_DR_IND, TRAN_AMT, TRAN_STATUS); the current balance of 100000.00 is after all of them
+HISTORY = [
+    (datetime(2025, 7, 5, 10, 0), 'C', '100.00', 'N'),
+    (datetime(2025, 7, 6, 9, 0), 'D', '30.00', 'N'),
+    (datetime(2025, 7, 6, 15, 0), 'C', '50.00', 'N'),
+    (datetime(2025, 7, 6, 16, 0), 'D', '1000.00', 'F'),
+    (datetime(2025, 7, 7, 8, 0), 'D', '20.00', 'N')
+]
+
+
+class TestBalanceSnapshots:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, database):
+        """Setup test fixtures"""
+        self.engine, self.Session, self.accounts = database(2)
+        with self.Session() as session:
+            for seq, (tran_date, indicator, amount, status) in enumerate(HISTORY):
+                session.add(TransactionHistory(
+                    SEQ_NO=f"TXN{seq:04d}", INTERNAL_KEY=1, CLIENT_NO='1108800001',
+                    BASE_ACCT_NO=self.accounts[0], TRAN_TYPE='TRANSFER', TRAN_AMT=Decimal(amount),
+                    CR_DR_IND=indicator, TRAN_DATE=tran_date, TRAN_STATUS=status
+                ))
+            session.commit()
+        self.job = BalanceSnapshotJob('source', self.Session, batch_size=1)
+
+    def _snapshots(self):
+        with self.Session() as session:
+            return {
+                (s.INTERNAL_KEY, s.SNAPSHOT_DATE): (s.BALANCE, s.TRAN_COUNT)
+                for s in session.execute(select(AccountBalanceSnapshot)).scalars()
+            }
+
+    def _balance_at(self, at, internal_key=1):
+        with self.Session() as session:
+            return balance_at(session, internal_key, at, Decimal('100000.00'))
+
+    def test_build_seeds_then_rolls_forward(self):
+        """Test the first day is seeded from the current balance and the next rolls forward"""
+        assert self.job.build(date(2025, 7, 5)) == 2
+        assert self.job.build(date(2025, 7, 6)) == 2
+
+        assert self._snapshots() == {
+            (1, date(2025, 7, 5)): (Decimal('100000.00'), 1),
+            (1, date(2025, 7, 6)): (Decimal('100020.00'), 2),
+            (2, date(2025, 7, 5)): (Decimal('100000.00'), 0),
+            (2, date(2025, 7, 6)): (Decimal('100000.00'), 0)
+        }
+
+    def test_rebuild_is_idempotent(self):
+        """Test building a day twice replaces its rows"""
+        self.job.build(date(2025, 7, 6))
+        self.job.build(date(2025, 7, 6))
+
+        with self.Session() as session:
+            assert session.execute(select(func.count()).select_from(AccountBalanceSnapshot)).scalar() == 2
+
+    def test_balance_at_replays_from_nearest_snapshot(self):
+        """Test lookups replay forward or backward from the closest snapshot"""
+        self.job.build(date(2025, 7, 5))
+        self.job.build(date(2025, 7, 6))
+
+        assert self._balance_at(datetime(2025, 7, 6, 12, 0)) == \
+            (Decimal('99970.00'), date(2025, 7, 5), 'forward', 1)
+        assert self._balance_at(datetime(2025, 7, 7, 12, 0)) == \
+            (Decimal('100000.00'), date(2025, 7, 6), 'forward', 1)
+        assert self._balance_at(datetime(2025, 7, 5, 9, 0)) == \
+            (Decimal('99900.00'), date(2025, 7, 5), 'backward', 1)
+        assert self._balance_at(datetime(2025, 7, 7, 0, 0)).replayed == 0
+
+    def test_balance_at_without_snapshots(self):
+        """Test accounts without snapshots replay back from the current balance"""
+        assert self._balance_at(datetime(2025, 7, 6, 12, 0)) == \
+            (Decimal('99970.00'), None, 'backward', 2)
+
+    def test_run_due_builds_closed_days_once(self):
+        """Test run_due builds each closed day after the settle delay"""
+        assert self.job.run_due(datetime(2025, 7, 7, 0, 1)) == [date(2025, 7, 5)]
+        assert self.job.run_due(datetime(2025, 7, 7, 0, 10)) == [date(2025, 7, 6)]
+        assert self.job.run_due(datetime(2025, 7, 7, 12, 0)) == []
+
+        restarted = BalanceSnapshotJob('source', self.Session)
+        assert restarted.run_due(datetime(2025, 7, 8, 1, 0)) == [date(2025, 7, 6), date(2025, 7, 7)]
+        assert self._snapshots()[(1, date(2025, 7, 7))] == (Decimal('100000.00'), 1)
+
+    def test_account_service_balance_at(self):
+        """Test AccountService resolves the account before the lookup"""
+        self.job.build(date(2025, 7, 5))
+
+        with self.Session() as session:
+            account, point = AccountService(session).get_balance_at(self.accounts[0], datetime(2025, 7, 6, 12, 0))
+
+        assert account.INTERNAL_KEY == 1
+        assert point.balance == Decimal('99970.00')
+
+
+class TestBalanceAtEndpoint:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, database, bind_databases, api_client):
+        """Setup test fixtures"""
+        self.engine, self.Session, self.accounts = database(1)
+        with self.Session() as session:
+            session.add(TransactionHistory(
+                SEQ_NO='TXN0001', INTERNAL_KEY=1, CLIENT_NO='1108800001', BASE_ACCT_NO=self.accounts[0],
+                TRAN_TYPE='TRANSFER', TRAN_AMT=Decimal('30.00'), CR_DR_IND='D',
+                TRAN_DATE=datetime(2025, 7, 6, 9, 0)
+            ))
+            session.commit()
+        BalanceSnapshotJob('source', self.Session).build(date(2025, 7, 5))
+        bind_databases(self.engine, self.engine)
+        self.client = api_client
+
+    def test_balance_at(self):
+        """Test the endpoint converts the timestamp to UTC and reports the snapshot used"""
+        response = self.client.get(
+            f'/api/v1/accounts/{self.accounts[0]}/balance/at?timestamp=2025-07-06T20:00:00%2B08:00'
+        )
+        data = response.get_json()['data']
+
+        assert response.status_code == 200
+        assert data['balance'] == Decimal('100000.00')
+        assert data['timestamp'] == '2025-07-06T12:00:00'
+        assert (data['snapshot_date'], data['replay_direction'], data['replayed_transactions']) == \
+            ('2025-07-05', 'forward', 1)
+
+    def test_utc_designator(self):
+        """Test a trailing 'Z' is accepted on every supported Python version"""
+        response = self.client.get(f'/api/v1/accounts/{self.accounts[0]}/balance/at?timestamp=2025-07-06T12:00:00Z')
+
+        assert response.status_code == 200
+        assert response.get_json()['data']['timestamp'] == '2025-07-06T12:00:00'
+
+    def test_invalid_timestamp(self):
+        """Test a missing or malformed timestamp is rejected"""
+        for query in ('', '?timestamp=yesterday'):
+            response = self.client.get(f'/api/v1/accounts/{self.accounts[0]}/balance/at{query}')
+            assert response.status_code == 400
+            assert response.get_json()['error']['code'] == 'VALIDATION_ERROR'
@@ -0,0 +1,119 @@
+"""
+Unit tests for the precomputed business calendar
+"""
+
+import pytest
+from datetime import date
+from unittest.mock import patch
+
+from app.models.calendar import Branch, BranchHoliday, LocationHoliday
+from app.services.business_calendar import BusinessCalendar, YearCalendar
+
+
+class TestYearCalendar:
+
+    def test_weekends_and_overrides(self):
+        """Test weekdays are open and overrides close or open days"""
+        calendar = YearCalendar(2025, [(date(2025, 10, 1), False), (date(2025, 9, 28), True)])
+
+        assert calendar.is_open(date(2025, 7, 7))
+        assert not calendar.is_open(date(2025, 7, 6))
+        assert not calendar.is_open(date(2025, 10, 1))
+        assert calendar.is_open(date(2025, 9, 28))
+        assert calendar.next_open_date(date(2025, 7, 5)) == date(2025, 7, 7)
+        assert YearCalendar(2024).days == 366
+
+    def test_no_open_day_left_in_year(self):
+        """Test next_open_date reports when the year has no business day left"""
+        calendar = YearCalendar(2025, [(date(2025, 12, 31), False)])
+
+        assert calendar.next_open_date(date(2025, 12, 31)) is None
+
+
+class TestBusinessCalendar:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, database):
+        """Setup test fixtures"""
+        self.engine, self.Session, _ = database(1)
+        with self.Session() as session:
+            session.add_all([
+                Branch(BRANCH='0503', COUNTRY='CHN', STATE='44'),
+                Branch(BRANCH='0101', COUNTRY='CHN', STATE='11'),
+                Branch(BRANCH='0504', COUNTRY='CHN', STATE='44'),
+                Branch(BRANCH='0505', COUNTRY='CHN', STATE='44'),
+                LocationHoliday(COUNTRY='CHN', STATE='ALL', HOLIDAY_DATE=date(2025, 10, 1)),
+                LocationHoliday(COUNTRY='CHN', STATE='ALL', HOLIDAY_DATE=date(2025, 10, 2)),
+                LocationHoliday(COUNTRY='CHN', STATE='ALL', HOLIDAY_DATE=date(2025, 10, 3)),
+                LocationHoliday(COUNTRY='CHN', STATE='ALL', HOLIDAY_DATE=date(2025, 10, 11), WORKING_HOLIDAY='Y'),
+                LocationHoliday(COUNTRY='CHN', STATE='44', HOLIDAY_DATE=date(2025, 7, 7)),
+                LocationHoliday(COUNTRY='CHN', STATE='44', HOLIDAY_DATE=date(2025, 7, 8), APPLY_IND='N'),
+                BranchHoliday(BRANCH='0503', HOLIDAY_DATE=date(2025, 10, 11), WORKING_HOLIDAY='N'),
+                BranchHoliday(BRANCH='0503', HOLIDAY_DATE=date(2025, 10, 3), WORKING_HOLIDAY='Y')
+            ])
+            session.commit()
+        self.calendar = BusinessCalendar('source', self.Session)
+        self.calendar.load()
+
+    def test_national_regional_and_branch_inheritance(self):
+        """Test entries apply nationwide, per region and per branch in that order"""
+        national_holiday = date(2025, 10, 1)
+        assert not self.calendar.is_business_day('0503', national_holiday)
+        assert not self.calendar.is_business_day('0101', national_holiday)
+        assert not self.calendar.is_business_day('9999', national_holiday)
+
+        regional_holiday = date(2025, 7, 7)
+        assert not self.calendar.is_business_day('0503', regional_holiday)
+        assert self.calendar.is_business_day('0101', regional_holiday)
+        assert self.calendar.is_business_day('0503', date(2025, 7, 8))
+
+        assert self.calendar.is_business_day('0503', date(2025, 10, 3))
+        assert not self.calendar.is_business_day('0504', date(2025, 10, 3))
+        assert not self.calendar.is_business_day('0503', date(2025, 10, 11))
+        assert self.calendar.is_business_day('0504', date(2025, 10, 11))
+
+    def test_next_business_day(self):
+        """Test next business day skips weekends and holidays and crosses years"""
+        assert self.calendar.next_business_day('0101', date(2025, 9, 30)) == date(2025, 10, 6)
+        assert self.calendar.next_business_day('0503', date(2025, 9, 30)) == date(2025, 10, 3)
+        assert self.calendar.next_business_day('0101', date(2025, 12, 31)) == date(2026, 1, 1)
+        assert self.calendar.business_date('0101', date(2025, 10, 2)) == date(2025, 10, 6)
+        assert self.calendar.business_date('0101', date(2025, 9, 30)) == date(2025, 9, 30)
+
+    def test_branches_share_identical_calendars(self):
+        """Test branches resolving to the same days share one bitmap"""
+        snapshot = self.calendar._snapshot
+
+        assert snapshot.branches['0504'] is snapshot.branches['0505']
+        assert snapshot.year('0101', 2025) is snapshot.year('9999', 2025)
+        assert snapshot.year('0504', 2025) is not snapshot.year('0101', 2025)
+        assert snapshot.year('0503', 2030) is snapshot.year('0101', 2030)
+
+    def test_refresh_reloads_only_on_change(self):
+        """Test a table change swaps in a new snapshot"""
+        snapshot = self.calendar._snapshot
+        self.calendar.refresh()
+        assert self.calendar._snapshot is snapshot
+
+        with self.Session() as session:
+            session.add(LocationHoliday(COUNTRY='CHN', STATE='ALL', HOLIDAY_DATE=date(2025, 7, 9)))
+            session.commit()
+        self.calendar.refresh()
+
+        assert self.calendar._snapshot is not snapshot
+        assert not self.calendar.is_business_day('0101', date(2025, 7, 9))
+        assert self.calendar.stats()['reloads'] == 2
+
+    def test_lookups_need_no_queries(self):
+        """Test answers come from memory once loaded"""
+        with patch.object(self.calendar, 'session_factory', side_effect=AssertionError('query issued')):
+            for day in range(1, 32):
+                self.calendar.is_business_day('0503', date(2025, 10, day))
+                self.calendar.next_business_day('0503', date(2025, 10, day))
+
+    def test_not_loaded(self):
+        """Test lookups answer None before the first load"""
+        calendar = BusinessCalendar('dest', self.Session)
+
+        assert calendar.is_business_day('0503', date(2025, 7, 7)) is None
+        assert calendar.next_business_day('0503', date(2025, 7, 7)) is None
@@ -0,0 +1,237 @@
+"""
+Unit tests for the binlog change stream
+"""
+
+import pytest
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import update
+
+from app.models.constraints import AccountRestraint, ClientTransactionLimit
+from app.services.change_stream import BinlogPosition, ChangeStream, FileCheckpoint, RowChange, decode_event
+from app.services.limit_profiles import LimitProfileCache
+from app.services.restraint_index import RestraintIndex
+
+
+# Stand-ins for the reader's event classes; the stream tells events apart by class name
+class WriteRowsEvent:
+
+    def __init__(self, table, *rows):
+        self.table = table
+        self.rows = [{'values': row} for row in rows]
+        self.timestamp = 1751904000
+
+
+class UpdateRowsEvent:
+
+    def __init__(self, table, *pairs):
+        self.table = table
+        self.rows = [{'before_values': before, 'after_values': after} for before, after in pairs]
+        self.timestamp = 1751904000
+
+
+class DeleteRowsEvent(WriteRowsEvent):
+    pass
+
+
+class XidEvent:
+    pass
+
+
+class FakeReader:
+    """Replays (event, log_pos) pairs like BinLogStreamReader, moving its position as it goes"""
+
+    def __init__(self, events, error=None):
+        self.events = events
+        self.error = error
+        self.log_file = 'mysql-bin.000001'
+        self.log_pos = None
+        self.closed = False
+
+    def __iter__(self):
+        for event, log_pos in self.events:
+            self.log_pos = log_pos
+            yield event
+        if self.error:
+            raise self.error
+
+    def close(self):
+        self.closed = True
+
+
+class Recorder:
+
+    def __init__(self, fail=0):
+        self.batches = []
+        self.resets = 0
+        self.fail = fail
+
+    def apply_changes(self, changes, caught_up):
+        if self.fail:
+            self.fail -= 1
+            raise RuntimeError('subscriber down')
+        self.batches.append(([(c.table, c.kind, c.key) for c in changes], caught_up))
+
+    def reset(self):
+        self.resets += 1
+
+
+def _restraint(seq_no, status='A', restraint_type='FREEZE', internal_key=1):
+    return {'INTERNAL_KEY': internal_key, 'RESTRAINT_TYPE': restraint_type, 'RES_SEQ_NO': seq_no,
+            'RESTRAINTS_STATUS': status}
+
+
+def _change(table, before, after):
+    kind = 'update' if before and after else ('insert' if after else 'delete')
+    return RowChange('source', table, kind, before, after, None, None)
+
+
+class TestChangeStream:
+
+    def _stream(self, readers, tmp_path=None, **kwargs):
+        readers = iter(readers)
+        self.opened = []
+
+        def reader_factory(position):
+            self.opened.append(position)
+            return next(readers)
+
+        checkpoint = FileCheckpoint(str(tmp_path / 'source.json')) if tmp_path else None
+        stream = ChangeStream('source', None, 1, checkpoint=checkpoint, reader_factory=reader_factory, **kwargs)
+        stream._master_position = lambda: BinlogPosition('mysql-bin.000001', 4)
+        return stream
+
+    def test_decode_event(self):
+        """Test row events become typed changes with before and after images, other tables none"""
+        update_event = UpdateRowsEvent(
+            'rb_acct_balance', ({'INTERNAL_KEY': 7, 'TOTAL_AMOUNT': 1}, {'INTERNAL_KEY': 7, 'TOTAL_AMOUNT': 2})
+        )
+        change, = decode_event(update_event, 'source')
+        assert (change.kind, change.key, change.before['TOTAL_AMOUNT'], change.after['TOTAL_AMOUNT']) == \
+            ('update', (7,), 1, 2)
+
+        deleted, = decode_event(DeleteRowsEvent('rb_restraints', _restraint('R1')), 'source')
+        assert deleted.kind == 'delete' and deleted.after is None and deleted.key == (1, 'FREEZE', 'R1')
+        assert decode_event(WriteRowsEvent('rb_tran_hist', {'SEQ_NO': '1'}), 'source') == []
+        assert decode_event(XidEvent(), 'source') == []
+
+    def test_poll_delivers_committed_transactions_and_checkpoints(self, tmp_path):
+        """Test only committed transactions are pushed and the checkpoint lands on the last commit"""
+        stream = self._stream([
+            FakeReader([
+                (WriteRowsEvent('rb_restraints', _restraint('R1')), 200), (XidEvent(), 250),
+                (WriteRowsEvent('transfer_log', {'id': 9}), 300)
+            ]),
+            FakeReader([(WriteRowsEvent('transfer_log', {'id': 9}), 300), (XidEvent(), 350)])
+        ], tmp_path)
+        recorder = Recorder()
+        restraints_only = Recorder()
+        stream.subscribe(recorder)
+        stream.subscribe(restraints_only, tables=('rb_restraints',))
+
+        stream.poll()
+        assert recorder.resets == 1
+        assert recorder.batches == [([('rb_restraints', 'insert', (1, 'FREEZE', 'R1'))], True)]
+        assert stream.position == BinlogPosition('mysql-bin.000001', 250)
+
+        # The open transaction is read again from the last commit and delivered once it commits
+        stream.poll()
+        assert self.opened == [BinlogPosition('mysql-bin.000001', 4), BinlogPosition('mysql-bin.000001', 250)]
+        assert recorder.batches[-1] == ([('transfer_log', 'insert', (9,))], True)
+        assert restraints_only.batches[-1] == ([], True)
+        assert FileCheckpoint(str(tmp_path / 'source.json')).load() == BinlogPosition('mysql-bin.000001', 350)
+
+        # A restarted stream resumes from the checkpoint without a reset
+        resumed = self._stream([FakeReader([])], tmp_path)
+        resumed.subscribe(Recorder())
+        resumed.poll()
+        assert self.opened == [BinlogPosition('mysql-bin.000001', 350)] and resumed.resets == 0
+
+    def test_failed_batch_is_redelivered(self):
+        """Test the position does not move past a batch a subscriber failed on"""
+        events = [(WriteRowsEvent('transfer_log', {'id': 1}), 200), (XidEvent(), 250)]
+        stream = self._stream([FakeReader(events), FakeReader(events)])
+        recorder = Recorder(fail=1)
+        stream.subscribe(recorder)
+
+        with pytest.raises(RuntimeError):
+            stream.poll()
+        assert stream.position == BinlogPosition('mysql-bin.000001', 4) and stream.failed_batches == 1
+
+        stream.poll()
+        assert recorder.batches == [([('transfer_log', 'insert', (1,))], True)]
+        assert stream.position == BinlogPosition('mysql-bin.000001', 250)
+
+    def test_lost_position_resets_subscribers(self):
+        """Test a purged binlog position makes subscribers rebuild and restarts at the binlog end"""
+        stream = self._stream([
+            FakeReader([], error=Exception(1236, 'Could not find first log file name in binary log index file')),
+            FakeReader([])
+        ])
+        stream.position = BinlogPosition('mysql-bin.000001', 999)
+        recorder = Recorder()
+        stream.subscribe(recorder)
+
+        stream.poll()
+        assert stream.position is None and recorder.resets == 0
+        stream.poll()
+        assert recorder.resets == 1 and stream.position == BinlogPosition('mysql-bin.000001', 4)
+
+
+class TestChangeSubscribers:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, database):
+        """Setup test fixtures"""
+        self.engine, self.Session, self.accounts = database(2)
+        self.now = datetime(2025, 7, 7, 16, 0, 0)
+
+    def test_restraint_index_applies_pushed_changes(self):
+        """Test pushed restraint changes update the index at once and pause the watermark poll"""
+        with self.Session() as session:
+            session.add(AccountRestraint(INTERNAL_KEY=1, RESTRAINT_TYPE='FREEZE', RES_SEQ_NO='R0',
+                                         RESTRAINTS_STATUS='I', TRAN_TIMESTAMP=self.now))
+            session.commit()
+        index = RestraintIndex('source', self.Session, max_staleness=5)
+        index.load()
+        assert index.lookup(1) == frozenset()
+
+        index.apply_changes([_change('rb_restraints', None, _restraint('R1'))], caught_up=True)
+        assert index.lookup(1) == frozenset(['FREEZE'])
+
+        index.apply_changes([
+            _change('rb_restraints', _restraint('R1'), _restraint('R1', status='I')),
+            _change('rb_restraints', None, _restraint('R2', restraint_type='PLEDGE', internal_key=2))
+        ], caught_up=True)
+        assert index.lookup(1) == frozenset() and index.lookup(2) == frozenset()
+
+        # A restraint written while pushes flow is not read by the poll, only pushed
+        with self.Session() as session:
+            session.add(AccountRestraint(INTERNAL_KEY=2, RESTRAINT_TYPE='FREEZE', RES_SEQ_NO='R3',
+                                         RESTRAINTS_STATUS='A', TRAN_TIMESTAMP=self.now))
+            session.commit()
+        index.refresh()
+        assert index.lookup(2) == frozenset()
+
+    def test_limit_cache_drops_changed_profiles(self):
+        """Test a pushed limit change drops the profile, and a profile read before it is not stored"""
+        cache = LimitProfileCache('source', self.Session)
+        cache.refresh()
+        with self.Session() as session:
+            assert cache.get_profile(session, self.accounts[0]).get('DailyTransferLimit').LIMIT_MAX_AMT == 50000
+            session.execute(
+                update(ClientTransactionLimit).where(ClientTransactionLimit.BASE_ACCT_NO == self.accounts[0])
+                .values(LIMIT_MAX_AMT=Decimal('100.00'))
+            )
+            session.commit()
+
+        limit = {'BASE_ACCT_NO': self.accounts[0], 'LIMIT_REF': 'DailyTransferLimit'}
+        cache.apply_changes([_change('rb_lm_client_tran_limit', limit, limit)], caught_up=True)
+        with self.Session() as session:
+            assert cache.get_profile(session, self.accounts[0]).get('DailyTransferLimit').LIMIT_MAX_AMT == 100
+
+        generation = cache._generation
+        cache.apply_changes([_change('rb_lm_client_tran_limit', limit, limit)], caught_up=True)
+        with self.Session() as session:
+            cache._store([cache._load_many(session, [self.accounts[0]])[0]], generation=generation)
+        assert cache.stats()['profiles'] == 0
@@ -0,0 +1,120 @@
+"""
+Unit tests for request deadlines
+"""
+
+import pytest
+from decimal import Decimal
+from unittest.mock import patch
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+
+from app.config.settings import Config
+from app.models.account import AccountBalance
+from app.models.transaction import TransferLog
+from app.services.account_service import AccountService
+from app.services.transfer_service import TransferService
+from app.utils.deadline import Deadline
+from app.utils.exceptions import InsufficientBalanceException, TimeoutException
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestDeadline:
+
+    def test_check_after_expiry(self):
+        """Test check passes inside the budget and raises TimeoutException naming the step after it"""
+        clock = FakeClock()
+        deadline = Deadline(5, 'transfer', clock=clock)
+        deadline.check('begin')
+        assert deadline.remaining() == 5
+
+        clock.now += 5
+        with pytest.raises(TimeoutException) as exc_info:
+            deadline.check('commit')
+        assert exc_info.value.details == {
+            'component': 'TIMEOUT', 'operation': 'transfer', 'timeout_seconds': 5, 'step': 'commit'
+        }
+        assert deadline.remaining() == 0
+
+    def test_timeout_errors(self):
+        """Test MySQL lock wait and statement time errors become TimeoutException"""
+        clock = FakeClock()
+        deadline = Deadline(5, 'transfer', clock=clock)
+        lock_wait = OperationalError('SELECT', {}, Exception(1205, 'Lock wait timeout exceeded'))
+        other = OperationalError('SELECT', {}, Exception(2006, 'MySQL server has gone away'))
+
+        assert isinstance(deadline.timeout_error(lock_wait, 'lock account'), TimeoutException)
+        assert deadline.timeout_error(other, 'lock account') is None
+
+        # Past the deadline any failure is a timeout, except a business rejection
+        clock.now += 6
+        assert isinstance(deadline.timeout_error(other, 'lock account'), TimeoutException)
+        assert deadline.timeout_error(InsufficientBalanceException('A', 1, 2), 'debit') is None
+
+
+class TestTransferDeadline:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, database, bind_databases):
+        """Setup test fixtures"""
+        self.engines, self.sessions, self.accounts = [], [], []
+        for name, prefix in (('source', '6230399991'), ('dest', '6230399992')):
+            engine, Session, accounts = database(2, name=name, balance='1000.00', account_prefix=prefix)
+            self.engines.append(engine)
+            self.sessions.append(Session)
+            self.accounts.append(accounts[0])
+        bind_databases(*self.engines)
+        self.request = {
+            'from_account': self.accounts[0], 'to_account': self.accounts[1],
+            'amount': Decimal('10.00'), 'currency': 'CNY'
+        }
+
+    def _state(self, Session):
+        with Session() as session:
+            return (session.execute(select(func.sum(AccountBalance.TOTAL_AMOUNT))).scalar(),
+                    session.execute(select(func.count()).select_from(TransferLog)).scalar())
+
+    def test_deadline_passing_mid_transfer_rolls_back(self):
+        """Test a deadline passing after the debit stops the credit and rolls back both sides"""
+        clock = FakeClock()
+        deadline = Deadline(5, 'transfer', clock=clock)
+        debit = AccountService.debit_account
+
+        def slow_debit(service, *args, **kwargs):
+            result = debit(service, *args, **kwargs)
+            clock.now += 6
+            return result
+
+        with patch.object(AccountService, 'debit_account', slow_debit):
+            with pytest.raises(TimeoutException) as exc_info:
+                TransferService(Config()).process_transfer(self.request, validated=True, deadline=deadline)
+
+        assert exc_info.value.details['step'] == 'lock account'
+        assert self._state(self.sessions[0]) == (Decimal('2000.00'), 0)
+        assert self._state(self.sessions[1]) == (Decimal('2000.00'), 0)
+
+    def test_transfer_within_deadline(self):
+        """Test a transfer inside its budget commits as before"""
+        result = TransferService(Config()).process_transfer(self.request, validated=True,
+                                                             deadline=Deadline(5, 'transfer'))
+        assert result['status'] == 'SUCCESS'
+        assert self._state(self.sessions[0]) == (Decimal('1990.00'), 1)
+
+    def test_api_answers_504(self, api_client):
+        """Test a transfer past TRANSACTION_TIMEOUT gets 504 and leaves no trace"""
+        with patch.object(Config, 'TRANSACTION_TIMEOUT', 0):
+            response = api_client.post('/api/v1/transfers', json={
+                'from_account': self.accounts[0], 'to_account': self.accounts[1], 'amount': 10
+            })
+
+        assert response.status_code == 504
+        assert response.get_json()['error']['details']['step'] == 'begin'
+        assert self._state(self.sessions[0]) == (Decimal('2000.00'), 0)
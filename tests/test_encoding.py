@@ -0,0 +1,91 @@
+"""
+Unit tests for response encoding
+"""
+
+import json
+import pytest
+from datetime import datetime
+from decimal import Decimal
+from flask import Flask, jsonify
+
+from app.utils.encoding import ResponseEncoder, BankingJSONProvider, msgpack, orjson
+
+BACKENDS = [False] + ([True] if orjson is not None else [])
+
+PAYLOAD = {
+    'balance': Decimal('12345678901234567.89'),
+    'fee': Decimal('-0.50'),
+    'when': datetime(2025, 7, 7, 16, 26, 48, 504101),
+    'name': '张三',
+    'items': [1, 2.5, None, True]
+}
+
+
+class TestResponseEncoder:
+
+    @pytest.mark.parametrize('use_orjson', BACKENDS)
+    def test_number_mode_is_exact(self, use_orjson):
+        """Test Decimal amounts are written as exact number literals"""
+        encoder = ResponseEncoder('number', use_orjson=use_orjson)
+        body = encoder.encode_json(PAYLOAD)
+
+        assert b'"balance":12345678901234567.89' in body
+        decoded = json.loads(body, parse_float=Decimal)
+        assert decoded['balance'] == Decimal('12345678901234567.89')
+        assert decoded['fee'] == Decimal('-0.50')
+        assert decoded['when'] == '2025-07-07T16:26:48.504101'
+        assert decoded['name'] == '张三'
+        assert decoded['items'] == [1, 2.5, None, True]
+
+    @pytest.mark.parametrize('use_orjson', BACKENDS)
+    def test_string_and_cents_modes(self, use_orjson):
+        """Test Decimal amounts as strings and integer cents"""
+        as_string = json.loads(ResponseEncoder('string', use_orjson=use_orjson).encode_json(PAYLOAD))
+        as_cents = json.loads(ResponseEncoder('cents', use_orjson=use_orjson).encode_json(PAYLOAD))
+
+        assert as_string['balance'] == '12345678901234567.89'
+        assert as_cents['balance'] == 1234567890123456789
+        assert as_cents['fee'] == -50
+
+    def test_invalid_mode_rejected(self):
+        """Test unsupported decimal modes raise"""
+        with pytest.raises(ValueError):
+            ResponseEncoder('float')
+
+class TestBankingJSONProvider:
+
+    def setup_method(self):
+        """Setup test fixtures"""
+        app = Flask(__name__)
+        app.json = BankingJSONProvider(app)
+
+        @app.route('/balance', methods=['GET', 'POST'])
+        def balance():
+            return jsonify({'balance': Decimal('100.10')})
+
+        @app.route('/echo', methods=['POST'])
+        def echo():
+            amount = app.json.loads(b'{"amount": 0.1}')['amount']
+            return jsonify({'is_decimal': isinstance(amount, Decimal)})
+
+        self.client = app.test_client()
+
+    def test_json_by_default(self):
+        """Test JSON is returned without an explicit Accept header"""
+        response = self.client.get('/balance')
+
+        assert response.mimetype == 'application/json'
+        assert response.data == b'{"balance":100.10}'
+
+    def test_request_floats_parsed_as_decimal(self):
+        """Test request bodies keep exact amounts"""
+        assert self.client.post('/echo').get_json() == {'is_decimal': True}
+
+    @pytest.mark.skipif(msgpack is None, reason="msgpack not installed")
+    def test_msgpack_negotiated_via_accept(self):
+        """Test MessagePack is returned when requested"""
+        response = self.client.get('/balance', headers={'Accept': 'application/msgpack'})
+
+        assert response.mimetype == 'application/msgpack'
+        assert msgpack.unpackb(response.data) == {'balance': '100.10'}
+        assert 'Accept' in response.headers['Vary']
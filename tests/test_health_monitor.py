@@ -0,0 +1,111 @@
+"""
+Unit tests for the background health monitor
+"""
+
+import time
+
+from app.database.health_monitor import (
+    HealthMonitor, HealthThresholds, ComponentHealth,
+    STATUS_HEALTHY, STATUS_DEGRADED, STATUS_UNHEALTHY, STATUS_UNKNOWN
+)
+
+
+def _ok():
+    pass
+
+
+def _fail():
+    raise RuntimeError("connection refused")
+
+
+class TestComponentHealth:
+
+    def setup_method(self):
+        """Setup test fixtures"""
+        self.thresholds = HealthThresholds(
+            degraded_latency_ms=100, unhealthy_latency_ms=500,
+            degraded_error_rate=0.2, unhealthy_error_rate=0.5,
+            unhealthy_consecutive_failures=3, max_staleness=30
+        )
+        self.component = ComponentHealth('source', window_size=10)
+
+    def test_unknown_before_first_probe(self):
+        """Test component without samples is unknown"""
+        assert self.component.evaluate(self.thresholds, time.time()) == STATUS_UNKNOWN
+
+    def test_healthy_with_fast_probes(self):
+        """Test fast successful probes are healthy"""
+        now = time.time()
+        for _ in range(5):
+            self.component.record_success(5.0, now)
+
+        assert self.component.evaluate(self.thresholds, now) == STATUS_HEALTHY
+
+    def test_degraded_on_slow_probes(self):
+        """Test p95 latency above the degraded threshold"""
+        now = time.time()
+        for _ in range(5):
+            self.component.record_success(150.0, now)
+
+        assert self.component.evaluate(self.thresholds, now) == STATUS_DEGRADED
+
+    def test_unhealthy_on_error_rate(self):
+        """Test error rate above the unhealthy threshold"""
+        now = time.time()
+        for _ in range(2):
+            self.component.record_success(5.0, now)
+            self.component.record_failure('timeout', now)
+            self.component.record_success(5.0, now)
+        self.component.record_failure('timeout', now)
+        self.component.record_failure('timeout', now)
+
+        assert self.component.error_rate() == 0.5
+        assert self.component.evaluate(self.thresholds, now) == STATUS_UNHEALTHY
+
+    def test_unhealthy_when_stale(self):
+        """Test results older than max staleness are unhealthy"""
+        checked_at = time.time() - 60
+        self.component.record_success(5.0, checked_at)
+
+        assert self.component.evaluate(self.thresholds, time.time()) == STATUS_UNHEALTHY
+
+
+class TestHealthMonitor:
+
+    def test_check_now_caches_snapshot(self):
+        """Test a probe round populates the cached snapshot"""
+        monitor = HealthMonitor({'source': _ok, 'dest': _ok}, interval=60, timeout=1)
+        assert monitor.snapshot()['status'] == STATUS_UNKNOWN
+
+        monitor.check_now()
+        snapshot = monitor.snapshot()
+
+        assert snapshot['status'] == STATUS_HEALTHY
+        assert snapshot['components']['source']['samples'] == 1
+        assert snapshot['components']['dest']['status'] == STATUS_HEALTHY
+
+    def test_failing_component_drives_overall_status(self):
+        """Test overall status is the worst component status"""
+        monitor = HealthMonitor(
+            {'source': _ok, 'dest': _fail}, interval=60, timeout=1,
+            thresholds=HealthThresholds(unhealthy_consecutive_failures=1)
+        )
+        monitor.check_now()
+        snapshot = monitor.snapshot()
+
+        assert snapshot['status'] == STATUS_UNHEALTHY
+        assert snapshot['components']['source']['status'] == STATUS_HEALTHY
+        assert 'connection refused' in snapshot['components']['dest']['last_error']
+
+    def test_probe_timeout_recorded_as_failure(self):
+        """Test a hung probe counts as a failure without blocking the round"""
+        monitor = HealthMonitor(
+            {'source': lambda: time.sleep(0.5)}, interval=60, timeout=0.05
+        )
+        started = time.perf_counter()
+        monitor.check_now()
+
+        assert time.perf_counter() - started < 0.4
+        component = monitor.snapshot()['components']['source']
+        assert component['consecutive_failures'] == 1
+        assert 'timed out' in component['last_error']
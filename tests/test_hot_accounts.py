@@ -0,0 +1,115 @@
+"""
+Unit tests for hot-account balance slots
+"""
+
+import pytest
+from decimal import Decimal
+from unittest.mock import patch
+
+from app.models.account import AccountBalance, AccountBalanceSlot
+from app.services.account_service import AccountService
+from app.services.hot_accounts import HotAccountRegistry
+from app.utils.exceptions import InsufficientBalanceException
+
+
+class TestHotAccounts:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, database):
+        """Setup test fixtures"""
+        self.engine, self.Session, self.accounts = database(2, balance='100.00')
+        self.registry = HotAccountRegistry('source', self.Session, default_slots=4,
+                                           lock_wait_ms=0, lock_wait_count=3)
+        self.hot = self.accounts[0]
+        self.registry.mark_hot(self.hot)
+
+    def _credit(self, amount, times=1):
+        for _ in range(times):
+            with self.Session() as session:
+                AccountService(session, hot_accounts=self.registry).credit_account(self.hot, amount, 'REF')
+                session.commit()
+
+    def test_mark_hot_creates_slots(self):
+        """Test marking an account hot pre-creates its slots"""
+        with self.Session() as session:
+            assert session.query(AccountBalanceSlot).filter_by(INTERNAL_KEY=1).count() == 4
+        assert self.registry.slot_count(self.hot) == 4
+        assert self.registry.slot_count(self.accounts[1]) == 0
+
+    def test_credits_go_to_slots_and_balance_includes_them(self):
+        """Test hot credits leave the main row untouched but count in the balance"""
+        self._credit('10.00', times=5)
+
+        with self.Session() as session:
+            assert session.get(AccountBalance, 1).TOTAL_AMOUNT == Decimal('100.00')
+            service = AccountService(session, hot_accounts=self.registry)
+            account, balance = service.get_account_balance_record(self.hot)
+            assert balance.TOTAL_AMOUNT == Decimal('150.00')
+
+    def test_debit_folds_slots_when_main_balance_short(self):
+        """Test a debit larger than the main balance consolidates slots first"""
+        self._credit('30.00', times=2)
+
+        with self.Session() as session:
+            service = AccountService(session, hot_accounts=self.registry)
+            result = service.debit_account(self.hot, Decimal('150.00'), 'REF')
+            session.commit()
+
+            assert result['previous_balance'] == Decimal('160.00')
+            assert result['new_balance'] == Decimal('10.00')
+
+        with self.Session() as session:
+            service = AccountService(session, hot_accounts=self.registry)
+            with pytest.raises(InsufficientBalanceException):
+                service.debit_account(self.hot, Decimal('20.00'), 'REF')
+
+    def test_balance_reads_do_not_depend_on_the_registry(self):
+        """Test a worker that does not know the account is hot still counts its slots"""
+        self._credit('30.00', times=2)
+
+        with self.Session() as session:
+            service = AccountService(session)
+            account, balance = service.get_account_balance_record(self.hot)
+            assert balance.TOTAL_AMOUNT == Decimal('160.00')
+            assert service.validate_sufficient_balance(self.hot, Decimal('160.00'))
+
+            result = service.debit_account(self.hot, Decimal('150.00'), 'REF')
+            session.commit()
+            assert (result['previous_balance'], result['new_balance']) == (Decimal('160.00'), Decimal('10.00'))
+
+    def test_compaction_preserves_total(self):
+        """Test compaction moves slot amounts into the main balance"""
+        self._credit('5.00', times=6)
+
+        assert self.registry.compact() == 1
+
+        with self.Session() as session:
+            assert session.get(AccountBalance, 1).TOTAL_AMOUNT == Decimal('130.00')
+            service = AccountService(session, hot_accounts=self.registry)
+            assert service.get_balance_slot_total(1) == Decimal('0.00')
+
+    def test_repeated_lock_waits_mark_account_hot(self):
+        """Test auto-detection after enough slow lock waits in the window"""
+        cold = self.accounts[1]
+        assert not self.registry.record_lock_wait(cold, 5)
+        assert not self.registry.record_lock_wait(cold, 5)
+        assert self.registry.record_lock_wait(cold, 5)
+        assert not self.registry.is_hot(cold)
+
+        assert self.registry.mark_pending() == 1
+        assert self.registry.is_hot(cold)
+        assert self.registry.mark_pending() == 0
+
+    def test_detection_does_not_mark_on_request_path(self):
+        """Test debits that trip detection while holding the row lock leave marking to the background thread"""
+        cold = self.accounts[1]
+        with patch.object(self.registry, 'mark_hot', wraps=self.registry.mark_hot) as mark_hot:
+            for _ in range(3):
+                with self.Session() as session:
+                    AccountService(session, hot_accounts=self.registry).debit_account(cold, Decimal('1.00'), 'REF')
+                    session.commit()
+            mark_hot.assert_not_called()
+
+            self.registry.mark_pending()
+        mark_hot.assert_called_once_with(cold, marked_by='AUTO')
+        assert self.registry.is_hot(cold)
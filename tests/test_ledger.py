@@ -0,0 +1,144 @@
+"""
+Unit tests for the journal ledger mode and the journal applier
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from sqlalchemy import select
+
+from app.config.settings import Config
+from app.models.account import AccountBalance, AccountJournal
+from app.models.transaction import TransactionHistory
+from app.services.account_service import AccountService
+from app.services.hot_accounts import HotAccountRegistry
+from app.services.ledger import JournalApplier
+from app.services.transfer_service import TransferService
+from app.utils.exceptions import TransferException
+
+
+class TestJournalTransfers:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, database, bind_databases):
+        """Setup test fixtures"""
+        self.sessions, self.accounts = [], []
+        engines = []
+        for name, prefix in (('source', '6230399991'), ('dest', '6230399992')):
+            engine, Session, accounts = database(1, name=name, balance='1000.00', account_prefix=prefix)
+            engines.append(engine)
+            self.sessions.append(Session)
+            self.accounts.append(accounts[0])
+        bind_databases(*engines)
+
+        with patch.object(Config, 'LEDGER_MODE', 'journal'):
+            self.service = TransferService(Config())
+        self.appliers = [JournalApplier(name, Session) for name, Session in zip(('source', 'dest'), self.sessions)]
+
+    def _transfer(self, amount):
+        return self.service.process_transfer({
+            'from_account': self.accounts[0], 'to_account': self.accounts[1],
+            'amount': Decimal(amount), 'currency': 'CNY'
+        }, validated=True)
+
+    def _balance(self, Session):
+        with Session() as session:
+            balance = session.get(AccountBalance, 1)
+            return balance.TOTAL_AMOUNT, balance.RESERVED_AMOUNT
+
+    def test_transfer_appends_and_reserves(self):
+        """Test a transfer journals both sides and reserves the debit without touching the balance"""
+        result = self._transfer('300.00')
+
+        assert result['source_new_balance'] == Decimal('700.00') and result['dest_new_balance'] is None
+        assert self._balance(self.sessions[0]) == (Decimal('1000.00'), Decimal('300.00'))
+        assert self._balance(self.sessions[1]) == (Decimal('1000.00'), Decimal('0.00'))
+        for Session, amount in zip(self.sessions, (Decimal('-300.00'), Decimal('300.00'))):
+            with Session() as session:
+                entry, = session.execute(select(AccountJournal)).scalars()
+                assert entry.AMOUNT == amount and entry.REFERENCE == result['transfer_id']
+                assert session.execute(select(TransactionHistory)).first() is None
+
+    def test_reservations_prevent_overdraft(self):
+        """Test a debit beyond the balance less open reservations is refused and leaves no entry"""
+        self._transfer('600.00')
+        with pytest.raises(TransferException):
+            self._transfer('500.00')
+
+        assert self._balance(self.sessions[0]) == (Decimal('1000.00'), Decimal('600.00'))
+        with self.sessions[0]() as session:
+            assert len(session.execute(select(AccountJournal)).all()) == 1
+
+    def test_reservation_counts_hot_account_slots(self):
+        """Test a debit validation passes because of slot funds is reserved after folding the slots"""
+        registry = HotAccountRegistry('source', self.sessions[0], default_slots=2)
+        registry.mark_hot(self.accounts[0])
+        with self.sessions[0]() as session:
+            service = AccountService(session, hot_accounts=registry)
+            service.credit_account(self.accounts[0], Decimal('500.00'), 'REF')
+            account, balance = service.get_account_balance_record(self.accounts[0])
+            assert service.validate_sufficient_balance(self.accounts[0], Decimal('1200.00'))
+
+            result = service.journal_debit(account, Decimal('1200.00'), 'T1')
+            session.commit()
+            assert (result['previous_balance'], result['new_balance']) == (Decimal('1500.00'), Decimal('300.00'))
+
+        assert self._balance(self.sessions[0]) == (Decimal('1500.00'), Decimal('1200.00'))
+
+    def test_applier_posts_balances_and_history(self):
+        """Test the applier folds the entries with running balances and releases the reservations"""
+        self._transfer('100.00')
+        self._transfer('250.00')
+
+        assert [applier.drain() for applier in self.appliers] == [2, 2]
+        assert self._balance(self.sessions[0]) == (Decimal('650.00'), Decimal('0.00'))
+        assert self._balance(self.sessions[1]) == (Decimal('1350.00'), Decimal('0.00'))
+        with self.sessions[1]() as session:
+            history = session.execute(
+                select(TransactionHistory.PREVIOUS_BAL_AMT, TransactionHistory.ACTUAL_BAL)
+                .order_by(TransactionHistory.ACTUAL_BAL)
+            ).all()
+        assert history == [(Decimal('1000.00'), Decimal('1100.00')), (Decimal('1100.00'), Decimal('1350.00'))]
+
+        # A rerun finds nothing new, so no entry is posted twice
+        assert self.appliers[0].apply_once() == 0
+        assert self._balance(self.sessions[0]) == (Decimal('650.00'), Decimal('0.00'))
+
+    def test_balance_endpoint_reports_available(self, api_client):
+        """Test the balance endpoint returns the posted balance and what is available"""
+        self._transfer('400.00')
+
+        data = api_client.get(f'/api/v1/accounts/{self.accounts[0]}/balance').get_json()['data']
+        assert (data['balance'], data['available_balance']) == (Decimal('1000.00'), Decimal('600.00'))
+
+
+class TestJournalGaps:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, database):
+        """Setup test fixtures"""
+        self.engine, self.Session, self.accounts = database(1)
+        self.now = datetime(2025, 7, 7, 16, 0, 0)
+
+    def _entry(self, journal_id, created_at):
+        return AccountJournal(JOURNAL_ID=journal_id, INTERNAL_KEY=1, CLIENT_NO='1108800001',
+                              BASE_ACCT_NO=self.accounts[0], AMOUNT=Decimal('10.00'), CR_DR_IND='C',
+                              REFERENCE=f'T{journal_id}', CREATED_AT=created_at)
+
+    def test_gap_waits_then_is_skipped(self):
+        """Test the applier stops at a gap that may still commit and skips it once it is old"""
+        with self.Session() as session:
+            session.add_all([self._entry(1, self.now), self._entry(3, self.now)])
+            session.commit()
+
+        clock = [self.now + timedelta(seconds=5)]
+        applier = JournalApplier('source', self.Session, gap_timeout=60, clock=lambda: clock[0])
+        assert applier.apply_once() == 1 and applier.last_journal_id == 1
+
+        clock[0] = self.now + timedelta(seconds=61)
+        assert applier.apply_once() == 1
+        assert applier.stats()['last_journal_id'] == 3 and applier.skipped_gaps == 1
+        with self.Session() as session:
+            assert session.get(AccountBalance, 1).TOTAL_AMOUNT == Decimal('100020.00')
@@ -0,0 +1,113 @@
+"""
+Unit tests for the limit profile cache
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from sqlalchemy import event, update
+
+from app.models.constraints import ClientTransactionLimit
+from app.services.account_service import AccountService
+from app.services.limit_profiles import LimitProfileCache
+from app.utils.exceptions import TransferLimitExceededException
+
+
+class TestLimitProfileCache:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, database):
+        """Setup test fixtures"""
+        self.engine, self.Session, self.accounts = database(3)
+        self.now = datetime(2025, 7, 7, 16, 0, 0)
+        with self.Session() as session:
+            session.execute(update(ClientTransactionLimit).values(TRAN_TIMESTAMP=self.now))
+            session.add(ClientTransactionLimit(
+                BASE_ACCT_NO=self.accounts[0], LIMIT_REF='RcNotMtTransferLimitPd', ACCT_CCY='CNY',
+                CLIENT_NO='1108800001', LIMIT_MAX_AMT=Decimal('5000.00'), LIMIT_MIN_AMT=Decimal('0.01'),
+                TRAN_TIMESTAMP=self.now
+            ))
+            session.commit()
+
+        self.queries = 0
+
+        @event.listens_for(self.engine, 'before_cursor_execute')
+        def count_queries(*args):
+            self.queries += 1
+
+        self.cache = LimitProfileCache('source', self.Session, overlap_seconds=1)
+        self.cache.refresh()
+
+    def _set_limit(self, account_no, limit_ref, max_amount, timestamp):
+        with self.Session() as session:
+            session.execute(
+                update(ClientTransactionLimit)
+                .where(ClientTransactionLimit.BASE_ACCT_NO == account_no,
+                       ClientTransactionLimit.LIMIT_REF == limit_ref)
+                .values(LIMIT_MAX_AMT=Decimal(max_amount), TRAN_TIMESTAMP=timestamp)
+            )
+            session.commit()
+
+    def test_profile_evaluates_all_transfer_limits(self):
+        """Test one call checks every transfer limit type"""
+        with self.Session() as session:
+            profile = self.cache.get_profile(session, self.accounts[0])
+
+        assert sorted(profile.limits) == ['DailyTransferLimit', 'RcNotMtTransferLimitPd']
+        assert profile.version == self.now
+        assert profile.evaluate('100.00') == []
+        assert [v.limit_ref for v in profile.evaluate('6000.00')] == ['RcNotMtTransferLimitPd']
+        assert [v.limit_ref for v in profile.evaluate('60000.00')] == \
+            ['DailyTransferLimit', 'RcNotMtTransferLimitPd']
+        assert profile.evaluate('0.001')[0].bound == 'MIN'
+
+    def test_cached_profile_needs_no_query(self):
+        """Test a miss costs one query and a hit none"""
+        with self.Session() as session:
+            self.queries = 0
+            first = self.cache.get_profile(session, self.accounts[0])
+            assert self.queries == 1
+            second = self.cache.get_profile(session, self.accounts[0])
+            assert self.queries == 1
+
+        assert first is second
+        assert self.cache.stats()['hits'] == 1
+
+    def test_refresh_reloads_changed_profiles_only(self):
+        """Test a changed limit replaces its profile and others are kept"""
+        with self.Session() as session:
+            changed = self.cache.get_profile(session, self.accounts[0])
+            unchanged = self.cache.get_profile(session, self.accounts[1])
+
+        self._set_limit(self.accounts[0], 'DailyTransferLimit', '100.00', self.now + timedelta(seconds=10))
+        self.cache.refresh()
+
+        with self.Session() as session:
+            reloaded = self.cache.get_profile(session, self.accounts[0])
+            assert self.cache.get_profile(session, self.accounts[1]) is unchanged
+
+        assert reloaded is not changed
+        assert reloaded.get('DailyTransferLimit').LIMIT_MAX_AMT == Decimal('100.00')
+        assert self.cache.stats()['reloaded'] == 1
+
+    def test_stale_cache_queries_database(self):
+        """Test lookups bypass the cache outside the freshness window"""
+        with self.Session() as session:
+            self.cache.get_profile(session, self.accounts[0])
+            self.cache._last_refresh -= 10
+            self.queries = 0
+            self.cache.get_profile(session, self.accounts[0])
+
+        assert self.queries == 1
+        assert self.cache.stats()['stale_misses'] == 1
+
+    def test_account_service_uses_profile(self):
+        """Test check_transfer_limits raises for any exceeded limit type"""
+        with self.Session() as session:
+            service = AccountService(session, limit_profiles=self.cache)
+
+            assert service.check_transfer_limits(self.accounts[0], Decimal('100.00'))
+            with pytest.raises(TransferLimitExceededException) as error:
+                service.check_transfer_limits(self.accounts[0], Decimal('6000.00'))
+            assert error.value.details['limit_type'] == 'Non-Counter Transfer Limit'
+            assert service.check_transfer_limits(self.accounts[1], Decimal('6000.00'))
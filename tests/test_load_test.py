@@ -0,0 +1,86 @@
+"""
+Tests for the load-test harness and the transfer pipeline it drives
+"""
+
+import pytest
+from collections import Counter
+from decimal import Decimal
+from sqlalchemy import func
+from sqlalchemy.orm import sessionmaker
+
+from app.models.account import AccountBalance
+from app.models.transaction import TransferLog
+from benchmarks.common import ZipfSampler, percentile
+from benchmarks.load_test import ServiceDriver, classify_error, run_load
+
+
+class TestLoadTestHelpers:
+
+    def test_zipf_sampler_is_skewed_and_reproducible(self):
+        """Test low ranks dominate and seeds repeat"""
+        sampler = ZipfSampler(100, 1.2, seed=7)
+        counts = Counter(sampler.sample() for _ in range(5000))
+
+        assert counts[0] > counts[10] > counts[90]
+        assert ZipfSampler(100, 1.2, seed=7).sample() == ZipfSampler(100, 1.2, seed=7).sample()
+
+    def test_percentile_nearest_rank(self):
+        """Test nearest-rank percentiles"""
+        values = list(range(1, 101))
+
+        assert percentile(values, 50) == 50
+        assert percentile(values, 99) == 99
+        assert percentile(values, 100) == 100
+        assert percentile([], 50) is None
+
+    def test_classify_error(self):
+        """Test MySQL and SQLite lock errors are recognised"""
+        assert classify_error("(pymysql.err.OperationalError) (1213, 'Deadlock found')") == 'deadlock'
+        assert classify_error("(1205, 'Lock wait timeout exceeded')") == 'lock_timeout'
+        assert classify_error("database is locked") == 'lock_timeout'
+        assert classify_error("something else") == 'other'
+
+
+    def test_service_retries_are_reported(self):
+        """Test reruns done inside the service are counted, and can be turned off"""
+        class RetryingDriver:
+            def transfer(self, request):
+                return None, 2
+
+        results = run_load(RetryingDriver(), ['A'], ['B'], concurrency=1, duration=30, transfers=3, skew=0)
+        assert (results['service_retries'], results['retried_transfers'], results['deadlocks']) == (6, 3, 0)
+        assert ServiceDriver(max_attempts=1).service.retry_policy.max_attempts == 1
+
+
+class TestTransferPipelineUnderLoad:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, database, bind_databases):
+        """Setup test fixtures"""
+        self.engines = []
+        self.accounts = []
+        for name, prefix in (('source', '6230399991'), ('dest', '6230399992')):
+            engine, _, accounts = database(5, name=name, balance='1000.00', account_prefix=prefix)
+            self.engines.append(engine)
+            self.accounts.append(accounts)
+        bind_databases(*self.engines)
+
+    def _totals(self, engine):
+        with sessionmaker(bind=engine)() as session:
+            balance = session.query(func.sum(AccountBalance.TOTAL_AMOUNT)).scalar()
+            succeeded = session.query(TransferLog).filter_by(status='SUCCESS').count()
+            return Decimal(str(balance)), succeeded
+
+    def test_concurrent_transfers_conserve_money(self):
+        """Test every successful transfer moves exactly its amount"""
+        results = run_load(ServiceDriver(), self.accounts[0], self.accounts[1],
+                           concurrency=2, duration=30, transfers=20, skew=1.0)
+
+        source_total, source_logs = self._totals(self.engines[0])
+        dest_total, dest_logs = self._totals(self.engines[1])
+
+        assert results['attempted'] == 20
+        assert results['succeeded'] == source_logs == dest_logs
+        assert results['succeeded'] > 0
+        assert source_total + dest_total == Decimal('10000.00')
+        assert results['latency_ms']['p99'] >= results['latency_ms']['p50']
@@ -0,0 +1,115 @@
+"""
+Unit tests for the on-demand sampling profiler
+"""
+
+import threading
+from datetime import datetime
+
+import pytest
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+
+from app.api.admin_api import admin_bp
+from app.config.settings import TestingConfig
+from app.utils import profiler as profiler_module
+from app.utils.profiler import SamplingProfiler, init_profiler, list_profiles, save_profile
+
+
+def busy_transfer(stop):
+    while not stop.is_set():
+        sum(range(100))
+
+
+class TestSamplingProfiler:
+
+    def test_samples_are_attributed_to_requests(self):
+        """Test stacks of request threads get their blueprint as root frame, other threads are left out"""
+        stop = threading.Event()
+        busy = threading.Thread(target=busy_transfer, args=(stop,))
+        idle = threading.Thread(target=stop.wait)
+        busy.start()
+        idle.start()
+        try:
+            profiler = SamplingProfiler(0.2, interval=0.005,
+                                        labels={busy.ident: ('transfer', 'transfer.create_transfer')})
+            profiler.run()
+        finally:
+            stop.set()
+            busy.join()
+            idle.join()
+
+        summary = profiler.summary()
+        assert summary['ticks'] > 10 and summary['samples'] == summary['ticks']
+        assert summary['by_blueprint'] == {'transfer': summary['samples']}
+        assert summary['by_endpoint'] == {'transfer.create_transfer': summary['samples']}
+        for line in profiler.collapsed().splitlines():
+            stack, count = line.rsplit(' ', 1)
+            assert stack.startswith('transfer;') and 'busy_transfer (' in stack and int(count) > 0
+        assert summary['sampler_cpu_seconds'] < summary['seconds']
+
+    def test_saved_profiles_are_pruned(self, tmp_path):
+        """Test profiles are written in both formats and only the newest are kept"""
+        for minute in (1, 2, 3):
+            profiler = SamplingProfiler(0)
+            profiler.run()
+            profiler.started_at = datetime(2025, 7, 7, 16, minute)
+            save_profile(profiler, str(tmp_path), keep=2)
+
+        names = list_profiles(str(tmp_path))
+        assert [name[-6:] for name in names] == ['160300', '160200']
+        assert sorted(p.name for p in tmp_path.iterdir()) == sorted(
+            name + suffix for name in names for suffix in ('.collapsed', '.json')
+        )
+
+
+class TestProfilerApi:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, tmp_path):
+        """Setup test fixtures"""
+        class ProfilerConfig(TestingConfig):
+            PROFILER_DIR = str(tmp_path)
+
+        self.app = Flask('tests')
+        self.app.config.from_object(ProfilerConfig)
+        JWTManager(self.app)
+        init_profiler(self.app)
+        self.app.register_blueprint(admin_bp, url_prefix='/admin')
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            self.admin = {'Authorization': 'Bearer ' + create_access_token(
+                identity='ops', additional_claims={'role': 'admin'})}
+            self.teller = {'Authorization': 'Bearer ' + create_access_token(identity='teller')}
+        yield
+        running = profiler_module.active_profiler
+        if running is not None:
+            running.stop()
+            running.join()
+
+    def test_profile_is_started_and_read_back(self):
+        """Test an admin starts a profile, a second one is refused while it runs, and the result is served"""
+        response = self.client.post('/admin/profiles', json={'seconds': 0.1, 'interval_ms': 5}, headers=self.admin)
+        assert response.status_code == 202
+        name = response.get_json()['data']['profile']
+
+        busy = self.client.post('/admin/profiles', json={'seconds': 0.1}, headers=self.admin)
+        assert busy.status_code == 409 and busy.get_json()['error']['code'] == 'PROFILER_BUSY'
+
+        profiler_module.active_profiler.join()
+        assert profiler_module.request_labels == {}
+        assert self.client.get('/admin/profiles', headers=self.admin).get_json()['data']['profiles'] == [name]
+        summary = self.client.get(f'/admin/profiles/{name}?format=json', headers=self.admin).get_json()
+        assert summary['ticks'] > 0 and summary['interval_ms'] == 5
+        collapsed = self.client.get(f'/admin/profiles/{name}', headers=self.admin)
+        assert collapsed.status_code == 200 and collapsed.mimetype == 'text/plain'
+
+    def test_admin_only_and_validated(self):
+        """Test non-admin tokens get 403 and out-of-range or unsafe parameters get 400"""
+        assert self.client.post('/admin/profiles', json={'seconds': 1}, headers=self.teller).status_code == 403
+        assert self.client.get('/admin/profiles').status_code == 401
+
+        for body in ({'seconds': 0}, {'seconds': 1000}, {'seconds': 'x'}, {'interval_ms': 0.1}):
+            response = self.client.post('/admin/profiles', json=body, headers=self.admin)
+            assert response.status_code == 400 and response.get_json()['error']['code'] == 'INVALID_REQUEST'
+        assert self.client.get('/admin/profiles/..%2Fsecrets', headers=self.admin).status_code in (400, 404)
+        assert self.client.get('/admin/profiles/profile-1-20250707T160000', headers=self.admin).status_code == 404
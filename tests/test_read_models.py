@@ -0,0 +1,64 @@
+"""
+Unit tests for read-only records and the account read path
+"""
+
+import pytest
+from decimal import Decimal
+
+from app.models.constraints import AccountRestraint
+from app.models.transaction import TransactionHistory
+from app.services.account_service import AccountService
+
+
+class TestReadModels:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, database):
+        """Setup test fixtures"""
+        self.engine, self.Session, self.accounts = database(2)
+        with self.Session() as session:
+            session.add(AccountRestraint(
+                INTERNAL_KEY=1, RESTRAINT_TYPE='FREEZE', RES_SEQ_NO='R1',
+                CLIENT_NO='1108800001', RESTRAINTS_STATUS='A'
+            ))
+            session.add(TransactionHistory.create_debit_transaction(
+                internal_key=1, client_no='1108800001', account_no=self.accounts[0],
+                amount=Decimal('10.00'), previous_balance=Decimal('100000.00'),
+                new_balance=Decimal('99990.00'), reference='TRF1'
+            ))
+            session.commit()
+
+    def test_balance_record_matches_orm(self):
+        """Test records expose the same attributes and dict as ORM instances"""
+        with self.Session() as session:
+            service = AccountService(session)
+            account, balance = service.get_account_balance(self.accounts[0])
+            account_record, balance_record = service.get_account_balance_record(self.accounts[0])
+
+            assert account_record.to_dict() == account.to_dict()
+            assert balance_record.to_dict() == balance.to_dict()
+            assert balance_record.TOTAL_AMOUNT == balance.TOTAL_AMOUNT
+            assert account_record.ACCT_CCY == 'CNY'
+
+    def test_records_are_immutable_and_untracked(self):
+        """Test records cannot be modified and are not added to the session"""
+        with self.Session() as session:
+            service = AccountService(session)
+            account_record, _ = service.get_account_balance_record(self.accounts[0])
+
+            assert len(session.identity_map) == 0
+            with pytest.raises(AttributeError):
+                account_record.ACCT_STATUS = 'C'
+
+    def test_account_info_and_history(self):
+        """Test account info and history are served from records"""
+        with self.Session() as session:
+            service = AccountService(session)
+            info = service.get_account_info(self.accounts[0])
+            history = service.get_account_transaction_history(self.accounts[0])
+
+            assert info['restrictions'][0]['restraint_type'] == 'FREEZE'
+            assert info['limits'][0]['limit_reference'] == 'DailyTransferLimit'
+            assert history[0]['reference'] == 'TRF1'
+            assert history[0]['amount'] == 10.0
+            assert len(session.identity_map) == 0
@@ -0,0 +1,125 @@
+"""
+Unit tests for the cross-database reconciliation tool
+"""
+
+import pytest
+from datetime import date
+from decimal import Decimal
+
+from app.models.transaction import TransactionHistory, TransferLog
+from app.tools.reconcile import Reconciler, format_report, partition_bounds, transfer_issues
+
+DAY = date(2025, 7, 7)
+
+
+def _transfer_id(hour, minute, second, suffix):
+    return f"TRF20250707{hour:02d}{minute:02d}{second:02d}{suffix:08d}"
+
+
+class TestTransferIssues:
+
+    def test_consistent_transfers(self):
+        """Test complete successful and rolled back transfers have no issues"""
+        assert transfer_issues((100, 'SUCCESS'), (100, 'SUCCESS'), [(100, 'D', 'S1')], [(100, 'C', 'S2')]) == []
+        assert transfer_issues((100, 'ROLLBACK'), (100, 'ROLLBACK'), [], []) == []
+
+    def test_issue_names(self):
+        """Test each kind of damage is named"""
+        assert transfer_issues((100, 'SUCCESS'), None, [(100, 'D', 'S1'), (100, 'D', 'S3')], []) == \
+            ['MISSING_DEST_LOG', 'DUPLICATE_DEBIT', 'MISSING_CREDIT']
+        assert transfer_issues((100, 'SUCCESS'), (100, 'ROLLBACK'), [(90, 'D', 'S1')], [(100, 'D', 'S2')]) == \
+            ['STATUS_MISMATCH', 'DEBIT_AMOUNT_MISMATCH', 'DEST_WRONG_DIRECTION', 'MISSING_CREDIT']
+        assert transfer_issues((100, 'ROLLBACK'), (100, 'ROLLBACK'), [(100, 'D', 'S1')], []) == \
+            ['UNEXPECTED_DEBIT']
+
+    def test_partition_bounds(self):
+        """Test a prefix maps to a half-open key range"""
+        assert partition_bounds('TRF2025070709') == ('TRF2025070709', 'TRF202507070:')
+
+
+class TestReconciler:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, database):
+        """Setup test fixtures"""
+        # File-backed: digest queries run concurrently on separate connections
+        self.sessions = {side: database(name=side)[1] for side in ('source', 'dest')}
+
+        # Consistent transfers spread over three hours
+        self.transfers = [
+            (_transfer_id(hour, minute, second, hour * 10000 + minute * 100 + second), Decimal('125.50'))
+            for hour in (1, 9, 23) for minute in (0, 30) for second in (5, 6)
+        ]
+        for transfer_id, amount in self.transfers:
+            self._add_transfer(transfer_id, amount)
+
+        self.reconciler = Reconciler(self.sessions['source'], self.sessions['dest'], workers=4)
+
+    def _add(self, side, *rows):
+        with self.sessions[side]() as session:
+            session.add_all(rows)
+            session.commit()
+
+    def _log(self, transfer_id, amount, status='SUCCESS'):
+        return TransferLog(transfer_id=transfer_id, from_account='6230399991000000001',
+                           to_account='6230399991000000002', amount=amount, status=status)
+
+    def _leg(self, transfer_id, amount, indicator, seq_no=None):
+        return TransactionHistory(SEQ_NO=seq_no or f"{indicator}{transfer_id}", INTERNAL_KEY=1,
+                                  REFERENCE=transfer_id, TRAN_AMT=amount, CR_DR_IND=indicator)
+
+    def _add_transfer(self, transfer_id, amount, status='SUCCESS'):
+        self._add('source', self._log(transfer_id, amount, status), self._leg(transfer_id, amount, 'D'))
+        self._add('dest', self._log(transfer_id, amount, status), self._leg(transfer_id, amount, 'C'))
+
+    def test_consistent_day_stops_at_hours(self):
+        """Test matching digests need no drill-down"""
+        report = self.reconciler.reconcile(DAY)
+
+        assert report['partitions'] == {'hour': {'checked': 3, 'mismatched': 0}}
+        assert report['discrepancies'] == []
+        assert 'No discrepancies' in format_report(report)
+
+    def test_discrepancies_are_pinpointed(self):
+        """Test only mismatching partitions are descended into and the exact ids reported"""
+        missing_credit = _transfer_id(9, 30, 7, 1)
+        self._add('source', self._log(missing_credit, Decimal('10.00')), self._leg(missing_credit, Decimal('10.00'), 'D'))
+        self._add('dest', self._log(missing_credit, Decimal('10.00')))
+
+        wrong_amount = _transfer_id(9, 30, 7, 2)
+        self._add('source', self._log(wrong_amount, Decimal('20.00')), self._leg(wrong_amount, Decimal('20.00'), 'D'))
+        self._add('dest', self._log(wrong_amount, Decimal('20.00')), self._leg(wrong_amount, Decimal('2.00'), 'C'))
+
+        # Missing on both sides: the databases agree, the per-side totals do not
+        no_legs = _transfer_id(23, 0, 9, 3)
+        self._add('source', self._log(no_legs, Decimal('30.00')))
+        self._add('dest', self._log(no_legs, Decimal('30.00')))
+
+        report = self.reconciler.reconcile(DAY)
+
+        assert report['partitions'] == {
+            'hour': {'checked': 3, 'mismatched': 2},
+            'minute': {'checked': 4, 'mismatched': 2},
+            'second': {'checked': 6, 'mismatched': 2}
+        }
+        assert [(d['transfer_id'], d['issues']) for d in report['discrepancies']] == [
+            (missing_credit, ['MISSING_CREDIT']),
+            (wrong_amount, ['CREDIT_AMOUNT_MISMATCH']),
+            (no_legs, ['MISSING_DEBIT', 'MISSING_CREDIT'])
+        ]
+        assert report['discrepancies'][1]['dest']['legs'][0]['amount'] == Decimal('2.00')
+
+    def test_rolled_back_and_other_days_are_ignored(self):
+        """Test rolled back transfers without legs and other days do not count"""
+        self._add_transfer(_transfer_id(12, 0, 0, 4), Decimal('5.00'), status='ROLLBACK')
+        with self.sessions['source']() as session:
+            session.query(TransactionHistory).filter_by(REFERENCE=_transfer_id(12, 0, 0, 4)).delete()
+            session.commit()
+        with self.sessions['dest']() as session:
+            session.query(TransactionHistory).filter_by(REFERENCE=_transfer_id(12, 0, 0, 4)).delete()
+            session.commit()
+        self._add('source', self._log('TRF20250708000000ABCDEF01', Decimal('1.00')))
+
+        report = self.reconciler.reconcile(DAY)
+
+        assert report['partitions'] == {'hour': {'checked': 4, 'mismatched': 0}}
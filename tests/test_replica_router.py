@@ -0,0 +1,91 @@
+"""
+Unit tests for lag-aware replica routing
+"""
+
+import pytest
+import time
+from sqlalchemy.orm import sessionmaker
+
+from app.database import connection, replica_router
+from app.database.replica_router import ReplicaRouter
+
+
+class TestReplicaRouter:
+
+    def setup_method(self):
+        """Setup test fixtures"""
+        self.lag = 0.5
+        self.router = ReplicaRouter('source', lambda: self.lag, max_lag=2, check_interval=1, sticky_seconds=5)
+        self.router.check_lag()
+
+    def test_fresh_replica_serves_reads(self):
+        """Test reads go to a replica within the lag budget"""
+        assert self.router.use_replica(('6230399991000000001',))
+
+    def test_lagging_or_unknown_replica_falls_back(self):
+        """Test excessive, unknown or stale lag routes to the primary"""
+        self.lag = 3
+        self.router.check_lag()
+        assert not self.router.use_replica()
+
+        self.lag = None
+        self.router.check_lag()
+        assert not self.router.use_replica()
+
+        self.lag = 0
+        self.router.check_lag()
+        self.router._lag_checked_at -= 10
+        assert not self.router.use_replica()
+
+    def test_failed_probe_counts_as_unknown(self):
+        """Test a probe error routes to the primary"""
+        def failing_probe():
+            raise RuntimeError("replica down")
+
+        router = ReplicaRouter('dest', failing_probe)
+        router.check_lag()
+        assert not router.use_replica()
+
+    def test_recent_writes_stick_to_primary(self):
+        """Test read-your-writes by account key and by client write time"""
+        self.router.record_write('6230399991000000001')
+
+        assert not self.router.use_replica(('6230399991000000001',))
+        assert self.router.use_replica(('6230399991000000002',))
+        assert not self.router.use_replica(written_at=time.time() - 1)
+        assert self.router.use_replica(written_at=time.time() - 60)
+        assert self.router.stats()['primary_reads'] == 2
+
+
+class TestReadSessions:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, database):
+        """Setup test fixtures"""
+        self.primary = database()[0]
+        self.replica = database()[0]
+        self.saved = (connection.SourceSession, dict(connection.replica_sessions), dict(replica_router.replica_routers))
+
+        connection.SourceSession = sessionmaker(bind=self.primary)
+        connection.replica_sessions['source'] = sessionmaker(bind=self.replica, info={'replica': True})
+        self.router = ReplicaRouter('source', lambda: 0, max_lag=2)
+        self.router.check_lag()
+        replica_router.replica_routers['source'] = self.router
+
+    def teardown_method(self):
+        connection.SourceSession = self.saved[0]
+        connection.replica_sessions.clear()
+        connection.replica_sessions.update(self.saved[1])
+        replica_router.replica_routers.clear()
+        replica_router.replica_routers.update(self.saved[2])
+
+    def test_read_session_routing(self):
+        """Test read sessions follow the router and writes pin to the primary"""
+        with connection.get_source_read_session(('A1',)) as session:
+            assert connection.is_replica_session(session)
+
+        replica_router.record_write('source', 'A1')
+
+        with connection.get_source_read_session(('A1',)) as session:
+            assert not connection.is_replica_session(session)
+            assert session.get_bind() is self.primary
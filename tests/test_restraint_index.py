@@ -0,0 +1,73 @@
+"""
+Unit tests for the in-memory restraint index
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from app.models.constraints import AccountRestraint
+from app.services.account_service import AccountService
+from app.services.restraint_index import RestraintIndex
+from app.utils.exceptions import AccountRestrictedException
+
+
+class TestRestraintIndex:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, database):
+        """Setup test fixtures"""
+        self.engine, self.Session, self.accounts = database(3)
+        self.now = datetime(2025, 7, 7, 16, 0, 0)
+        self._add_restraint(1, 'FREEZE', 'R1', 'A', self.now)
+        self._add_restraint(2, 'PLEDGE', 'R2', 'A', self.now)
+        self.index = RestraintIndex('source', self.Session, max_staleness=5, overlap_seconds=1)
+        self.index.load()
+
+    def _add_restraint(self, internal_key, restraint_type, seq_no, status, timestamp):
+        with self.Session() as session:
+            session.merge(AccountRestraint(
+                INTERNAL_KEY=internal_key, RESTRAINT_TYPE=restraint_type, RES_SEQ_NO=seq_no,
+                CLIENT_NO='1108800001', RESTRAINTS_STATUS=status, TRAN_TIMESTAMP=timestamp
+            ))
+            session.commit()
+
+    def test_load_indexes_only_blocking_restraints(self):
+        """Test only active freeze-type restraints are indexed"""
+        assert self.index.lookup(1) == frozenset(['FREEZE'])
+        assert self.index.lookup(2) == frozenset()
+        assert self.index.lookup(3) == frozenset()
+
+    def test_refresh_applies_changes_since_watermark(self):
+        """Test incremental refresh adds and releases restraints"""
+        later = self.now + timedelta(seconds=10)
+        self._add_restraint(3, 'JUDICIAL', 'R3', 'A', later)
+        self._add_restraint(1, 'FREEZE', 'R1', 'I', later)
+
+        self.index.refresh()
+
+        assert self.index.lookup(3) == frozenset(['JUDICIAL'])
+        assert self.index.lookup(1) == frozenset()
+        assert self.index.stats()['restrained_accounts'] == 1
+
+    def test_stale_index_does_not_answer(self):
+        """Test lookups return None outside the freshness window"""
+        self.index._last_refresh -= 10
+
+        assert self.index.lookup(3) is None
+        assert self.index.stats()['stale_misses'] == 1
+
+    def test_account_service_skips_query_for_unrestricted_account(self):
+        """Test the unrestricted case is answered from the index"""
+        with self.Session() as session:
+            service = AccountService(session, self.index)
+            with patch.object(service, 'get_account_restrictions') as query:
+                service.validate_account_for_transfer(self.accounts[2])
+                query.assert_not_called()
+
+    def test_account_service_confirms_restrained_account(self):
+        """Test restrained accounts are still rejected"""
+        with self.Session() as session:
+            service = AccountService(session, self.index)
+            with pytest.raises(AccountRestrictedException):
+                service.validate_account_for_transfer(self.accounts[0])
@@ -0,0 +1,126 @@
+"""
+Unit tests for the proxy SQL log analyzer
+"""
+
+import os
+import tempfile
+from datetime import datetime, timedelta
+from urllib.parse import quote
+
+from app.tools.sql_log_analyzer import analyze, fingerprint_sql, LatencyHistogram
+
+SAMPLE_LOG = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'deposit SQL.txt')
+START = datetime(2025, 7, 7, 16, 26, 48)
+
+
+def _line(at, con, sql, timecost, autocommit=0):
+    stamp = f"{at.strftime('%Y-%m-%d %H:%M:%S')} {at.microsecond:06d}"
+    return (f"[{stamp}] INFO topic=set_1&tid={con}&con=0x{con}&qid=&clientIP=10.0.0.1:1"
+            f"&proxyHost=10.0.0.2:15003&sql_size={len(sql)}&sql_type=3&sql={quote(sql)}"
+            f"&autocommit={autocommit}&resultcode=0&event_timecost=0.05&timecost={timecost}\n")
+
+
+def _write(lines):
+    handle, path = tempfile.mkstemp(suffix='.log')
+    with os.fdopen(handle, 'w') as f:
+        f.writelines(lines)
+    return path
+
+
+class TestFingerprints:
+
+    def test_literals_are_normalized(self):
+        """Test executions with different literals share a fingerprint"""
+        a = fingerprint_sql("SELECT * FROM RB_ACCT\n WHERE INTERNAL_KEY = 2003879425 AND CLIENT_NO = '1108803572'")
+        b = fingerprint_sql("select * from rb_acct where internal_key = 7 and client_no = 'it''s'")
+
+        assert a == b == "select * from rb_acct where internal_key = ? and client_no = ?"
+        assert fingerprint_sql("select a from t where id in (1, 2, 3)") == "select a from t where id in (?+)"
+        assert fingerprint_sql("update t set x = -83986.57 where k = 1") == "update t set x = ? where k = ?"
+
+    def test_chopped_statements_match(self):
+        """Test chops at different offsets of one statement match"""
+        a = fingerprint_sql("SELECT A, B FROM T WHERE K = 1 AND C = 'x", chopped=True)
+        b = fingerprint_sql("SELECT A, B FROM T WHERE K = 22 AND C = 'xyz", chopped=True)
+
+        assert a == b
+        assert a.endswith('/*chopped*/')
+
+    def test_histogram_percentiles(self):
+        """Test bucketed percentiles stay within the bucket error"""
+        histogram = LatencyHistogram()
+        for value in range(1, 1001):
+            histogram.add(float(value))
+
+        assert abs(histogram.percentile(50) - 500) / 500 < 0.02
+        assert abs(histogram.percentile(99) - 990) / 990 < 0.02
+        assert histogram.percentile(100) == 1000
+
+
+class TestAnalyzer:
+
+    def test_sample_log(self):
+        """Test the production sample in deposit SQL.txt"""
+        report = analyze([SAMPLE_LOG], workers=1)
+        summary = report['summary']
+
+        assert summary['lines'] == 18
+        assert summary['malformed'] == 1
+        assert summary['transactions'] == 2
+
+        slowest = report['slow_transactions'][0]
+        assert slowest['span_ms'] > 30000
+        assert 'rb_acct_balance' in slowest['locked_tables']
+        assert max(step['gap_before_ms'] for step in slowest['critical_path']) > 30000
+        assert report['fingerprints'][0]['sql'] == 'set sql_select_limit=?'
+
+    def test_parallel_chunks_match_sequential(self):
+        """Test transactions split across chunks are stitched back together"""
+        lines = []
+        at = START
+        for tx in range(60):
+            con = f"c{tx % 4}"
+            for step in range(3):
+                at += timedelta(milliseconds=3)
+                lines.append(_line(at, con, f"UPDATE RB_ACCT_BALANCE SET TOTAL_AMOUNT = {tx} WHERE INTERNAL_KEY = {step}", 0.4))
+            at += timedelta(milliseconds=3)
+            lines.append(_line(at, con, "commit", 0.2))
+        path = _write(lines)
+        try:
+            sequential = analyze([path], workers=1)
+            parallel = analyze([path], workers=2, chunk_size=1500)
+        finally:
+            os.unlink(path)
+
+        assert sequential['summary'] == parallel['summary']
+        assert parallel['summary']['transactions'] == 60
+        assert sequential['fingerprints'] == parallel['fingerprints']
+        assert [t['span_ms'] for t in sequential['slow_transactions']] == \
+            [t['span_ms'] for t in parallel['slow_transactions']]
+
+    def test_lock_wait_suspect_with_blocker(self):
+        """Test a slow locking statement is linked to the transaction holding the table"""
+        lines = []
+        at = START
+        for i in range(20):
+            at += timedelta(milliseconds=5)
+            lines.append(_line(at, 'b', f"UPDATE RB_ACCT_BALANCE SET TOTAL_AMOUNT = {i} WHERE INTERNAL_KEY = 9", 0.5))
+            lines.append(_line(at, 'b', "commit", 0.1))
+
+        holder_start = at + timedelta(milliseconds=10)
+        lines.append(_line(holder_start, 'a',
+                           "SELECT * FROM RB_ACCT_BALANCE WHERE INTERNAL_KEY = 1 FOR UPDATE", 0.3))
+        lines.append(_line(holder_start + timedelta(seconds=1, milliseconds=400), 'b',
+                           "UPDATE RB_ACCT_BALANCE SET TOTAL_AMOUNT = 5 WHERE INTERNAL_KEY = 1", 1200.0))
+        lines.append(_line(holder_start + timedelta(seconds=2), 'a', "commit", 0.2))
+        path = _write(lines)
+        try:
+            report = analyze([path], workers=1)
+        finally:
+            os.unlink(path)
+
+        suspects = report['lock_wait_suspects']
+        assert len(suspects) == 1
+        assert suspects[0]['timecost_ms'] == 1200.0
+        assert suspects[0]['table'] == 'rb_acct_balance'
+        assert [b['connection'] for b in suspects[0]['blockers']] == ['10.0.0.2:15003/0xa']
@@ -0,0 +1,75 @@
+"""
+Unit tests for lazy, fork-safe application startup
+"""
+
+import logging
+import os
+
+import pytest
+from unittest.mock import patch
+
+import app as application
+from app.config.settings import TestingConfig
+from app.database import connection
+
+
+class TestLazyStartup:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, tmp_path, bind_databases):
+        """Setup test fixtures"""
+        class LazyConfig(TestingConfig):
+            LAZY_STARTUP = True
+            LOG_FILE = str(tmp_path / 'banking.log')
+
+        self.config = LazyConfig
+        self.bind_databases = bind_databases
+        handlers = list(logging.getLogger().handlers)
+        saved = (connection._lazy_engines, application._worker_pid)
+        yield
+        connection._lazy_engines, application._worker_pid = saved
+        connection.replica_engines.clear()
+        connection.replica_sessions.clear()
+        for handler in logging.getLogger().handlers[:]:
+            if handler not in handlers:
+                logging.getLogger().removeHandler(handler)
+                handler.close()
+
+    def test_create_app_connects_nothing(self):
+        """Test create_app builds no engine and starts no worker state until first use"""
+        with patch.object(application, 'init_restraint_indexes') as init_restraint_indexes:
+            app = application.create_app(self.config)
+
+        assert connection.source_engine is None and connection.SourceSession is None
+        init_restraint_indexes.assert_not_called()
+
+        # The first lookup of the process creates the engines, without probing the databases
+        with patch.dict(os.environ, {'DB1_HOST': 'db1.internal', 'DB2_HOST': 'db2.internal'}):
+            engine = connection.get_source_engine()
+        assert engine.url.host == 'db1.internal' and connection.get_dest_engine().url.host == 'db2.internal'
+        assert app.config['LAZY_STARTUP']
+
+    def test_worker_state_starts_once_per_process(self):
+        """Test start_worker runs once in a process and again in a forked child"""
+        app = application.create_app(self.config)
+        with patch.object(application, 'init_restraint_indexes') as init_restraint_indexes:
+            application._worker_pid = None
+            app.test_client().get('/missing')
+            application.start_worker(app)
+            assert init_restraint_indexes.call_count == 1
+
+            # A child process inherits the parent's pid marker but not its threads
+            application._worker_pid = os.getpid() + 1
+            application.start_worker(app)
+            assert init_restraint_indexes.call_count == 2
+
+    def test_fork_drops_inherited_connections(self, database):
+        """Test a forked child replaces the pools it inherited instead of sharing their connections"""
+        engine, _, _ = database()
+        self.bind_databases(engine, engine)
+        pool = engine.pool
+        with engine.connect():
+            pass
+
+        connection._after_fork_in_child()
+        assert engine.pool is not pool
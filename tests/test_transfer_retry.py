@@ -0,0 +1,135 @@
+"""
+Unit tests for deadlock and lock wait retries of transfers
+"""
+
+import pytest
+from decimal import Decimal
+from unittest.mock import patch
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+
+from app.config.settings import Config
+from app.models.account import AccountBalance
+from app.models.transaction import TransferLog
+from app.services.account_service import AccountService
+from app.services.transfer_retry import RetryBudget, TransferRetryPolicy, retryable_error
+from app.services.transfer_service import TransferService
+from app.utils.deadline import Deadline
+from app.utils.exceptions import DistributedTransactionException, TransferException
+
+
+def _db_error(code, message):
+    return OperationalError('UPDATE rb_acct_balance', {}, Exception(code, message))
+
+
+DEADLOCK = _db_error(1213, 'Deadlock found when trying to get lock; try restarting transaction')
+
+
+class TestRetryPolicy:
+
+    def test_classification_follows_the_exception_chain(self):
+        """Test a deadlock wrapped by the transaction manager is still recognized"""
+        try:
+            try:
+                raise DEADLOCK
+            except OperationalError as e:
+                raise DistributedTransactionException(str(e), 'PREPARE')
+        except DistributedTransactionException as wrapped:
+            assert retryable_error(wrapped) == 'deadlock'
+
+        assert retryable_error(_db_error(1205, 'Lock wait timeout exceeded')) == 'lock_wait_timeout'
+        assert retryable_error(_db_error(1062, 'Duplicate entry')) is None
+        assert retryable_error(ValueError('bad')) is None
+
+    def test_budget_limits_retries_to_a_share_of_transfers(self):
+        """Test retries spend whole tokens while transfers deposit a fraction"""
+        budget = RetryBudget(ratio=0.5, reserve=2)
+        assert [budget.withdraw() for _ in range(3)] == [True, True, False]
+        budget.deposit()
+        assert not budget.withdraw()
+        budget.deposit()
+        assert budget.withdraw()
+
+    def test_decide(self):
+        """Test only pre-commit lock conflicts with attempts and time left are retried"""
+        policy = TransferRetryPolicy(RetryBudget(reserve=10), max_attempts=3, base_delay=0.1, rng=lambda: 1.0)
+
+        assert policy.decide(DEADLOCK, 1, False) == ('deadlock', 0.1)
+        assert policy.decide(DEADLOCK, 2, False).delay == 0.2
+        assert policy.decide(DEADLOCK, 3, False) is None
+        assert policy.decide(DEADLOCK, 1, True) is None
+        assert policy.decide(_db_error(1062, 'Duplicate entry'), 1, False) is None
+        assert policy.decide(DEADLOCK, 1, False, Deadline(0.05)) is None
+
+
+class TestTransferRetries:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, database, bind_databases):
+        """Setup test fixtures"""
+        self.sessions, self.accounts = [], []
+        engines = []
+        for name, prefix in (('source', '6230399991'), ('dest', '6230399992')):
+            engine, Session, accounts = database(1, name=name, balance='1000.00', account_prefix=prefix)
+            engines.append(engine)
+            self.sessions.append(Session)
+            self.accounts.append(accounts[0])
+        bind_databases(*engines)
+
+        self.service = TransferService(Config())
+        self.service.retry_policy = TransferRetryPolicy(RetryBudget(reserve=10), rng=lambda: 0.0)
+        self.request = {
+            'from_account': self.accounts[0], 'to_account': self.accounts[1],
+            'amount': Decimal('10.00'), 'currency': 'CNY'
+        }
+
+    def _state(self, Session):
+        with Session() as session:
+            balance = session.execute(select(func.sum(AccountBalance.TOTAL_AMOUNT))).scalar()
+            logs = session.execute(select(TransferLog.transfer_id, TransferLog.retry_count)).all()
+            return balance, logs
+
+    def _debit_failing(self, *errors):
+        debit = AccountService.debit_account
+        calls = []
+
+        def failing_debit(service, *args, **kwargs):
+            calls.append(args)
+            if len(calls) <= len(errors):
+                raise errors[len(calls) - 1]
+            return debit(service, *args, **kwargs)
+        return failing_debit, calls
+
+    def test_deadlock_is_retried_with_the_same_transfer_id(self):
+        """Test a deadlock victim reruns once and the retry is recorded on both logs"""
+        failing_debit, calls = self._debit_failing(DEADLOCK)
+        with patch.object(AccountService, 'debit_account', failing_debit):
+            result = self.service.process_transfer(self.request, validated=True)
+
+        assert result['status'] == 'SUCCESS' and len(calls) == 2
+        source_balance, source_logs = self._state(self.sessions[0])
+        dest_balance, dest_logs = self._state(self.sessions[1])
+        assert (source_balance, dest_balance) == (Decimal('990.00'), Decimal('1010.00'))
+        assert source_logs == dest_logs == [(result['transfer_id'], 1)]
+
+    def test_other_errors_fail_at_once(self):
+        """Test non-retryable database errors still fail the transfer on the first attempt"""
+        failing_debit, calls = self._debit_failing(_db_error(1062, 'Duplicate entry'))
+        with patch.object(AccountService, 'debit_account', failing_debit):
+            with pytest.raises(TransferException):
+                self.service.process_transfer(self.request, validated=True)
+
+        assert len(calls) == 1
+        assert self._state(self.sessions[0]) == (Decimal('1000.00'), [])
+
+    def test_exhausted_budget_stops_retries(self):
+        """Test retries stop when the process budget is spent"""
+        self.service.retry_policy = TransferRetryPolicy(RetryBudget(ratio=0.1, reserve=1), rng=lambda: 0.0)
+        failing_debit, calls = self._debit_failing(DEADLOCK, DEADLOCK)
+        with patch.object(AccountService, 'debit_account', failing_debit):
+            with pytest.raises(TransferException):
+                self.service.process_transfer(self.request, validated=True)
+
+        assert len(calls) == 2
+        assert self._state(self.sessions[1]) == (Decimal('1000.00'), [])
@@ -0,0 +1,127 @@
+"""
+Unit tests for the compiled transfer validation rules
+"""
+
+import pytest
+from decimal import Decimal
+
+from app.utils.exceptions import (
+    ValidationException, TransferException, SameAccountTransferException,
+    TransferLimitExceededException, CurrencyMismatchException
+)
+from app.utils.transfer_rules import TransferRules
+
+FROM_ACCOUNT = '6230399991006371427'
+TO_ACCOUNT = '6230399991006371430'
+
+
+def _request(**overrides):
+    request = {'from_account': FROM_ACCOUNT, 'to_account': TO_ACCOUNT, 'amount': '100.50', 'currency': 'CNY'}
+    request.update(overrides)
+    return request
+
+
+class TestTransferRules:
+
+    def setup_method(self):
+        """Setup test fixtures"""
+        self.rules = TransferRules('0.01', '50000.00')
+
+    def test_valid_request_is_normalized(self):
+        """Test a valid request comes back with a Decimal amount and upper-case currency"""
+        normalized, violations = self.rules.validate(_request(amount=100.5, currency='cny'))
+
+        assert violations == []
+        assert normalized['amount'] == Decimal('100.5')
+        assert normalized['currency'] == 'CNY'
+
+    def test_all_violations_in_one_pass(self):
+        """Test every broken rule is reported"""
+        _, violations = self.rules.validate({
+            'from_account': '62303-9999', 'to_account': '62303-9999', 'amount': '1.234', 'currency': 'USD'
+        })
+
+        assert [v.code for v in violations] == [
+            'INVALID_ACCOUNT', 'INVALID_ACCOUNT', 'SAME_ACCOUNT', 'AMOUNT_SCALE', 'UNSUPPORTED_CURRENCY'
+        ]
+        assert violations[0].message == "Account number contains invalid characters"
+
+    def test_non_string_currency(self):
+        """Test lists and objects as currency are violations, not lookup errors"""
+        for currency in (['CNY'], {'code': 'CNY'}, 156):
+            _, violations = self.rules.validate(_request(currency=currency))
+            assert [v.code for v in violations] == ['INVALID_CURRENCY']
+
+    @pytest.mark.parametrize('overrides, exception', [
+        ({'amount': None}, TransferException),
+        ({'to_account': FROM_ACCOUNT}, SameAccountTransferException),
+        ({'to_account': 'short'}, ValidationException),
+        ({'amount': 'abc'}, ValidationException),
+        ({'amount': '-5'}, TransferException),
+        ({'amount': '0.001'}, TransferLimitExceededException),
+        ({'amount': '50000.01'}, TransferLimitExceededException),
+        ({'currency': 'USD'}, CurrencyMismatchException),
+        ({'currency': ['CNY']}, ValidationException)
+    ])
+    def test_check_raises_service_exceptions(self, overrides, exception):
+        """Test check raises the exception of the first violation"""
+        with pytest.raises(exception):
+            self.rules.check(_request(**overrides))
+
+    def test_batch_matches_single_validation(self):
+        """Test batch validation reports the same violations as one by one"""
+        requests = [
+            _request(),
+            _request(amount='0'),
+            _request(to_account=FROM_ACCOUNT),
+            _request(amount='75000'),
+            _request(currency='usd'),
+            _request(from_account=12345),
+            _request(amount='100.50'),
+            _request(currency=['CNY']),
+            _request(currency={'code': 'CNY'}),
+            {}
+        ]
+
+        amounts, violations = self.rules.validate_batch(requests)
+
+        for request, amount, request_violations in zip(requests, amounts, violations):
+            normalized, expected = self.rules.validate(request)
+            assert list(request_violations) == expected
+            assert amount == normalized['amount']
+
+
+class TestValidationEndpoints:
+
+    @pytest.fixture(autouse=True)
+    def setup(self, api_client):
+        """Setup test fixtures"""
+        self.client = api_client
+
+    def test_validate_reports_violations(self):
+        """Test /transfers/validate returns the first error and every violation"""
+        response = self.client.post('/api/v1/transfers/validate', json=_request(amount='1.234', currency='USD'))
+        data = response.get_json()['data']
+
+        assert response.status_code == 200
+        assert data['valid'] is False
+        assert data['error']['error']['code'] == 'VALIDATION_ERROR'
+        assert [v['code'] for v in data['violations']] == ['AMOUNT_SCALE', 'UNSUPPORTED_CURRENCY']
+
+    def test_validate_missing_fields(self):
+        """Test missing fields keep their dedicated error response"""
+        response = self.client.post('/api/v1/transfers/validate', json={'from_account': FROM_ACCOUNT})
+
+        assert response.status_code == 400
+        assert response.get_json()['error']['code'] == 'MISSING_FIELDS'
+
+    def test_validate_batch(self):
+        """Test /transfers/validate/batch reports each request"""
+        response = self.client.post('/api/v1/transfers/validate/batch', json={
+            'transfers': [_request(), _request(to_account=FROM_ACCOUNT), _request(amount='100.50')]
+        })
+        data = response.get_json()['data']
+
+        assert response.status_code == 200
+        assert (data['count'], data['valid'], data['invalid']) == (3, 2, 1)
+        assert data['results'][1]['violations'][0]['code'] == 'SAME_ACCOUNT'
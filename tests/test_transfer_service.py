@@ -93,4 +93,16 @@ class TestTransferService:
         }
         
         with pytest.raises(TransferLimitExceededException):
-            self.transfer_service._validate_transfer_request(request)
\ No newline at end of file
+            self.transfer_service._validate_transfer_request(request)
+    
+    def test_value_date_uses_utc_day(self):
+        """Test the business date is looked up for the UTC day, like transfer ids and TRAN_DATE"""
+        calendar = Mock()
+        account = Mock(ACCT_BRANCH='0503')
+        
+        with patch('app.services.transfer_service.get_business_calendar', return_value=calendar), \
+                patch('app.services.transfer_service.datetime') as clock:
+            clock.utcnow.return_value.date.return_value = 'utc-day'
+            self.transfer_service._value_date(account)
+        
+        calendar.business_date.assert_called_once_with('0503', 'utc-day')